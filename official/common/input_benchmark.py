@@ -0,0 +1,108 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+r"""Benchmarks the input pipeline of a task without running a model.
+
+Drains `task.build_inputs` for a number of batches with the input pipeline
+profiler enabled, for every combination of the given interleave cycle and block
+lengths, and reports the throughput and per-stage profile of each (shell
+script):
+
+input_benchmark --experiment=retinanet_resnetfpn_coco \
+                --config_file=path/to/config.yaml \
+                --data=train_data \
+                --num_batches=200 \
+                --cycle_lengths=8,32,64 \
+                --block_lengths=1,4
+"""
+
+import itertools
+import time
+
+from absl import app
+from absl import flags
+from absl import logging
+import orbit
+import tensorflow as tf
+
+# pylint: disable=unused-import
+from official.common import registry_imports
+# pylint: enable=unused-import
+from official.common import flags as tfm_flags
+from official.core import input_profiler
+from official.core import task_factory
+from official.core import train_utils
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_enum('data', 'train_data', ['train_data', 'validation_data'],
+                  'The data config of the task to benchmark.')
+flags.DEFINE_integer('num_batches', 100, 'The number of batches to drain.')
+flags.DEFINE_integer(
+    'num_warmup_batches', 10,
+    'The number of batches drained before profiling, e.g. to fill buffers.')
+flags.DEFINE_list(
+    'cycle_lengths', [],
+    'The `cycle_length` values to benchmark. Defaults to the configured one.')
+flags.DEFINE_list(
+    'block_lengths', [],
+    'The `block_length` values to benchmark. Defaults to the configured one.')
+
+
+def benchmark(task, data_config, num_batches, num_warmup_batches, profiler):
+  """Returns the batches per second of draining the inputs of `task`."""
+  dataset = task.build_inputs(data_config)
+  iterator = iter(dataset)
+  for _ in range(num_warmup_batches):
+    next(iterator)
+  profiler.reset()
+  start = time.time()
+  for _ in range(num_batches):
+    next(iterator)
+  return num_batches / (time.time() - start)
+
+
+def main(_):
+  params = train_utils.parse_configuration(FLAGS)
+  task = task_factory.get_task(params.task, logging_dir=FLAGS.model_dir)
+  data_config = params.task.get(FLAGS.data).replace(enable_profiling=True)
+  profiler = input_profiler.get_profiler(
+      'train' if data_config.is_training else 'eval')
+  summary_manager = orbit.utils.SummaryManager(
+      FLAGS.model_dir, tf.summary.scalar,
+      global_step=tf.Variable(0, dtype=tf.int64))
+
+  cycle_lengths = [int(x) for x in FLAGS.cycle_lengths] or [
+      data_config.cycle_length]
+  block_lengths = [int(x) for x in FLAGS.block_lengths] or [
+      data_config.block_length]
+  for cycle_length, block_length in itertools.product(cycle_lengths,
+                                                      block_lengths):
+    batches_per_second = benchmark(
+        task,
+        data_config.replace(
+            cycle_length=cycle_length, block_length=block_length),
+        FLAGS.num_batches, FLAGS.num_warmup_batches, profiler)
+    logging.info(
+        'cycle_length=%s block_length=%d: %.2f batches/s.\n%s', cycle_length,
+        block_length, batches_per_second, profiler.report())
+    summary_manager.write_summaries(
+        {f'cycle_length_{cycle_length}_block_length_{block_length}': dict(
+            profiler.summaries(), batches_per_second=batches_per_second)})
+  summary_manager.flush()
+
+
+if __name__ == '__main__':
+  tfm_flags.define_flags()
+  app.run(main)
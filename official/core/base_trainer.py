@@ -26,11 +26,20 @@ import tensorflow as tf
 
 from official.core import base_task
 from official.core import config_definitions
+from official.core import input_profiler
 
 ExperimentConfig = config_definitions.ExperimentConfig
 TrainerConfig = config_definitions.TrainerConfig
 
 
+def _enable_profiling(task_config, data_field):
+  """Returns whether the input profiling of a data config is enabled."""
+  data_config = getattr(task_config, data_field, None)
+  if data_config is None:
+    return False
+  return getattr(data_config, "enable_profiling", False)
+
+
 class Recovery:
   """Built-in model blowup recovery module.
 
@@ -148,9 +157,12 @@ class Trainer(orbit.StandardTrainer, orbit.StandardEvaluator):
           self,
           train_dataset,
           options=orbit.StandardTrainerOptions(
-              use_tf_while_loop=config.trainer.train_tf_while_loop,
+              # The step breakdown times the steps from a Python loop.
+              use_tf_while_loop=(config.trainer.train_tf_while_loop and
+                                 not config.trainer.record_step_breakdown),
               use_tf_function=config.trainer.train_tf_function,
-              use_tpu_summary_optimization=config.trainer.allow_tpu_summary))
+              use_tpu_summary_optimization=config.trainer.allow_tpu_summary,
+              record_step_breakdown=config.trainer.record_step_breakdown))
 
     if evaluate:
       eval_dataset = orbit.utils.make_distributed_dataset(
@@ -274,6 +286,10 @@ class Trainer(orbit.StandardTrainer, orbit.StandardEvaluator):
       logs["learning_rate"] = self.optimizer.learning_rate(self.global_step)
     else:
       logs["learning_rate"] = self.optimizer.learning_rate
+    if _enable_profiling(self.config.task, "train_data"):
+      profiler = input_profiler.get_profiler("train")
+      logs.update(profiler.summaries())
+      profiler.reset()
     return logs
 
   def train_step(self, iterator):
@@ -323,6 +339,10 @@ class Trainer(orbit.StandardTrainer, orbit.StandardEvaluator):
     if aggregated_logs:
       metrics = self.task.reduce_aggregated_logs(aggregated_logs)
       logs.update(metrics)
+    if _enable_profiling(self.config.task, "validation_data"):
+      profiler = input_profiler.get_profiler("eval")
+      logs.update(profiler.summaries())
+      profiler.reset()
 
     if self._checkpoint_exporter:
       self._checkpoint_exporter.maybe_export_checkpoint(
@@ -150,6 +150,24 @@ class TrainerTest(tf.test.TestCase, parameterized.TestCase):
     self.assertTrue(
         tf.io.gfile.exists(os.path.join(model_dir, 'best_ckpt', 'info.json')))
 
+  def test_record_step_breakdown(self):
+    config = cfg.ExperimentConfig(
+        trainer=cfg.TrainerConfig(
+            record_step_breakdown=True,
+            optimizer_config=cfg.OptimizationConfig({
+                'optimizer': {
+                    'type': 'sgd'
+                },
+                'learning_rate': {
+                    'type': 'constant'
+                }
+            })))
+    # `train_tf_while_loop` defaults to True, and is ignored.
+    trainer = self.create_test_trainer(config)
+    logs = trainer.train(tf.convert_to_tensor(5, dtype=tf.int32))
+    self.assertIn('training_loss', logs)
+    self.assertIn('step_breakdown/input_wait_fraction', logs)
+
   def test_recovery(self):
     config = cfg.ExperimentConfig(
         trainer=cfg.TrainerConfig(
@@ -72,6 +72,23 @@ class DataConfig(base_config.Config):
       decoding when loading dataset from TFDS. Use comma to separate multiple
       features. The main use case is to skip the image/video decoding for better
       performance.
+    enable_profiling: A bool to indicate whether to record the latency and
+      throughput of every stage of the input pipeline, and the time the
+      accelerator waits for input. See `official.core.input_profiler`.
+    snapshot_dir: A str specifying a directory in which the decoded and
+      deterministically parsed examples are stored, so that later epochs and
+      runs read them instead of decoding and parsing again. Each snapshot is
+      keyed by a hash of this config, the parser arguments and the input files,
+      and is rebuilt when the key changes. The first read with a new key writes
+      the snapshot from a single pass over the data before returning. If
+      empty, no snapshot is used.
+    snapshot_num_shards: The number of files a snapshot is sharded into. For
+      training, their order is shuffled every epoch.
+    snapshot_shuffle_buffer_size: The buffer size used for shuffling the
+      training elements read from a snapshot, instead of
+      `shuffle_buffer_size`. The buffer holds decoded elements rather than
+      serialized examples, e.g. decoded images for detection, so it is kept
+      small: the shuffled and interleaved shards already mix the elements.
   """
   input_path: Union[Sequence[str], str] = ""
   tfds_name: str = ""
@@ -92,6 +109,10 @@ class DataConfig(base_config.Config):
   tfds_download: bool = False
   tfds_as_supervised: bool = False
   tfds_skip_decoding_feature: str = ""
+  enable_profiling: bool = False
+  snapshot_dir: str = ""
+  snapshot_num_shards: int = 64
+  snapshot_shuffle_buffer_size: int = 256
 
 
 @dataclasses.dataclass
@@ -185,6 +206,25 @@ class TrainerConfig(base_config.Config):
     best_checkpoint_metric_comp: for exporting the best checkpoint, how the
       trainer should compare the evaluation metrics. This can be either `higher`
       (higher the better) or `lower` (lower the better).
+    callstack_sampling_steps: if set, a "start,stop" pair of global steps
+      between which the Python callstacks of all threads are sampled. The
+      folded stacks and a table of the functions with the most self time are
+      written to `model_dir/train/profile_<start>_<stop>`, or to one such
+      directory per part of the window if evaluations interrupt it.
+    callstack_sampling_interval: the callstack sampling interval, in seconds.
+    record_step_breakdown: whether to record and summarize the time spent
+      waiting for the inputs, in the train steps, in the train loop
+      begin/end, and writing summaries and checkpoints. The train loop is
+      then a Python loop, regardless of `train_tf_while_loop`. On GPUs and
+      TPUs, the step time only covers dispatching the steps.
+    background_eval: whether `train_and_eval` evaluates a copy of the model on
+      a background thread, from snapshots of the weights taken every
+      `validation_interval` steps, while training continues.
+    max_pending_evals: the maximum number of background evaluations pending at
+      once. Training waits for the oldest one when the limit is reached.
+    async_checkpoint: whether to write the training checkpoints on a background
+      thread, so that training continues while they are written. Requires a
+      TF version with asynchronous checkpoints.
   """
   optimizer_config: OptimizationConfig = OptimizationConfig()
   # Orbit settings.
@@ -216,6 +256,16 @@ class TrainerConfig(base_config.Config):
   # the condition and fail the job if the condition happens; max trials > 0,
   # we will retore the model states.
   recovery_max_trials: int = 0
+  # Callstack sampling.
+  callstack_sampling_steps: str = ""
+  callstack_sampling_interval: float = 0.001
+  # Step time breakdown.
+  record_step_breakdown: bool = False
+  # Background evaluation.
+  background_eval: bool = False
+  max_pending_evals: int = 1
+  # Asynchronous checkpointing.
+  async_checkpoint: bool = False
 
 
 @dataclasses.dataclass
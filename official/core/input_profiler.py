@@ -0,0 +1,244 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-stage profiling of the `InputReader` input pipeline."""
+import functools
+import threading
+from typing import Any, Callable, Dict
+
+import numpy as np
+import tensorflow as tf
+
+# The stages of `InputReader.read`, in pipeline order. The elements of `read`,
+# `decoder_fn`, `snapshot_parser_fn`, `sample_fn` and `parser_fn` are examples;
+# the elements of `batch` and `postprocess_fn` are batches.
+MAP_STAGES = ('decoder_fn', 'snapshot_parser_fn', 'parser_fn',
+              'postprocess_fn')
+STAGES = ('read', 'decoder_fn', 'snapshot_parser_fn', 'sample_fn',
+          'parser_fn', 'batch', 'postprocess_fn')
+INPUT_WAIT = 'input_wait'
+
+# The upper edges of the log-spaced latency histogram buckets, in seconds.
+_BUCKET_EDGES = np.logspace(-6, 2, 81)
+
+_PROFILERS = {}
+
+
+def get_profiler(name: str) -> 'InputProfiler':
+  """Returns the profiler shared by the input pipelines named `name`."""
+  if name not in _PROFILERS:
+    _PROFILERS[name] = InputProfiler()
+  return _PROFILERS[name]
+
+
+def _identity(structure):
+  return tf.nest.map_structure(
+      tf.identity, structure, expand_composites=True)
+
+
+class _StageStats:
+  """The latency histogram and throughput window of a pipeline stage."""
+
+  def __init__(self):
+    self.count = 0
+    self.total_time = 0.0
+    self.histogram = np.zeros(len(_BUCKET_EDGES) + 1, np.int64)
+    self.start = None
+    self.end = None
+
+  def record(self, start, end):
+    latency = max(end - start, 0.0)
+    self.count += 1
+    self.total_time += latency
+    self.histogram[np.searchsorted(_BUCKET_EDGES, latency)] += 1
+    self.start = start if self.start is None else min(self.start, start)
+    self.end = end if self.end is None else max(self.end, end)
+
+  def percentile(self, q):
+    bucket = np.searchsorted(np.cumsum(self.histogram), q * self.count)
+    return _BUCKET_EDGES[min(bucket, len(_BUCKET_EDGES) - 1)]
+
+  def result(self, key):
+    """Returns the stats, with latencies reported under `key` in ms."""
+    duration = (self.end - self.start) if self.count else 0.0
+    return {
+        'count': self.count,
+        'throughput': self.count / duration if duration > 0 else 0.0,
+        f'{key}_ms_mean': 1e3 * self.total_time / max(self.count, 1),
+        f'{key}_ms_p50': 1e3 * self.percentile(0.5),
+        f'{key}_ms_p90': 1e3 * self.percentile(0.9),
+        f'{key}_ms_p99': 1e3 * self.percentile(0.99),
+        'total_time': self.total_time,
+    }
+
+
+class InputProfiler:
+  """Records per-stage latencies and throughput of an input pipeline.
+
+  Map stages (`decoder_fn`, `parser_fn` and `postprocess_fn`) are timed around
+  the function for every element. Dataset stages (file reading, `sample_fn`
+  and batching) are timed by the interval between the elements they produce.
+  The time the consumer of the dataset, i.e. the accelerator's training or
+  evaluation step, waited for each batch is recorded as `input_wait`.
+
+  Timestamps are taken in the input pipeline and handed to Python through
+  `tf.numpy_function`, which adds a small cost per element, so profiling is
+  meant for diagnosing input-bound jobs rather than for every run.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._stats = {}
+    self._last_arrival = {}
+
+  def reset(self):
+    """Clears the recorded stats."""
+    with self._lock:
+      self._stats = {}
+      self._last_arrival = {}
+
+  def _record(self, stage, start, end):
+    with self._lock:
+      if stage not in self._stats:
+        self._stats[stage] = _StageStats()
+      self._stats[stage].record(float(start), float(end))
+    return np.float64(end)
+
+  def _record_arrival(self, stage, end):
+    with self._lock:
+      start = self._last_arrival.get(stage, end)
+      self._last_arrival[stage] = end
+    return self._record(stage, start, end)
+
+  def time_fn(self, stage: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Wraps the map function `fn` to record its latency as `stage`."""
+
+    def timed_fn(*args):
+      start = tf.timestamp()
+      with tf.control_dependencies([start]):
+        args = _identity(args)
+      outputs = fn(*args)
+      with tf.control_dependencies(
+          tf.nest.flatten(outputs, expand_composites=True)):
+        end = tf.timestamp()
+      recorded = tf.numpy_function(
+          functools.partial(self._record, stage), [start, end], tf.float64)
+      with tf.control_dependencies([recorded]):
+        return _identity(outputs)
+
+    return timed_fn
+
+  def time_dataset(self, stage: str,
+                   dataset: tf.data.Dataset) -> tf.data.Dataset:
+    """Records the intervals between the elements of `dataset` as `stage`."""
+
+    def record_arrival(*element):
+      recorded = tf.numpy_function(
+          functools.partial(self._record_arrival, stage), [tf.timestamp()],
+          tf.float64)
+      with tf.control_dependencies([recorded]):
+        element = _identity(element)
+      return element if len(element) > 1 else element[0]
+
+    return dataset.map(record_arrival)
+
+  def time_input_wait(self, dataset: tf.data.Dataset) -> tf.data.Dataset:
+    """Records how long the consumer of `dataset` waits for each element."""
+    # `zip` requests its inputs in order, so the timestamp is taken when the
+    # consumer asks for an element, before `dataset` is asked for one.
+    requests = tf.data.Dataset.from_tensors(0).repeat().map(
+        lambda _: tf.timestamp())
+
+    def record_wait(request_time, element):
+      recorded = tf.numpy_function(
+          functools.partial(self._record, INPUT_WAIT),
+          [request_time, tf.timestamp()], tf.float64)
+      with tf.control_dependencies([recorded]):
+        return _identity(element)
+
+    return tf.data.Dataset.zip((requests, dataset)).map(record_wait)
+
+  def stats(self) -> Dict[str, Dict[str, float]]:
+    """Returns the stats of every stage that recorded elements.
+
+    Each stage reports its element `count`, its `throughput` in elements per
+    second, and its latency percentiles in milliseconds: the processing time of
+    an element for map stages (`latency_ms_*`), the interval between elements
+    for dataset stages (`interval_ms_*`) and the wait time of the consumer for
+    `input_wait` (`wait_ms_*`).
+    """
+    results = {}
+    with self._lock:
+      for stage in STAGES + (INPUT_WAIT,):
+        if stage not in self._stats:
+          continue
+        if stage in MAP_STAGES:
+          key = 'latency'
+        elif stage == INPUT_WAIT:
+          key = 'wait'
+        else:
+          key = 'interval'
+        results[stage] = self._stats[stage].result(key)
+    return results
+
+  def summaries(self, prefix: str = 'input_pipeline') -> Dict[str, float]:
+    """Returns the stats as a flat dictionary of scalar summaries."""
+    summaries = {}
+    for stage, stage_stats in self.stats().items():
+      for name, value in stage_stats.items():
+        if name != 'total_time':
+          summaries[f'{prefix}/{stage}/{name}'] = value
+    return summaries
+
+  def write_summaries(self, summary_manager):
+    """Writes the stats through an `orbit.utils.SummaryManager`."""
+    summary_manager.write_summaries(self.summaries())
+    summary_manager.flush()
+
+  def report(self) -> str:
+    """Returns a human readable table of the stats and the likely bottleneck."""
+    stats = self.stats()
+    if not stats:
+      return 'No input pipeline stats were recorded.'
+    num_batches = max((stats[stage]['count']
+                       for stage in ('batch', 'postprocess_fn', INPUT_WAIT)
+                       if stage in stats), default=0)
+    lines = ['%-15s %10s %12s %10s %10s %10s %10s %14s' %
+             ('stage', 'count', 'elements/s', 'mean ms', 'p50 ms', 'p90 ms',
+              'p99 ms', 'busy ms/batch')]
+    for stage, stage_stats in stats.items():
+      values = [v for k, v in stage_stats.items() if '_ms_' in k]
+      busy = ('%14.3f' % (1e3 * stage_stats['total_time'] / num_batches)
+              if stage in MAP_STAGES and num_batches else '%14s' % '-')
+      lines.append('%-15s %10d %12.1f %10.3f %10.3f %10.3f %10.3f ' %
+                   tuple([stage, stage_stats['count'],
+                          stage_stats['throughput']] + values) + busy)
+
+    if INPUT_WAIT in stats:
+      wait = stats[INPUT_WAIT]
+      wait_time = wait['total_time']
+      duration = wait['count'] / wait['throughput'] if wait[
+          'throughput'] else 0.0
+      lines.append(
+          'The consumer waited %.3f ms per batch for input (%.1f%% of the '
+          'time).' % (wait['wait_ms_mean'],
+                      100.0 * wait_time / duration if duration else 0.0))
+    map_stages = [stage for stage in MAP_STAGES if stage in stats]
+    if map_stages and num_batches:
+      bottleneck = max(map_stages, key=lambda s: stats[s]['total_time'])
+      lines.append(
+          'The most expensive map stage is `%s`, with %.3f ms of processing '
+          'per batch.' %
+          (bottleneck, 1e3 * stats[bottleneck]['total_time'] / num_batches))
+    return '\n'.join(lines)
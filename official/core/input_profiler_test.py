@@ -0,0 +1,103 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for input_profiler."""
+import os
+
+import orbit
+import tensorflow as tf
+
+from official.core import config_definitions as cfg
+from official.core import input_profiler
+from official.core import input_reader
+
+
+def _write_examples(path, num_examples):
+  with tf.io.TFRecordWriter(path) as writer:
+    for i in range(num_examples):
+      writer.write(
+          tf.train.Example(
+              features=tf.train.Features(
+                  feature={
+                      'value':
+                          tf.train.Feature(
+                              int64_list=tf.train.Int64List(value=[i])),
+                  })).SerializeToString())
+
+
+class InputProfilerTest(tf.test.TestCase):
+
+  def _read(self, enable_profiling):
+    input_path = os.path.join(self.get_temp_dir(), 'data.tfrecord')
+    _write_examples(input_path, num_examples=24)
+    params = cfg.DataConfig(
+        input_path=input_path,
+        global_batch_size=4,
+        is_training=False,
+        enable_profiling=enable_profiling)
+    reader = input_reader.InputReader(
+        params,
+        decoder_fn=lambda x: tf.io.parse_single_example(  # pylint: disable=g-long-lambda
+            x, {'value': tf.io.FixedLenFeature([], tf.int64)}),
+        sample_fn=lambda dataset: dataset.filter(
+            lambda x: x['value'] % 3 != 0),
+        parser_fn=lambda x: (x['value'] * 2, x['value']),
+        postprocess_fn=lambda values, labels: (values + 1, labels))
+    return [tf.nest.map_structure(lambda x: x.numpy(), element)
+            for element in reader.read()]
+
+  def test_profiles_every_stage(self):
+    profiler = input_profiler.get_profiler('eval')
+    profiler.reset()
+
+    self.assertAllEqual(self._read(enable_profiling=False),
+                        self._read(enable_profiling=True))
+
+    stats = profiler.stats()
+    self.assertEqual([
+        'read', 'decoder_fn', 'sample_fn', 'parser_fn', 'batch',
+        'postprocess_fn', 'input_wait'
+    ], list(stats))
+    self.assertEqual(24, stats['read']['count'])
+    self.assertEqual(24, stats['decoder_fn']['count'])
+    self.assertEqual(16, stats['sample_fn']['count'])
+    self.assertEqual(16, stats['parser_fn']['count'])
+    self.assertEqual(4, stats['batch']['count'])
+    self.assertEqual(4, stats['postprocess_fn']['count'])
+    self.assertEqual(4, stats['input_wait']['count'])
+    for stage_stats in stats.values():
+      self.assertGreater(stage_stats['throughput'], 0)
+    self.assertGreater(stats['parser_fn']['latency_ms_p99'], 0)
+    self.assertLessEqual(stats['parser_fn']['latency_ms_p50'],
+                         stats['parser_fn']['latency_ms_p99'])
+
+    report = profiler.report()
+    self.assertIn('The consumer waited', report)
+    self.assertIn('The most expensive map stage', report)
+
+    summary_dir = os.path.join(self.get_temp_dir(), 'summaries')
+    profiler.write_summaries(
+        orbit.utils.SummaryManager(
+            summary_dir, tf.summary.scalar,
+            global_step=tf.Variable(0, dtype=tf.int64)))
+    self.assertNotEmpty(tf.io.gfile.glob(os.path.join(summary_dir, 'events*')))
+    self.assertIn('input_pipeline/input_wait/wait_ms_p90',
+                  profiler.summaries())
+
+    profiler.reset()
+    self.assertEmpty(profiler.stats())
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -13,14 +13,30 @@
 # limitations under the License.
 
 """A common dataset reader."""
+import hashlib
+import json
+import os
 import random
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Optional, Tuple
 
 from absl import logging
 import tensorflow as tf
 import tensorflow_datasets as tfds
 
 from official.core import config_definitions as cfg
+from official.core import input_profiler
+
+
+# The `DataConfig` fields which do not change the elements that are stored in a
+# snapshot, and are therefore not part of its key.
+_SNAPSHOT_INDEPENDENT_FIELDS = (
+    'global_batch_size', 'drop_remainder', 'shuffle_buffer_size', 'cache',
+    'cycle_length', 'block_length', 'deterministic', 'enable_tf_data_service',
+    'tf_data_service_address', 'tf_data_service_job_name', 'enable_profiling',
+    'snapshot_dir', 'snapshot_num_shards', 'snapshot_shuffle_buffer_size')
+
+# The file naming the completely written run of a snapshot directory.
+_SNAPSHOT_RUN_FILE = 'snapshot_run'
 
 
 def _get_random_integer():
@@ -43,7 +59,10 @@ class InputReader:
                transform_and_batch_fn: Optional[Callable[
                    [tf.data.Dataset, Optional[tf.distribute.InputContext]],
                    tf.data.Dataset]] = None,
-               postprocess_fn: Optional[Callable[..., Any]] = None):
+               postprocess_fn: Optional[Callable[..., Any]] = None,
+               snapshot_fns: Optional[Tuple[Optional[Callable[..., Any]],
+                                            Optional[Callable[..., Any]]]] = None,
+               snapshot_key: str = ''):
     """Initializes an InputReader instance.
 
     Args:
@@ -66,6 +85,17 @@ class InputReader:
         batch size.
       postprocess_fn: A optional `callable` that processes batched tensors. It
         will be executed after batching.
+      snapshot_fns: An optional pair of `callable`s splitting `parser_fn` into
+        its deterministic part and the remaining (e.g. random augmentation)
+        part, either of which can be None. It is only used if
+        `params.snapshot_dir` is set, in which case the outputs of `decoder_fn`
+        and of the deterministic part are stored in a snapshot, and only the
+        remaining part is executed when reading from it. If None, only the
+        outputs of `decoder_fn` are stored and `parser_fn` is executed after
+        reading them. `sample_fn` is applied after the snapshot.
+      snapshot_key: A str identifying any other state than `params` and the
+        input files which the snapshotted elements depend on, e.g. the
+        arguments of the parser.
     """
     if params.input_path and params.tfds_name:
       raise ValueError('At most one of `input_path` and `tfds_name` can be '
@@ -137,6 +167,21 @@ class InputReader:
     self._postprocess_fn = postprocess_fn
     self._seed = _get_random_integer()
 
+    self._snapshot_dir = params.snapshot_dir
+    self._snapshot_num_shards = params.snapshot_num_shards
+    self._snapshot_shuffle_buffer_size = params.snapshot_shuffle_buffer_size
+    self._snapshot_fns = snapshot_fns or (None, parser_fn)
+    self._snapshot_key = snapshot_key
+    self._snapshot_config = {
+        k: v
+        for k, v in params.as_dict().items()
+        if k not in _SNAPSHOT_INDEPENDENT_FIELDS
+    }
+    self._profiler = None
+    if params.enable_profiling:
+      self._profiler = input_profiler.get_profiler(
+          'train' if self._is_training else 'eval')
+
     self._enable_tf_data_service = (
         params.enable_tf_data_service and params.tf_data_service_address)
     self._tf_data_service_address = params.tf_data_service_address
@@ -149,12 +194,14 @@ class InputReader:
           'enable_round_robin_tf_data_service', False)
 
   def _shard_files_then_read(
-      self, input_context: Optional[tf.distribute.InputContext] = None):
+      self,
+      input_context: Optional[tf.distribute.InputContext] = None,
+      shuffle_and_repeat: bool = True):
     """Shards the data files and then sent a split to every worker to read."""
     dataset = tf.data.Dataset.from_tensor_slices(self._matched_files)
 
     # Shuffle and repeat at file level.
-    if self._is_training:
+    if self._is_training and shuffle_and_repeat:
       dataset = dataset.shuffle(
           len(self._matched_files),
           seed=self._seed,
@@ -167,7 +214,7 @@ class InputReader:
         not self._enable_tf_data_service):
       dataset = dataset.shard(input_context.num_input_pipelines,
                               input_context.input_pipeline_id)
-    if self._is_training:
+    if self._is_training and shuffle_and_repeat:
       dataset = dataset.repeat()
 
     dataset = dataset.interleave(
@@ -179,7 +226,9 @@ class InputReader:
     return dataset
 
   def _read_files_then_shard(
-      self, input_context: Optional[tf.distribute.InputContext] = None):
+      self,
+      input_context: Optional[tf.distribute.InputContext] = None,
+      shuffle_and_repeat: bool = True):
     """Sends all data files to every worker and then shard by data."""
     dataset = self._dataset_fn(self._matched_files)
 
@@ -197,13 +246,14 @@ class InputReader:
         not self._enable_tf_data_service):
       dataset = dataset.shard(input_context.num_input_pipelines,
                               input_context.input_pipeline_id)
-    if self._is_training:
+    if self._is_training and shuffle_and_repeat:
       dataset = dataset.repeat()
     return dataset
 
   def _read_tfds(
       self,
-      input_context: Optional[tf.distribute.InputContext] = None
+      input_context: Optional[tf.distribute.InputContext] = None,
+      shuffle_and_repeat: bool = True
   ) -> tf.data.Dataset:
     """Reads a dataset from tfds."""
     if self._tfds_download:
@@ -219,15 +269,96 @@ class InputReader:
         decoders[skip_feature.strip()] = tfds.decode.SkipDecoding()
     dataset = self._tfds_builder.as_dataset(
         split=self._tfds_split,
-        shuffle_files=self._is_training,
+        shuffle_files=self._is_training and shuffle_and_repeat,
         as_supervised=self._tfds_as_supervised,
         decoders=decoders,
         read_config=read_config)
 
-    if self._is_training:
+    if self._is_training and shuffle_and_repeat:
       dataset = dataset.repeat()
     return dataset
 
+  def _snapshot_path(
+      self, input_context: Optional[tf.distribute.InputContext] = None) -> str:
+    """Returns the snapshot directory keyed by everything the elements use."""
+    key = json.dumps(
+        {
+            'config': self._snapshot_config,
+            'files': self._matched_files,
+            'key': self._snapshot_key,
+            'input_pipeline': [
+                input_context.input_pipeline_id,
+                input_context.num_input_pipelines
+            ] if input_context and self._sharding else None,
+        },
+        sort_keys=True,
+        default=str)
+    return os.path.join(self._snapshot_dir,
+                        hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+  def _snapshot(self, dataset: tf.data.Dataset,
+                input_context: Optional[tf.distribute.InputContext] = None
+               ) -> tf.data.Dataset:
+    """Writes `dataset` to a compressed and sharded snapshot once, and reads it.
+
+    The snapshot is saved with `tf.data.experimental.save` into a new run
+    directory under the snapshot path, whose name is then written to
+    `_SNAPSHOT_RUN_FILE`. Later reads load that run without iterating
+    `dataset`, and runs that were not completely written are never read.
+
+    Args:
+      dataset: The dataset to snapshot, iterated once if there is no snapshot.
+      input_context: The `tf.distribute.InputContext`, if any.
+
+    Returns:
+      The dataset read from the snapshot, with the shards shuffled every epoch
+      for training.
+    """
+    num_shards = self._snapshot_num_shards
+    is_training = self._is_training
+    path = self._snapshot_path(input_context)
+    run_file = os.path.join(path, _SNAPSHOT_RUN_FILE)
+    dataset = dataset.enumerate()
+    if tf.io.gfile.exists(run_file):
+      with tf.io.gfile.GFile(run_file) as f:
+        run = f.read().strip()
+    else:
+      run = 'run-%d' % _get_random_integer()
+      logging.info('Writing the input snapshot to %s.',
+                   os.path.join(path, run))
+      tf.data.experimental.save(
+          dataset,
+          os.path.join(path, run),
+          compression='GZIP',
+          shard_func=lambda index, *_: index % num_shards)
+      with tf.io.gfile.GFile(run_file, 'w') as f:
+        f.write(run)
+    logging.info('Reading the input snapshot at %s.', os.path.join(path, run))
+
+    def reader_func(datasets):
+      # The shards are shuffled instead of the input files.
+      if is_training:
+        datasets = datasets.shuffle(num_shards, seed=self._seed)
+      return datasets.interleave(
+          lambda x: x,
+          cycle_length=self._cycle_length,
+          num_parallel_calls=tf.data.experimental.AUTOTUNE,
+          deterministic=self._deterministic)
+
+    dataset = tf.data.experimental.load(
+        os.path.join(path, run),
+        dataset.element_spec,
+        compression='GZIP',
+        reader_func=reader_func)
+    return dataset.map(lambda _, element: element)
+
+  def _maybe_time_dataset(self, stage: str,
+                          dataset: tf.data.Dataset) -> tf.data.Dataset:
+    """Records the element intervals of `dataset` if profiling is enabled."""
+    if self._profiler:
+      return self._profiler.time_dataset(stage, dataset)
+    return dataset
+
   @property
   def tfds_info(self) -> tfds.core.DatasetInfo:
     """Returns TFDS dataset info, if available."""
@@ -242,8 +373,11 @@ class InputReader:
       input_context: Optional[tf.distribute.InputContext] = None
   ) -> tf.data.Dataset:
     """Generates a tf.data.Dataset object."""
+    # A snapshot is written from a single pass over the data, in file order,
+    # and read with its shards shuffled.
+    shuffle_and_repeat = not self._snapshot_dir
     if self._tfds_builder:
-      dataset = self._read_tfds(input_context)
+      dataset = self._read_tfds(input_context, shuffle_and_repeat)
     elif len(self._matched_files) > 1:
       if input_context and (len(self._matched_files) <
                             input_context.num_input_pipelines):
@@ -252,29 +386,48 @@ class InputReader:
             '%d. We will send all input files to every worker. '
             'Please consider sharding your data into more files.',
             len(self._matched_files), input_context.num_input_pipelines)
-        dataset = self._read_files_then_shard(input_context)
+        dataset = self._read_files_then_shard(input_context,
+                                              shuffle_and_repeat)
       else:
-        dataset = self._shard_files_then_read(input_context)
+        dataset = self._shard_files_then_read(input_context,
+                                              shuffle_and_repeat)
     elif len(self._matched_files) == 1:
-      dataset = self._read_files_then_shard(input_context)
+      dataset = self._read_files_then_shard(input_context, shuffle_and_repeat)
     else:
       raise ValueError('It is unexpected that `tfds_builder` is None and '
                        'there is also no `matched_files`.')
+    dataset = self._maybe_time_dataset('read', dataset)
+
+    def maybe_map_fn(dataset, fn, stage):
+      if fn is None:
+        return dataset
+      if self._profiler:
+        fn = self._profiler.time_fn(stage, fn)
+      return dataset.map(fn, num_parallel_calls=tf.data.experimental.AUTOTUNE)
+
+    if self._snapshot_dir:
+      snapshot_parser_fn, parser_fn = self._snapshot_fns
+      dataset = maybe_map_fn(dataset, self._decoder_fn, 'decoder_fn')
+      dataset = maybe_map_fn(dataset, snapshot_parser_fn,
+                             'snapshot_parser_fn')
+      dataset = self._snapshot(dataset, input_context)
+      if self._cache:
+        dataset = dataset.cache()
+      if self._is_training:
+        dataset = dataset.repeat()
+        dataset = dataset.shuffle(self._snapshot_shuffle_buffer_size)
+    else:
+      parser_fn = self._parser_fn
+      if self._cache:
+        dataset = dataset.cache()
+      if self._is_training:
+        dataset = dataset.shuffle(self._shuffle_buffer_size)
+      dataset = maybe_map_fn(dataset, self._decoder_fn, 'decoder_fn')
 
-    if self._cache:
-      dataset = dataset.cache()
-
-    if self._is_training:
-      dataset = dataset.shuffle(self._shuffle_buffer_size)
-
-    def maybe_map_fn(dataset, fn):
-      return dataset if fn is None else dataset.map(
-          fn, num_parallel_calls=tf.data.experimental.AUTOTUNE)
-
-    dataset = maybe_map_fn(dataset, self._decoder_fn)
     if self._sample_fn is not None:
       dataset = dataset.apply(self._sample_fn)
-    dataset = maybe_map_fn(dataset, self._parser_fn)
+      dataset = self._maybe_time_dataset('sample_fn', dataset)
+    dataset = maybe_map_fn(dataset, parser_fn, 'parser_fn')
 
     if self._transform_and_batch_fn is not None:
       dataset = self._transform_and_batch_fn(dataset, input_context)
@@ -283,8 +436,9 @@ class InputReader:
           self._global_batch_size) if input_context else self._global_batch_size
       dataset = dataset.batch(
           per_replica_batch_size, drop_remainder=self._drop_remainder)
+    dataset = self._maybe_time_dataset('batch', dataset)
 
-    dataset = maybe_map_fn(dataset, self._postprocess_fn)
+    dataset = maybe_map_fn(dataset, self._postprocess_fn, 'postprocess_fn')
 
     if self._enable_tf_data_service and input_context:
       if self._enable_round_robin_tf_data_service:
@@ -320,4 +474,7 @@ class InputReader:
       options = tf.data.Options()
       options.experimental_deterministic = self._deterministic
       dataset = dataset.with_options(options)
-    return dataset.prefetch(tf.data.experimental.AUTOTUNE)
+    dataset = dataset.prefetch(tf.data.experimental.AUTOTUNE)
+    if self._profiler:
+      dataset = self._profiler.time_input_wait(dataset)
+    return dataset
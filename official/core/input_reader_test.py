@@ -0,0 +1,127 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for input_reader."""
+import os
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+from official.core import config_definitions as cfg
+from official.core import input_reader
+
+
+def _write_examples(path, num_examples):
+  with tf.io.TFRecordWriter(path) as writer:
+    for i in range(num_examples):
+      writer.write(
+          tf.train.Example(
+              features=tf.train.Features(
+                  feature={
+                      'value':
+                          tf.train.Feature(
+                              int64_list=tf.train.Int64List(value=[i])),
+                  })).SerializeToString())
+
+
+def _decode(serialized_example):
+  return tf.io.parse_single_example(
+      serialized_example, {'value': tf.io.FixedLenFeature([], tf.int64)})
+
+
+class InputReaderSnapshotTest(tf.test.TestCase, parameterized.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self._input_path = [
+        os.path.join(self.get_temp_dir(), f'data-{i}.tfrecord')
+        for i in range(2)
+    ]
+    for i, path in enumerate(self._input_path):
+      _write_examples(path, num_examples=10 + i)
+    self._snapshot_dir = os.path.join(self.get_temp_dir(), 'snapshot')
+
+  def _snapshot_runs(self):
+    """Returns the directories to which a snapshot was written."""
+    # The directories are <snapshot_dir>/<key>/<run>.
+    return sorted(
+        path for path in tf.io.gfile.glob(
+            os.path.join(self._snapshot_dir, '*', '*'))
+        if tf.io.gfile.isdir(path))
+
+  def _read(self, is_training, snapshot_dir, snapshot_key='', num_batches=6):
+    params = cfg.DataConfig(
+        input_path=self._input_path,
+        global_batch_size=3,
+        is_training=is_training,
+        drop_remainder=False,
+        snapshot_dir=snapshot_dir,
+        snapshot_num_shards=4)
+    deterministic_fn = lambda decoded_tensors: decoded_tensors['value'] * 10
+    random_fn = lambda value: value + tf.random.uniform([], 0, 2, tf.int64)
+    reader = input_reader.InputReader(
+        params,
+        decoder_fn=_decode,
+        parser_fn=lambda x: random_fn(deterministic_fn(x)),
+        snapshot_fns=(deterministic_fn, random_fn),
+        snapshot_key=snapshot_key)
+    batches = reader.read().take(num_batches)
+    return np.concatenate([batch.numpy() for batch in batches])
+
+  @parameterized.parameters(True, False)
+  def test_snapshot_is_reused_until_key_changes(self, is_training):
+    # The first read writes the whole snapshot.
+    self._read(is_training, self._snapshot_dir, num_batches=1)
+    runs = self._snapshot_runs()
+    self.assertLen(runs, 1)
+    files = tf.io.gfile.listdir(runs[0])
+
+    # The second read loads the snapshot instead of writing a new one.
+    values = self._read(is_training, self._snapshot_dir)
+    self.assertEqual(runs, self._snapshot_runs())
+    self.assertCountEqual(files, tf.io.gfile.listdir(runs[0]))
+
+    # The deterministic part is in the snapshot, the random part is not.
+    self.assertLen(values, 18)
+    expected = list(range(10)) + list(range(11))
+    for value in values:
+      self.assertIn(value // 10, expected)
+    self.assertContainsSubset(set(values % 10), {0, 1})
+
+    # A different key builds a new snapshot.
+    self._read(
+        is_training, self._snapshot_dir, snapshot_key='other', num_batches=1)
+    self.assertLen(tf.io.gfile.listdir(self._snapshot_dir), 2)
+    self.assertLen(self._snapshot_runs(), 2)
+
+  def test_incomplete_snapshot_is_not_read(self):
+    self._read(False, self._snapshot_dir, num_batches=1)
+    [run] = self._snapshot_runs()
+    # Simulates a write interrupted before the run was recorded.
+    tf.io.gfile.remove(
+        os.path.join(os.path.dirname(run), input_reader._SNAPSHOT_RUN_FILE))
+
+    values = self._read(False, self._snapshot_dir, num_batches=7)
+    self.assertLen(self._snapshot_runs(), 2)
+    self.assertCountEqual(list(range(10)) + list(range(11)), values // 10)
+
+  def test_snapshot_matches_without_snapshot(self):
+    without_snapshot = self._read(False, '', num_batches=7)
+    with_snapshot = self._read(False, self._snapshot_dir, num_batches=7)
+    self.assertCountEqual(without_snapshot // 10, with_snapshot // 10)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -13,6 +13,33 @@
 # limitations under the License.
 
 """Registry utility."""
+import importlib
+import sys
+
+# Maps the locations of registered collections, i.e. "module:attribute" strings,
+# to dicts from the names of keys that are registered lazily, see
+# `register_lazy`, to the modules registering them. Collections are referred to
+# by location so that registering lazily does not import their modules.
+_LAZY_REGISTRATIONS = {}
+# Maps the locations of registered collections to the module imported when a
+# key is neither registered nor registered lazily, see
+# `register_lazy_fallback`.
+_LAZY_FALLBACKS = {}
+
+
+def key_name(reg_key):
+  """Returns the name of `reg_key` used for lazy registration.
+
+  Args:
+    reg_key: a registration key, i.e. a string or a class.
+
+  Returns:
+    `reg_key` itself if it is a string, otherwise its qualified name, e.g.
+    "official.core.config_definitions.TaskConfig".
+  """
+  if isinstance(reg_key, str):
+    return reg_key
+  return "{}.{}".format(reg_key.__module__, reg_key.__qualname__)
 
 
 def register(registered_collection, reg_key):
@@ -81,6 +108,63 @@ def lookup(registered_collection, reg_key):
   Raises:
     LookupError: when reg_key cannot be found.
   """
+  try:
+    return _lookup(registered_collection, reg_key)
+  except LookupError:
+    # Imports the module that registers reg_key, if it is registered lazily,
+    # and looks it up again.
+    location = _location(registered_collection)
+    module_name = _LAZY_REGISTRATIONS.get(location, {}).pop(
+        key_name(reg_key), None)
+    if module_name is None:
+      module_name = _LAZY_FALLBACKS.pop(location, None)
+    if module_name is None:
+      raise
+    importlib.import_module(module_name)
+    return lookup(registered_collection, reg_key)
+
+
+def register_lazy(collection_location, reg_key_name, module_name):
+  """Registers a function or class without importing its module.
+
+  The module `module_name` is imported by the first lookup() of a key named
+  `reg_key_name`, and is expected to register it in the collection.
+
+  Args:
+    collection_location: the location of the registered collection, as a
+      "module:attribute" string, e.g. "official.core.exp_factory:
+      _REGISTERED_CONFIGS". Its module is not imported.
+    reg_key_name: the name of the registration key, see key_name().
+    module_name: the module registering the key when imported.
+  """
+  lazy_modules = _LAZY_REGISTRATIONS.setdefault(collection_location, {})
+  lazy_modules[reg_key_name] = module_name
+
+
+def register_lazy_fallback(collection_location, module_name):
+  """Sets a module imported when a key is not registered, even lazily.
+
+  Args:
+    collection_location: the location of the registered collection, as a
+      "module:attribute" string.
+    module_name: the module importing all the registrations, e.g. to recover
+      from a stale list of lazy registrations.
+  """
+  _LAZY_FALLBACKS[collection_location] = module_name
+
+
+def _location(registered_collection):
+  """Returns the location of a collection with lazy registrations, if any."""
+  for location in set(_LAZY_REGISTRATIONS) | set(_LAZY_FALLBACKS):
+    module_name, attribute = location.split(":")
+    module = sys.modules.get(module_name)
+    if getattr(module, attribute, None) is registered_collection:
+      return location
+  return None
+
+
+def _lookup(registered_collection, reg_key):
+  """Looks up reg_key among the registered functions and classes."""
   if isinstance(reg_key, str):
     hierarchy = reg_key.split("/")
     collection = registered_collection
@@ -0,0 +1,133 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+r"""Manifests of the registrations made by a `registry_imports` module.
+
+Importing a `registry_imports` module imports every task, config, backbone and
+dataloader module, most of which are not used by a given experiment. A manifest
+records which module registers each experiment, task, backbone, etc. so that
+`load` only registers them lazily, and `registry.lookup` imports the modules of
+the registrations that are used.
+
+Manifests are generated from the `registry_imports` module (shell script):
+
+python3 -m official.core.registry_manifest \
+    --registry_imports=yolo.common.registry_imports \
+    --output=yolo/common/registry_manifest.json
+"""
+import importlib
+import json
+import os
+import sys
+from typing import Dict
+
+from absl import app
+from absl import flags
+from absl import logging
+
+from official.core import registry
+
+# The locations of the registered collections, by name.
+COLLECTIONS = {
+    'experiments': 'official.core.exp_factory:_REGISTERED_CONFIGS',
+    'tasks': 'official.core.task_factory:_REGISTERED_TASK_CLS',
+    'backbones': ('official.vision.beta.modeling.backbones.factory:'
+                  '_REGISTERED_BACKBONE_CLS'),
+    'video_models': ('official.vision.beta.modeling.factory_3d:'
+                     '_REGISTERED_MODEL_CLS'),
+    'nlp_data_loaders': ('official.nlp.data.data_loader_factory:'
+                         '_REGISTERED_DATA_LOADER_CLS'),
+}
+
+
+def _get_collection(name):
+  """Returns the registered collection `name` if its module is imported."""
+  module_name, attribute = COLLECTIONS[name].split(':')
+  return getattr(sys.modules.get(module_name), attribute, {})
+
+
+def _flatten(collection, prefix=''):
+  """Yields the (key name, registered value) pairs of `collection`."""
+  for reg_key, value in collection.items():
+    if isinstance(reg_key, str):
+      name = prefix + reg_key
+      if isinstance(value, dict):
+        yield from _flatten(value, name + '/')
+        continue
+    else:
+      name = registry.key_name(reg_key)
+    yield name, value
+
+
+def build(registry_imports: str) -> Dict[str, Dict[str, str]]:
+  """Imports `registry_imports` and returns the manifest of its registrations.
+
+  Args:
+    registry_imports: the name of the module importing all registrations.
+
+  Returns:
+    A dictionary from collection names to dictionaries from the names of
+    registration keys to the modules registering them.
+  """
+  importlib.import_module(registry_imports)
+  manifest = {'registry_imports': registry_imports}
+  for name in COLLECTIONS:
+    collection = _get_collection(name)
+    manifest[name] = {
+        key: value.__module__
+        for key, value in sorted(_flatten(collection))
+    }
+  return manifest
+
+
+def load(path: str, registry_imports: str):
+  """Registers the registrations of a manifest lazily.
+
+  Falls back to importing `registry_imports` if the manifest does not exist,
+  or if a key that is not in the manifest is looked up, e.g. because the
+  manifest is stale.
+
+  Args:
+    path: the path of the manifest written by `write`.
+    registry_imports: the name of the module importing all registrations.
+  """
+  if not os.path.exists(path):
+    logging.warning('Registry manifest %s not found, importing %s.', path,
+                    registry_imports)
+    importlib.import_module(registry_imports)
+    return
+  with open(path) as f:
+    manifest = json.load(f)
+  for name, location in COLLECTIONS.items():
+    for reg_key_name, module_name in manifest.get(name, {}).items():
+      registry.register_lazy(location, reg_key_name, module_name)
+    registry.register_lazy_fallback(location, registry_imports)
+
+
+def write(manifest: Dict[str, Dict[str, str]], path: str):
+  with open(path, 'w') as f:
+    json.dump(manifest, f, indent=2, sort_keys=True)
+    f.write('\n')
+
+
+def main(_):
+  write(build(flags.FLAGS.registry_imports), flags.FLAGS.output)
+
+
+if __name__ == '__main__':
+  flags.DEFINE_string('registry_imports', None,
+                      'The module importing all registrations.')
+  flags.DEFINE_string('output', None, 'The path to write the manifest to.')
+  flags.mark_flags_as_required(['registry_imports', 'output'])
+  app.run(main)
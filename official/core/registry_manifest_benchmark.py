@@ -0,0 +1,82 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+r"""Benchmarks the startup time of a training binary with a registry manifest.
+
+Measures, in fresh Python processes, the time to import the training binary,
+i.e. the time until `--help` is printed, and the time to launch a single
+experiment, i.e. to also create its config and task, when the registrations
+are loaded lazily from the manifest and when the `registry_imports` module is
+imported eagerly (shell script):
+
+python3 -m official.core.registry_manifest_benchmark \
+    --entry_point=yolo.train \
+    --registry_imports=yolo.common.registry_imports \
+    --experiment=darknet_classification
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+from absl import app
+from absl import flags
+from absl import logging
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_string('entry_point', 'yolo.train',
+                    'The training binary, which loads a registry manifest.')
+flags.DEFINE_string('registry_imports', 'yolo.common.registry_imports',
+                    'The module importing all registrations.')
+flags.DEFINE_string('experiment', 'darknet_classification',
+                    'The experiment to launch.')
+flags.DEFINE_integer('num_runs', 5, 'The number of runs of each measurement.')
+
+_LAUNCH = """
+from official.core import exp_factory
+from official.core import task_factory
+config = exp_factory.get_exp_config({experiment!r})
+task_factory.get_task(config.task)
+"""
+
+
+def time_python(source, num_runs):
+  """Returns the median wall time of running `source` in a new process."""
+  times = []
+  for _ in range(num_runs):
+    start = time.time()
+    subprocess.run([sys.executable, '-c', source], check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    times.append(time.time() - start)
+  return statistics.median(times)
+
+
+def main(_):
+  help_lazy = f'import {FLAGS.entry_point}'
+  help_eager = f'import {FLAGS.registry_imports}\n' + help_lazy
+  launch = _LAUNCH.format(experiment=FLAGS.experiment)
+  results = {
+      'help_manifest': time_python(help_lazy, FLAGS.num_runs),
+      'help_registry_imports': time_python(help_eager, FLAGS.num_runs),
+      'launch_manifest': time_python(help_lazy + launch, FLAGS.num_runs),
+      'launch_registry_imports': time_python(help_eager + launch,
+                                             FLAGS.num_runs),
+  }
+  for name, seconds in results.items():
+    logging.info('%-25s %8.3f s', name, seconds)
+
+
+if __name__ == '__main__':
+  app.run(main)
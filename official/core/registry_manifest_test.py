@@ -0,0 +1,55 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for registry_manifest."""
+import os
+import subprocess
+import sys
+
+import tensorflow as tf
+
+from official.core import registry_manifest
+
+_LAUNCH = """
+import sys
+from official.core import exp_factory
+from official.core import registry_manifest
+from official.core import task_factory
+
+registry_manifest.load(sys.argv[1], 'official.utils.testing.mock_task')
+assert 'official.utils.testing.mock_task' not in sys.modules
+config = exp_factory.get_exp_config('mock')
+task_factory.get_task(config.task)
+assert 'official.utils.testing.mock_task' in sys.modules
+"""
+
+
+class RegistryManifestTest(tf.test.TestCase):
+
+  def test_build_and_load(self):
+    manifest = registry_manifest.build('official.utils.testing.mock_task')
+    self.assertEqual('official.utils.testing.mock_task',
+                     manifest['experiments']['mock'])
+    self.assertEqual(
+        'official.utils.testing.mock_task',
+        manifest['tasks']['official.utils.testing.mock_task.MockTaskConfig'])
+
+    path = os.path.join(self.get_temp_dir(), 'manifest.json')
+    registry_manifest.write(manifest, path)
+    # The registrations must not be imported yet, hence a new process.
+    subprocess.run([sys.executable, '-c', _LAUNCH, path], check=True)
+
+
+if __name__ == '__main__':
+  tf.test.main()
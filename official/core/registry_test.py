@@ -18,9 +18,23 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import os
+import sys
+
 import tensorflow as tf
 from official.core import registry
 
+_LAZY_COLLECTION = {}
+
+_LAZY_MODULE = """
+import sys
+from official.core import registry
+
+@registry.register(sys.modules[{test_module!r}]._LAZY_COLLECTION, {reg_key!r})
+def func():
+  pass
+"""
+
 
 class RegistryTest(tf.test.TestCase):
 
@@ -87,6 +101,39 @@ class RegistryTest(tf.test.TestCase):
     with self.assertRaises(LookupError):
       registry.lookup(collection, 'non-exist')
 
+  def _write_module(self, module_name, reg_key):
+    module_dir = self.get_temp_dir()
+    with open(os.path.join(module_dir, module_name + '.py'), 'w') as f:
+      f.write(_LAZY_MODULE.format(test_module=__name__, reg_key=reg_key))
+    sys.path.insert(0, module_dir)
+    self.addCleanup(sys.path.remove, module_dir)
+    self.addCleanup(sys.modules.pop, module_name, None)
+
+  def test_register_lazy(self):
+    location = __name__ + ':_LAZY_COLLECTION'
+    self._write_module('lazy_module', 'lazy/func')
+    self._write_module('fallback_module', 'fallback_func')
+
+    registry.register_lazy(location, 'lazy/func', 'lazy_module')
+    registry.register_lazy_fallback(location, 'fallback_module')
+    self.assertNotIn('lazy_module', sys.modules)
+
+    func = registry.lookup(_LAZY_COLLECTION, 'lazy/func')
+    self.assertIn('lazy_module', sys.modules)
+    self.assertEqual(sys.modules['lazy_module'].func, func)
+    self.assertNotIn('fallback_module', sys.modules)
+
+    # Keys that are not registered lazily import the fallback module, once.
+    func = registry.lookup(_LAZY_COLLECTION, 'fallback_func')
+    self.assertEqual(sys.modules['fallback_module'].func, func)
+    with self.assertRaises(LookupError):
+      registry.lookup(_LAZY_COLLECTION, 'non-exist')
+
+  def test_key_name(self):
+    self.assertEqual('a/b', registry.key_name('a/b'))
+    self.assertEqual(__name__ + '.RegistryTest',
+                     registry.key_name(RegistryTest))
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -25,6 +25,7 @@ import tensorflow as tf
 from official.core import base_task
 from official.core import config_definitions
 from official.core import train_utils
+from official.utils.misc import callstack_sampler
 
 BestCheckpointExporter = train_utils.BestCheckpointExporter
 
@@ -49,6 +50,30 @@ def maybe_create_best_ckpt_exporter(params: config_definitions.ExperimentConfig,
   return best_ckpt_exporter
 
 
+class _SnapshotCheckpointExporter:
+  """Exports the snapshot restored for background evaluation.
+
+  The background evaluator has its own optimizer, which is never trained, so
+  its checkpoint is not the one to export. This exports the checkpoint the
+  snapshots are restored into instead, i.e. the global step and model of the
+  evaluated snapshot.
+  """
+
+  def __init__(self, exporter: BestCheckpointExporter):
+    self._exporter = exporter
+    # Set once the background evaluator, which holds its objects, is created.
+    self.checkpoint = None
+
+  def maybe_export_checkpoint(self, checkpoint, eval_logs, global_step):
+    del checkpoint
+    self._exporter.maybe_export_checkpoint(self.checkpoint, eval_logs,
+                                           global_step)
+
+  @property
+  def best_ckpt_logs(self):
+    return self._exporter.best_ckpt_logs
+
+
 def run_experiment(distribution_strategy: tf.distribute.Strategy,
                    task: base_task.Task,
                    mode: str,
@@ -77,13 +102,35 @@ def run_experiment(distribution_strategy: tf.distribute.Strategy,
         otherwise, returns {}.
   """
 
+  background_eval = params.trainer.background_eval and mode == 'train_and_eval'
+  checkpoint_exporter = maybe_create_best_ckpt_exporter(params, model_dir)
   with distribution_strategy.scope():
     trainer = train_utils.create_trainer(
         params,
         task,
         train='train' in mode,
         evaluate=('eval' in mode) or run_post_eval,
-        checkpoint_exporter=maybe_create_best_ckpt_exporter(params, model_dir))
+        checkpoint_exporter=None if background_eval else checkpoint_exporter)
+    if background_eval:
+      # Evaluates a separate copy of the model, restored from the snapshots of
+      # the trained weights. The global step is restored too, so that the best
+      # checkpoint is exported at the step of its snapshot.
+      snapshot_exporter = (
+          _SnapshotCheckpointExporter(checkpoint_exporter)
+          if checkpoint_exporter else None)
+      background_evaluator = train_utils.create_trainer(
+          params,
+          task,
+          train=False,
+          evaluate=True,
+          checkpoint_exporter=snapshot_exporter)
+      background_eval_checkpoint = tf.train.Checkpoint(
+          global_step=background_evaluator.global_step,
+          model=background_evaluator.model)
+      if snapshot_exporter:
+        snapshot_exporter.checkpoint = background_eval_checkpoint
+    else:
+      background_evaluator, background_eval_checkpoint = None, None
 
   if trainer.checkpoint:
     checkpoint_manager = tf.train.CheckpointManager(
@@ -98,6 +145,13 @@ def run_experiment(distribution_strategy: tf.distribute.Strategy,
   else:
     checkpoint_manager = None
 
+  profiler, profile_steps = None, None
+  if params.trainer.callstack_sampling_steps and save_summary:
+    profile_steps = tuple(
+        int(step) for step in params.trainer.callstack_sampling_steps.split(','))
+    profiler = callstack_sampler.CallstackSampler(
+        interval=params.trainer.callstack_sampling_interval)
+
   controller = orbit.Controller(
       strategy=distribution_strategy,
       trainer=trainer if 'train' in mode else None,
@@ -105,6 +159,12 @@ def run_experiment(distribution_strategy: tf.distribute.Strategy,
       global_step=trainer.global_step,
       steps_per_loop=params.trainer.steps_per_loop,
       checkpoint_manager=checkpoint_manager,
+      async_checkpoint=params.trainer.async_checkpoint,
+      background_evaluator=background_evaluator,
+      background_eval_checkpoint=background_eval_checkpoint,
+      max_pending_evals=params.trainer.max_pending_evals,
+      profiler=profiler,
+      profile_steps=profile_steps,
       summary_dir=os.path.join(model_dir, 'train') if (save_summary) else None,
       eval_summary_dir=os.path.join(model_dir, 'validation') if
       (save_summary) else None,
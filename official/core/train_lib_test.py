@@ -110,6 +110,40 @@ class TrainTest(tf.test.TestCase, parameterized.TestCase):
         run_post_eval=run_post_eval)
     print(logs)
 
+  def test_background_eval_exports_snapshot_step(self):
+    model_dir = self.get_temp_dir()
+    config = json.loads(json.dumps(self._test_config))
+    config['trainer'].update({
+        'steps_per_loop': 5,
+        'validation_interval': 5,
+        'background_eval': True,
+        'best_checkpoint_export_subdir': 'best_ckpt',
+        'best_checkpoint_eval_metric': 'acc',
+        'best_checkpoint_metric_comp': 'higher',
+    })
+    flags_dict = dict(
+        experiment='mock',
+        mode='train_and_eval',
+        model_dir=model_dir,
+        params_override=json.dumps(config))
+    with flagsaver.flagsaver(**flags_dict):
+      params = train_utils.parse_configuration(flags.FLAGS)
+      task = task_factory.get_task(params.task, logging_dir=model_dir)
+      train_lib.run_experiment(
+          distribution_strategy=tf.distribute.get_strategy(),
+          task=task,
+          mode='train_and_eval',
+          params=params,
+          model_dir=model_dir)
+
+    export_dir = os.path.join(model_dir, 'best_ckpt')
+    with tf.io.gfile.GFile(os.path.join(export_dir, 'info.json')) as f:
+      best_step = json.load(f)['best_ckpt_global_step']
+    self.assertIn(best_step, (5, 10))
+    reader = tf.train.load_checkpoint(export_dir)
+    self.assertEqual(
+        reader.get_tensor('global_step/.ATTRIBUTES/VARIABLE_VALUE'), best_step)
+
   def test_parse_configuration(self):
     model_dir = self.get_temp_dir()
     flags_dict = dict(
@@ -19,6 +19,7 @@ import dataclasses
 
 from official.core import config_definitions as cfg
 from official.modeling import hyperparams
+from official.modeling.hyperparams import oneof
 
 
 @dataclasses.dataclass
@@ -31,9 +32,85 @@ class TaskRoutine(hyperparams.Config):
 
 @dataclasses.dataclass
 class MultiTaskConfig(hyperparams.Config):
+  """The configuration of a group of tasks.
+
+  Attributes:
+    init_checkpoint: the checkpoint to initialize the model from.
+    model: the model configuration.
+    task_routines: the routines of the individual tasks.
+    eval_concurrency: how the tasks are evaluated, one of "sequential",
+      "threads" or "interleaved", see `evaluator.MultiTaskEvaluator`.
+  """
   init_checkpoint: str = ""
   model: hyperparams.Config = None
   task_routines: Tuple[TaskRoutine, ...] = ()
+  eval_concurrency: str = "sequential"
+
+
+@dataclasses.dataclass
+class ProportionalSampleConfig(hyperparams.Config):
+  """Samples tasks with probabilities proportional to weight**alpha."""
+  alpha: float = 1.0
+
+
+@dataclasses.dataclass
+class AnnealingSampleConfig(hyperparams.Config):
+  """Samples tasks with probabilities proportional to weight**(1/temperature).
+
+  The temperature is annealed linearly from `start_temperature` to
+  `end_temperature` over `annealing_steps` steps, e.g. from proportional
+  sampling (temperature 1) towards uniform sampling (high temperatures).
+  """
+  start_temperature: float = 1.0
+  end_temperature: float = 5.0
+  annealing_steps: int = 100000
+
+
+@dataclasses.dataclass
+class LossAdaptiveSampleConfig(hyperparams.Config):
+  """Samples tasks with probabilities proportional to weight * loss**alpha.
+
+  The losses are moving averages, with decay `loss_decay`, of the training
+  losses of the tasks, updated at the end of every train loop.
+  """
+  alpha: float = 1.0
+  loss_decay: float = 0.9
+
+
+@dataclasses.dataclass
+class TaskSamplingConfig(oneof.OneOfConfig):
+  type: str = "proportional"
+  proportional: ProportionalSampleConfig = ProportionalSampleConfig()
+  annealing: AnnealingSampleConfig = AnnealingSampleConfig()
+  loss_adaptive: LossAdaptiveSampleConfig = LossAdaptiveSampleConfig()
+
+
+@dataclasses.dataclass
+class MultiTaskTrainerConfig(cfg.TrainerConfig):
+  """The trainer configuration of sampling-based multi-task training.
+
+  Attributes:
+    task_sampler: how the task trained at each step is sampled, using the
+      `task_weight`s of the task routines.
+    seed: the seed of the task sampling.
+  """
+  task_sampler: TaskSamplingConfig = TaskSamplingConfig()
+  seed: int = 0
+
+
+@dataclasses.dataclass
+class MultiTaskExperimentConfig(hyperparams.Config):
+  """An experiment config for multi-task training and evaluation.
+
+  Attributes:
+    task: the multi-task config, with the routines of the tasks trained and
+      evaluated.
+    trainer: the trainer configuration.
+    runtime: the runtime configuration.
+  """
+  task: MultiTaskConfig = MultiTaskConfig()
+  trainer: MultiTaskTrainerConfig = MultiTaskTrainerConfig()
+  runtime: cfg.RuntimeConfig = cfg.RuntimeConfig()
 
 
 @dataclasses.dataclass
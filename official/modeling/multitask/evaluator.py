@@ -16,7 +16,11 @@
 
 The evaluator implements the Orbit `AbstractEvaluator` interface.
 """
+import concurrent.futures
+import time
 from typing import Optional, Union
+
+from absl import logging
 import gin
 import orbit
 import tensorflow as tf
@@ -25,6 +29,11 @@ from official.modeling.multitask import base_model
 from official.modeling.multitask import multitask
 
 
+SEQUENTIAL = "sequential"
+THREADS = "threads"
+INTERLEAVED = "interleaved"
+
+
 @gin.configurable
 class MultiTaskEvaluator(orbit.AbstractEvaluator):
   """Implements the common trainer shared for TensorFlow models."""
@@ -32,19 +41,37 @@ class MultiTaskEvaluator(orbit.AbstractEvaluator):
   def __init__(self,
                task: multitask.MultiTask,
                model: Union[tf.keras.Model, base_model.MultiTaskBaseModel],
-               global_step: Optional[tf.Variable] = None):
+               global_step: Optional[tf.Variable] = None,
+               concurrency: str = SEQUENTIAL):
     """Initialize common trainer for TensorFlow models.
 
     Args:
       task: A multitask.MultiTask instance.
       model: tf.keras.Model instance.
       global_step: the global step variable.
+      concurrency: how the tasks are evaluated. "sequential" evaluates them one
+        after another. "threads" evaluates each task on its own thread, so that
+        the host-side aggregation of a task, e.g. COCO or SQuAD
+        post-processing, overlaps the evaluation steps of the others. It falls
+        back to "interleaved" with TPU strategies, which do not support
+        concurrent steps. "interleaved" runs one step of each task in turn and
+        aggregates the outputs of a task after dispatching the next task's
+        step, which overlaps when steps are dispatched asynchronously.
     """
+    if concurrency not in (SEQUENTIAL, THREADS, INTERLEAVED):
+      raise ValueError("Unsupported concurrency: %s" % concurrency)
     # Gets the current distribution strategy. If not inside any strategy scope,
     # it gets a single-replica no-op strategy.
     self._strategy = tf.distribute.get_strategy()
     self._task = task
     self._model = model
+    if concurrency == THREADS and isinstance(
+        self._strategy,
+        (tf.distribute.TPUStrategy, tf.distribute.experimental.TPUStrategy)):
+      logging.info("Threads are not supported by %s, interleaving the tasks.",
+                   type(self._strategy).__name__)
+      concurrency = INTERLEAVED
+    self._concurrency = concurrency
     self._global_step = global_step or orbit.utils.create_global_step()
     # TODO(hongkuny): Define a more robust way to handle the training/eval
     # checkpoint loading.
@@ -90,12 +117,16 @@ class MultiTaskEvaluator(orbit.AbstractEvaluator):
         return tf.nest.map_structure(self.strategy.experimental_local_results,
                                      distributed_outputs)
 
-      return orbit.utils.create_loop_fn(eval_step_fn)
+      return eval_step_fn
 
-    self.task_fns = {
+    self.task_step_fns = {
         name: get_function(name, task)
         for name, task in self.task.tasks.items()
     }
+    self.task_fns = {
+        name: orbit.utils.create_loop_fn(step_fn)
+        for name, step_fn in self.task_step_fns.items()
+    }
 
   @property
   def strategy(self):
@@ -146,26 +177,99 @@ class MultiTaskEvaluator(orbit.AbstractEvaluator):
     for metrics in self.validation_metrics.values():
       for metric in metrics:
         metric.reset_states()
-    results = {}
     eval_iters = tf.nest.map_structure(iter, self.eval_datasets)
+    num_steps = {
+        name: self.task.task_eval_steps(name) or num_steps
+        for name in self.task_fns
+    }
+
+    if self._concurrency == INTERLEAVED:
+      outputs, wall_times = self._evaluate_interleaved(eval_iters, num_steps)
+    else:
+
+      def evaluate_task(name):
+        start = time.time()
+        outputs = self.task_fns[name](
+            eval_iters[name],
+            num_steps[name],
+            state=None,
+            reduce_fn=self.task.tasks[name].aggregate_logs)
+        return outputs, time.time() - start
 
-    for name, task_eval_loop in self.task_fns.items():
-      outputs = None
-      eval_iter = eval_iters[name]
+      if self._concurrency == THREADS:
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(self.task_fns)) as executor:
+          task_results = dict(
+              zip(self.task_fns, executor.map(evaluate_task, self.task_fns)))
+      else:
+        task_results = {name: evaluate_task(name) for name in self.task_fns}
+      outputs = {name: result[0] for name, result in task_results.items()}
+      wall_times = {name: result[1] for name, result in task_results.items()}
+
+    results = {}
+    for name in self.task_fns:
       task = self.task.tasks[name]
-      task_eval_steps = self.task.task_eval_steps(name) or num_steps
-      outputs = task_eval_loop(
-          eval_iter,
-          task_eval_steps,
-          state=outputs,
-          reduce_fn=task.aggregate_logs)
       task_metrics = self.validation_metrics[name]
       task_loss = self.validation_losses[name]
       logs = {}
       for metric in task_metrics + [task_loss]:
         logs[metric.name] = metric.result()
-      if outputs:
-        metrics = task.reduce_aggregated_logs(outputs)
+      if outputs[name]:
+        metrics = task.reduce_aggregated_logs(outputs[name])
         logs.update(metrics)
+      logs["eval_wall_time"] = wall_times[name]
+      logging.info("Evaluated task %s in %.2f seconds.", name,
+                   wall_times[name])
       results[name] = logs
     return results
+
+  def _evaluate_interleaved(self, eval_iters, num_steps):
+    """Runs one evaluation step of each task in turn.
+
+    The outputs of a task's step are aggregated after the next task's step is
+    dispatched, so that the aggregation can overlap its execution.
+
+    Args:
+      eval_iters: a dict of (task name, iterator).
+      num_steps: a dict of (task name, number of steps), -1 meaning until the
+        iterator is exhausted.
+
+    Returns:
+      A tuple of dicts of (task name, aggregated outputs) and (task name,
+      wall time in seconds).
+    """
+    start = time.time()
+    states = {name: None for name in self.task_fns}
+    wall_times = {}
+    steps = {name: 0 for name in self.task_fns}
+    active = [name for name in self.task_fns if num_steps[name] != 0]
+    pending = None
+    while active:
+      for name in list(active):
+        try:
+          step_outputs = self.task_step_fns[name](eval_iters[name])
+        except (StopIteration, tf.errors.OutOfRangeError):
+          step_outputs = None
+        if pending is not None:
+          self._aggregate(states, *pending)
+          pending = None
+        if step_outputs is None:
+          active.remove(name)
+          wall_times[name] = time.time() - start
+          continue
+        pending = (name, step_outputs)
+        steps[name] += 1
+        if steps[name] == num_steps[name]:
+          active.remove(name)
+          self._aggregate(states, *pending)
+          pending = None
+          wall_times[name] = time.time() - start
+    if pending is not None:
+      self._aggregate(states, *pending)
+    for name in self.task_fns:
+      wall_times.setdefault(name, 0.)
+    return states, wall_times
+
+  def _aggregate(self, states, name, step_outputs):
+    states[name] = self.task.tasks[name].aggregate_logs(
+        states[name], step_outputs)
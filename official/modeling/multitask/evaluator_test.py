@@ -54,6 +54,10 @@ class MockModel(tf.keras.Model):
 class MockTask(base_task.Task):
   """Mock task object for testing."""
 
+  def __init__(self, *args, num_examples=None, **kwargs):
+    super().__init__(*args, **kwargs)
+    self._num_examples = num_examples
+
   def build_metrics(self, training: bool = True):
     del training
     return [tf.keras.metrics.Accuracy(name="acc")]
@@ -69,7 +73,7 @@ class MockTask(base_task.Task):
         return dict(x=x), label
 
     dataset = tf.data.Dataset.range(1)
-    dataset = dataset.repeat()
+    dataset = dataset.repeat(self._num_examples)
     dataset = dataset.map(
         generate_data, num_parallel_calls=tf.data.experimental.AUTOTUNE)
     return dataset.prefetch(buffer_size=1).batch(2, drop_remainder=True)
@@ -114,6 +118,28 @@ class EvaluatorTest(tf.test.TestCase, parameterized.TestCase):
     self.assertEqual(results["bar"]["validation_loss"], 0.0)
     self.assertEqual(results["foo"]["validation_loss"], 1.0)
 
+  @parameterized.parameters(
+      (evaluator.SEQUENTIAL, 5), (evaluator.THREADS, 5),
+      (evaluator.INTERLEAVED, 5), (evaluator.THREADS, -1),
+      (evaluator.INTERLEAVED, -1))
+  def test_multitask_evaluator_concurrency(self, concurrency, num_steps):
+    tasks = [
+        MockTask(params=cfg.TaskConfig(), name="bar", num_examples=6),
+        MockTask(params=cfg.TaskConfig(), name="foo", num_examples=10)
+    ]
+    test_multitask = multitask.MultiTask(tasks=tasks)
+    test_evaluator = evaluator.MultiTaskEvaluator(
+        task=test_multitask, model=MockModel(), concurrency=concurrency)
+    results = test_evaluator.evaluate(
+        tf.convert_to_tensor(num_steps, dtype=tf.int32))
+    # The batches are of 2 examples, so "bar" is exhausted after 3 steps.
+    self.assertEqual(results["bar"]["counter"], 3.)
+    self.assertEqual(results["foo"]["counter"], 5.)
+    self.assertEqual(results["bar"]["validation_loss"], 0.0)
+    self.assertEqual(results["foo"]["validation_loss"], 1.0)
+    for name in ("bar", "foo"):
+      self.assertGreater(results[name]["eval_wall_time"], 0.)
+
   @combinations.generate(all_strategy_combinations())
   def test_multitask_evaluator_numpy_metrics(self, distribution):
     with distribution.scope():
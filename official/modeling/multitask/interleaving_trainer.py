@@ -0,0 +1,200 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Multitask trainer that interleaves the training steps of the tasks.
+
+Unlike `MultiTask.joint_train_step`, which runs the forward and backward passes
+of every task at every step, each step of this trainer trains a single task,
+sampled by a `task_sampler.TaskSampler`. The tasks have their own input
+pipelines, and only the sampled task's iterator is advanced.
+"""
+import time
+from typing import Optional
+
+from absl import logging
+import gin
+import orbit
+import tensorflow as tf
+
+from official.modeling.multitask import base_model
+from official.modeling.multitask import multitask
+from official.modeling.multitask import task_sampler as sampler
+
+
+@gin.configurable
+class MultiTaskInterleavingTrainer(orbit.StandardTrainer):
+  """Trains one task, sampled by a `TaskSampler`, at every step."""
+
+  def __init__(self,
+               multi_task: multitask.MultiTask,
+               multi_task_model: base_model.MultiTaskBaseModel,
+               optimizer: tf.optimizers.Optimizer,
+               task_sampler: sampler.TaskSampler,
+               seed: int = 0,
+               trainer_options: Optional[orbit.StandardTrainerOptions] = None):
+    """Initializes the trainer.
+
+    Args:
+      multi_task: a multitask.MultiTask instance with the tasks to train.
+      multi_task_model: a MultiTaskBaseModel, with a sub-task model per task.
+      optimizer: the optimizer shared by the tasks.
+      task_sampler: the sampler of the task trained at each step. Its tasks
+        must be the tasks of `multi_task`.
+      seed: the seed of the task sampling.
+      trainer_options: an orbit.StandardTrainerOptions instance.
+    """
+    self._strategy = tf.distribute.get_strategy()
+    self._multi_task = multi_task
+    self._multi_task_model = multi_task_model
+    self._optimizer = optimizer
+    self._task_sampler = task_sampler
+    self._seed = seed
+    self._task_names = task_sampler.task_names
+    if set(self._task_names) != set(multi_task.tasks):
+      raise ValueError(
+          "The tasks of the sampler %s are not the tasks to train %s." %
+          (self._task_names, list(multi_task.tasks)))
+
+    self._global_step = orbit.utils.create_global_step()
+    self._task_step_counts = tf.Variable(
+        tf.zeros([len(self._task_names)], tf.int64),
+        trainable=False,
+        name="task_step_counts",
+        aggregation=tf.VariableAggregation.ONLY_FIRST_REPLICA)
+    self._checkpoint = tf.train.Checkpoint(
+        global_step=self.global_step,
+        model=self.multi_task_model,
+        optimizer=self.optimizer,
+        task_step_counts=self._task_step_counts,
+        task_sampler=self._task_sampler)
+
+    self.training_losses = {
+        name: tf.keras.metrics.Mean("training_loss", dtype=tf.float32)
+        for name in self._task_names
+    }
+    self.training_metrics = {
+        name: task.build_metrics(training=True)
+        for name, task in multi_task.tasks.items()
+    }
+    self._loop_start_time = None
+    self._loop_start_counts = None
+
+    train_datasets = {}
+    for name, task in multi_task.tasks.items():
+      train_datasets[name] = orbit.utils.make_distributed_dataset(
+          self.strategy, task.build_inputs, task.task_config.train_data)
+    super().__init__(train_dataset=train_datasets, options=trainer_options)
+
+    # Each task's step function must be traced once, in `train_step`, so they
+    # are built here rather than in the step.
+    self._task_step_fns = {
+        name: self._build_task_step_fn(name) for name in self._task_names
+    }
+
+  def _build_task_step_fn(self, name):
+    """Returns the replica function training task `name` for one step."""
+    task = self.multi_task.tasks[name]
+    model = self.multi_task_model.sub_tasks[name]
+    metrics = self.training_metrics[name]
+    training_loss = self.training_losses[name]
+
+    def step_fn(inputs):
+      logs = task.train_step(
+          inputs, model=model, optimizer=self.optimizer, metrics=metrics)
+      training_loss.update_state(logs[task.loss])
+
+    return step_fn
+
+  @property
+  def strategy(self):
+    return self._strategy
+
+  @property
+  def multi_task(self):
+    return self._multi_task
+
+  @property
+  def multi_task_model(self):
+    return self._multi_task_model
+
+  @property
+  def optimizer(self):
+    return self._optimizer
+
+  @property
+  def task_sampler(self):
+    return self._task_sampler
+
+  @property
+  def global_step(self):
+    return self._global_step
+
+  @property
+  def checkpoint(self):
+    return self._checkpoint
+
+  def initialize(self):
+    """Initializes the model, e.g. from a pre-trained checkpoint."""
+    self.multi_task_model.initialize()
+
+  def train_loop_begin(self):
+    for metric in self.training_losses.values():
+      metric.reset_states()
+    for metrics in self.training_metrics.values():
+      for metric in metrics:
+        metric.reset_states()
+    self._loop_start_time = time.time()
+    self._loop_start_counts = self._task_step_counts.numpy()
+
+  def train_step(self, iterator_map):
+    """Trains the task sampled at the current step for one step."""
+    task_index = self.task_sampler.sample(self.global_step, seed=self._seed)
+
+    def branch_fn(name):
+
+      def train_task():
+        self.strategy.run(
+            self._task_step_fns[name], args=(next(iterator_map[name]),))
+        return tf.constant(0)
+
+      return train_task
+
+    tf.switch_case(
+        tf.cast(task_index, tf.int32),
+        [branch_fn(name) for name in self._task_names])
+    self._task_step_counts.assign_add(
+        tf.one_hot(task_index, len(self._task_names), dtype=tf.int64))
+    self.global_step.assign_add(1)
+
+  def train_loop_end(self):
+    """Returns the per-task losses, metrics, step counts and throughput."""
+    elapsed = time.time() - self._loop_start_time
+    task_steps = self._task_step_counts.numpy() - self._loop_start_counts
+    outputs = {}
+    task_losses = {}
+    for i, name in enumerate(self._task_names):
+      task_outputs = {
+          "training_loss": self.training_losses[name].result(),
+          "steps": task_steps[i],
+          "steps_per_second": task_steps[i] / elapsed if elapsed > 0 else 0.,
+      }
+      for metric in self.training_metrics[name]:
+        task_outputs[metric.name] = metric.result()
+      if task_steps[i]:
+        task_losses[name] = float(task_outputs["training_loss"])
+      logging.info("Task %s: %d steps in this loop, %.2f steps/sec.", name,
+                   task_steps[i], task_outputs["steps_per_second"])
+      outputs[name] = task_outputs
+    self.task_sampler.update(task_losses)
+    return outputs
@@ -0,0 +1,161 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for multitask.interleaving_trainer."""
+from absl.testing import parameterized
+import tensorflow as tf
+
+from tensorflow.python.distribute import combinations
+from tensorflow.python.distribute import strategy_combinations
+from official.core import base_task
+from official.core import config_definitions as cfg
+from official.modeling.multitask import base_model
+from official.modeling.multitask import interleaving_trainer
+from official.modeling.multitask import multitask
+from official.modeling.multitask import task_sampler as sampler
+
+
+def all_strategy_combinations():
+  return combinations.combine(
+      distribution=[
+          strategy_combinations.default_strategy,
+          strategy_combinations.cloud_tpu_strategy,
+          strategy_combinations.one_device_strategy_gpu,
+      ],
+      mode="eager",
+  )
+
+
+class MockFooModel(tf.keras.Model):
+
+  def __init__(self, shared_layer, *args, **kwargs):
+    super().__init__(*args, **kwargs)
+    self._share_layer = shared_layer
+    self._foo_specific_layer = tf.keras.layers.Dense(1)
+
+  def call(self, inputs):
+    self.add_loss(tf.reduce_mean(self._foo_specific_layer(inputs["x"])**2))
+    return self._share_layer(inputs["x"])
+
+
+class MockBarModel(MockFooModel):
+  pass
+
+
+class MockMultiTaskModel(base_model.MultiTaskBaseModel):
+
+  def __init__(self, *args, **kwargs):
+    self._shared_dense = tf.keras.layers.Dense(1)
+    super().__init__(*args, **kwargs)
+
+  def _instantiate_sub_tasks(self):
+    return {
+        "foo": MockFooModel(self._shared_dense),
+        "bar": MockBarModel(self._shared_dense)
+    }
+
+
+class MockTask(base_task.Task):
+  """Mock task object for testing."""
+
+  def __init__(self, *args, num_examples=None, **kwargs):
+    super().__init__(*args, **kwargs)
+    self._num_examples = num_examples
+
+  def build_inputs(self, params):
+    dataset = tf.data.Dataset.from_tensors(
+        (dict(x=tf.ones([2], tf.float32)), tf.zeros([1], tf.int32)))
+    # A finite dataset fails the training if it is read too often.
+    dataset = dataset.repeat(self._num_examples)
+    return dataset.batch(2, drop_remainder=True)
+
+
+class InterleavingTrainerTest(tf.test.TestCase, parameterized.TestCase):
+
+  @combinations.generate(all_strategy_combinations())
+  def test_multitask_interleaving_trainer(self, distribution):
+    with distribution.scope():
+      tasks = [
+          MockTask(params=cfg.TaskConfig(), name="foo"),
+          MockTask(params=cfg.TaskConfig(), name="bar")
+      ]
+      test_multitask = multitask.MultiTask(
+          tasks=tasks, task_weights={"foo": 1.0, "bar": 3.0})
+      test_optimizer = tf.keras.optimizers.SGD(0.1)
+      model = MockMultiTaskModel()
+      test_trainer = interleaving_trainer.MultiTaskInterleavingTrainer(
+          multi_task=test_multitask,
+          multi_task_model=model,
+          optimizer=test_optimizer,
+          task_sampler=sampler.ProportionalTaskSampler(
+              test_multitask.task_weights))
+      results = test_trainer.train(tf.convert_to_tensor(20, dtype=tf.int32))
+
+    self.assertContainsSubset(["training_loss", "steps", "steps_per_second"],
+                              results["foo"].keys())
+    self.assertEqual(20, results["foo"]["steps"] + results["bar"]["steps"])
+    self.assertGreater(results["foo"]["steps"], 0)
+    self.assertGreater(results["bar"]["steps"], results["foo"]["steps"])
+    self.assertEqual(20, test_trainer.global_step.numpy())
+    self.assertEqual(20, test_optimizer.iterations.numpy())
+
+  def test_idle_task_inputs_are_not_read(self):
+    tasks = [
+        MockTask(params=cfg.TaskConfig(), name="foo"),
+        # Holds a single batch, so reading it twice fails.
+        MockTask(params=cfg.TaskConfig(), name="bar", num_examples=2)
+    ]
+    test_multitask = multitask.MultiTask(
+        tasks=tasks, task_weights={"foo": 1.0, "bar": 0.0})
+    test_trainer = interleaving_trainer.MultiTaskInterleavingTrainer(
+        multi_task=test_multitask,
+        multi_task_model=MockMultiTaskModel(),
+        optimizer=tf.keras.optimizers.SGD(0.1),
+        task_sampler=sampler.ProportionalTaskSampler(
+            test_multitask.task_weights))
+    results = test_trainer.train(tf.convert_to_tensor(5, dtype=tf.int32))
+    self.assertEqual(5, results["foo"]["steps"])
+    self.assertEqual(0, results["bar"]["steps"])
+
+  def test_checkpoint_restores_task_sampler(self):
+    tasks = [
+        MockTask(params=cfg.TaskConfig(), name="foo"),
+        MockTask(params=cfg.TaskConfig(), name="bar")
+    ]
+    test_multitask = multitask.MultiTask(tasks=tasks)
+
+    def build_trainer():
+      return interleaving_trainer.MultiTaskInterleavingTrainer(
+          multi_task=test_multitask,
+          multi_task_model=MockMultiTaskModel(),
+          optimizer=tf.keras.optimizers.SGD(0.1),
+          task_sampler=sampler.LossAdaptiveTaskSampler(
+              test_multitask.task_weights))
+
+    test_trainer = build_trainer()
+    test_trainer.train(tf.convert_to_tensor(5, dtype=tf.int32))
+    distribution = test_trainer.task_sampler.task_distribution(0).numpy()
+    # The sampler adapted to the training losses.
+    self.assertNotAllClose([0.5, 0.5], distribution)
+    path = test_trainer.checkpoint.save(self.get_temp_dir() + "/ckpt")
+
+    restored_trainer = build_trainer()
+    restored_trainer.checkpoint.restore(path).assert_existing_objects_matched()
+    self.assertAllClose(
+        distribution,
+        restored_trainer.task_sampler.task_distribution(0).numpy())
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -0,0 +1,164 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Utils to sample the task trained at each step of multi-task training."""
+import abc
+from typing import Dict, Mapping
+
+import tensorflow as tf
+
+from official.modeling.multitask import configs
+
+
+class TaskSampler(tf.Module, metaclass=abc.ABCMeta):
+  """An abstract class defining the task sampling distribution."""
+
+  def __init__(self, task_weights: Mapping[str, float]):
+    """Initializes the sampler.
+
+    Args:
+      task_weights: a dict of (task name, task weight). The order of the tasks
+        is the order of the probabilities of `task_distribution`.
+    """
+    super().__init__()
+    self._task_names = list(task_weights)
+    self._task_weights = tf.constant(
+        [task_weights[name] for name in self._task_names], tf.float32)
+
+  @property
+  def task_names(self):
+    return self._task_names
+
+  @abc.abstractmethod
+  def task_distribution(self, global_step: tf.Tensor) -> tf.Tensor:
+    """Returns the probabilities of the tasks at `global_step`."""
+    pass
+
+  def update(self, task_losses: Mapping[str, float]):
+    """Updates the sampler with the training losses of a train loop.
+
+    Called eagerly at the end of every train loop, with the mean training loss
+    of the tasks that were sampled during the loop.
+
+    Args:
+      task_losses: a dict of (task name, training loss).
+    """
+    del task_losses
+
+  def sample(self, global_step: tf.Tensor, seed: int = 0) -> tf.Tensor:
+    """Returns the index of the task to train at `global_step`.
+
+    The sample is a deterministic function of `seed` and `global_step`, so that
+    training resumed from a checkpoint samples the same tasks.
+
+    Args:
+      global_step: the global step.
+      seed: the seed of the sampling.
+    """
+    logits = tf.math.log(self.task_distribution(global_step))
+    return tf.random.stateless_categorical(
+        logits[tf.newaxis],
+        num_samples=1,
+        seed=tf.stack([tf.cast(seed, tf.int64),
+                       tf.cast(global_step, tf.int64)]))[0, 0]
+
+
+def _normalize(weights):
+  return weights / tf.reduce_sum(weights)
+
+
+class ProportionalTaskSampler(TaskSampler):
+  """Samples tasks with probabilities proportional to weight**alpha."""
+
+  def __init__(self, task_weights: Mapping[str, float], alpha: float = 1.0):
+    super().__init__(task_weights)
+    self._alpha = alpha
+
+  def task_distribution(self, global_step: tf.Tensor) -> tf.Tensor:
+    del global_step
+    return _normalize(tf.pow(self._task_weights, self._alpha))
+
+
+class AnnealingTaskSampler(TaskSampler):
+  """Samples tasks with probabilities proportional to weight**(1/temperature).
+
+  The temperature is annealed linearly with the global step, from
+  `start_temperature` to `end_temperature` over `annealing_steps` steps.
+  """
+
+  def __init__(self,
+               task_weights: Mapping[str, float],
+               start_temperature: float = 1.0,
+               end_temperature: float = 5.0,
+               annealing_steps: int = 100000):
+    super().__init__(task_weights)
+    self._start_temperature = start_temperature
+    self._end_temperature = end_temperature
+    self._annealing_steps = max(annealing_steps, 1)
+
+  def task_distribution(self, global_step: tf.Tensor) -> tf.Tensor:
+    progress = tf.minimum(
+        tf.cast(global_step, tf.float32) / self._annealing_steps, 1.0)
+    temperature = self._start_temperature + progress * (
+        self._end_temperature - self._start_temperature)
+    return _normalize(tf.pow(self._task_weights, 1.0 / temperature))
+
+
+class LossAdaptiveTaskSampler(TaskSampler):
+  """Samples tasks with probabilities proportional to weight * loss**alpha.
+
+  Tasks whose training loss is high are sampled more often. The losses are
+  moving averages of the training losses of the train loops, and start at 1,
+  i.e. with proportional sampling.
+  """
+
+  def __init__(self,
+               task_weights: Mapping[str, float],
+               alpha: float = 1.0,
+               loss_decay: float = 0.9):
+    super().__init__(task_weights)
+    self._alpha = alpha
+    self._loss_decay = loss_decay
+    self._task_losses = tf.Variable(
+        tf.ones_like(self._task_weights),
+        trainable=False,
+        name='task_losses')
+
+  def task_distribution(self, global_step: tf.Tensor) -> tf.Tensor:
+    del global_step
+    return _normalize(self._task_weights *
+                      tf.pow(self._task_losses, self._alpha))
+
+  def update(self, task_losses: Mapping[str, float]):
+    losses = self._task_losses.numpy()
+    for i, name in enumerate(self.task_names):
+      if name in task_losses:
+        losses[i] = (self._loss_decay * losses[i] +
+                     (1. - self._loss_decay) * task_losses[name])
+    self._task_losses.assign(losses)
+
+
+_SAMPLERS = {
+    'proportional': ProportionalTaskSampler,
+    'annealing': AnnealingTaskSampler,
+    'loss_adaptive': LossAdaptiveTaskSampler,
+}
+
+
+def get_task_sampler(config: configs.TaskSamplingConfig,
+                     task_weights: Dict[str, float]) -> TaskSampler:
+  """Creates the task sampler of `config`."""
+  if config.type not in _SAMPLERS:
+    raise ValueError('Unsupported task sampler type: %s' % config.type)
+  return _SAMPLERS[config.type](task_weights, **config.get().as_dict())
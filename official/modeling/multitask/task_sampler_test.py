@@ -0,0 +1,78 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for multitask.task_sampler."""
+import numpy as np
+import tensorflow as tf
+
+from official.modeling.multitask import configs
+from official.modeling.multitask import task_sampler as sampler
+
+
+class TaskSamplerTest(tf.test.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self._task_weights = {"a": 1.0, "b": 2.0, "c": 5.0}
+
+  def test_proportional(self):
+    task_sampler = sampler.get_task_sampler(
+        configs.TaskSamplingConfig(type="proportional"), self._task_weights)
+    self.assertAllClose([0.125, 0.25, 0.625],
+                        task_sampler.task_distribution(tf.constant(10)))
+
+    task_sampler = sampler.ProportionalTaskSampler(
+        self._task_weights, alpha=0.)
+    self.assertAllClose([1 / 3] * 3,
+                        task_sampler.task_distribution(tf.constant(10)))
+
+  def test_annealing(self):
+    task_sampler = sampler.get_task_sampler(
+        configs.TaskSamplingConfig(
+            type="annealing",
+            annealing=configs.AnnealingSampleConfig(
+                start_temperature=1., end_temperature=1e6,
+                annealing_steps=10)), self._task_weights)
+    self.assertAllClose([0.125, 0.25, 0.625],
+                        task_sampler.task_distribution(tf.constant(0)))
+    self.assertAllClose([1 / 3] * 3,
+                        task_sampler.task_distribution(tf.constant(20)),
+                        atol=1e-4)
+
+  def test_loss_adaptive(self):
+    task_sampler = sampler.LossAdaptiveTaskSampler(
+        self._task_weights, alpha=1., loss_decay=0.)
+    self.assertAllClose([0.125, 0.25, 0.625],
+                        task_sampler.task_distribution(tf.constant(0)))
+    task_sampler.update({"a": 10.0, "c": 1.0})
+    self.assertAllClose([10 / 17, 2 / 17, 5 / 17],
+                        task_sampler.task_distribution(tf.constant(0)))
+
+  def test_sample(self):
+    task_sampler = sampler.ProportionalTaskSampler(self._task_weights)
+    samples = [
+        task_sampler.sample(tf.constant(step), seed=1).numpy()
+        for step in range(2000)
+    ]
+    self.assertEqual(
+        samples[:10],
+        [task_sampler.sample(tf.constant(step), seed=1).numpy()
+         for step in range(10)])
+    self.assertAllClose([0.125, 0.25, 0.625],
+                        np.bincount(samples, minlength=3) / len(samples),
+                        atol=0.04)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -20,9 +20,116 @@ import orbit
 import tensorflow as tf
 from official.core import base_task
 from official.core import base_trainer as core_lib
+from official.modeling.multitask import base_model
 from official.modeling.multitask import configs
 from official.modeling.multitask import evaluator as evaluator_lib
+from official.modeling.multitask import interleaving_trainer
 from official.modeling.multitask import multitask
+from official.modeling.multitask import task_sampler as sampler
+
+
+def run_experiment(*, distribution_strategy: tf.distribute.Strategy,
+                   task: multitask.MultiTask,
+                   model: base_model.MultiTaskBaseModel, mode: str,
+                   params: configs.MultiTaskExperimentConfig,
+                   model_dir: str) -> base_model.MultiTaskBaseModel:
+  """Runs sampling-based multi-task train/eval configured by the params.
+
+  Each training step trains one task, sampled according to
+  `params.trainer.task_sampler` and the task weights of `task`.
+
+  Args:
+    distribution_strategy: A distribution distribution_strategy.
+    task: A multitask.MultiTask instance.
+    model: A MultiTaskBaseModel instance.
+    mode: A 'str', specifying the mode. Can be 'train', 'eval', 'train_and_eval'
+      or 'continuous_eval'.
+    params: MultiTaskExperimentConfig instance.
+    model_dir: A 'str', a path to store model checkpoints and summaries.
+
+  Returns:
+      model: `base_model.MultiTaskBaseModel` instance.
+  """
+
+  is_training = 'train' in mode
+  is_eval = 'eval' in mode
+  with distribution_strategy.scope():
+    if is_training:
+      optimizer = task.create_optimizer(params.trainer.optimizer_config,
+                                        params.runtime)
+      trainer = interleaving_trainer.MultiTaskInterleavingTrainer(
+          multi_task=task,
+          multi_task_model=model,
+          optimizer=optimizer,
+          task_sampler=sampler.get_task_sampler(params.trainer.task_sampler,
+                                                task.task_weights),
+          seed=params.trainer.seed,
+          trainer_options=orbit.StandardTrainerOptions(
+              use_tf_function=params.trainer.train_tf_function,
+              use_tf_while_loop=params.trainer.train_tf_while_loop))
+    else:
+      trainer = None
+    if is_eval:
+      evaluator = evaluator_lib.MultiTaskEvaluator(
+          task=task,
+          model=model,
+          global_step=trainer.global_step if is_training else None,
+          concurrency=params.task.eval_concurrency)
+    else:
+      evaluator = None
+
+  if trainer:
+    checkpoint = trainer.checkpoint
+    global_step = trainer.global_step
+  else:
+    checkpoint = evaluator.checkpoint
+    global_step = evaluator.global_step
+
+  checkpoint_manager = tf.train.CheckpointManager(
+      checkpoint,
+      directory=model_dir,
+      max_to_keep=params.trainer.max_to_keep,
+      step_counter=global_step,
+      checkpoint_interval=params.trainer.checkpoint_interval,
+      init_fn=trainer.initialize if trainer else None)
+
+  controller = orbit.Controller(
+      strategy=distribution_strategy,
+      trainer=trainer,
+      evaluator=evaluator,
+      global_step=global_step,
+      steps_per_loop=params.trainer.steps_per_loop,
+      checkpoint_manager=checkpoint_manager,
+      summary_dir=os.path.join(model_dir, 'train'),
+      eval_summary_dir=os.path.join(model_dir, 'validation'),
+      summary_interval=params.trainer.summary_interval)
+
+  logging.info('Starts to execute mode: %s', mode)
+  with distribution_strategy.scope():
+    if mode == 'train':
+      controller.train(steps=params.trainer.train_steps)
+    elif mode == 'train_and_eval':
+      controller.train_and_evaluate(
+          train_steps=params.trainer.train_steps,
+          eval_steps=params.trainer.validation_steps,
+          eval_interval=params.trainer.validation_interval)
+    elif mode == 'eval':
+      controller.evaluate(steps=params.trainer.validation_steps)
+    elif mode == 'continuous_eval':
+
+      def timeout_fn():
+        if evaluator.global_step.numpy() >= params.trainer.train_steps:
+          return True
+        return False
+
+      controller.evaluate_continuously(
+          steps=params.trainer.validation_steps,
+          timeout=params.trainer.continuous_eval_timeout,
+          timeout_fn=timeout_fn)
+    else:
+      raise NotImplementedError('The mode is not implemented: %s' % mode)
+
+  return model
 
 
 def run_experiment_wtih_multitask_eval(
@@ -73,7 +180,8 @@ def run_experiment_wtih_multitask_eval(
       evaluator = evaluator_lib.MultiTaskEvaluator(
           task=eval_tasks,
           model=model,
-          global_step=trainer.global_step if is_training else None)
+          global_step=trainer.global_step if is_training else None,
+          concurrency=params.eval_tasks.eval_concurrency)
     else:
       evaluator = None
 
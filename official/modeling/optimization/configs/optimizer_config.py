@@ -165,8 +165,15 @@ class EMAConfig(BaseOptimizerConfig):
     average_decay: 'float', average decay value.
     start_step: 'int', start step to apply moving average.
     dynamic_decay: 'bool', whether to apply dynamic decay or not.
+    fused: 'bool', whether to keep the averages in a few flat buffers, one per
+      dtype and device, which are updated with a handful of ops per step
+      instead of a few ops per variable.
+    update_interval: 'int', number of steps between updates of the averages.
+      The decay is raised to this power to compensate for the skipped steps.
   """
   name: str = "ExponentialMovingAverage"
   average_decay: float = 0.99
   start_step: int = 0
   dynamic_decay: bool = True
+  fused: bool = False
+  update_interval: int = 1
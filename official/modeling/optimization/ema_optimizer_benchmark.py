@@ -0,0 +1,95 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+r"""Benchmarks the per-step overhead of the moving average updates.
+
+Times the update of the moving averages and the weight swap of
+`ExponentialMovingAverage` for a model with many small variables, with and
+without `fused`, and for every given `update_interval` (shell script):
+
+python3 -m official.modeling.optimization.ema_optimizer_benchmark \
+    --num_variables=2000 --update_intervals=1,4
+"""
+import time
+
+from absl import app
+from absl import flags
+from absl import logging
+import tensorflow as tf
+
+from official.modeling.optimization import ema_optimizer
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_integer('num_variables', 2000, 'The number of model variables.')
+flags.DEFINE_integer('variable_size', 256, 'The size of each variable.')
+flags.DEFINE_integer('num_steps', 100, 'The number of timed steps.')
+flags.DEFINE_list('update_intervals', ['1', '4'],
+                  'The `update_interval` values to benchmark.')
+
+
+class _ManyVariables(tf.keras.Model):
+  """A model made of many small variables."""
+
+  def __init__(self, num_variables, variable_size):
+    super().__init__()
+    self.vs = [
+        tf.Variable(tf.random.normal([variable_size]), name='v%d' % i)
+        for i in range(num_variables)
+    ]
+
+
+def benchmark(fused, update_interval):
+  """Returns the update and swap times, in ms per step."""
+  strategy = tf.distribute.OneDeviceStrategy('/cpu:0')
+  with strategy.scope():
+    model = _ManyVariables(FLAGS.num_variables, FLAGS.variable_size)
+    optimizer = ema_optimizer.ExponentialMovingAverage(
+        tf.keras.optimizers.SGD(),
+        fused=fused,
+        update_interval=update_interval)
+    optimizer.shadow_copy(model)
+
+  @tf.function
+  def update(step):
+    strategy.run(optimizer.update_average, args=(step,))
+
+  # Traces and warms up.
+  update(tf.constant(0))
+  start = time.time()
+  for step in range(1, FLAGS.num_steps + 1):
+    update(tf.constant(step))
+  update_ms = 1e3 * (time.time() - start) / FLAGS.num_steps
+
+  with strategy.scope():
+    optimizer.swap_weights()
+    start = time.time()
+    for _ in range(FLAGS.num_steps):
+      optimizer.swap_weights()
+  swap_ms = 1e3 * (time.time() - start) / FLAGS.num_steps
+  return update_ms, swap_ms
+
+
+def main(_):
+  for update_interval in [int(x) for x in FLAGS.update_intervals]:
+    for fused in (False, True):
+      update_ms, swap_ms = benchmark(fused, update_interval)
+      logging.info(
+          'fused=%s update_interval=%d: %.3f ms/step to update the averages, '
+          '%.3f ms to swap the weights.', fused, update_interval, update_ms,
+          swap_ms)
+
+
+if __name__ == '__main__':
+  app.run(main)
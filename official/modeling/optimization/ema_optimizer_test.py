@@ -0,0 +1,124 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for ema_optimizer."""
+# pylint: disable=protected-access
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+from official.modeling.optimization import ema_optimizer
+
+
+def _build_model():
+  model = tf.keras.Sequential([
+      tf.keras.layers.Dense(4, input_shape=(3,)),
+      tf.keras.layers.BatchNormalization(),
+      tf.keras.layers.Dense(2),
+  ])
+  for i, var in enumerate(model.weights):
+    var.assign(tf.fill(var.shape, 0.1 * (i + 1)))
+  return model
+
+
+class ExponentialMovingAverageTest(tf.test.TestCase, parameterized.TestCase):
+
+  def _train(self, num_steps, **kwargs):
+    strategy = tf.distribute.OneDeviceStrategy('/cpu:0')
+    with strategy.scope():
+      model = _build_model()
+      optimizer = ema_optimizer.ExponentialMovingAverage(
+          tf.keras.optimizers.SGD(0.05), average_decay=0.9, **kwargs)
+      optimizer.shadow_copy(model)
+
+    @tf.function
+    def train_step(inputs):
+
+      def step_fn(inputs):
+        with tf.GradientTape() as tape:
+          loss = tf.reduce_sum(model(inputs, training=True)**2)
+        grads = tape.gradient(loss, model.trainable_variables)
+        optimizer.apply_gradients(zip(grads, model.trainable_variables))
+
+      strategy.run(step_fn, args=(inputs,))
+
+    inputs = tf.reshape(tf.range(6, dtype=tf.float32), [2, 3]) / 6.
+    for _ in range(num_steps):
+      train_step(inputs)
+    weights = [v.numpy() for v in model.weights]
+    with strategy.scope():
+      optimizer.swap_weights()
+    averages = [v.numpy() for v in model.weights]
+    with strategy.scope():
+      optimizer.swap_weights()
+    self.assertAllClose(weights, [v.numpy() for v in model.weights])
+    return weights, averages
+
+  @parameterized.parameters(True, False)
+  def test_fused_matches_unfused(self, dynamic_decay):
+    weights, averages = self._train(5, dynamic_decay=dynamic_decay)
+    fused_weights, fused_averages = self._train(
+        5, dynamic_decay=dynamic_decay, fused=True)
+    self.assertAllClose(weights, fused_weights)
+    self.assertAllClose(averages, fused_averages)
+    self.assertNotAllClose(weights, averages)
+
+  @parameterized.parameters(True, False)
+  def test_update_interval(self, fused):
+    _, averages = self._train(
+        6, dynamic_decay=False, fused=fused, update_interval=3)
+    _, every_step_averages = self._train(6, dynamic_decay=False, fused=fused)
+    # The averages of slowly changing weights barely depend on the interval,
+    # as the decay is corrected for the skipped steps.
+    for average, every_step_average in zip(averages, every_step_averages):
+      self.assertAllClose(average, every_step_average, atol=0.5)
+    self.assertNotAllClose(averages, every_step_averages)
+
+  def test_fused_assign_average_vars(self):
+    model = _build_model()
+    optimizer = ema_optimizer.ExponentialMovingAverage(
+        tf.keras.optimizers.SGD(0.1), fused=True)
+    optimizer.shadow_copy(model)
+    # All the weights are float32 on the same device.
+    self.assertLen(optimizer._average_weights, 1)
+    self.assertEqual(
+        sum(np.prod(v.shape) for v in model.weights),
+        optimizer._average_weights[0].shape[0])
+    optimizer.assign_average_vars(model.weights)
+    for var in model.weights:
+      expected = 0. if var.trainable else var.numpy()
+      self.assertAllClose(np.broadcast_to(expected, var.shape), var.numpy())
+
+  def test_fused_checkpoint(self):
+    model = _build_model()
+    optimizer = ema_optimizer.ExponentialMovingAverage(
+        tf.keras.optimizers.SGD(0.1), fused=True)
+    optimizer.shadow_copy(model)
+    optimizer._average_weights[0].assign(
+        tf.ones_like(optimizer._average_weights[0]))
+    path = tf.train.Checkpoint(optimizer=optimizer).save(
+        self.get_temp_dir() + '/ckpt')
+
+    restored_model = _build_model()
+    restored = ema_optimizer.ExponentialMovingAverage(
+        tf.keras.optimizers.SGD(0.1), fused=True)
+    restored.shadow_copy(restored_model)
+    tf.train.Checkpoint(optimizer=restored).restore(path).assert_consumed()
+    self.assertAllClose(
+        np.ones(restored._average_weights[0].shape),
+        restored._average_weights[0].numpy())
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -16,10 +16,13 @@
 # pylint: disable=g-bad-import-order
 import collections
 import copy
+import itertools
 import json
 import math
+import multiprocessing
 import os
 
+import numpy as np
 import six
 
 from absl import logging
@@ -257,204 +260,70 @@ def convert_examples_to_features(examples,
                                  is_training,
                                  output_fn,
                                  xlnet_format=False,
-                                 batch_size=None):
-  """Loads a data file into a list of `InputBatch`s."""
+                                 batch_size=None,
+                                 num_processes=None):
+  """Loads a data file into a list of `InputBatch`s.
+
+  Args:
+    examples: A list of `SquadExample`s.
+    tokenizer: A `tokenization.FullTokenizer`.
+    max_seq_length: The maximum total input sequence length.
+    doc_stride: The stride to take between document chunks.
+    max_query_length: The maximum number of tokens for the question.
+    is_training: Whether the features are generated for training.
+    output_fn: A callback that receives each `InputFeatures`, in order.
+    xlnet_format: Whether to emit features in the XLNet token order.
+    batch_size: The eval batch size used to pad the features when not training.
+    num_processes: If larger than 1, examples are converted in contiguous
+      shards on a process pool of this size. Features are still passed to
+      `output_fn` in the same deterministic order as the serial path.
+
+  Returns:
+    The number of features written, including padding features.
+  """
+  convert_kwargs = dict(
+      max_seq_length=max_seq_length,
+      doc_stride=doc_stride,
+      max_query_length=max_query_length,
+      is_training=is_training,
+      xlnet_format=xlnet_format)
+
+  if num_processes and num_processes > 1:
+    shards = [(start, examples[start:start + _EXAMPLES_PER_SHARD],
+               convert_kwargs)
+              for start in range(0, len(examples), _EXAMPLES_PER_SHARD)]
+    pool = multiprocessing.Pool(
+        processes=num_processes,
+        initializer=_init_conversion_worker,
+        initargs=(tokenizer,))
+    example_features_iterator = itertools.chain.from_iterable(
+        pool.imap(_convert_example_shard, shards))
+  else:
+    pool = None
+    example_features_iterator = _convert_examples(
+        examples, 0, tokenizer, **convert_kwargs)
 
   base_id = 1000000000
   unique_id = base_id
   feature = None
-  for (example_index, example) in enumerate(examples):
-    query_tokens = tokenizer.tokenize(example.question_text)
-
-    if len(query_tokens) > max_query_length:
-      query_tokens = query_tokens[0:max_query_length]
-
-    tok_to_orig_index = []
-    orig_to_tok_index = []
-    all_doc_tokens = []
-    for (i, token) in enumerate(example.doc_tokens):
-      orig_to_tok_index.append(len(all_doc_tokens))
-      sub_tokens = tokenizer.tokenize(token)
-      for sub_token in sub_tokens:
-        tok_to_orig_index.append(i)
-        all_doc_tokens.append(sub_token)
-
-    tok_start_position = None
-    tok_end_position = None
-    if is_training and example.is_impossible:
-      tok_start_position = -1
-      tok_end_position = -1
-    if is_training and not example.is_impossible:
-      tok_start_position = orig_to_tok_index[example.start_position]
-      if example.end_position < len(example.doc_tokens) - 1:
-        tok_end_position = orig_to_tok_index[example.end_position + 1] - 1
-      else:
-        tok_end_position = len(all_doc_tokens) - 1
-      (tok_start_position, tok_end_position) = _improve_answer_span(
-          all_doc_tokens, tok_start_position, tok_end_position, tokenizer,
-          example.orig_answer_text)
-
-    # The -3 accounts for [CLS], [SEP] and [SEP]
-    max_tokens_for_doc = max_seq_length - len(query_tokens) - 3
-
-    # We can have documents that are longer than the maximum sequence length.
-    # To deal with this we do a sliding window approach, where we take chunks
-    # of the up to our max length with a stride of `doc_stride`.
-    _DocSpan = collections.namedtuple(  # pylint: disable=invalid-name
-        "DocSpan", ["start", "length"])
-    doc_spans = []
-    start_offset = 0
-    while start_offset < len(all_doc_tokens):
-      length = len(all_doc_tokens) - start_offset
-      if length > max_tokens_for_doc:
-        length = max_tokens_for_doc
-      doc_spans.append(_DocSpan(start=start_offset, length=length))
-      if start_offset + length == len(all_doc_tokens):
-        break
-      start_offset += min(length, doc_stride)
-
-    for (doc_span_index, doc_span) in enumerate(doc_spans):
-      tokens = []
-      token_to_orig_map = {}
-      token_is_max_context = {}
-      segment_ids = []
-
-      # Paragraph mask used in XLNet.
-      # 1 represents paragraph and class tokens.
-      # 0 represents query and other special tokens.
-      paragraph_mask = []
-
-      # pylint: disable=cell-var-from-loop
-      def process_query(seg_q):
-        for token in query_tokens:
-          tokens.append(token)
-          segment_ids.append(seg_q)
-          paragraph_mask.append(0)
-        tokens.append("[SEP]")
-        segment_ids.append(seg_q)
-        paragraph_mask.append(0)
-
-      def process_paragraph(seg_p):
-        for i in range(doc_span.length):
-          split_token_index = doc_span.start + i
-          token_to_orig_map[len(tokens)] = tok_to_orig_index[split_token_index]
-
-          is_max_context = _check_is_max_context(doc_spans, doc_span_index,
-                                                 split_token_index)
-          token_is_max_context[len(tokens)] = is_max_context
-          tokens.append(all_doc_tokens[split_token_index])
-          segment_ids.append(seg_p)
-          paragraph_mask.append(1)
-        tokens.append("[SEP]")
-        segment_ids.append(seg_p)
-        paragraph_mask.append(0)
-
-      def process_class(seg_class):
-        class_index = len(segment_ids)
-        tokens.append("[CLS]")
-        segment_ids.append(seg_class)
-        paragraph_mask.append(1)
-        return class_index
-
-      if xlnet_format:
-        seg_p, seg_q, seg_class, seg_pad = 0, 1, 2, 3
-        process_paragraph(seg_p)
-        process_query(seg_q)
-        class_index = process_class(seg_class)
-      else:
-        seg_p, seg_q, seg_class, seg_pad = 1, 0, 0, 0
-        class_index = process_class(seg_class)
-        process_query(seg_q)
-        process_paragraph(seg_p)
-
-      input_ids = tokenizer.convert_tokens_to_ids(tokens)
-
-      # The mask has 1 for real tokens and 0 for padding tokens. Only real
-      # tokens are attended to.
-      input_mask = [1] * len(input_ids)
-
-      # Zero-pad up to the sequence length.
-      while len(input_ids) < max_seq_length:
-        input_ids.append(0)
-        input_mask.append(0)
-        segment_ids.append(seg_pad)
-        paragraph_mask.append(0)
-
-      assert len(input_ids) == max_seq_length
-      assert len(input_mask) == max_seq_length
-      assert len(segment_ids) == max_seq_length
-      assert len(paragraph_mask) == max_seq_length
-
-      start_position = 0
-      end_position = 0
-      span_contains_answer = False
-
-      if is_training and not example.is_impossible:
-        # For training, if our document chunk does not contain an annotation
-        # we throw it out, since there is nothing to predict.
-        doc_start = doc_span.start
-        doc_end = doc_span.start + doc_span.length - 1
-        span_contains_answer = (tok_start_position >= doc_start and
-                                tok_end_position <= doc_end)
-        if span_contains_answer:
-          doc_offset = 0 if xlnet_format else len(query_tokens) + 2
-          start_position = tok_start_position - doc_start + doc_offset
-          end_position = tok_end_position - doc_start + doc_offset
-
-      if example_index < 20:
-        logging.info("*** Example ***")
-        logging.info("unique_id: %s", (unique_id))
-        logging.info("example_index: %s", (example_index))
-        logging.info("doc_span_index: %s", (doc_span_index))
-        logging.info("tokens: %s",
-                     " ".join([tokenization.printable_text(x) for x in tokens]))
-        logging.info(
-            "token_to_orig_map: %s", " ".join([
-                "%d:%d" % (x, y) for (x, y) in six.iteritems(token_to_orig_map)
-            ]))
-        logging.info(
-            "token_is_max_context: %s", " ".join([
-                "%d:%s" % (x, y)
-                for (x, y) in six.iteritems(token_is_max_context)
-            ]))
-        logging.info("input_ids: %s", " ".join([str(x) for x in input_ids]))
-        logging.info("input_mask: %s", " ".join([str(x) for x in input_mask]))
-        logging.info("segment_ids: %s", " ".join([str(x) for x in segment_ids]))
-        logging.info("paragraph_mask: %s", " ".join(
-            [str(x) for x in paragraph_mask]))
-        logging.info("class_index: %d", class_index)
+  try:
+    for example_index, features in example_features_iterator:
+      for feature in features:
+        feature.unique_id = unique_id
+        if example_index < 20:
+          _log_feature(feature, is_training)
+
+        # Run callback
         if is_training:
-          if span_contains_answer:
-            answer_text = " ".join(tokens[start_position:(end_position + 1)])
-            logging.info("start_position: %d", (start_position))
-            logging.info("end_position: %d", (end_position))
-            logging.info("answer: %s", tokenization.printable_text(answer_text))
-          else:
-            logging.info("document span doesn't contain answer")
-
-      feature = InputFeatures(
-          unique_id=unique_id,
-          example_index=example_index,
-          doc_span_index=doc_span_index,
-          tokens=tokens,
-          paragraph_mask=paragraph_mask,
-          class_index=class_index,
-          token_to_orig_map=token_to_orig_map,
-          token_is_max_context=token_is_max_context,
-          input_ids=input_ids,
-          input_mask=input_mask,
-          segment_ids=segment_ids,
-          start_position=start_position,
-          end_position=end_position,
-          is_impossible=not span_contains_answer)
-
-      # Run callback
-      if is_training:
-        output_fn(feature)
-      else:
-        output_fn(feature, is_padding=False)
+          output_fn(feature)
+        else:
+          output_fn(feature, is_padding=False)
 
-      unique_id += 1
+        unique_id += 1
+  finally:
+    if pool is not None:
+      pool.close()
+      pool.join()
 
   if not is_training and feature:
     assert batch_size
@@ -474,6 +343,271 @@ def convert_examples_to_features(examples,
   return unique_id - base_id
 
 
+# Number of examples sent to a conversion worker at a time. Shards are
+# contiguous so that questions about the same context stay together and the
+# context is only tokenized once per shard.
+_EXAMPLES_PER_SHARD = 256
+
+# Tokenizer shared by the examples converted in a worker process.
+_worker_tokenizer = None
+
+
+def _init_conversion_worker(tokenizer):
+  global _worker_tokenizer
+  _worker_tokenizer = tokenizer
+
+
+def _convert_example_shard(shard):
+  """Converts a contiguous shard of examples in a worker process."""
+  start_index, examples, convert_kwargs = shard
+  return list(
+      _convert_examples(examples, start_index, _worker_tokenizer,
+                        **convert_kwargs))
+
+
+def _convert_examples(examples, start_index, tokenizer, max_seq_length,
+                      doc_stride, max_query_length, is_training, xlnet_format):
+  """Yields `(example_index, features)` for each example.
+
+  The returned features do not have a `unique_id` yet; ids are assigned by the
+  caller so that they are contiguous regardless of how examples are sharded.
+  Consecutive examples sharing the same context (as produced by
+  `read_squad_examples`) reuse a single tokenization of that context.
+  """
+  cached_doc_tokens = None
+  cached_tokenization = None
+  for (offset, example) in enumerate(examples):
+    if (cached_doc_tokens is None or
+        (example.doc_tokens is not cached_doc_tokens and
+         example.doc_tokens != cached_doc_tokens)):
+      cached_doc_tokens = example.doc_tokens
+      cached_tokenization = _tokenize_doc_tokens(example.doc_tokens, tokenizer)
+    features = _convert_single_example(
+        example=example,
+        example_index=start_index + offset,
+        doc_tokenization=cached_tokenization,
+        tokenizer=tokenizer,
+        max_seq_length=max_seq_length,
+        doc_stride=doc_stride,
+        max_query_length=max_query_length,
+        is_training=is_training,
+        xlnet_format=xlnet_format)
+    yield start_index + offset, features
+
+
+def _tokenize_doc_tokens(doc_tokens, tokenizer):
+  """Runs WordPiece tokenization over whitespace-tokenized context."""
+  tok_to_orig_index = []
+  orig_to_tok_index = []
+  all_doc_tokens = []
+  for (i, token) in enumerate(doc_tokens):
+    orig_to_tok_index.append(len(all_doc_tokens))
+    sub_tokens = tokenizer.tokenize(token)
+    for sub_token in sub_tokens:
+      tok_to_orig_index.append(i)
+      all_doc_tokens.append(sub_token)
+  return tok_to_orig_index, orig_to_tok_index, all_doc_tokens
+
+
+_DocSpan = collections.namedtuple(  # pylint: disable=invalid-name
+    "DocSpan", ["start", "length"])
+
+
+def _get_doc_spans(num_doc_tokens, max_tokens_for_doc, doc_stride):
+  """Splits a document into overlapping spans."""
+  # We can have documents that are longer than the maximum sequence length.
+  # To deal with this we do a sliding window approach, where we take chunks
+  # of the up to our max length with a stride of `doc_stride`.
+  doc_spans = []
+  start_offset = 0
+  while start_offset < num_doc_tokens:
+    length = num_doc_tokens - start_offset
+    if length > max_tokens_for_doc:
+      length = max_tokens_for_doc
+    doc_spans.append(_DocSpan(start=start_offset, length=length))
+    if start_offset + length == num_doc_tokens:
+      break
+    start_offset += min(length, doc_stride)
+  return doc_spans
+
+
+def _convert_single_example(example, example_index, doc_tokenization,
+                            tokenizer, max_seq_length, doc_stride,
+                            max_query_length, is_training, xlnet_format):
+  """Converts a single `SquadExample` into a list of `InputFeatures`."""
+  query_tokens = tokenizer.tokenize(example.question_text)
+
+  if len(query_tokens) > max_query_length:
+    query_tokens = query_tokens[0:max_query_length]
+
+  tok_to_orig_index, orig_to_tok_index, all_doc_tokens = doc_tokenization
+
+  tok_start_position = None
+  tok_end_position = None
+  if is_training and example.is_impossible:
+    tok_start_position = -1
+    tok_end_position = -1
+  if is_training and not example.is_impossible:
+    tok_start_position = orig_to_tok_index[example.start_position]
+    if example.end_position < len(example.doc_tokens) - 1:
+      tok_end_position = orig_to_tok_index[example.end_position + 1] - 1
+    else:
+      tok_end_position = len(all_doc_tokens) - 1
+    (tok_start_position, tok_end_position) = _improve_answer_span(
+        all_doc_tokens, tok_start_position, tok_end_position, tokenizer,
+        example.orig_answer_text)
+
+  # The -3 accounts for [CLS], [SEP] and [SEP]
+  max_tokens_for_doc = max_seq_length - len(query_tokens) - 3
+
+  doc_spans = _get_doc_spans(len(all_doc_tokens), max_tokens_for_doc,
+                             doc_stride)
+  max_context_flags = _compute_max_context_flags(doc_spans,
+                                                 len(all_doc_tokens))
+
+  features = []
+  for (doc_span_index, doc_span) in enumerate(doc_spans):
+    tokens = []
+    token_to_orig_map = {}
+    token_is_max_context = {}
+    segment_ids = []
+
+    # Paragraph mask used in XLNet.
+    # 1 represents paragraph and class tokens.
+    # 0 represents query and other special tokens.
+    paragraph_mask = []
+
+    # pylint: disable=cell-var-from-loop
+    def process_query(seg_q):
+      for token in query_tokens:
+        tokens.append(token)
+        segment_ids.append(seg_q)
+        paragraph_mask.append(0)
+      tokens.append("[SEP]")
+      segment_ids.append(seg_q)
+      paragraph_mask.append(0)
+
+    def process_paragraph(seg_p):
+      span_is_max_context = max_context_flags[doc_span_index]
+      for i in range(doc_span.length):
+        split_token_index = doc_span.start + i
+        token_to_orig_map[len(tokens)] = tok_to_orig_index[split_token_index]
+        token_is_max_context[len(tokens)] = bool(span_is_max_context[i])
+        tokens.append(all_doc_tokens[split_token_index])
+        segment_ids.append(seg_p)
+        paragraph_mask.append(1)
+      tokens.append("[SEP]")
+      segment_ids.append(seg_p)
+      paragraph_mask.append(0)
+
+    def process_class(seg_class):
+      class_index = len(segment_ids)
+      tokens.append("[CLS]")
+      segment_ids.append(seg_class)
+      paragraph_mask.append(1)
+      return class_index
+
+    if xlnet_format:
+      seg_p, seg_q, seg_class, seg_pad = 0, 1, 2, 3
+      process_paragraph(seg_p)
+      process_query(seg_q)
+      class_index = process_class(seg_class)
+    else:
+      seg_p, seg_q, seg_class, seg_pad = 1, 0, 0, 0
+      class_index = process_class(seg_class)
+      process_query(seg_q)
+      process_paragraph(seg_p)
+
+    input_ids = tokenizer.convert_tokens_to_ids(tokens)
+
+    # The mask has 1 for real tokens and 0 for padding tokens. Only real
+    # tokens are attended to.
+    input_mask = [1] * len(input_ids)
+
+    # Zero-pad up to the sequence length.
+    while len(input_ids) < max_seq_length:
+      input_ids.append(0)
+      input_mask.append(0)
+      segment_ids.append(seg_pad)
+      paragraph_mask.append(0)
+
+    assert len(input_ids) == max_seq_length
+    assert len(input_mask) == max_seq_length
+    assert len(segment_ids) == max_seq_length
+    assert len(paragraph_mask) == max_seq_length
+
+    start_position = 0
+    end_position = 0
+    span_contains_answer = False
+
+    if is_training and not example.is_impossible:
+      # For training, if our document chunk does not contain an annotation
+      # we throw it out, since there is nothing to predict.
+      doc_start = doc_span.start
+      doc_end = doc_span.start + doc_span.length - 1
+      span_contains_answer = (tok_start_position >= doc_start and
+                              tok_end_position <= doc_end)
+      if span_contains_answer:
+        doc_offset = 0 if xlnet_format else len(query_tokens) + 2
+        start_position = tok_start_position - doc_start + doc_offset
+        end_position = tok_end_position - doc_start + doc_offset
+
+    features.append(
+        InputFeatures(
+            unique_id=None,
+            example_index=example_index,
+            doc_span_index=doc_span_index,
+            tokens=tokens,
+            paragraph_mask=paragraph_mask,
+            class_index=class_index,
+            token_to_orig_map=token_to_orig_map,
+            token_is_max_context=token_is_max_context,
+            input_ids=input_ids,
+            input_mask=input_mask,
+            segment_ids=segment_ids,
+            start_position=start_position,
+            end_position=end_position,
+            is_impossible=not span_contains_answer))
+  return features
+
+
+def _log_feature(feature, is_training):
+  """Logs the content of a converted feature."""
+  logging.info("*** Example ***")
+  logging.info("unique_id: %s", (feature.unique_id))
+  logging.info("example_index: %s", (feature.example_index))
+  logging.info("doc_span_index: %s", (feature.doc_span_index))
+  logging.info("tokens: %s",
+               " ".join([tokenization.printable_text(x)
+                         for x in feature.tokens]))
+  logging.info(
+      "token_to_orig_map: %s", " ".join([
+          "%d:%d" % (x, y)
+          for (x, y) in six.iteritems(feature.token_to_orig_map)
+      ]))
+  logging.info(
+      "token_is_max_context: %s", " ".join([
+          "%d:%s" % (x, y)
+          for (x, y) in six.iteritems(feature.token_is_max_context)
+      ]))
+  logging.info("input_ids: %s", " ".join([str(x) for x in feature.input_ids]))
+  logging.info("input_mask: %s", " ".join([str(x) for x in feature.input_mask]))
+  logging.info("segment_ids: %s",
+               " ".join([str(x) for x in feature.segment_ids]))
+  logging.info("paragraph_mask: %s", " ".join(
+      [str(x) for x in feature.paragraph_mask]))
+  logging.info("class_index: %d", feature.class_index)
+  if is_training:
+    if not feature.is_impossible:
+      answer_text = " ".join(
+          feature.tokens[feature.start_position:(feature.end_position + 1)])
+      logging.info("start_position: %d", (feature.start_position))
+      logging.info("end_position: %d", (feature.end_position))
+      logging.info("answer: %s", tokenization.printable_text(answer_text))
+    else:
+      logging.info("document span doesn't contain answer")
+
+
 def _improve_answer_span(doc_tokens, input_start, input_end, tokenizer,
                          orig_answer_text):
   """Returns tokenized answer spans that better match the annotated answer."""
@@ -548,6 +682,37 @@ def _check_is_max_context(doc_spans, cur_span_index, position):
   return cur_span_index == best_span_index
 
 
+def _compute_max_context_flags(doc_spans, num_doc_tokens):
+  """Computes `_check_is_max_context` for every token of every span at once.
+
+  Args:
+    doc_spans: A list of `_DocSpan`s covering the document.
+    num_doc_tokens: The number of tokens in the document.
+
+  Returns:
+    A list with one boolean array per span, where element `i` tells whether
+    the span is the max context span for token `doc_span.start + i`.
+  """
+  if not doc_spans:
+    return []
+  starts = np.array([doc_span.start for doc_span in doc_spans])
+  lengths = np.array([doc_span.length for doc_span in doc_spans])
+  positions = np.arange(num_doc_tokens)
+  num_left_context = positions[np.newaxis, :] - starts[:, np.newaxis]
+  num_right_context = (starts + lengths - 1)[:, np.newaxis] - positions
+  scores = (np.minimum(num_left_context, num_right_context) +
+            0.01 * lengths[:, np.newaxis])
+  scores = np.where((num_left_context >= 0) & (num_right_context >= 0), scores,
+                    -np.inf)
+  # `argmax` returns the first maximum, matching the strict comparison used by
+  # `_check_is_max_context`.
+  best_span_index = np.argmax(scores, axis=0)
+  return [
+      best_span_index[doc_span.start:doc_span.start + doc_span.length] ==
+      span_index for (span_index, doc_span) in enumerate(doc_spans)
+  ]
+
+
 def write_predictions(all_examples,
                       all_features,
                       all_results,
@@ -942,7 +1107,8 @@ def generate_tf_record_from_json_file(input_file_path,
                                       max_query_length=64,
                                       doc_stride=128,
                                       version_2_with_negative=False,
-                                      xlnet_format=False):
+                                      xlnet_format=False,
+                                      num_processes=None):
   """Generates and saves training data into a tf record file."""
   train_examples = read_squad_examples(
       input_file=input_file_path,
@@ -960,7 +1126,8 @@ def generate_tf_record_from_json_file(input_file_path,
       max_query_length=max_query_length,
       is_training=True,
       output_fn=train_writer.process_feature,
-      xlnet_format=xlnet_format)
+      xlnet_format=xlnet_format,
+      num_processes=num_processes)
   train_writer.close()
 
   meta_data = {
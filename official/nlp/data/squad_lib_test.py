@@ -0,0 +1,96 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for official.nlp.data.squad_lib."""
+import os
+
+from absl.testing import parameterized
+import tensorflow as tf
+
+from official.nlp.bert import tokenization
+from official.nlp.data import squad_lib
+
+_WORDS = ["the", "man", "went", "to", "store", "and", "bought", "milk"]
+
+
+def _create_examples(num_paragraphs, questions_per_paragraph):
+  examples = []
+  for p in range(num_paragraphs):
+    doc_tokens = [_WORDS[(p + i) % len(_WORDS)] for i in range(20 + 3 * p)]
+    for q in range(questions_per_paragraph):
+      start_position = (p + q) % len(doc_tokens)
+      examples.append(
+          squad_lib.SquadExample(
+              qas_id="%d-%d" % (p, q),
+              question_text="where the man went",
+              doc_tokens=doc_tokens,
+              orig_answer_text=doc_tokens[start_position],
+              start_position=start_position,
+              end_position=start_position,
+              is_impossible=False))
+  return examples
+
+
+class SquadLibTest(tf.test.TestCase, parameterized.TestCase):
+
+  def setUp(self):
+    super(SquadLibTest, self).setUp()
+    vocab_file = os.path.join(self.get_temp_dir(), "vocab.txt")
+    with tf.io.gfile.GFile(vocab_file, "w") as writer:
+      writer.write("\n".join(["[PAD]", "[CLS]", "[SEP]", "[UNK]"] + _WORDS))
+    self.tokenizer = tokenization.FullTokenizer(vocab_file=vocab_file)
+
+  @parameterized.parameters((30, 4), (30, 7), (57, 16), (100, 100))
+  def test_compute_max_context_flags(self, num_doc_tokens, doc_stride):
+    doc_spans = squad_lib._get_doc_spans(
+        num_doc_tokens, max_tokens_for_doc=16, doc_stride=doc_stride)
+    flags = squad_lib._compute_max_context_flags(doc_spans, num_doc_tokens)
+    self.assertLen(flags, len(doc_spans))
+    for span_index, doc_span in enumerate(doc_spans):
+      expected = [
+          squad_lib._check_is_max_context(doc_spans, span_index,
+                                          doc_span.start + i)
+          for i in range(doc_span.length)
+      ]
+      self.assertEqual(expected, flags[span_index].tolist())
+
+  @parameterized.parameters(True, False)
+  def test_parallel_conversion_matches_serial(self, is_training):
+
+    def convert(num_processes):
+      features = []
+      output_fn = lambda feature, is_padding=False: features.append(feature)
+      num_features = squad_lib.convert_examples_to_features(
+          examples=_create_examples(
+              num_paragraphs=6, questions_per_paragraph=60),
+          tokenizer=self.tokenizer,
+          max_seq_length=24,
+          doc_stride=5,
+          max_query_length=8,
+          is_training=is_training,
+          output_fn=output_fn,
+          batch_size=8,
+          num_processes=num_processes)
+      return num_features, features
+
+    serial_count, serial_features = convert(num_processes=None)
+    parallel_count, parallel_features = convert(num_processes=2)
+    self.assertEqual(serial_count, parallel_count)
+    self.assertLen(parallel_features, len(serial_features))
+    for expected, actual in zip(serial_features, parallel_features):
+      self.assertEqual(vars(expected), vars(actual))
+
+
+if __name__ == "__main__":
+  tf.test.main()
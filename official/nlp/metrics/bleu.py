@@ -19,14 +19,20 @@ https://github.com/tensorflow/tensor2tensor/blob/master/tensor2tensor/utils/bleu
 """
 
 import collections
+import functools
 import math
+import multiprocessing
 import re
-import sys
-import unicodedata
 
 import numpy as np
 import tensorflow as tf
 
+from official.nlp.metrics import unicode_tables
+
+# Lists of lines shorter than this many lines per worker are tokenized in the
+# calling process, since starting the processes would take longer.
+_MIN_LINES_PER_WORKER = 1000
+
 
 class UnicodeRegex(object):
   """Ad-hoc hack to recognize all punctuation and symbols."""
@@ -38,13 +44,20 @@ class UnicodeRegex(object):
     self.symbol_re = re.compile("([" + self.property_chars("S") + "])")
 
   def property_chars(self, prefix):
-    return "".join(
-        chr(x)
-        for x in range(sys.maxunicode)
-        if unicodedata.category(chr(x)).startswith(prefix))
+    return unicode_tables.property_chars(prefix)
+
 
+@functools.lru_cache(maxsize=None)
+def _get_uregex():
+  """Returns the `UnicodeRegex`, which is built on first use."""
+  return UnicodeRegex()
 
-uregex = UnicodeRegex()
+
+def __getattr__(name):
+  # `uregex` used to be built at import time, and is now built on first use.
+  if name == "uregex":
+    return _get_uregex()
+  raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 
 def bleu_tokenize(string):
@@ -71,17 +84,19 @@ def bleu_tokenize(string):
   Returns:
     a list of tokens
   """
+  uregex = _get_uregex()
   string = uregex.nondigit_punct_re.sub(r"\1 \2 ", string)
   string = uregex.punct_nondigit_re.sub(r" \1 \2", string)
   string = uregex.symbol_re.sub(r" \1 ", string)
   return string.split()
 
 
-def bleu_wrapper(ref_filename, hyp_filename, case_sensitive=False):
+def bleu_wrapper(ref_filename, hyp_filename, case_sensitive=False,
+                 num_workers=1):
   """Compute BLEU for two files (reference and hypothesis translation)."""
   ref_lines = tf.io.gfile.GFile(ref_filename).read().strip().splitlines()
   hyp_lines = tf.io.gfile.GFile(hyp_filename).read().strip().splitlines()
-  return bleu_on_list(ref_lines, hyp_lines, case_sensitive)
+  return bleu_on_list(ref_lines, hyp_lines, case_sensitive, num_workers)
 
 
 def _get_ngrams_with_counter(segment, max_order):
@@ -170,8 +185,28 @@ def compute_bleu(reference_corpus, translation_corpus, max_order=4,
   return np.float32(bleu)
 
 
-def bleu_on_list(ref_lines, hyp_lines, case_sensitive=False):
-  """Compute BLEU for two list of strings (reference and hypothesis)."""
+def tokenize_lines(lines, num_workers=1):
+  """Tokenizes `lines` with `bleu_tokenize`, in a process pool if requested."""
+  if num_workers <= 1 or len(lines) < _MIN_LINES_PER_WORKER * num_workers:
+    return [bleu_tokenize(x) for x in lines]
+  with multiprocessing.Pool(num_workers) as pool:
+    return pool.map(
+        bleu_tokenize, lines, chunksize=len(lines) // (4 * num_workers) + 1)
+
+
+def bleu_on_list(ref_lines, hyp_lines, case_sensitive=False, num_workers=1):
+  """Compute BLEU for two list of strings (reference and hypothesis).
+
+  Args:
+    ref_lines: list of reference strings.
+    hyp_lines: list of hypothesis strings.
+    case_sensitive: whether to compute the case-sensitive BLEU.
+    num_workers: number of processes tokenizing the lines of large lists. The
+      score does not depend on it.
+
+  Returns:
+    The BLEU score, in [0, 100].
+  """
   if len(ref_lines) != len(hyp_lines):
     raise ValueError(
         "Reference and translation files have different number of "
@@ -180,6 +215,6 @@ def bleu_on_list(ref_lines, hyp_lines, case_sensitive=False):
   if not case_sensitive:
     ref_lines = [x.lower() for x in ref_lines]
     hyp_lines = [x.lower() for x in hyp_lines]
-  ref_tokens = [bleu_tokenize(x) for x in ref_lines]
-  hyp_tokens = [bleu_tokenize(x) for x in hyp_lines]
+  ref_tokens = tokenize_lines(ref_lines, num_workers)
+  hyp_tokens = tokenize_lines(hyp_lines, num_workers)
   return compute_bleu(ref_tokens, hyp_tokens) * 100
@@ -0,0 +1,106 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+r"""Precomputed tables of the Unicode characters of a general category.
+
+Scanning all the code points with `unicodedata.category` takes about a second,
+so the characters of the categories used by the BLEU tokenizers are shipped in
+`unicode_tables.json`, as ranges of code points. The table is only used if it
+was generated with the Unicode database of the running Python, otherwise the
+code points are scanned.
+
+The table is regenerated with (shell script):
+
+python3 -m official.nlp.metrics.unicode_tables
+"""
+
+import functools
+import json
+import os
+import sys
+import unicodedata
+
+from absl import app
+from absl import logging
+
+# The prefixes of the general categories in the table: punctuation and symbols.
+CATEGORY_PREFIXES = ("P", "S")
+
+_TABLE_PATH = os.path.join(os.path.dirname(__file__), "unicode_tables.json")
+
+
+def _scan(prefix):
+  """Returns the ranges of the code points of the categories `prefix*`."""
+  ranges = []
+  for x in range(sys.maxunicode):
+    if unicodedata.category(chr(x)).startswith(prefix):
+      if ranges and ranges[-1][1] == x - 1:
+        ranges[-1][1] = x
+      else:
+        ranges.append([x, x])
+  return ranges
+
+
+def build_table():
+  """Returns the table of the categories of `CATEGORY_PREFIXES`."""
+  table = {"unidata_version": unicodedata.unidata_version}
+  for prefix in CATEGORY_PREFIXES:
+    table[prefix] = _scan(prefix)
+  return table
+
+
+@functools.lru_cache(maxsize=None)
+def _load_table():
+  """Returns the shipped table, or None if it is missing or out of date."""
+  if not os.path.exists(_TABLE_PATH):
+    return None
+  with open(_TABLE_PATH) as f:
+    table = json.load(f)
+  if table.get("unidata_version") != unicodedata.unidata_version:
+    logging.info(
+        "The Unicode table %s is for Unicode %s, not %s; scanning the "
+        "code points instead.", _TABLE_PATH, table.get("unidata_version"),
+        unicodedata.unidata_version)
+    return None
+  return table
+
+
+@functools.lru_cache(maxsize=None)
+def property_chars(prefix: str) -> str:
+  """Returns the characters whose category starts with `prefix`, in order.
+
+  Args:
+    prefix: a prefix of Unicode general categories, e.g. "P" for punctuation.
+
+  Returns:
+    The string of the characters below `sys.maxunicode` of these categories,
+    in increasing order of code point.
+  """
+  table = _load_table()
+  if table is not None and prefix in table:
+    ranges = table[prefix]
+  else:
+    ranges = _scan(prefix)
+  return "".join(
+      chr(x) for start, end in ranges for x in range(start, end + 1))
+
+
+def main(_):
+  with open(_TABLE_PATH, "w") as f:
+    json.dump(build_table(), f, separators=(",", ":"))
+    f.write("\n")
+
+
+if __name__ == "__main__":
+  app.run(main)
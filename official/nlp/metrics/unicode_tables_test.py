@@ -0,0 +1,43 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for official.nlp.metrics.unicode_tables."""
+
+import sys
+import unicodedata
+
+import tensorflow as tf
+
+from official.nlp.metrics import unicode_tables
+
+
+class UnicodeTablesTest(tf.test.TestCase):
+
+  def test_property_chars_match_unicodedata(self):
+    for prefix in unicode_tables.CATEGORY_PREFIXES:
+      expected = "".join(
+          chr(x)
+          for x in range(sys.maxunicode)
+          if unicodedata.category(chr(x)).startswith(prefix))
+      self.assertEqual(expected, unicode_tables.property_chars(prefix))
+
+  def test_shipped_table_is_up_to_date(self):
+    table = unicode_tables._load_table()
+    if table is None:
+      self.skipTest("The table is for another version of Unicode.")
+    self.assertEqual(unicode_tables.build_table(), table)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -24,7 +24,7 @@ import tensorflow as tf
 from official.nlp.nhnet import input_pipeline
 from official.nlp.nhnet import models
 from official.nlp.transformer import metrics as metrics_v2
-from official.nlp.transformer.utils import metrics
+from official.nlp.transformer.utils import corpus_metrics
 
 
 def rouge_l_fscore(logits, labels):
@@ -41,7 +41,7 @@ def rouge_l_fscore(logits, labels):
     rouge_l_fscore: approx rouge-l f1 score.
   """
   predictions = np.argmax(logits, axis=-1)
-  rouge_l_f_score = metrics.rouge_l_sentence_level(predictions, labels)
+  rouge_l_f_score = corpus_metrics.rouge_l_sentence_level(predictions, labels)
   return rouge_l_f_score
 
 
@@ -59,7 +59,7 @@ def rouge_2_fscore(logits, labels):
     rouge2_fscore: approx rouge-2 f1 score.
   """
   predictions = np.argmax(logits, axis=-1)
-  rouge_2_f_score = metrics.rouge_n(predictions, labels)
+  rouge_2_f_score = corpus_metrics.rouge_n(predictions, labels)
   return rouge_2_f_score
 
 
@@ -78,7 +78,7 @@ def bleu_score(logits, labels):
     bleu: int, approx bleu score
   """
   predictions = np.argmax(logits, axis=-1)
-  bleu = metrics.compute_bleu(labels, predictions)
+  bleu = corpus_metrics.compute_bleu(labels, predictions)
   return bleu
 
 
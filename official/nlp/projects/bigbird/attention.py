@@ -14,6 +14,8 @@
 # ==============================================================================
 """Keras-based bigbird attention layer."""
 
+import functools
+
 import numpy as np
 import tensorflow as tf
 
@@ -99,6 +101,66 @@ def bigbird_block_rand_mask(from_seq_length,
   return rand_attn
 
 
+@functools.lru_cache(maxsize=None)
+def _cached_rand_attn(max_rand_mask_length, from_block_size, to_block_size,
+                      num_rand_blocks, num_heads, seed):
+  rand_attn = _generate_rand_attn(max_rand_mask_length, from_block_size,
+                                  to_block_size, num_rand_blocks, num_heads,
+                                  seed)
+  rand_attn.setflags(write=False)
+  return rand_attn
+
+
+def _generate_rand_attn(max_rand_mask_length, from_block_size, to_block_size,
+                        num_rand_blocks, num_heads, seed):
+  np.random.seed(seed)
+  # pylint: disable=g-complex-comprehension
+  rand_attn = [
+      bigbird_block_rand_mask(
+          max_rand_mask_length,
+          max_rand_mask_length,
+          from_block_size,
+          to_block_size,
+          num_rand_blocks,
+          last_idx=1024) for _ in range(num_heads)
+  ]
+  # pylint: enable=g-complex-comprehension
+  return np.stack(rand_attn, axis=0)
+
+
+def get_rand_attn(max_rand_mask_length,
+                  from_block_size,
+                  to_block_size,
+                  num_rand_blocks,
+                  num_heads,
+                  seed=None):
+  """Returns the random attention of the heads of a layer.
+
+  The random attention is the same for all the sequence lengths up to
+  `max_rand_mask_length`, which slice it. With a `seed`, it is generated once
+  per process for given arguments, and shared by the layers with the same
+  arguments, e.g. the layers of the encoders built for training, evaluation
+  and export.
+
+  Args:
+    max_rand_mask_length: int. The maximum sequence length.
+    from_block_size: int. size of block in from sequence.
+    to_block_size: int. size of block in to sequence.
+    num_rand_blocks: int. Number of random chunks per row.
+    num_heads: int. Number of attention heads.
+    seed: The seed of the random attention. If None, it is not cached.
+
+  Returns:
+    A read-only int32 array of shape [num_heads,
+    max_rand_mask_length//from_block_size-2, num_rand_blocks].
+  """
+  if seed is None:
+    return _generate_rand_attn(max_rand_mask_length, from_block_size,
+                               to_block_size, num_rand_blocks, num_heads, seed)
+  return _cached_rand_attn(max_rand_mask_length, from_block_size,
+                           to_block_size, num_rand_blocks, num_heads, seed)
+
+
 def create_rand_mask_from_inputs(from_blocked_mask, to_blocked_mask, rand_attn,
                                  num_attention_heads, num_rand_blocks,
                                  batch_size, from_seq_length, from_block_size):
@@ -109,8 +171,8 @@ def create_rand_mask_from_inputs(from_blocked_mask, to_blocked_mask, rand_attn,
       from_seq_length//from_block_size, from_block_size].
     to_blocked_mask: int32 Tensor of shape [batch_size,
       to_seq_length//to_block_size, to_block_size].
-    rand_attn: [batch_size, num_attention_heads,
-      from_seq_length//from_block_size-2, num_rand_blocks]
+    rand_attn: [num_attention_heads, from_seq_length//from_block_size-2,
+      num_rand_blocks], the same for all the examples.
     num_attention_heads: int. Number of attention heads.
     num_rand_blocks: int. Number of random chunks per row.
     batch_size: int. Batch size for computation.
@@ -124,7 +186,7 @@ def create_rand_mask_from_inputs(from_blocked_mask, to_blocked_mask, rand_attn,
   """
   num_windows = from_seq_length // from_block_size - 2
   rand_mask = tf.reshape(
-      tf.gather(to_blocked_mask, rand_attn, batch_dims=1), [
+      tf.gather(to_blocked_mask, rand_attn, axis=1), [
           batch_size, num_attention_heads, num_windows,
           num_rand_blocks * from_block_size
       ])
@@ -169,8 +231,8 @@ def bigbird_block_sparse_attention(
     to_blocked_mask: (optional) int32 Tensor of shape [batch_size,
       to_seq_length//to_block_size, to_block_size]. Same as to_mask, just
       reshaped.
-    rand_attn: [batch_size, num_attention_heads,
-      from_seq_length//from_block_size-2, num_rand_blocks]
+    rand_attn: [num_attention_heads, from_seq_length//from_block_size-2,
+      num_rand_blocks], the same for all the examples.
     num_attention_heads: int. Number of attention heads.
     num_rand_blocks: int. Number of random chunks per row.
     size_per_head: int. Size of each attention head.
@@ -184,9 +246,6 @@ def bigbird_block_sparse_attention(
     float Tensor of shape [batch_size, from_seq_length, num_attention_heads,
       size_per_head].
   """
-  rand_attn = tf.expand_dims(rand_attn, 0)
-  rand_attn = tf.repeat(rand_attn, batch_size, 0)
-
   rand_mask = create_rand_mask_from_inputs(
       from_blocked_mask,
       to_blocked_mask,
@@ -214,12 +273,23 @@ def bigbird_block_sparse_attention(
   blocked_query_matrix = tf.reshape(query_layer, (b, h, m // wm, wm, -1))
   blocked_key_matrix = tf.reshape(key_layer, (b, h, n // wn, wn, -1))
   blocked_value_matrix = tf.reshape(value_layer, (b, h, n // wn, wn, -1))
+  # The random blocks are gathered from the blocks of all the heads, with
+  # indices offset by head, rather than from a copy of `rand_attn` per example.
+  rand_block_indices = rand_attn + tf.range(
+      h, dtype=rand_attn.dtype)[:, None, None] * (n // wn)
   gathered_key = tf.reshape(
-      tf.gather(blocked_key_matrix, rand_attn, batch_dims=2, name="gather_key"),
+      tf.gather(
+          tf.reshape(blocked_key_matrix, (b, h * (n // wn), wn, -1)),
+          rand_block_indices,
+          axis=1,
+          name="gather_key"),
       (b, h, m // wm - 2, r * wn, -1))  # [b, h, n//wn-2, r, wn, -1]
   gathered_value = tf.reshape(
       tf.gather(
-          blocked_value_matrix, rand_attn, batch_dims=2, name="gather_value"),
+          tf.reshape(blocked_value_matrix, (b, h * (n // wn), wn, -1)),
+          rand_block_indices,
+          axis=1,
+          name="gather_value"),
       (b, h, m // wm - 2, r * wn, -1))  # [b, h, n//wn-2, r, wn, -1]
   first_product = tf.einsum(
       "BHQD,BHKD->BHQK", blocked_query_matrix[:, :, 0],
@@ -412,22 +482,13 @@ class BigBirdAttention(tf.keras.layers.MultiHeadAttention):
     self._num_rand_blocks = num_rand_blocks
     self._from_block_size = from_block_size
     self._to_block_size = to_block_size
+    self._max_rand_mask_length = max_rand_mask_length
     self._seed = seed
 
     # Generates random attention.
-    np.random.seed(self._seed)
-    # pylint: disable=g-complex-comprehension
-    rand_attn = [
-        bigbird_block_rand_mask(
-            max_rand_mask_length,
-            max_rand_mask_length,
-            from_block_size,
-            to_block_size,
-            num_rand_blocks,
-            last_idx=1024) for _ in range(self._num_heads)
-    ]
-    # pylint: enable=g-complex-comprehension
-    rand_attn = np.stack(rand_attn, axis=0)
+    rand_attn = get_rand_attn(max_rand_mask_length, from_block_size,
+                              to_block_size, num_rand_blocks, self._num_heads,
+                              seed)
     self.rand_attn = tf.constant(rand_attn, dtype=tf.int32)
 
   def _compute_attention(self, query, key, value, attention_mask=None):
@@ -485,6 +546,7 @@ class BigBirdAttention(tf.keras.layers.MultiHeadAttention):
         "num_rand_blocks": self._num_rand_blocks,
         "from_block_size": self._from_block_size,
         "to_block_size": self._to_block_size,
+        "max_rand_mask_length": self._max_rand_mask_length,
         "seed": self._seed
     }
     base_config = super().get_config()
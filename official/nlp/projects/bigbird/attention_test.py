@@ -45,6 +45,19 @@ class BigbirdAttentionTest(tf.test.TestCase):
         attention_mask=masks)
     self.assertEqual(output.shape, [batch_size, seq_length, key_dim])
 
+  def test_rand_attn_is_cached(self):
+    rand_attn = attention.get_rand_attn(
+        1024, 64, 64, num_rand_blocks=3, num_heads=4, seed=1)
+    self.assertEqual(rand_attn.shape, (4, 14, 3))
+    self.assertIs(
+        attention.get_rand_attn(
+            1024, 64, 64, num_rand_blocks=3, num_heads=4, seed=1), rand_attn)
+    self.assertAllEqual(
+        attention._generate_rand_attn(1024, 64, 64, 3, 4, seed=1), rand_attn)
+    self.assertNotAllEqual(
+        attention.get_rand_attn(
+            1024, 64, 64, num_rand_blocks=3, num_heads=4, seed=2), rand_attn)
+
   def test_config(self):
     num_heads = 12
     key_dim = 64
@@ -0,0 +1,89 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+r"""Benchmarks the construction and the forward pass of the BigBird encoder.
+
+Times the construction of a first and of a second `BigBirdEncoder`, which
+reuses the cached random attention, and the forward step of the first encoder
+at every given sequence length (shell script):
+
+python3 -m official.nlp.projects.bigbird.encoder_benchmark \
+    --seq_lengths=1024,4096,8192 --num_layers=12
+"""
+import time
+
+from absl import app
+from absl import flags
+from absl import logging
+import numpy as np
+import tensorflow as tf
+
+from official.nlp.projects.bigbird import encoder
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_list('seq_lengths', ['1024', '4096', '8192'],
+                  'The sequence lengths to benchmark.')
+flags.DEFINE_integer('num_layers', 2, 'The number of transformer layers.')
+flags.DEFINE_integer('hidden_size', 256, 'The size of the hidden layers.')
+flags.DEFINE_integer('num_attention_heads', 4, 'The number of heads.')
+flags.DEFINE_integer('batch_size', 1, 'The batch size.')
+flags.DEFINE_integer('num_steps', 10, 'The number of timed steps.')
+
+
+def build_encoder(max_sequence_length):
+  """Returns an encoder and its construction time, in seconds."""
+  start = time.time()
+  network = encoder.BigBirdEncoder(
+      vocab_size=1000,
+      hidden_size=FLAGS.hidden_size,
+      num_layers=FLAGS.num_layers,
+      num_attention_heads=FLAGS.num_attention_heads,
+      intermediate_size=4 * FLAGS.hidden_size,
+      max_sequence_length=max_sequence_length)
+  return network, time.time() - start
+
+
+def benchmark_step(network, seq_length):
+  """Returns the time of a forward step at `seq_length`, in ms."""
+  shape = (FLAGS.batch_size, seq_length)
+  inputs = [
+      tf.constant(np.random.randint(1000, size=shape), tf.int32),
+      tf.ones(shape, tf.int32),
+      tf.zeros(shape, tf.int32),
+  ]
+  step = tf.function(lambda x: network(x, training=False)['sequence_output'])
+  # Traces and warms up.
+  step(inputs).numpy()
+  start = time.time()
+  for _ in range(FLAGS.num_steps):
+    step(inputs).numpy()
+  return 1e3 * (time.time() - start) / FLAGS.num_steps
+
+
+def main(_):
+  seq_lengths = [int(x) for x in FLAGS.seq_lengths]
+  max_sequence_length = max(seq_lengths)
+  network, first_s = build_encoder(max_sequence_length)
+  _, second_s = build_encoder(max_sequence_length)
+  logging.info(
+      'Built the encoder in %.3f s, and a second one in %.3f s.', first_s,
+      second_s)
+  for seq_length in seq_lengths:
+    logging.info('seq_length=%d: %.3f ms/step.', seq_length,
+                 benchmark_step(network, seq_length))
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -12,11 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 """TriviaQA script for inference."""
-import collections
 import contextlib
 import functools
 import json
-import operator
 
 from absl import app
 from absl import flags
@@ -26,7 +24,6 @@ import tensorflow_datasets as tfds
 
 import sentencepiece as spm
 from official.nlp.configs import encoders  # pylint: disable=unused-import
-from official.nlp.projects.triviaqa import evaluation
 from official.nlp.projects.triviaqa import inputs
 from official.nlp.projects.triviaqa import prediction
 
@@ -62,6 +59,11 @@ flags.DEFINE_integer('decode_top_k', 8,
 flags.DEFINE_integer('decode_max_size', 16,
                      'Maximum number of sentence pieces in an answer.')
 
+flags.DEFINE_bool(
+    'decode_in_background', True,
+    'Whether to decode the answers of a batch in a background thread, while '
+    'the next batches run through the model.')
+
 FLAGS = flags.FLAGS
 
 
@@ -82,9 +84,13 @@ def read_sentencepiece_model(path):
 
 
 def predict(sp_processor, features_map_fn, logits_fn, decode_logits_fn,
-            split_and_pad_fn, distribute_strategy, dataset):
+            split_and_pad_fn, distribute_strategy, dataset,
+            decode_in_background=True):
   """Make predictions."""
-  predictions = collections.defaultdict(list)
+  decoder = prediction.AnswerDecoder(
+      prediction.space_piece_table(sp_processor),
+      background=decode_in_background,
+      log_answers=True)
   for _, features in dataset.enumerate():
     token_ids = features['token_ids']
     x = split_and_pad_fn(features_map_fn(features))
@@ -94,35 +100,13 @@ def predict(sp_processor, features_map_fn, logits_fn, decode_logits_fn,
     end_limit = token_ids.row_lengths() - 1  # inclusive
     begin, end, scores = decode_logits_fn(logits, end_limit)
     answers = prediction.decode_answer(features['context'], begin, end,
-                                       features['token_offsets'],
-                                       end_limit).numpy()
-    for j, (qid, token_id, offset, score, answer) in enumerate(
-        zip(features['qid'].numpy(),
-            tf.gather(features['token_ids'], begin, batch_dims=1).numpy(),
-            tf.gather(features['token_offsets'], begin, batch_dims=1).numpy(),
-            scores, answers)):
-      if not answer:
-        logging.info('%s: %s | NO_ANSWER, %f',
-                     features['id'][j].numpy().decode('utf-8'),
-                     features['question'][j].numpy().decode('utf-8'), score)
-        continue
-      if sp_processor.IdToPiece(int(token_id)).startswith('▁') and offset > 0:
-        answer = answer[1:]
-      logging.info('%s: %s | %s, %f', features['id'][j].numpy().decode('utf-8'),
-                   features['question'][j].numpy().decode('utf-8'),
-                   answer.decode('utf-8'), score)
-      predictions[qid.decode('utf-8')].append((score, answer.decode('utf-8')))
-  predictions = {
-      qid: evaluation.normalize_answer(
-          sorted(answers, key=operator.itemgetter(0), reverse=True)[0][1])
-      for qid, answers in predictions.items()
-  }
-  return predictions
+                                       features['token_offsets'], end_limit)
+    decoder.add(features, begin, scores, answers)
+  return decoder.predictions()
 
 
-def main(argv):
-  if len(argv) > 1:
-    raise app.UsageError('Too many command-line arguments.')
+def build_predict_fn():
+  """Returns the prediction function of the flags, and its dataset."""
   # Configure input processing.
   sp_processor = read_sentencepiece_model(FLAGS.sentencepiece_model_path)
   features_map_fn = tf.function(
@@ -172,7 +156,15 @@ def main(argv):
       decode_logits_fn=decode_logits_fn,
       split_and_pad_fn=split_and_pad_fn,
       distribute_strategy=strategy,
-      dataset=dataset)
+      dataset=dataset,
+      decode_in_background=FLAGS.decode_in_background)
+  return predict_fn, dataset
+
+
+def main(argv):
+  if len(argv) > 1:
+    raise app.UsageError('Too many command-line arguments.')
+  predict_fn, _ = build_predict_fn()
   with worker_context():
     predictions = predict_fn()
   with tf.io.gfile.GFile(FLAGS.predictions_path, 'w') as f:
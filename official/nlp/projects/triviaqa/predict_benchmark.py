@@ -0,0 +1,58 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+r"""Benchmarks the prediction throughput on a TriviaQA split.
+
+Runs `predict.predict` on the first batches of the split, with the answers
+decoded after each batch and in a background thread, and logs the examples
+per second of each. Takes the flags of `predict` (shell script):
+
+python3 -m official.nlp.projects.triviaqa.predict_benchmark \
+    --data_dir=... --split=validation --saved_model_dir=... \
+    --sentencepiece_model_path=... \
+    --num_batches=100
+"""
+import time
+
+from absl import app
+from absl import flags
+from absl import logging
+
+from official.nlp.projects.triviaqa import predict
+
+flags.DEFINE_integer('num_batches', 100, 'The number of timed batches.')
+
+FLAGS = flags.FLAGS
+
+
+def main(argv):
+  if len(argv) > 1:
+    raise app.UsageError('Too many command-line arguments.')
+  predict_fn, dataset = predict.build_predict_fn()
+  dataset = dataset.take(FLAGS.num_batches)
+  with predict.worker_context():
+    num_examples = sum(
+        int(features['qid'].shape[0]) for features in dataset)
+    # Traces and warms up.
+    predict_fn(dataset=dataset.take(1))
+    for decode_in_background in (False, True):
+      start = time.time()
+      predict_fn(dataset=dataset, decode_in_background=decode_in_background)
+      elapsed = time.time() - start
+      logging.info('decode_in_background=%s: %.2f examples/s.',
+                   decode_in_background, num_examples / elapsed)
+
+
+if __name__ == '__main__':
+  flags.mark_flags_as_required(['split', 'saved_model_dir'])
+  app.run(main)
@@ -12,8 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 """Functions for inference."""
+import collections
+from concurrent import futures
+
+from absl import logging
+import numpy as np
 import tensorflow as tf
 
+from official.nlp.projects.triviaqa import evaluation
+
 
 def split_and_pad(strategy, batch_size, x):
   """Split and pad for interence."""
@@ -33,13 +40,29 @@ def split_and_pad(strategy, batch_size, x):
 
 
 def decode_logits(top_k, max_size, logits, default):
-  """Get the span from logits."""
+  """Get the span from logits.
+
+  Args:
+    top_k: the number of begin and end tokens to consider.
+    max_size: the maximum number of tokens of a span, minus one.
+    logits: the begin and end logits, of shape [batch_size, seq_length, 2].
+    default: the index of the last token of each example. Spans ending after
+      it are not considered, and it is the begin and end of the examples
+      without a valid span.
+
+  Returns:
+    The begin, end and score of the best span of each example.
+  """
   logits = tf.transpose(logits, [0, 2, 1])
   values, indices = tf.math.top_k(logits, top_k)
   width = (
       tf.expand_dims(indices[:, 1, :], -2) -
       tf.expand_dims(indices[:, 0, :], -1))
-  mask = tf.logical_and(width >= 0, width <= max_size)
+  end_mask = tf.expand_dims(
+      indices[:, 1, :] <= tf.cast(tf.expand_dims(default, -1), indices.dtype),
+      -2)
+  mask = tf.logical_and(
+      tf.logical_and(width >= 0, width <= max_size), end_mask)
   scores = (
       tf.expand_dims(values[:, 0, :], -1) + tf.expand_dims(values[:, 1, :], -2))
   scores = tf.where(mask, scores, -1e8)
@@ -63,6 +86,112 @@ def decode_answer(context, begin, end, token_offsets, end_limit):
   return tf.strings.substr(context, i, j - i)
 
 
+def space_piece_table(sp_processor):
+  """Returns whether each piece of `sp_processor` starts with a space."""
+  return np.array([
+      sp_processor.IdToPiece(i).startswith('▁')
+      for i in range(sp_processor.GetPieceSize())
+  ])
+
+
+def decode_batch_answers(features, begin, scores, answers, space_pieces,
+                         log_answers=False):
+  """Returns the (qid, score, answer) of the non-empty answers of a batch.
+
+  Args:
+    features: the features of the batch.
+    begin: the begin tokens of the answers.
+    scores: the scores of the answers.
+    answers: the answers, as returned by `decode_answer`.
+    space_pieces: the table returned by `space_piece_table`.
+    log_answers: whether to log the answer of each example.
+  """
+  begin_ids = tf.gather(features['token_ids'], begin, batch_dims=1).numpy()
+  begin_offsets = tf.gather(
+      features['token_offsets'], begin, batch_dims=1).numpy()
+  # The answers beginning with a space piece, after the beginning of the
+  # context, include the space.
+  strip_space = np.logical_and(space_pieces[begin_ids], begin_offsets > 0)
+  scores = np.asarray(scores)
+  decoded = []
+  for j, (qid, score, answer, strip) in enumerate(
+      zip(features['qid'].numpy(), scores, answers.numpy(), strip_space)):
+    if not answer:
+      if log_answers:
+        logging.info('%s: %s | NO_ANSWER, %f',
+                     features['id'][j].numpy().decode('utf-8'),
+                     features['question'][j].numpy().decode('utf-8'), score)
+      continue
+    if strip:
+      answer = answer[1:]
+    if log_answers:
+      logging.info('%s: %s | %s, %f', features['id'][j].numpy().decode('utf-8'),
+                   features['question'][j].numpy().decode('utf-8'),
+                   answer.decode('utf-8'), score)
+    decoded.append((qid.decode('utf-8'), score, answer.decode('utf-8')))
+  return decoded
+
+
+class AnswerDecoder:
+  """Decodes the answers of batches and keeps the best answer per question.
+
+  A question has an example per chunk of its documents, and its prediction is
+  the answer of the best scoring example. Converting the answers of a batch to
+  Python strings waits for the batch to be computed, so with `background`,
+  batches are decoded in order in a background thread, while the next batches
+  are read and run through the model.
+  """
+
+  def __init__(self, space_pieces, background=True, max_pending=2,
+               log_answers=False):
+    """Initializes the decoder.
+
+    Args:
+      space_pieces: the table returned by `space_piece_table`.
+      background: whether to decode the batches in a background thread.
+      max_pending: the maximum number of batches waiting to be decoded, after
+        which `add` blocks.
+      log_answers: whether to log the answer of each example.
+    """
+    self._space_pieces = space_pieces
+    self._max_pending = max_pending
+    self._log_answers = log_answers
+    self._executor = (
+        futures.ThreadPoolExecutor(max_workers=1) if background else None)
+    self._pending = collections.deque()
+    self._best_answers = {}
+
+  def add(self, features, begin, scores, answers):
+    """Decodes the answers of a batch, in the background if enabled."""
+    if self._executor is None:
+      self._decode(features, begin, scores, answers)
+      return
+    while len(self._pending) >= self._max_pending:
+      self._pending.popleft().result()
+    self._pending.append(
+        self._executor.submit(self._decode, features, begin, scores, answers))
+
+  def _decode(self, features, begin, scores, answers):
+    for qid, score, answer in decode_batch_answers(
+        features, begin, scores, answers, self._space_pieces,
+        self._log_answers):
+      # The first answer is kept on ties.
+      if qid not in self._best_answers or score > self._best_answers[qid][0]:
+        self._best_answers[qid] = (score, answer)
+
+  def predictions(self):
+    """Waits for the added batches and returns the normalized predictions."""
+    while self._pending:
+      self._pending.popleft().result()
+    if self._executor is not None:
+      self._executor.shutdown()
+      self._executor = None
+    return {
+        qid: evaluation.normalize_answer(answer)
+        for qid, (_, answer) in self._best_answers.items()
+    }
+
+
 def distributed_logits_fn(model, x):
   return model.distribute_strategy.run(
       lambda x: model(x, training=False), args=(x,))
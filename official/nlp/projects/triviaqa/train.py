@@ -12,11 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 """TriviaQA training script."""
-import collections
 import contextlib
 import functools
 import json
-import operator
 import os
 
 from absl import app
@@ -240,7 +238,8 @@ def evaluate(sp_processor, features_map_fn, labels_map_fn, logits_fn,
         reduction=tf.keras.losses.Reduction.NONE)
     return loss_metric(loss_fn(y, logits))
 
-  predictions = collections.defaultdict(list)
+  decoder = prediction.AnswerDecoder(
+      prediction.space_piece_table(sp_processor))
   for _, (features, labels) in validation_dataset.enumerate():
     token_ids = features['token_ids']
     y = labels_map_fn(token_ids, labels)
@@ -252,23 +251,9 @@ def evaluate(sp_processor, features_map_fn, labels_map_fn, logits_fn,
     end_limit = token_ids.row_lengths() - 1  # inclusive
     begin, end, scores = decode_logits_fn(logits, end_limit)
     answers = prediction.decode_answer(features['context'], begin, end,
-                                       features['token_offsets'],
-                                       end_limit).numpy()
-    for _, (qid, token_id, offset, score, answer) in enumerate(
-        zip(features['qid'].numpy(),
-            tf.gather(features['token_ids'], begin, batch_dims=1).numpy(),
-            tf.gather(features['token_offsets'], begin, batch_dims=1).numpy(),
-            scores, answers)):
-      if not answer:
-        continue
-      if sp_processor.IdToPiece(int(token_id)).startswith('▁') and offset > 0:
-        answer = answer[1:]
-      predictions[qid.decode('utf-8')].append((score, answer.decode('utf-8')))
-  predictions = {
-      qid: evaluation.normalize_answer(
-          sorted(answers, key=operator.itemgetter(0), reverse=True)[0][1])
-      for qid, answers in predictions.items()
-  }
+                                       features['token_offsets'], end_limit)
+    decoder.add(features, begin, scores, answers)
+  predictions = decoder.predictions()
   metrics = evaluation.evaluate_triviaqa(ground_truth, predictions, mute=True)
   metrics['loss'] = loss_metric.result().numpy()
   return metrics
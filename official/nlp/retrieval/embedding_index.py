@@ -0,0 +1,421 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""An on-disk index of embeddings, searched by maximum inner product.
+
+The candidates of a retrieval corpus are encoded once, e.g. by a
+`DualEncoder(output='predictions')`, with `encode_corpus`. The embeddings are
+written to a directory as a row-major matrix, in float16 or in int8 with a
+float32 scale per row. `EmbeddingIndex` memory-maps the matrix and returns the
+top-k candidates of batches of queries:
+
+  - exhaustively, with a matrix multiply per block of rows and a partial sort
+    per block, over a thread pool (NumPy releases the GIL in both);
+  - or, after `train_ivf`, only in the `nprobe` inverted lists (IVF) whose
+    centroids are closest to each query.
+"""
+
+import json
+import os
+from concurrent import futures
+from typing import Iterable, Optional, Tuple, Union
+
+import numpy as np
+import tensorflow as tf
+
+_METADATA = 'metadata.json'
+_EMBEDDINGS = 'embeddings.bin'
+_SCALES = 'scales.npy'
+_IVF = 'ivf.npz'
+
+_DTYPES = ('float16', 'int8')
+
+
+def _quantize_int8(embeddings):
+  """Returns the int8 rows and the float32 scales of `embeddings`."""
+  scales = np.abs(embeddings).max(axis=1) / 127.
+  scales[scales == 0] = 1.
+  quantized = np.rint(embeddings / scales[:, None]).astype(np.int8)
+  return quantized, scales.astype(np.float32)
+
+
+def _top_k(scores, ids, k):
+  """Returns the `k` best scores of each row of `scores`, and their ids.
+
+  Args:
+    scores: float array of shape [num_queries, num_candidates].
+    ids: int64 array of the ids of the candidates, of shape [num_candidates]
+      or [num_queries, num_candidates].
+    k: the number of candidates to return.
+
+  Returns:
+    The scores and ids of the best candidates of each query, of shape
+    [num_queries, min(k, num_candidates)], by decreasing score.
+  """
+  k = min(k, scores.shape[1])
+  if k < scores.shape[1]:
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    scores = np.take_along_axis(scores, top, axis=1)
+    ids = (np.take_along_axis(ids, top, axis=1) if ids.ndim == 2 else ids[top])
+  elif ids.ndim == 1:
+    ids = np.broadcast_to(ids, scores.shape)
+  order = np.argsort(-scores, axis=1, kind='stable')
+  return (np.take_along_axis(scores, order, axis=1),
+          np.take_along_axis(ids, order, axis=1))
+
+
+class EmbeddingIndexWriter:
+  """Writes embeddings to an index directory, by batches.
+
+  Example:
+
+  ```python
+  with EmbeddingIndexWriter(index_dir, dtype='int8') as writer:
+    for embeddings in batches:
+      writer.add(embeddings)
+  index = EmbeddingIndex(index_dir)
+  ```
+  """
+
+  def __init__(self, index_dir: str, dtype: str = 'float16'):
+    """Initializes the writer.
+
+    Args:
+      index_dir: the directory of the index. It is created if needed, and an
+        existing index in it is overwritten.
+      dtype: the type of the stored embeddings, 'float16' or 'int8'.
+    """
+    if dtype not in _DTYPES:
+      raise ValueError('Unsupported dtype %s, expected one of %s.' %
+                       (dtype, _DTYPES))
+    os.makedirs(index_dir, exist_ok=True)
+    for name in (_METADATA, _SCALES, _IVF):
+      if os.path.exists(os.path.join(index_dir, name)):
+        os.remove(os.path.join(index_dir, name))
+    self._index_dir = index_dir
+    self._dtype = dtype
+    self._file = open(os.path.join(index_dir, _EMBEDDINGS), 'wb')
+    self._scales = []
+    self._num_vectors = 0
+    self._dim = None
+
+  def add(self, embeddings: np.ndarray):
+    """Appends a batch of embeddings, of shape [batch_size, dim]."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if embeddings.ndim != 2:
+      raise ValueError('Expected embeddings of rank 2, got shape %s.' %
+                       (embeddings.shape,))
+    if self._dim is None:
+      self._dim = embeddings.shape[1]
+    elif embeddings.shape[1] != self._dim:
+      raise ValueError('Expected embeddings of dimension %d, got %d.' %
+                       (self._dim, embeddings.shape[1]))
+    if self._dtype == 'int8':
+      embeddings, scales = _quantize_int8(embeddings)
+      self._scales.append(scales)
+    else:
+      embeddings = embeddings.astype(np.float16)
+    self._file.write(np.ascontiguousarray(embeddings).tobytes())
+    self._num_vectors += embeddings.shape[0]
+
+  def close(self):
+    """Writes the metadata of the index."""
+    if self._file.closed:
+      return
+    self._file.close()
+    if self._dtype == 'int8':
+      scales = (
+          np.concatenate(self._scales)
+          if self._scales else np.zeros(0, np.float32))
+      np.save(os.path.join(self._index_dir, _SCALES), scales)
+    with open(os.path.join(self._index_dir, _METADATA), 'w') as f:
+      json.dump(
+          dict(
+              num_vectors=self._num_vectors,
+              dim=self._dim or 0,
+              dtype=self._dtype), f)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+
+def encode_corpus(encoder: tf.keras.Model,
+                  dataset: Iterable,
+                  index_dir: str,
+                  dtype: str = 'float16',
+                  output_key: str = 'pooled_output') -> 'EmbeddingIndex':
+  """Encodes a corpus into an index.
+
+  Args:
+    encoder: the model encoding the candidates, e.g. a
+      `DualEncoder(output='predictions')`.
+    dataset: the batches of inputs of `encoder`, in the order of the ids of
+      the candidates. Large batches amortize the calls to the model.
+    index_dir: the directory of the index.
+    dtype: the type of the stored embeddings, 'float16' or 'int8'.
+    output_key: the key of the embeddings in the outputs of `encoder`.
+
+  Returns:
+    The `EmbeddingIndex` of the corpus.
+  """
+
+  @tf.function
+  def encode(inputs):
+    return encoder(inputs, training=False)[output_key]
+
+  with EmbeddingIndexWriter(index_dir, dtype) as writer:
+    pending = None
+    for inputs in dataset:
+      # Converting a batch to NumPy waits for it, so the previous batch is
+      # written once the next one is dispatched.
+      embeddings = encode(inputs)
+      if pending is not None:
+        writer.add(pending.numpy())
+      pending = embeddings
+    if pending is not None:
+      writer.add(pending.numpy())
+  return EmbeddingIndex(index_dir)
+
+
+class EmbeddingIndex:
+  """A memory-mapped index of embeddings, searched by inner product."""
+
+  def __init__(self, index_dir: str):
+    """Opens the index written to `index_dir`."""
+    with open(os.path.join(index_dir, _METADATA)) as f:
+      metadata = json.load(f)
+    self._index_dir = index_dir
+    self._num_vectors = metadata['num_vectors']
+    self._dim = metadata['dim']
+    self._dtype = metadata['dtype']
+    if self._num_vectors:
+      self._embeddings = np.memmap(
+          os.path.join(index_dir, _EMBEDDINGS),
+          dtype=self._dtype,
+          mode='r',
+          shape=(self._num_vectors, self._dim))
+    else:
+      self._embeddings = np.zeros((0, self._dim), self._dtype)
+    self._scales = None
+    if self._dtype == 'int8':
+      self._scales = np.load(os.path.join(index_dir, _SCALES))
+    self._centroids = None
+    self._list_ids = None
+    self._list_offsets = None
+    if os.path.exists(os.path.join(index_dir, _IVF)):
+      with np.load(os.path.join(index_dir, _IVF)) as ivf:
+        self._set_ivf(ivf['centroids'], ivf['list_ids'], ivf['list_offsets'])
+
+  @property
+  def num_vectors(self) -> int:
+    return self._num_vectors
+
+  @property
+  def dim(self) -> int:
+    return self._dim
+
+  @property
+  def dtype(self) -> str:
+    return self._dtype
+
+  @property
+  def num_lists(self) -> int:
+    """The number of inverted lists, 0 if the IVF is not trained."""
+    return 0 if self._centroids is None else len(self._centroids)
+
+  def _set_ivf(self, centroids, list_ids, list_offsets):
+    self._centroids = centroids
+    self._list_ids = list_ids
+    self._list_offsets = list_offsets
+
+  def vectors(self, ids: Union[slice, np.ndarray]) -> np.ndarray:
+    """Returns the (dequantized) float32 embeddings of `ids`."""
+    vectors = self._embeddings[ids].astype(np.float32)
+    if self._scales is not None:
+      vectors *= self._scales[ids][:, None]
+    return vectors
+
+  def _scores(self, queries, ids):
+    # [num_queries, dim] x [dim, num_ids], scaled per candidate.
+    scores = queries @ self._embeddings[ids].astype(np.float32).T
+    if self._scales is not None:
+      scores *= self._scales[ids]
+    return scores
+
+  def _search_block(self, queries, start, end, k):
+    scores = self._scores(queries, slice(start, end))
+    return _top_k(scores, np.arange(start, end, dtype=np.int64), k)
+
+  def _search_list(self, queries, list_index, k):
+    start, end = self._list_offsets[list_index:list_index + 2]
+    ids = np.sort(self._list_ids[start:end])
+    return _top_k(self._scores(queries, ids), ids, k)
+
+  def search(self,
+             queries: np.ndarray,
+             k: int = 10,
+             nprobe: Optional[int] = None,
+             block_size: int = 65536,
+             num_threads: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the top-k candidates of each query, by inner product.
+
+    Args:
+      queries: float array of shape [num_queries, dim].
+      k: the number of candidates to return per query.
+      nprobe: the number of inverted lists searched per query. If None, or if
+        the IVF is not trained, all the candidates are scored.
+      block_size: the number of candidates scored at once in an exhaustive
+        search.
+      num_threads: the number of threads scoring blocks (or queries, with the
+        IVF). Defaults to the number of CPUs.
+
+    Returns:
+      The float32 scores and the int64 ids of the best candidates of each
+      query, of shape [num_queries, k], by decreasing score. If fewer than `k`
+      candidates are searched, the missing ones have the id -1 and a score of
+      -inf.
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    num_threads = num_threads or os.cpu_count()
+    with futures.ThreadPoolExecutor(num_threads) as executor:
+      if nprobe is not None and self.num_lists:
+        return self._search_ivf(queries, k, nprobe, executor)
+      starts = range(0, self._num_vectors, block_size)
+      results = list(
+          executor.map(
+              lambda start: self._search_block(
+                  queries, start, min(start + block_size, self._num_vectors),
+                  k), starts))
+    scores = np.full((len(queries), k), -np.inf, np.float32)
+    ids = np.full((len(queries), k), -1, np.int64)
+    if results:
+      block_scores, block_ids = _top_k(
+          np.concatenate([s for s, _ in results], axis=1),
+          np.concatenate([i for _, i in results], axis=1), k)
+      scores[:, :block_scores.shape[1]] = block_scores
+      ids[:, :block_ids.shape[1]] = block_ids
+    return scores, ids
+
+  def _search_ivf(self, queries, k, nprobe, executor):
+    """Searches the `nprobe` lists closest to each query."""
+    nprobe = min(nprobe, self.num_lists)
+    probes = _top_k(queries @ self._centroids.T, np.arange(self.num_lists),
+                    nprobe)[1]
+    # Each list is scored once, against all the queries probing it, and its
+    # top-k of each of these queries fills a slot of the query's candidates.
+    probe_order = np.argsort(probes.ravel(), kind='stable')
+    probe_bounds = np.searchsorted(
+        probes.ravel()[probe_order], np.arange(self.num_lists + 1))
+    candidate_scores = np.full((len(queries), nprobe, k), -np.inf, np.float32)
+    candidate_ids = np.full((len(queries), nprobe, k), -1, np.int64)
+
+    def search_list(list_index):
+      probe_indices = probe_order[
+          probe_bounds[list_index]:probe_bounds[list_index + 1]]
+      if not len(probe_indices):
+        return
+      query_indices, slots = np.divmod(probe_indices, nprobe)
+      scores, ids = self._search_list(queries[query_indices], list_index, k)
+      candidate_scores[query_indices, slots, :scores.shape[1]] = scores
+      candidate_ids[query_indices, slots, :ids.shape[1]] = ids
+
+    list(executor.map(search_list, range(self.num_lists)))
+    return _top_k(
+        candidate_scores.reshape(len(queries), -1),
+        candidate_ids.reshape(len(queries), -1), k)
+
+  def train_ivf(self,
+                num_lists: int,
+                num_iterations: int = 10,
+                sample_size: Optional[int] = None,
+                block_size: int = 65536,
+                seed: int = 0):
+    """Trains an IVF coarse quantizer and writes it to the index directory.
+
+    The centroids are learned by spherical k-means on a sample of the
+    embeddings, and every embedding is added to the inverted list of the
+    centroid with which it has the largest inner product.
+
+    Args:
+      num_lists: the number of inverted lists, i.e. of centroids.
+      num_iterations: the number of k-means iterations.
+      sample_size: the number of embeddings the centroids are learned on.
+        Defaults to `256 * num_lists`.
+      block_size: the number of embeddings assigned to lists at once.
+      seed: the seed of the sampling and of the initial centroids.
+    """
+    if num_lists > self._num_vectors:
+      raise ValueError('Cannot train %d lists on %d embeddings.' %
+                       (num_lists, self._num_vectors))
+    rng = np.random.RandomState(seed)
+    sample_size = min(sample_size or 256 * num_lists, self._num_vectors)
+    sample = self.vectors(
+        np.sort(rng.choice(self._num_vectors, sample_size, replace=False)))
+    sample /= np.maximum(np.linalg.norm(sample, axis=1, keepdims=True), 1e-12)
+    centroids = sample[rng.choice(sample_size, num_lists, replace=False)]
+    for _ in range(num_iterations):
+      assignments = np.argmax(sample @ centroids.T, axis=1)
+      counts = np.bincount(assignments, minlength=num_lists)
+      starts = np.cumsum(counts) - counts
+      empty = counts == 0
+      sums = np.zeros_like(centroids)
+      sums[~empty] = np.add.reduceat(
+          sample[np.argsort(assignments, kind='stable')],
+          starts[~empty],
+          axis=0)
+      # Empty lists restart from random embeddings of the sample.
+      sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+      centroids = sums / np.maximum(
+          np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+
+    assignments = np.concatenate([
+        np.argmax(
+            self.vectors(slice(start, start + block_size)) @ centroids.T,
+            axis=1) for start in range(0, self._num_vectors, block_size)
+    ])
+    list_ids = np.argsort(assignments, kind='stable').astype(np.int64)
+    list_offsets = np.concatenate(
+        [[0], np.cumsum(np.bincount(assignments, minlength=num_lists))])
+    centroids = centroids.astype(np.float32)
+    np.savez(
+        os.path.join(self._index_dir, _IVF),
+        centroids=centroids,
+        list_ids=list_ids,
+        list_offsets=list_offsets)
+    self._set_ivf(centroids, list_ids, list_offsets)
+
+
+def recall_at_k(retrieved_ids: np.ndarray, relevant_ids: np.ndarray,
+                k: Optional[int] = None) -> float:
+  """Returns the mean fraction of the relevant ids found in the top-k.
+
+  Args:
+    retrieved_ids: the retrieved ids of each query, by decreasing score, of
+      shape [num_queries, num_retrieved].
+    relevant_ids: the relevant ids of each query, of shape [num_queries] or
+      [num_queries, num_relevant], e.g. the exact top-k.
+    k: the number of retrieved ids considered. Defaults to all of them.
+
+  Returns:
+    The recall@k, averaged over the queries.
+  """
+  retrieved_ids = np.asarray(retrieved_ids)[:, :k]
+  relevant_ids = np.asarray(relevant_ids)
+  if relevant_ids.ndim == 1:
+    relevant_ids = relevant_ids[:, None]
+  found = (relevant_ids[:, :, None] == retrieved_ids[:, None, :]).any(axis=2)
+  return float(found.mean()) if found.size else 0.
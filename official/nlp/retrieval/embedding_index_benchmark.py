@@ -0,0 +1,112 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+r"""Benchmarks the recall@k and the queries per second of `EmbeddingIndex`.
+
+Indexes clustered random unit embeddings, as float16 and int8, and searches
+them exhaustively and with the IVF for every given `nprobe`. The recall@k is
+measured against an exact float32 search (shell script):
+
+python3 -m official.nlp.retrieval.embedding_index_benchmark \
+    --num_vectors=1000000 --dim=768 --num_lists=1024 --nprobes=8,32,128
+"""
+import tempfile
+import time
+
+from absl import app
+from absl import flags
+from absl import logging
+import numpy as np
+
+from official.nlp.retrieval import embedding_index
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_integer('num_vectors', 200000, 'The number of indexed vectors.')
+flags.DEFINE_integer('dim', 256, 'The dimension of the vectors.')
+flags.DEFINE_integer('num_clusters', 1000,
+                     'The number of clusters of the random vectors.')
+flags.DEFINE_integer('num_queries', 1000, 'The number of queries.')
+flags.DEFINE_integer('k', 10, 'The number of retrieved vectors per query.')
+flags.DEFINE_integer('num_lists', 256, 'The number of inverted lists.')
+flags.DEFINE_list('nprobes', ['4', '16', '64'],
+                  'The numbers of inverted lists searched per query.')
+flags.DEFINE_integer('num_threads', None,
+                     'The number of search threads. Defaults to the CPUs.')
+
+
+def _normalize(x):
+  return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def _random_vectors(rng, centers, num_vectors):
+  vectors = centers[rng.randint(len(centers), size=num_vectors)]
+  vectors += rng.randn(num_vectors, centers.shape[1]) / np.sqrt(
+      centers.shape[1])
+  return _normalize(vectors).astype(np.float32)
+
+
+def _exact_top_k(vectors, queries, k, block_size=65536):
+  """Returns the exact top-k ids, with float32 embeddings."""
+  scores, ids = [], []
+  for start in range(0, len(vectors), block_size):
+    block_scores = queries @ vectors[start:start + block_size].T
+    top = np.argpartition(-block_scores, k - 1, axis=1)[:, :k]
+    scores.append(np.take_along_axis(block_scores, top, axis=1))
+    ids.append(top + start)
+  scores, ids = np.concatenate(scores, 1), np.concatenate(ids, 1)
+  order = np.argsort(-scores, axis=1)[:, :k]
+  return np.take_along_axis(ids, order, axis=1)
+
+
+def _benchmark_search(index, queries, exact_ids, nprobe=None):
+  start = time.time()
+  _, ids = index.search(
+      queries, k=FLAGS.k, nprobe=nprobe, num_threads=FLAGS.num_threads)
+  qps = len(queries) / (time.time() - start)
+  return qps, embedding_index.recall_at_k(ids, exact_ids)
+
+
+def main(_):
+  rng = np.random.RandomState(0)
+  centers = _normalize(rng.randn(FLAGS.num_clusters, FLAGS.dim))
+  vectors = _random_vectors(rng, centers, FLAGS.num_vectors)
+  queries = _random_vectors(rng, centers, FLAGS.num_queries)
+  exact_ids = _exact_top_k(vectors, queries, FLAGS.k)
+
+  for dtype in ('float16', 'int8'):
+    index_dir = tempfile.mkdtemp()
+    start = time.time()
+    with embedding_index.EmbeddingIndexWriter(index_dir, dtype) as writer:
+      for i in range(0, FLAGS.num_vectors, 65536):
+        writer.add(vectors[i:i + 65536])
+    index = embedding_index.EmbeddingIndex(index_dir)
+    logging.info('%s: indexed %d vectors in %.2f s.', dtype,
+                 FLAGS.num_vectors, time.time() - start)
+    qps, recall = _benchmark_search(index, queries, exact_ids)
+    logging.info('%s exhaustive: %.1f QPS, recall@%d %.4f.', dtype, qps,
+                 FLAGS.k, recall)
+
+    start = time.time()
+    index.train_ivf(FLAGS.num_lists)
+    logging.info('%s: trained %d lists in %.2f s.', dtype, FLAGS.num_lists,
+                 time.time() - start)
+    for nprobe in [int(x) for x in FLAGS.nprobes]:
+      qps, recall = _benchmark_search(index, queries, exact_ids, nprobe)
+      logging.info('%s IVF nprobe=%d: %.1f QPS, recall@%d %.4f.', dtype,
+                   nprobe, qps, FLAGS.k, recall)
+
+
+if __name__ == '__main__':
+  app.run(main)
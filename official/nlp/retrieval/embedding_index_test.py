@@ -0,0 +1,124 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for official.nlp.retrieval.embedding_index."""
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+from official.nlp.modeling import networks
+from official.nlp.modeling.models import dual_encoder
+from official.nlp.retrieval import embedding_index
+
+
+def _embeddings(num_vectors, dim, seed=0):
+  embeddings = np.random.RandomState(seed).randn(num_vectors, dim)
+  return (embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+         ).astype(np.float32)
+
+
+def _write_index(index_dir, embeddings, dtype, batch_size=100):
+  with embedding_index.EmbeddingIndexWriter(index_dir, dtype) as writer:
+    for start in range(0, len(embeddings), batch_size):
+      writer.add(embeddings[start:start + batch_size])
+  return embedding_index.EmbeddingIndex(index_dir)
+
+
+class EmbeddingIndexTest(tf.test.TestCase, parameterized.TestCase):
+
+  @parameterized.parameters(('float16', 1e-3), ('int8', 1e-2))
+  def test_vectors_round_trip(self, dtype, tolerance):
+    embeddings = _embeddings(250, 16)
+    index = _write_index(self.get_temp_dir(), embeddings, dtype)
+    self.assertEqual((index.num_vectors, index.dim, index.dtype),
+                     (250, 16, dtype))
+    self.assertAllClose(embeddings, index.vectors(slice(None)),
+                        atol=tolerance)
+
+  @parameterized.parameters('float16', 'int8')
+  def test_search_matches_brute_force(self, dtype):
+    embeddings = _embeddings(1000, 16)
+    queries = _embeddings(20, 16, seed=1)
+    index = _write_index(self.get_temp_dir(), embeddings, dtype)
+    expected = queries @ index.vectors(slice(None)).T
+    expected_ids = np.argsort(-expected, axis=1, kind='stable')[:, :10]
+
+    scores, ids = index.search(queries, k=10, block_size=128, num_threads=4)
+    self.assertAllEqual(expected_ids, ids)
+    self.assertAllClose(
+        np.take_along_axis(expected, expected_ids, axis=1), scores, rtol=1e-5)
+
+  def test_search_fewer_candidates_than_k(self):
+    index = _write_index(self.get_temp_dir(), _embeddings(3, 8), 'float16')
+    scores, ids = index.search(_embeddings(2, 8, seed=1), k=5)
+    self.assertAllEqual([[-1, -1]] * 2, ids[:, 3:])
+    self.assertAllEqual(np.full((2, 2), -np.inf), scores[:, 3:])
+    self.assertAllEqual([[0, 1, 2]] * 2, np.sort(ids[:, :3], axis=1))
+
+  def test_ivf(self):
+    embeddings = _embeddings(2000, 16)
+    queries = _embeddings(50, 16, seed=1)
+    index_dir = self.get_temp_dir()
+    index = _write_index(index_dir, embeddings, 'float16')
+    index.train_ivf(num_lists=16, num_iterations=5)
+    self.assertEqual(index.num_lists, 16)
+
+    # Searching all the lists is an exhaustive search.
+    exact_scores, exact_ids = index.search(queries, k=10)
+    scores, ids = index.search(queries, k=10, nprobe=16)
+    self.assertAllEqual(exact_ids, ids)
+    self.assertAllClose(exact_scores, scores)
+
+    # The IVF is saved with the index.
+    index = embedding_index.EmbeddingIndex(index_dir)
+    self.assertEqual(index.num_lists, 16)
+    _, ids = index.search(queries, k=10, nprobe=4)
+    self.assertGreater(embedding_index.recall_at_k(ids, exact_ids), 0.5)
+
+  def test_recall_at_k(self):
+    retrieved = np.array([[1, 2, 3], [4, 5, 6]])
+    self.assertEqual(embedding_index.recall_at_k(retrieved, [2, 7]), 0.5)
+    self.assertEqual(embedding_index.recall_at_k(retrieved, [2, 7], k=1), 0.)
+    self.assertEqual(
+        embedding_index.recall_at_k(retrieved, [[1, 9], [6, 5]]), 0.75)
+
+  def test_encode_corpus(self):
+    sequence_length = 8
+    network = networks.BertEncoder(
+        vocab_size=100,
+        num_layers=1,
+        hidden_size=16,
+        num_attention_heads=2,
+        intermediate_size=32,
+        sequence_length=sequence_length)
+    encoder = dual_encoder.DualEncoder(
+        network, max_seq_length=sequence_length, output='predictions')
+    word_ids = np.random.RandomState(0).randint(
+        1, 100, size=(10, sequence_length)).astype(np.int32)
+    inputs = (word_ids, np.ones_like(word_ids), np.zeros_like(word_ids))
+    dataset = tf.data.Dataset.from_tensor_slices(inputs).batch(4).map(
+        lambda *x: list(x))
+
+    index = embedding_index.encode_corpus(encoder, dataset,
+                                          self.get_temp_dir())
+    self.assertEqual(index.num_vectors, 10)
+    self.assertAllClose(
+        encoder(list(inputs))['pooled_output'],
+        index.vectors(slice(None)),
+        atol=1e-3)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -18,81 +18,49 @@ Source:
 https://github.com/tensorflow/tensor2tensor/blob/master/tensor2tensor/utils/bleu_hook.py
 """
 
-import re
-import sys
-import unicodedata
-
 from absl import app
 from absl import flags
-import six
-from six.moves import range
 import tensorflow as tf
 
-from official.nlp.transformer.utils import metrics
+from official.nlp.metrics import bleu
+from official.nlp.transformer.utils import corpus_metrics
 from official.nlp.transformer.utils import tokenizer
 from official.utils.flags import core as flags_core
 
+UnicodeRegex = bleu.UnicodeRegex
+bleu_tokenize = bleu.bleu_tokenize
 
-class UnicodeRegex(object):
-  """Ad-hoc hack to recognize all punctuation and symbols."""
-
-  def __init__(self):
-    punctuation = self.property_chars("P")
-    self.nondigit_punct_re = re.compile(r"([^\d])([" + punctuation + r"])")
-    self.punct_nondigit_re = re.compile(r"([" + punctuation + r"])([^\d])")
-    self.symbol_re = re.compile("([" + self.property_chars("S") + "])")
-
-  def property_chars(self, prefix):
-    return "".join(
-        six.unichr(x)
-        for x in range(sys.maxunicode)
-        if unicodedata.category(six.unichr(x)).startswith(prefix))
-
-
-uregex = UnicodeRegex()
-
-
-def bleu_tokenize(string):
-  r"""Tokenize a string following the official BLEU implementation.
-
-  See https://github.com/moses-smt/mosesdecoder/'
-           'blob/master/scripts/generic/mteval-v14.pl#L954-L983
-  In our case, the input string is expected to be just one line
-  and no HTML entities de-escaping is needed.
-  So we just tokenize on punctuation and symbols,
-  except when a punctuation is preceded and followed by a digit
-  (e.g. a comma/dot as a thousand/decimal separator).
-
-  Note that a numer (e.g. a year) followed by a dot at the end of sentence
-  is NOT tokenized,
-  i.e. the dot stays with the number because `s/(\p{P})(\P{N})/ $1 $2/g`
-  does not match this case (unless we add a space after each sentence).
-  However, this error is already in the original mteval-v14.pl
-  and we want to be consistent with it.
-
-  Args:
-    string: the input string
 
-  Returns:
-    a list of tokens
-  """
-  string = uregex.nondigit_punct_re.sub(r"\1 \2 ", string)
-  string = uregex.punct_nondigit_re.sub(r" \1 \2", string)
-  string = uregex.symbol_re.sub(r" \1 ", string)
-  return string.split()
+def __getattr__(name):
+  # `uregex` used to be built at import time, and is now built on first use.
+  if name == "uregex":
+    return bleu.uregex
+  raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 
-def bleu_wrapper(ref_filename, hyp_filename, case_sensitive=False):
+def bleu_wrapper(ref_filename, hyp_filename, case_sensitive=False,
+                 num_workers=1):
   """Compute BLEU for two files (reference and hypothesis translation)."""
   ref_lines = tokenizer.native_to_unicode(
       tf.io.gfile.GFile(ref_filename).read()).strip().splitlines()
   hyp_lines = tokenizer.native_to_unicode(
       tf.io.gfile.GFile(hyp_filename).read()).strip().splitlines()
-  return bleu_on_list(ref_lines, hyp_lines, case_sensitive)
+  return bleu_on_list(ref_lines, hyp_lines, case_sensitive, num_workers)
+
+
+def bleu_on_list(ref_lines, hyp_lines, case_sensitive=False, num_workers=1):
+  """Compute BLEU for two list of strings (reference and hypothesis).
 
+  Args:
+    ref_lines: list of reference strings.
+    hyp_lines: list of hypothesis strings.
+    case_sensitive: whether to compute the case-sensitive BLEU.
+    num_workers: number of processes tokenizing the lines of large lists. The
+      score does not depend on it.
 
-def bleu_on_list(ref_lines, hyp_lines, case_sensitive=False):
-  """Compute BLEU for two list of strings (reference and hypothesis)."""
+  Returns:
+    The BLEU score, in [0, 100].
+  """
   if len(ref_lines) != len(hyp_lines):
     raise ValueError(
         "Reference and translation files have different number of "
@@ -101,18 +69,20 @@ def bleu_on_list(ref_lines, hyp_lines, case_sensitive=False):
   if not case_sensitive:
     ref_lines = [x.lower() for x in ref_lines]
     hyp_lines = [x.lower() for x in hyp_lines]
-  ref_tokens = [bleu_tokenize(x) for x in ref_lines]
-  hyp_tokens = [bleu_tokenize(x) for x in hyp_lines]
-  return metrics.compute_bleu(ref_tokens, hyp_tokens) * 100
+  ref_tokens = bleu.tokenize_lines(ref_lines, num_workers)
+  hyp_tokens = bleu.tokenize_lines(hyp_lines, num_workers)
+  return corpus_metrics.compute_bleu(ref_tokens, hyp_tokens) * 100
 
 
 def main(unused_argv):
   if FLAGS.bleu_variant in ("both", "uncased"):
-    score = bleu_wrapper(FLAGS.reference, FLAGS.translation, False)
+    score = bleu_wrapper(FLAGS.reference, FLAGS.translation, False,
+                         FLAGS.num_workers)
     tf.logging.info("Case-insensitive results: %f" % score)
 
   if FLAGS.bleu_variant in ("both", "cased"):
-    score = bleu_wrapper(FLAGS.reference, FLAGS.translation, True)
+    score = bleu_wrapper(FLAGS.reference, FLAGS.translation, True,
+                         FLAGS.num_workers)
     tf.logging.info("Case-sensitive results: %f" % score)
 
 
@@ -140,6 +110,12 @@ def define_compute_bleu_flags():
           "Specify one or more BLEU variants to calculate. Variants: \"cased\""
           ", \"uncased\", or \"both\"."))
 
+  flags.DEFINE_integer(
+      name="num_workers",
+      default=1,
+      help=flags_core.help_wrap(
+          "Number of processes tokenizing the reference and translation."))
+
 
 if __name__ == "__main__":
   tf.logging.set_verbosity(tf.logging.INFO)
@@ -68,5 +68,13 @@ class ComputeBleuTest(tf.test.TestCase):
     self.assertLess(cased_score, 100)
 
 
+  def test_bleu_list_with_workers(self):
+    ref = ["Test 1 two, 3 (%d)" % i for i in range(2000)]
+    hyp = ["test 1 two: 3 (%d)." % (i % 7) for i in range(2000)]
+    self.assertEqual(
+        compute_bleu.bleu_on_list(ref, hyp, False),
+        compute_bleu.bleu_on_list(ref, hyp, False, num_workers=2))
+
+
 if __name__ == "__main__":
   tf.test.main()
@@ -396,7 +396,8 @@ def main(unused_argv):
       train_files_flat,
       _TARGET_VOCAB_SIZE,
       _TARGET_THRESHOLD,
-      min_count=None if FLAGS.search else _TRAIN_DATA_MIN_COUNT)
+      min_count=None if FLAGS.search else _TRAIN_DATA_MIN_COUNT,
+      num_workers=FLAGS.vocab_num_workers)
 
   logging.info("Step 4/5: Compiling training and evaluation data")
   compiled_train_files = compile_files(FLAGS.raw_dir, train_files, _TRAIN_TAG)
@@ -434,6 +435,12 @@ def define_data_download_flags():
       help=flags_core.help_wrap(
           "If set, use binary search to find the vocabulary set with size"
           "closest to the target size (%d)." % _TARGET_VOCAB_SIZE))
+  flags.DEFINE_integer(
+      name="vocab_num_workers",
+      default=1,
+      help=flags_core.help_wrap(
+          "Number of processes counting the subtokens when building the "
+          "vocabulary. The vocabulary does not depend on it."))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,225 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Corpus-level BLEU and ROUGE, computed with NumPy over integer ids.
+
+The functions have the signatures and the exact scores of `metrics.rouge_n`,
+`metrics.rouge_l_sentence_level` and `metrics.compute_bleu`, which count the
+n-grams of every sentence in Python Counters and sets, and fill an O(nm) dict
+per sentence pair to compute the LCS. Here:
+
+  - the tokens are mapped to integer ids, and the n-grams of all the sentences
+    of the corpus are windows of a flat id array, which `np.unique` numbers;
+  - per-sentence n-gram counts and overlaps are computed on
+    (sentence, n-gram) keys with `np.unique` and `np.intersect1d`;
+  - the LCS length is computed with a bit-parallel algorithm over Python ints,
+    in O(n) big-int operations per sentence pair, optionally in a process pool.
+"""
+
+import multiprocessing
+
+import numpy as np
+
+from official.nlp.transformer.utils import metrics
+
+
+def _to_id_arrays(*corpora):
+  """Returns the sentences of the corpora as lists of int64 id arrays.
+
+  Integer tokens are used as ids. Other tokens, e.g. strings, are mapped to ids
+  with a vocabulary shared by the corpora.
+
+  Args:
+    *corpora: collections of sentences, i.e. sequences of tokens, or 2-D arrays.
+  """
+  arrays = [[np.asarray(sentence) for sentence in corpus] for corpus in corpora]
+  if all(a.dtype.kind in "iub" or not a.size for c in arrays for a in c):
+    return [[a.astype(np.int64) for a in c] for c in arrays]
+  vocab = {}
+  return [[
+      np.array([vocab.setdefault(t, len(vocab)) for t in sentence],
+               dtype=np.int64) for sentence in corpus
+  ] for corpus in corpora]
+
+
+def _ngram_keys(corpora, n):
+  """Returns the (sentence, n-gram) keys of the n-grams of each corpus.
+
+  Args:
+    corpora: lists of int64 id arrays, with the same number of sentences.
+    n: the order of the n-grams.
+
+  Returns:
+    A list with, for each corpus, the int64 keys of its n-grams, one per window
+    of `n` tokens, where equal keys are equal n-grams of the same sentence; and
+    the number of distinct n-grams `num_ngrams`, such that the sentence index
+    of a key is `key // num_ngrams`.
+  """
+  windows, sentence_ids = [], []
+  for corpus in corpora:
+    lengths = np.array([len(a) for a in corpus], dtype=np.int64)
+    flat = np.concatenate(corpus + [np.zeros(n, np.int64)])
+    total = int(lengths.sum())
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    sentence = np.repeat(np.arange(len(corpus), dtype=np.int64), lengths)
+    # The windows that start in a sentence and end in the same sentence.
+    valid = np.arange(total) - starts + n <= np.repeat(lengths, lengths)
+    window = np.stack([flat[k:k + total] for k in range(n)], axis=1)
+    windows.append(window[valid])
+    sentence_ids.append(sentence[valid])
+  all_windows = np.concatenate(windows)
+  if not len(all_windows):
+    return [np.zeros(0, np.int64) for _ in corpora], 1
+  _, ngram_ids = np.unique(all_windows, axis=0, return_inverse=True)
+  num_ngrams = int(ngram_ids.max()) + 1
+  keys, offset = [], 0
+  for sentence in sentence_ids:
+    ids = ngram_ids[offset:offset + len(sentence)]
+    offset += len(sentence)
+    keys.append(sentence * num_ngrams + ids)
+  return keys, num_ngrams
+
+
+def rouge_n(eval_sentences, ref_sentences, n=2):
+  """Computes ROUGE-N f1 score of two text collections of sentences.
+
+  Same as `metrics.rouge_n`, batched over the corpus.
+
+  Args:
+    eval_sentences: Predicted sentences.
+    ref_sentences: Sentences from the reference set
+    n: Size of ngram.  Defaults to 2.
+
+  Returns:
+    f1 score for ROUGE-N
+  """
+  num_sentences = min(len(eval_sentences), len(ref_sentences))
+  eval_ids, ref_ids = _to_id_arrays(eval_sentences[:num_sentences],
+                                    ref_sentences[:num_sentences])
+  (eval_keys, ref_keys), num_ngrams = _ngram_keys([eval_ids, ref_ids], n)
+  eval_keys, ref_keys = np.unique(eval_keys), np.unique(ref_keys)
+  overlapping_keys = np.intersect1d(eval_keys, ref_keys, assume_unique=True)
+
+  def count(keys):
+    return np.bincount(keys // num_ngrams, minlength=num_sentences).tolist()
+
+  f1_scores = []
+  for eval_count, ref_count, overlapping_count in zip(
+      count(eval_keys), count(ref_keys), count(overlapping_keys)):
+    precision = float(overlapping_count) / eval_count if eval_count else 0.0
+    recall = float(overlapping_count) / ref_count if ref_count else 0.0
+    f1_scores.append(2.0 * ((precision * recall) / (precision + recall + 1e-8)))
+  return np.mean(f1_scores, dtype=np.float32)
+
+
+def _len_lcs(x, y):
+  """Returns the length of the LCS of two lists of ids, bit-parallel.
+
+  Bit i of `v` is cleared when the LCS of `x[:i + 1]` and the prefix of `y`
+  processed so far is longer than the LCS with `x[:i]`, so that the LCS length
+  is the number of cleared bits (Hyyro, 2004).
+
+  Args:
+    x: list of ids.
+    y: list of ids.
+
+  Returns:
+    integer: Length of LCS between x and y
+  """
+  masks = {}
+  for i, token in enumerate(x):
+    masks[token] = masks.get(token, 0) | (1 << i)
+  full = v = (1 << len(x)) - 1
+  for token in y:
+    u = v & masks.get(token, 0)
+    v = ((v + u) | (v - u)) & full
+  return len(x) - bin(v).count("1")
+
+
+def _len_lcs_of_pairs(pairs):
+  return [_len_lcs(x, y) for x, y in pairs]
+
+
+def rouge_l_sentence_level(eval_sentences, ref_sentences, num_workers=1):
+  """Computes ROUGE-L (sentence level) of two collections of sentences.
+
+  Same as `metrics.rouge_l_sentence_level`, with a bit-parallel LCS.
+
+  Args:
+    eval_sentences: The sentences that have been picked by the summarizer
+    ref_sentences: The sentences from the reference set
+    num_workers: number of processes computing the LCS lengths.
+
+  Returns:
+    A float: F_lcs
+  """
+  num_sentences = min(len(eval_sentences), len(ref_sentences))
+  eval_ids, ref_ids = _to_id_arrays(eval_sentences[:num_sentences],
+                                    ref_sentences[:num_sentences])
+  pairs = [(x.tolist(), y.tolist()) for x, y in zip(eval_ids, ref_ids)]
+  if num_workers > 1 and len(pairs) > num_workers:
+    chunk_size = -(-len(pairs) // num_workers)
+    chunks = [
+        pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)
+    ]
+    with multiprocessing.Pool(num_workers) as pool:
+      lcs_lengths = [l for c in pool.map(_len_lcs_of_pairs, chunks) for l in c]
+  else:
+    lcs_lengths = _len_lcs_of_pairs(pairs)
+
+  f1_scores = []
+  for (x, y), lcs in zip(pairs, lcs_lengths):
+    f1_scores.append(metrics._f_lcs(lcs, float(len(y)), float(len(x))))  # pylint: disable=protected-access
+  return np.mean(f1_scores, dtype=np.float32)
+
+
+def compute_bleu(reference_corpus, translation_corpus, max_order=4,
+                 use_bp=True):
+  """Computes BLEU score of translated segments against one or more references.
+
+  Same as `metrics.compute_bleu`, batched over the corpus.
+
+  Args:
+    reference_corpus: list of references for each translation. Each
+        reference should be tokenized into a list of tokens.
+    translation_corpus: list of translations to score. Each translation
+        should be tokenized into a list of tokens.
+    max_order: Maximum n-gram order to use when computing BLEU score.
+    use_bp: boolean, whether to apply brevity penalty.
+
+  Returns:
+    BLEU score.
+  """
+  num_sentences = min(len(reference_corpus), len(translation_corpus))
+  ref_ids, translation_ids = _to_id_arrays(reference_corpus[:num_sentences],
+                                           translation_corpus[:num_sentences])
+  matches_by_order = [0] * max_order
+  possible_matches_by_order = [0] * max_order
+  for order in range(1, max_order + 1):
+    (ref_keys, translation_keys), _ = _ngram_keys([ref_ids, translation_ids],
+                                                  order)
+    ref_keys, ref_counts = np.unique(ref_keys, return_counts=True)
+    translation_keys, translation_counts = np.unique(
+        translation_keys, return_counts=True)
+    _, ref_index, translation_index = np.intersect1d(
+        ref_keys, translation_keys, assume_unique=True, return_indices=True)
+    matches_by_order[order - 1] = int(
+        np.minimum(ref_counts[ref_index],
+                   translation_counts[translation_index]).sum())
+    possible_matches_by_order[order - 1] = int(translation_counts.sum())
+
+  return metrics._bleu_from_counts(  # pylint: disable=protected-access
+      matches_by_order, possible_matches_by_order,
+      sum(len(a) for a in ref_ids), sum(len(a) for a in translation_ids),
+      max_order, use_bp)
@@ -0,0 +1,78 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for official.nlp.transformer.utils.corpus_metrics."""
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+from official.nlp.transformer.utils import corpus_metrics
+from official.nlp.transformer.utils import metrics
+
+
+class CorpusMetricsTest(tf.test.TestCase, parameterized.TestCase):
+
+  def _id_corpora(self, seed):
+    rng = np.random.RandomState(seed)
+    batch_size = rng.randint(1, 16)
+    vocab_size = rng.randint(2, 8)
+    predictions = rng.randint(0, vocab_size, size=(batch_size, 20))
+    labels = rng.randint(0, vocab_size, size=(batch_size, 24)).astype(np.int32)
+    return predictions, labels
+
+  def _token_corpora(self, seed):
+    rng = np.random.RandomState(seed)
+    hypotheses = [list(rng.choice(list("abcdef"), size=rng.randint(1, 12)))
+                  for _ in range(10)]
+    references = [list(rng.choice(list("abcde"), size=rng.randint(1, 12)))
+                  for _ in range(10)]
+    return hypotheses, references
+
+  @parameterized.parameters(0, 1, 2, 3)
+  def test_matches_metrics_on_ids(self, seed):
+    predictions, labels = self._id_corpora(seed)
+    for n in (1, 2, 3):
+      self.assertEqual(
+          metrics.rouge_n(predictions, labels, n),
+          corpus_metrics.rouge_n(predictions, labels, n))
+    self.assertEqual(
+        metrics.rouge_l_sentence_level(predictions, labels),
+        corpus_metrics.rouge_l_sentence_level(predictions, labels))
+    self.assertEqual(
+        metrics.compute_bleu(labels, predictions),
+        corpus_metrics.compute_bleu(labels, predictions))
+
+  @parameterized.parameters(0, 1)
+  def test_matches_metrics_on_tokens(self, seed):
+    hypotheses, references = self._token_corpora(seed)
+    self.assertEqual(
+        metrics.rouge_n(hypotheses, references),
+        corpus_metrics.rouge_n(hypotheses, references))
+    self.assertEqual(
+        metrics.rouge_l_sentence_level(hypotheses, references),
+        corpus_metrics.rouge_l_sentence_level(
+            hypotheses, references, num_workers=2))
+    self.assertEqual(
+        metrics.compute_bleu(references, hypotheses),
+        corpus_metrics.compute_bleu(references, hypotheses))
+
+  def test_len_lcs(self):
+    self.assertEqual(4, corpus_metrics._len_lcs(list("ABCBDAB"),
+                                                list("BDCABA")))
+    self.assertEqual(0, corpus_metrics._len_lcs([], [1, 2]))
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -245,12 +245,9 @@ def compute_bleu(reference_corpus, translation_corpus, max_order=4,
   """
   reference_length = 0
   translation_length = 0
-  bp = 1.0
-  geo_mean = 0
 
   matches_by_order = [0] * max_order
   possible_matches_by_order = [0] * max_order
-  precisions = []
 
   for (references, translations) in zip(reference_corpus, translation_corpus):
     reference_length += len(references)
@@ -268,6 +265,17 @@ def compute_bleu(reference_corpus, translation_corpus, max_order=4,
       possible_matches_by_order[len(ngram) - 1] += translation_ngram_counts[
           ngram]
 
+  return _bleu_from_counts(matches_by_order, possible_matches_by_order,
+                           reference_length, translation_length, max_order,
+                           use_bp)
+
+
+def _bleu_from_counts(matches_by_order, possible_matches_by_order,
+                      reference_length, translation_length, max_order,
+                      use_bp):
+  """Computes the BLEU score from the n-gram match counts of a corpus."""
+  bp = 1.0
+  geo_mean = 0
   precisions = [0] * max_order
   smooth = 1.0
 
@@ -19,6 +19,7 @@ from __future__ import division
 from __future__ import print_function
 
 import collections
+import multiprocessing
 import re
 import sys
 import unicodedata
@@ -102,7 +103,8 @@ class Subtokenizer(object):
                       file_byte_limit=1e6,
                       reserved_tokens=None,
                       correct_strip=True,
-                      master_char_set=None):
+                      master_char_set=None,
+                      num_workers=1):
     """Create subtoken vocabulary based on files, and save vocab to file.
 
     Args:
@@ -120,6 +122,8 @@ class Subtokenizer(object):
         beginning of the subtoken vocabulary list.
       correct_strip: Whether to convert text to unicode before strip.
       master_char_set: the char set.
+      num_workers: int number of processes counting the subtokens. The
+        vocabulary does not depend on it.
 
     Returns:
       Subtokenizer object
@@ -138,7 +142,7 @@ class Subtokenizer(object):
       alphabet = _generate_alphabet_dict(token_counts)
       subtoken_list = _generate_subtokens_with_target_vocab_size(
           token_counts, alphabet, target_vocab_size, threshold, min_count,
-          reserved_tokens)
+          reserved_tokens, num_workers=num_workers)
       logging.info("Generated vocabulary with %d subtokens.",
                    len(subtoken_list))
       _save_vocab_file(vocab_file, subtoken_list)
@@ -428,21 +432,185 @@ def _split_token_to_subtokens(token, subtoken_dict, max_subtoken_length):
   return ret
 
 
+def _build_subtoken_trie(subtokens):
+  """Returns a trie of nested dicts, where "" marks the end of a subtoken."""
+  trie = {}
+  for subtoken in subtokens:
+    node = trie
+    for c in subtoken:
+      node = node.setdefault(c, {})
+    node[""] = True
+  return trie
+
+
+def _split_token_to_subtokens_with_trie(token, subtoken_trie,
+                                        max_subtoken_length):
+  """Like `_split_token_to_subtokens`, with a trie built from the subtokens.
+
+  Instead of looking up every substring starting at a position, from the
+  longest to the shortest, the trie is walked character by character until no
+  subtoken has the prefix, so that the subtokens are the same.
+
+  Args:
+    token: escaped token to split.
+    subtoken_trie: trie of the subtokens, from `_build_subtoken_trie`.
+    max_subtoken_length: maximum length of the subtokens to match.
+
+  Returns:
+    List of subtokens.
+  """
+  ret = []
+  start = 0
+  token_len = len(token)
+  while start < token_len:
+    node = subtoken_trie
+    end = start
+    for pos in xrange(start, min(token_len, start + max_subtoken_length)):
+      node = node.get(token[pos])
+      if node is None:
+        break
+      if "" in node:
+        end = pos + 1
+    if end == start:
+      raise ValueError("Was unable to split token \"%s\" into subtokens." %
+                       token)
+    ret.append(token[start:end])
+    start = end
+  return ret
+
+
+def _count_escaped_subtokens(escaped_token_counts, subtoken_list,
+                             max_subtoken_length):
+  """`_count_and_gen_subtokens` for (escaped token, count) pairs."""
+  subtoken_trie = _build_subtoken_trie(subtoken_list)
+  subtoken_counts = collections.defaultdict(int)
+  for token, count in escaped_token_counts:
+    subtokens = _split_token_to_subtokens_with_trie(token, subtoken_trie,
+                                                    max_subtoken_length)
+    start = 0
+    for subtoken in subtokens:
+      for end in xrange(start + 1, len(token) + 1):
+        subtoken_counts[token[start:end]] += count
+      start += len(subtoken)
+  return subtoken_counts
+
+
+# The shards of escaped token counts of a `_SubtokenCounter` worker process.
+_worker_token_counts = None
+
+
+def _init_subtoken_counter_worker(shards):
+  global _worker_token_counts
+  _worker_token_counts = shards
+
+
+def _count_subtokens_in_worker_shard(args):
+  shard_index, subtoken_list, max_subtoken_length = args
+  return _count_escaped_subtokens(_worker_token_counts[shard_index],
+                                  subtoken_list, max_subtoken_length)
+
+
+class _SubtokenCounter(object):
+  """Counts subtokens like `_count_and_gen_subtokens`, for many vocabularies.
+
+  The tokens are escaped once, and sharded across `num_workers` processes that
+  count the subtokens of their shard. The counts of the initial vocabulary,
+  made of the alphabet, do not depend on `min_count`, so they are counted once
+  and reused by every probe of the binary search of `min_count`.
+  """
+
+  def __init__(self, token_counts, alphabet, num_workers=1):
+    escaped_token_counts = [(_escape_token(token, alphabet), count)
+                            for token, count in six.iteritems(token_counts)]
+    self._num_workers = max(num_workers, 1)
+    self._shards = [
+        escaped_token_counts[i::self._num_workers]
+        for i in xrange(self._num_workers)
+    ]
+    self._pool = None
+    if self._num_workers > 1:
+      self._pool = multiprocessing.Pool(
+          self._num_workers,
+          initializer=_init_subtoken_counter_worker,
+          initargs=(self._shards,))
+    self._cache = {}
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *unused_args):
+    self.close()
+
+  def close(self):
+    if self._pool is not None:
+      self._pool.close()
+      self._pool.join()
+      self._pool = None
+
+  def count(self, subtoken_list, max_subtoken_length, cache=False):
+    """Returns the subtoken counts for a vocabulary.
+
+    Args:
+      subtoken_list: list of subtokens to split the tokens into.
+      max_subtoken_length: maximum length of the subtokens to match.
+      cache: whether to keep the counts, to be reused by later calls with the
+        same subtokens and maximum length.
+
+    Returns:
+      A defaultdict mapping subtokens to the number of times they appear in the
+      tokens, which the caller may modify.
+    """
+    key = (frozenset(subtoken_list), max_subtoken_length)
+    if key not in self._cache:
+      if self._pool is None:
+        subtoken_counts = _count_escaped_subtokens(self._shards[0],
+                                                   subtoken_list,
+                                                   max_subtoken_length)
+      else:
+        shard_counts = self._pool.map(
+            _count_subtokens_in_worker_shard,
+            [(i, subtoken_list, max_subtoken_length)
+             for i in xrange(self._num_workers)])
+        subtoken_counts = shard_counts[0]
+        for counts in shard_counts[1:]:
+          for subtoken, count in six.iteritems(counts):
+            subtoken_counts[subtoken] += count
+      if not cache:
+        return subtoken_counts
+      self._cache[key] = subtoken_counts
+    return collections.defaultdict(int, self._cache[key])
+
+
 def _generate_subtokens_with_target_vocab_size(token_counts,
                                                alphabet,
                                                target_size,
                                                threshold,
                                                min_count=None,
-                                               reserved_tokens=None):
+                                               reserved_tokens=None,
+                                               num_workers=1):
   """Generate subtoken vocabulary close to the target size."""
   if reserved_tokens is None:
     reserved_tokens = RESERVED_TOKENS
 
-  if min_count is not None:
-    logging.info("Using min_count=%d to generate vocab with target size %d",
-                 min_count, target_size)
-    return _generate_subtokens(
-        token_counts, alphabet, min_count, reserved_tokens=reserved_tokens)
+  with _SubtokenCounter(token_counts, alphabet, num_workers) as counter:
+    if min_count is not None:
+      logging.info("Using min_count=%d to generate vocab with target size %d",
+                   min_count, target_size)
+      return _generate_subtokens(
+          token_counts,
+          alphabet,
+          min_count,
+          reserved_tokens=reserved_tokens,
+          subtoken_counter=counter)
+    logging.info("Finding best min_count to get target size of %d",
+                 target_size)
+    return _bisect_min_count(token_counts, alphabet, target_size, threshold,
+                             reserved_tokens, counter)
+
+
+def _bisect_min_count(token_counts, alphabet, target_size, threshold,
+                      reserved_tokens, subtoken_counter):
+  """Binary searches the min_count of the vocabulary closest to target_size."""
 
   def bisect(min_val, max_val):
     """Recursive function to binary search for subtoken vocabulary."""
@@ -450,7 +618,11 @@ def _generate_subtokens_with_target_vocab_size(token_counts,
     logging.info("Binary search: trying min_count=%d (%d %d)", cur_count,
                  min_val, max_val)
     subtoken_list = _generate_subtokens(
-        token_counts, alphabet, cur_count, reserved_tokens=reserved_tokens)
+        token_counts,
+        alphabet,
+        cur_count,
+        reserved_tokens=reserved_tokens,
+        subtoken_counter=subtoken_counter)
 
     val = len(subtoken_list)
     logging.info("Binary search: min_count=%d resulted in %d tokens", cur_count,
@@ -470,7 +642,6 @@ def _generate_subtokens_with_target_vocab_size(token_counts,
       return other_subtoken_list
     return subtoken_list
 
-  logging.info("Finding best min_count to get target size of %d", target_size)
   return bisect(_MIN_MIN_COUNT, _MAX_MIN_COUNT)
 
 
@@ -616,7 +787,8 @@ def _generate_subtokens(token_counts,
                         alphabet,
                         min_count,
                         num_iterations=4,
-                        reserved_tokens=None):
+                        reserved_tokens=None,
+                        subtoken_counter=None):
   """Create a list of subtokens in decreasing order of frequency.
 
   Args:
@@ -627,6 +799,8 @@ def _generate_subtokens(token_counts,
     num_iterations: int number of iterations to generate new tokens.
     reserved_tokens: list of tokens that will be added to the beginning to the
       returned subtoken list.
+    subtoken_counter: optional `_SubtokenCounter` of `token_counts` and
+      `alphabet`, counting the subtokens instead of `_count_and_gen_subtokens`.
 
   Returns:
     Sorted list of subtokens (most frequent first)
@@ -648,9 +822,14 @@ def _generate_subtokens(token_counts,
 
     # Create dict mapping subtoken->count, with additional subtokens created
     # from substrings taken from the tokens.
-    subtoken_counts = _count_and_gen_subtokens(token_counts, alphabet,
-                                               subtoken_dict,
-                                               max_subtoken_length)
+    if subtoken_counter is None:
+      subtoken_counts = _count_and_gen_subtokens(token_counts, alphabet,
+                                                 subtoken_dict,
+                                                 max_subtoken_length)
+    else:
+      # The counts of the first iteration do not depend on `min_count`.
+      subtoken_counts = subtoken_counter.count(
+          subtoken_list, max_subtoken_length, cache=(i == 0))
 
     # Generate new list of subtokens sorted by subtoken count.
     subtoken_list, max_subtoken_length = _gen_new_subtoken_list(
@@ -98,6 +98,21 @@ class StringHelperTest(tf.test.TestCase):
                                                     max_subtoken_length)
     self.assertEqual(["ab", "c"], subtokens)
 
+  def test_split_token_to_subtokens_with_trie(self):
+    token = "abcab_"
+    subtokens = ["a", "b", "c", "_", "ab", "abc", "abcab_"]
+    trie = tokenizer._build_subtoken_trie(subtokens)
+    subtoken_dict = tokenizer._list_to_index_dict(subtokens)
+
+    for max_subtoken_length in (1, 2, 3, 6):
+      self.assertEqual(
+          tokenizer._split_token_to_subtokens(token, subtoken_dict,
+                                              max_subtoken_length),
+          tokenizer._split_token_to_subtokens_with_trie(
+              token, trie, max_subtoken_length))
+    with self.assertRaises(ValueError):
+      tokenizer._split_token_to_subtokens_with_trie("abd", trie, 3)
+
   def test_generate_alphabet_dict(self):
     s = ["testing", "123"]
     reserved_tokens = ["???"]
@@ -181,6 +196,25 @@ class StringHelperTest(tf.test.TestCase):
 
     self.assertEqual(len("translate"), max_token_length)
 
+  def test_subtoken_counter_matches_count_and_gen_subtokens(self):
+    text = ("the quick brown fox jumps over the lazy dog; the dogs were "
+            "quickly jumping over foxes_and\\backslashes 12 123 1234")
+    token_counts = collections.defaultdict(int)
+    for i, token in enumerate(
+        tokenizer._split_string_to_tokens(text,
+                                          tokenizer._ALPHANUMERIC_CHAR_SET)):
+      token_counts[token] += i % 3 + 1
+    alphabet = tokenizer._generate_alphabet_dict(token_counts)
+
+    for num_workers in (1, 2):
+      with tokenizer._SubtokenCounter(token_counts, alphabet,
+                                      num_workers) as counter:
+        for min_count in (1, 2, 4):
+          self.assertEqual(
+              tokenizer._generate_subtokens(token_counts, alphabet, min_count),
+              tokenizer._generate_subtokens(
+                  token_counts, alphabet, min_count, subtoken_counter=counter))
+
   def test_generate_subtokens(self):
     token_counts = {"ab": 1, "bc": 3, "abc": 5}
     alphabet = set("abc_")
@@ -16,6 +16,7 @@
 """Script to pre-process pre-training data into tfrecords."""
 
 import json
+import multiprocessing
 import os
 import random
 
@@ -27,7 +28,7 @@ import absl.logging as _logging  # pylint: disable=unused-import
 import numpy as np
 
 
-import tensorflow.google as tf
+import tensorflow.compat.v1 as tf
 from official.nlp.xlnet import preprocess_utils
 import sentencepiece as spm
 
@@ -127,7 +128,7 @@ def _create_data(idx, input_paths):
       continue
 
     input_data = np.array(input_data, dtype=np.int64)
-    sent_ids = np.array(sent_ids, dtype=np.bool)
+    sent_ids = np.array(sent_ids, dtype=bool)
 
     total_line_cnt += line_cnt
     input_shards.append((input_data, sent_ids))
@@ -139,7 +140,8 @@ def _create_data(idx, input_paths):
   filenames, num_batch = [], 0
 
   # Randomly shuffle input shards (with a fixed but distinct random seed)
-  np.random.seed(100 * FLAGS.task + FLAGS.pass_id)
+  np.random.seed(100 * idx + FLAGS.pass_id)
+  random.seed(100 * idx + FLAGS.pass_id)
 
   perm_indices = np.random.permutation(len(input_shards))
   tf.logging.info("Using perm indices %s for pass %d",
@@ -231,10 +233,42 @@ def create_data(_):
 
   tf.logging.info("Task %d process %d files: %s",
                   FLAGS.task, len(task_file_paths), task_file_paths)
-  record_info = _create_data(FLAGS.task, task_file_paths)
+  if FLAGS.num_proc <= 1:
+    _create_task_data((FLAGS.task, task_file_paths))
+    return
+
+  # Split the files of the task among `num_proc` processes, which write their
+  # tfrecords and record info as tasks `task * num_proc + k`.
+  sub_tasks = []
+  for k in range(FLAGS.num_proc):
+    sub_task_file_paths = task_file_paths[k::FLAGS.num_proc]
+    if sub_task_file_paths:
+      sub_tasks.append((FLAGS.task * FLAGS.num_proc + k, sub_task_file_paths))
+  with multiprocessing.Pool(len(sub_tasks)) as pool:
+    record_infos = pool.map(_create_task_data, sub_tasks, chunksize=1)
+  record_info = _merge_record_infos(record_infos)
+  tf.logging.info("Task %d: %d processes wrote %d batches in %d files.",
+                  FLAGS.task, len(sub_tasks), record_info["num_batch"],
+                  len(record_info["filenames"]))
+
+
+def _merge_record_infos(record_infos):
+  """Merges the record infos of several tasks into a single one."""
+  record_info = {"filenames": [], "num_batch": 0}
+  for info in record_infos:
+    record_info["filenames"] += info["filenames"]
+    record_info["num_batch"] += info["num_batch"]
+  return record_info
+
+
+def _create_task_data(task_and_file_paths):
+  """Creates the tfrecords and the record info of a task and its files."""
+  idx, task_file_paths = task_and_file_paths
+  record_info = _create_data(idx, task_file_paths)
 
+  tfrecord_dir = os.path.join(FLAGS.save_dir, "tfrecords")
   record_prefix = "record_info-{}-{}-{}".format(
-      FLAGS.split, FLAGS.task, FLAGS.pass_id)
+      FLAGS.split, idx, FLAGS.pass_id)
   record_name = format_filename(
       prefix=record_prefix,
       bsz_per_host=FLAGS.bsz_per_host,
@@ -251,6 +285,8 @@ def create_data(_):
   with tf.gfile.Open(record_info_path, "w") as fp:
     json.dump(record_info, fp)
 
+  return record_info
+
 
 def batchify(data, bsz_per_host, sent_ids=None):
   num_step = len(data) // bsz_per_host
@@ -265,8 +301,38 @@ def batchify(data, bsz_per_host, sent_ids=None):
   return data
 
 
-def _split_a_and_b(data, sent_ids, begin_idx, tot_len, extend_target=False):
-  """Split two segments from `data` starting from the index `begin_idx`."""
+def _sentence_boundaries(sent_ids):
+  """Returns the indices `i` such that `sent_ids[i] != sent_ids[i - 1]`."""
+  return np.flatnonzero(np.diff(sent_ids)) + 1
+
+
+def _trim_a_and_b(a_len, b_len, tot_len):
+  """Returns the lengths of segments A and B trimmed to `tot_len` tokens.
+
+  The longer segment is shortened one token at a time, B first on ties, until
+  the segments fit.
+  """
+  excess = a_len + b_len - tot_len
+  if excess <= 0:
+    return a_len, b_len
+  if a_len > b_len:
+    cut = min(excess, a_len - b_len)
+    a_len -= cut
+  else:
+    cut = min(excess, b_len - a_len)
+    b_len -= cut
+  excess -= cut
+  return a_len - excess // 2, b_len - (excess + 1) // 2
+
+
+def _split_a_and_b(data, sent_ids, begin_idx, tot_len, extend_target=False,
+                   boundaries=None):
+  """Split two segments from `data` starting from the index `begin_idx`.
+
+  `boundaries` are the sentence boundaries of `sent_ids`, as returned by
+  `_sentence_boundaries`. They are computed if not given, but should be
+  computed once per row when splitting the same row repeatedly.
+  """
 
   data_len = data.shape[0]
   if begin_idx + tot_len >= data_len:
@@ -275,13 +341,15 @@ def _split_a_and_b(data, sent_ids, begin_idx, tot_len, extend_target=False):
                     begin_idx, tot_len, data_len)
     return None
 
-  end_idx = begin_idx + 1
-  cut_points = []
-  while end_idx < data_len:
-    if sent_ids[end_idx] != sent_ids[end_idx - 1]:
-      if end_idx - begin_idx >= tot_len: break
-      cut_points.append(end_idx)
-    end_idx += 1
+  if boundaries is None:
+    boundaries = _sentence_boundaries(sent_ids)
+
+  # The boundaries after `begin_idx` that are less than `tot_len` tokens away
+  # are the cut points; the next one (or the end of the data) ends segment B.
+  cut_begin, cut_end = np.searchsorted(
+      boundaries, [begin_idx + 1, begin_idx + tot_len])
+  cut_points = boundaries[cut_begin:cut_end]
+  end_idx = (boundaries[cut_end] if cut_end < len(boundaries) else data_len)
 
   a_begin = begin_idx
   if len(cut_points) == 0 or random.random() < 0.5:
@@ -295,11 +363,15 @@ def _split_a_and_b(data, sent_ids, begin_idx, tot_len, extend_target=False):
     # (zihangd): `data_len - 1` to account for extend_target
     b_begin = random.randint(0, data_len - 1 - b_len)
     b_end = b_begin + b_len
-    while b_begin > 0 and sent_ids[b_begin - 1] == sent_ids[b_begin]:
-      b_begin -= 1
+    # Extend B to the sentence boundaries around it.
+    b_begin_idx = np.searchsorted(boundaries, b_begin, side="right")
+    b_begin = boundaries[b_begin_idx - 1] if b_begin_idx > 0 else 0
     # (zihangd): `data_len - 1` to account for extend_target
-    while b_end < data_len - 1 and sent_ids[b_end - 1] == sent_ids[b_end]:
-      b_end += 1
+    b_end_idx = np.searchsorted(boundaries, b_end)
+    if b_end_idx < len(boundaries):
+      b_end = min(boundaries[b_end_idx], data_len - 1)
+    else:
+      b_end = data_len - 1
 
     new_begin = a_end
   else:
@@ -310,12 +382,10 @@ def _split_a_and_b(data, sent_ids, begin_idx, tot_len, extend_target=False):
 
     new_begin = b_end
 
-  while a_end - a_begin + b_end - b_begin > tot_len:
-    if a_end - a_begin > b_end - b_begin:
-      # delete the right side only for the LM objective
-      a_end -= 1
-    else:
-      b_end -= 1
+  a_len, b_len = _trim_a_and_b(a_end - a_begin, b_end - b_begin, tot_len)
+  # delete the right side only for the LM objective
+  a_end = a_begin + a_len
+  b_end = b_begin + b_len
 
   ret = [data[a_begin: a_end], data[b_begin: b_end], label, new_begin]
 
@@ -341,12 +411,23 @@ def _is_start_piece(piece):
     return False
 
 
-def _sample_mask(sp, seg, reverse=False, max_gram=5, goal_num_predict=None):
+def _start_piece_table(sp):
+  """Returns a bool array telling, for each id of `sp`, if it starts a token."""
+  return np.array(
+      [_is_start_piece(sp.IdToPiece(i)) for i in range(sp.GetPieceSize())],
+      dtype=bool)
+
+
+def _sample_mask(sp, seg, reverse=False, max_gram=5, goal_num_predict=None,
+                 is_start_piece=None):
   """Sample `goal_num_predict` tokens for partial prediction.
-  About `mask_beta` tokens are chosen in a context of `mask_alpha` tokens."""
+  About `mask_beta` tokens are chosen in a context of `mask_alpha` tokens.
+
+  `is_start_piece` is the table returned by `_start_piece_table(sp)`. The
+  pieces of `seg` are looked up in `sp` if it is not given."""
 
   seg_len = len(seg)
-  mask = np.array([False] * seg_len, dtype=np.bool)
+  mask = np.array([False] * seg_len, dtype=bool)
 
   num_predict = 0
 
@@ -357,6 +438,12 @@ def _sample_mask(sp, seg, reverse=False, max_gram=5, goal_num_predict=None):
   if reverse:
     seg = np.flip(seg, 0)
 
+  if is_start_piece is None:
+    seg_is_start = [_is_start_piece(sp.IdToPiece(x.item())) for x in seg]
+  else:
+    seg_is_start = is_start_piece[seg]
+  start_positions = np.flatnonzero(seg_is_start)
+
   cur_len = 0
   while cur_len < seg_len:
     if goal_num_predict is not None and num_predict >= goal_num_predict: break
@@ -369,20 +456,13 @@ def _sample_mask(sp, seg, reverse=False, max_gram=5, goal_num_predict=None):
     r_ctx = ctx_size - l_ctx
 
     # Find the start position of a complete token
-    beg = cur_len + l_ctx
-    while beg < seg_len and not _is_start_piece(sp.IdToPiece(seg[beg].item())):
-      beg += 1
-    if beg >= seg_len:
+    start_idx = np.searchsorted(start_positions, cur_len + l_ctx)
+    if start_idx >= len(start_positions):
       break
+    beg = start_positions[start_idx]
 
     # Find the end position of the n-gram (start pos of the n+1-th gram)
-    end = beg + 1
-    cnt_ngram = 1
-    while end < seg_len:
-      cnt_ngram += 1
-      if cnt_ngram > n:
-        break
-      end += 1
+    end = beg + n
     if end >= seg_len:
       break
 
@@ -410,7 +490,7 @@ def _sample_mask_ngram(sp, seg, reverse=False, max_gram=5,
   About `mask_beta` tokens are chosen in a context of `mask_alpha` tokens."""
 
   seg_len = len(seg)
-  mask = np.array([False] * seg_len, dtype=np.bool)
+  mask = np.array([False] * seg_len, dtype=bool)
 
   num_predict = 0
 
@@ -524,6 +604,11 @@ def create_tfrecords(save_dir, basename, data, bsz_per_host, seq_len,
   sep_array = np.array([SEP_ID], dtype=np.int64)
   cls_array = np.array([CLS_ID], dtype=np.int64)
 
+  # The rows are split and masked many times: look their sentence boundaries
+  # and the pieces of the vocabulary up once.
+  boundaries = [_sentence_boundaries(row) for row in sent_ids]
+  is_start_piece = _start_piece_table(sp)
+
   i = 0
   while i + seq_len <= data_len:
     if num_batch % 500 == 0:
@@ -540,7 +625,8 @@ def create_tfrecords(save_dir, basename, data, bsz_per_host, seq_len,
           sent_ids[idx],
           begin_idx=i + reuse_len,
           tot_len=seq_len - reuse_len - 3,
-          extend_target=True)
+          extend_target=True,
+          boundaries=boundaries[idx])
       if results is None:
         tf.logging.info("Break out with seq idx %d", i)
         all_ok = False
@@ -557,10 +643,12 @@ def create_tfrecords(save_dir, basename, data, bsz_per_host, seq_len,
         num_predict_1 = FLAGS.num_predict // 2
         num_predict_0 = FLAGS.num_predict - num_predict_1
       mask_0 = _sample_mask(sp, inp, reverse=reverse,
-                            goal_num_predict=num_predict_0)
+                            goal_num_predict=num_predict_0,
+                            is_start_piece=is_start_piece)
       mask_1 = _sample_mask(sp, np.concatenate([a_data, sep_array, b_data,
                                                 sep_array, cls_array]),
-                            reverse=reverse, goal_num_predict=num_predict_1)
+                            reverse=reverse, goal_num_predict=num_predict_1,
+                            is_start_piece=is_start_piece)
 
       # concatenate data
       cat_data = np.concatenate([inp, a_data, sep_array, b_data,
@@ -990,6 +1078,10 @@ if __name__ == "__main__":
   flags.DEFINE_integer("num_task", 1, help="Number of total tasks.")
   flags.DEFINE_integer("task", 0, help="The Task ID. This value is used when "
                        "using multiple workers to identify each worker.")
+  flags.DEFINE_integer("num_proc", 1, help="Number of processes of the task. "
+                       "The files of the task are split among them, and "
+                       "process k writes its data as task `task * num_proc + "
+                       "k`.")
 
   tf.logging.set_verbosity(tf.logging.INFO)
   app.run(create_data)
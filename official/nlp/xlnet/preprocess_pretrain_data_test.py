@@ -0,0 +1,218 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for preprocess_pretrain_data."""
+
+import random
+from unittest import mock
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+from official.nlp.xlnet import preprocess_pretrain_data
+
+_MASK_ALPHA = 6
+_MASK_BETA = 1
+
+_PIECES = ["<unk>", "<s>", "</s>", "▁the", "▁cat", "s", "ing", ",",
+           ".", "▁sat", "ab", "▁on", "er"]
+
+
+class _FakeSentencePiece(object):
+  """The piece lookups of a `SentencePieceProcessor` over `_PIECES`."""
+
+  def IdToPiece(self, i):  # pylint: disable=invalid-name
+    return _PIECES[i]
+
+  def GetPieceSize(self):  # pylint: disable=invalid-name
+    return len(_PIECES)
+
+
+def _loop_split_a_and_b(data, sent_ids, begin_idx, tot_len,
+                        extend_target=False):
+  """The loop implementation `_split_a_and_b` replaced, without logging."""
+  data_len = data.shape[0]
+  if begin_idx + tot_len >= data_len:
+    return None
+
+  end_idx = begin_idx + 1
+  cut_points = []
+  while end_idx < data_len:
+    if sent_ids[end_idx] != sent_ids[end_idx - 1]:
+      if end_idx - begin_idx >= tot_len: break
+      cut_points.append(end_idx)
+    end_idx += 1
+
+  a_begin = begin_idx
+  if len(cut_points) == 0 or random.random() < 0.5:
+    label = 0
+    if len(cut_points) == 0:
+      a_end = end_idx
+    else:
+      a_end = random.choice(cut_points)
+
+    b_len = max(1, tot_len - (a_end - a_begin))
+    b_begin = random.randint(0, data_len - 1 - b_len)
+    b_end = b_begin + b_len
+    while b_begin > 0 and sent_ids[b_begin - 1] == sent_ids[b_begin]:
+      b_begin -= 1
+    while b_end < data_len - 1 and sent_ids[b_end - 1] == sent_ids[b_end]:
+      b_end += 1
+
+    new_begin = a_end
+  else:
+    label = 1
+    a_end = random.choice(cut_points)
+    b_begin = a_end
+    b_end = end_idx
+
+    new_begin = b_end
+
+  while a_end - a_begin + b_end - b_begin > tot_len:
+    if a_end - a_begin > b_end - b_begin:
+      a_end -= 1
+    else:
+      b_end -= 1
+
+  ret = [data[a_begin: a_end], data[b_begin: b_end], label, new_begin]
+
+  if extend_target:
+    if a_end >= data_len or b_end >= data_len:
+      return None
+    a_target = data[a_begin + 1: a_end + 1]
+    b_target = data[b_begin: b_end + 1]
+    ret.extend([a_target, b_target])
+
+  return ret
+
+
+def _loop_sample_mask(sp, seg, reverse=False, max_gram=5,
+                      goal_num_predict=None):
+  """The loop implementation `_sample_mask` replaced."""
+  seg_len = len(seg)
+  mask = np.array([False] * seg_len, dtype=bool)
+
+  num_predict = 0
+
+  ngrams = np.arange(1, max_gram + 1, dtype=np.int64)
+  pvals = 1. / np.arange(1, max_gram + 1)
+  pvals /= pvals.sum(keepdims=True)
+
+  if reverse:
+    seg = np.flip(seg, 0)
+
+  cur_len = 0
+  while cur_len < seg_len:
+    if goal_num_predict is not None and num_predict >= goal_num_predict: break
+
+    n = np.random.choice(ngrams, p=pvals)
+    if goal_num_predict is not None:
+      n = min(n, goal_num_predict - num_predict)
+    ctx_size = (n * _MASK_ALPHA) // _MASK_BETA
+    l_ctx = np.random.choice(ctx_size)
+    r_ctx = ctx_size - l_ctx
+
+    beg = cur_len + l_ctx
+    while beg < seg_len and not preprocess_pretrain_data._is_start_piece(
+        sp.IdToPiece(seg[beg].item())):
+      beg += 1
+    if beg >= seg_len:
+      break
+
+    end = beg + 1
+    cnt_ngram = 1
+    while end < seg_len:
+      cnt_ngram += 1
+      if cnt_ngram > n:
+        break
+      end += 1
+    if end >= seg_len:
+      break
+
+    mask[beg:end] = True
+    num_predict += end - beg
+
+    cur_len = end + r_ctx
+
+  while goal_num_predict is not None and num_predict < goal_num_predict:
+    i = np.random.randint(seg_len)
+    if not mask[i]:
+      mask[i] = True
+      num_predict += 1
+
+  if reverse:
+    mask = np.flip(mask, 0)
+
+  return mask
+
+
+def _random_sent_ids(rng, length, mean_sentence_len):
+  """Returns alternating bool sentence ids of random sentence lengths."""
+  boundaries = rng.uniform(size=length - 1) < 1. / mean_sentence_len
+  return np.cumsum(np.concatenate([[0], boundaries])) % 2 == 1
+
+
+class PreprocessPretrainDataTest(tf.test.TestCase, parameterized.TestCase):
+
+  @parameterized.parameters((2,), (8,), (40,), (1000,))
+  def test_split_a_and_b_matches_loop(self, mean_sentence_len):
+    rng = np.random.RandomState(mean_sentence_len)
+    data = np.arange(300, dtype=np.int64)
+    for trial in range(200):
+      sent_ids = _random_sent_ids(rng, len(data), mean_sentence_len)
+      boundaries = preprocess_pretrain_data._sentence_boundaries(sent_ids)
+      begin_idx = rng.randint(0, 250)
+      tot_len = rng.randint(1, 80)
+      extend_target = bool(trial % 2)
+
+      random.seed(trial)
+      expected = _loop_split_a_and_b(
+          data, sent_ids, begin_idx, tot_len, extend_target=extend_target)
+      for given_boundaries in (None, boundaries):
+        random.seed(trial)
+        result = preprocess_pretrain_data._split_a_and_b(
+            data, sent_ids, begin_idx, tot_len, extend_target=extend_target,
+            boundaries=given_boundaries)
+        if expected is None:
+          self.assertIsNone(result)
+          continue
+        self.assertLen(result, len(expected))
+        for x, y in zip(expected, result):
+          self.assertAllEqual(x, y)
+
+  @parameterized.parameters(
+      (False, None), (True, None), (False, 15), (True, 15), (False, 85))
+  def test_sample_mask_matches_loop(self, reverse, goal_num_predict):
+    sp = _FakeSentencePiece()
+    is_start_piece = preprocess_pretrain_data._start_piece_table(sp)
+    flags = mock.Mock(mask_alpha=_MASK_ALPHA, mask_beta=_MASK_BETA)
+    rng = np.random.RandomState(0)
+    with mock.patch.object(
+        preprocess_pretrain_data, "FLAGS", flags, create=True):
+      for trial in range(100):
+        seg = rng.randint(len(_PIECES), size=rng.randint(90, 120))
+
+        np.random.seed(trial)
+        expected = _loop_sample_mask(
+            sp, seg, reverse=reverse, goal_num_predict=goal_num_predict)
+        for table in (None, is_start_piece):
+          np.random.seed(trial)
+          mask = preprocess_pretrain_data._sample_mask(
+              sp, seg, reverse=reverse, goal_num_predict=goal_num_predict,
+              is_start_piece=table)
+          self.assertAllEqual(expected, mask)
+
+
+if __name__ == "__main__":
+  tf.test.main()
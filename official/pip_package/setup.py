@@ -82,6 +82,9 @@ setup(
         'official.benchmark*',
         'official.colab*',
     ]),
+    package_data={
+        '': ['*.json',],
+    },
     exclude_package_data={
         '': ['*_test.py',],
     },
@@ -1,62 +1,139 @@
 """A simple Python callstack sampler."""
 
+import collections
 import contextlib
-import datetime
-import signal
-import traceback
+import os
+import sys
+import threading
+import time
+
+import tensorflow as tf
+
+
+def _format_frame(frame):
+  code = frame.f_code
+  return '{} ({}:{})'.format(code.co_name, code.co_filename,
+                             code.co_firstlineno)
 
 
 class CallstackSampler(object):
-  """A simple signal-based Python callstack sampler.
+  """A thread-based Python callstack sampler.
+
+  Periodically samples the callstacks of all Python threads, and counts the
+  samples of every distinct stack in the folded format of flame graphs:
+  `thread;outermost function;...;innermost function`. Functions are identified
+  by their name, file and first line, so the memory used is bounded by the
+  number of distinct code paths rather than by the number of samples.
   """
 
-  def __init__(self, interval=None):
-    self.stacks = []
+  def __init__(self, interval=None, duration=None):
+    """Initializes the sampler.
+
+    Args:
+      interval: the sampling interval, in seconds. Defaults to 0.001.
+      duration: the maximum number of seconds to sample for after `start`. If
+        None, samples until `stop` is called.
+    """
+    self.counts = collections.Counter()
     self.interval = 0.001 if interval is None else interval
+    self.duration = duration
+    self._stop_event = threading.Event()
+    self._thread = None
+
+  def _sample(self):
+    """Samples the current stacks of all other threads."""
+    thread_names = {t.ident: t.name for t in threading.enumerate()}
+    for thread_id, frame in sys._current_frames().items():  # pylint: disable=protected-access
+      if thread_id == threading.get_ident():
+        continue
+      stack = []
+      while frame is not None:
+        stack.append(_format_frame(frame))
+        frame = frame.f_back
+      stack.append(thread_names.get(thread_id, str(thread_id)))
+      self.counts[';'.join(reversed(stack))] += 1
+
+  def _run(self):
+    end_time = None if self.duration is None else time.time() + self.duration
+    while not self._stop_event.wait(self.interval):
+      if end_time is not None and time.time() > end_time:
+        break
+      self._sample()
 
-  def _sample(self, signum, frame):
-    """Samples the current stack."""
-    del signum
-    stack = traceback.extract_stack(frame)
-    formatted_stack = []
-    formatted_stack.append(datetime.datetime.utcnow())
-    for filename, lineno, function_name, text in stack:
-      formatted_frame = '{}:{}({})({})'.format(filename, lineno, function_name,
-                                               text)
-      formatted_stack.append(formatted_frame)
-    self.stacks.append(formatted_stack)
-    signal.setitimer(signal.ITIMER_VIRTUAL, self.interval, 0)
+  def start(self):
+    """Starts sampling on a background thread."""
+    if self._thread is not None:
+      return
+    self._stop_event.clear()
+    self._thread = threading.Thread(
+        target=self._run, name='CallstackSampler', daemon=True)
+    self._thread.start()
+
+  def stop(self):
+    """Stops sampling."""
+    if self._thread is None:
+      return
+    self._stop_event.set()
+    self._thread.join()
+    self._thread = None
 
   @contextlib.contextmanager
   def profile(self):
-    signal.signal(signal.SIGVTALRM, self._sample)
-    signal.setitimer(signal.ITIMER_VIRTUAL, self.interval, 0)
+    self.start()
     try:
       yield
     finally:
-      signal.setitimer(signal.ITIMER_VIRTUAL, 0)
+      self.stop()
+
+  def top_self_time(self, n=20):
+    """Returns the `n` functions most often at the top of the stack.
+
+    Args:
+      n: the number of functions to return.
+
+    Returns:
+      A list of (function, number of samples, fraction of samples) tuples.
+    """
+    self_counts = collections.Counter()
+    for stack, count in self.counts.items():
+      self_counts[stack.rsplit(';', 1)[-1]] += count
+    total = sum(self_counts.values())
+    return [(function, count, count / total)
+            for function, count in self_counts.most_common(n)]
 
   def save(self, fname):
-    with open(fname, 'w') as f:
-      for s in self.stacks:
-        for l in s:
-          f.write('%s\n' % l)
-        f.write('\n')
+    """Writes the folded stacks, e.g. for `flamegraph.pl`, to `fname`."""
+    with tf.io.gfile.GFile(fname, 'w') as f:
+      for stack, count in sorted(self.counts.items()):
+        f.write('%s %d\n' % (stack, count))
+
+  def save_top_self_time(self, fname, n=20):
+    """Writes a table of the `n` functions with the most self time."""
+    with tf.io.gfile.GFile(fname, 'w') as f:
+      f.write('%8s %7s  %s\n' % ('samples', 'percent', 'function'))
+      for function, count, fraction in self.top_self_time(n):
+        f.write('%8d %6.2f%%  %s\n' % (count, 100 * fraction, function))
+
+  def write(self, directory):
+    """Writes the folded stacks and the top self-time table to `directory`."""
+    tf.io.gfile.makedirs(directory)
+    self.save(os.path.join(directory, 'callstacks.folded'))
+    self.save_top_self_time(os.path.join(directory, 'callstacks_top.txt'))
 
 
 @contextlib.contextmanager
-def callstack_sampling(filename, interval=None):
-  """Periodically samples the Python callstack.
+def callstack_sampling(filename, interval=None, duration=None):
+  """Periodically samples the Python callstacks of all threads.
 
   Args:
-    filename: the filename
+    filename: the filename to write the folded stacks to.
     interval: the sampling interval, in seconds. Defaults to 0.001.
+    duration: the maximum number of seconds to sample for.
 
   Yields:
    nothing
   """
-  sampler = CallstackSampler(interval=interval)
+  sampler = CallstackSampler(interval=interval, duration=duration)
   with sampler.profile():
     yield
   sampler.save(filename)
-
@@ -0,0 +1,69 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for callstack_sampler."""
+import os
+import time
+
+import tensorflow as tf
+
+from official.utils.misc import callstack_sampler
+
+
+def _busy_loop(seconds):
+  end_time = time.time() + seconds
+  while time.time() < end_time:
+    pass
+
+
+class CallstackSamplerTest(tf.test.TestCase):
+
+  def test_samples_and_writes_folded_stacks(self):
+    sampler = callstack_sampler.CallstackSampler(interval=0.001)
+    with sampler.profile():
+      _busy_loop(0.5)
+    self.assertNotEmpty(sampler.counts)
+    for stack in sampler.counts:
+      self.assertTrue(stack.startswith('MainThread;'))
+    self.assertIn('_busy_loop', ''.join(sampler.counts))
+
+    top = sampler.top_self_time(n=3)
+    self.assertLessEqual(len(top), 3)
+    self.assertIn('_busy_loop', top[0][0])
+    self.assertAllClose(1.0, sum(fraction for _, _, fraction in
+                                 sampler.top_self_time(n=len(sampler.counts))))
+
+    directory = os.path.join(self.get_temp_dir(), 'profile')
+    sampler.write(directory)
+    with tf.io.gfile.GFile(os.path.join(directory, 'callstacks.folded')) as f:
+      lines = f.read().splitlines()
+    self.assertLen(lines, len(sampler.counts))
+    self.assertEqual(
+        sum(sampler.counts.values()),
+        sum(int(line.rsplit(' ', 1)[1]) for line in lines))
+    with tf.io.gfile.GFile(os.path.join(directory, 'callstacks_top.txt')) as f:
+      self.assertIn('_busy_loop', f.read())
+
+  def test_stops_after_duration(self):
+    sampler = callstack_sampler.CallstackSampler(interval=0.001, duration=0.1)
+    sampler.start()
+    _busy_loop(0.5)
+    num_samples = sum(sampler.counts.values())
+    _busy_loop(0.2)
+    self.assertEqual(num_samples, sum(sampler.counts.values()))
+    sampler.stop()
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -63,6 +63,7 @@ class Parser(hyperparams.Config):
   rpn_batch_size_per_im: int = 256
   rpn_fg_fraction: float = 0.5
   mask_crop_size: int = 112
+  defer_anchor_labeling: bool = False
 
 
 @dataclasses.dataclass
@@ -211,6 +212,13 @@ class MaskRCNNTask(cfg.TaskConfig):
   init_checkpoint_modules: str = 'all'  # all or backbone
   annotation_file: Optional[str] = None
   per_category_metrics: bool = False
+  # Matches detections to groundtruths as eval batches arrive instead of
+  # buffering them for pycocotools.
+  use_streaming_eval: bool = False
+  num_eval_processes: int = 1
+  # Pastes the masks of each eval image at once, resampling them like
+  # `mask_ops.paste_instance_masks_v2`.
+  use_batch_mask_paste: bool = False
   # If set, we only use masks for the specified class IDs.
   allowed_mask_class_ids: Optional[List[int]] = None
 
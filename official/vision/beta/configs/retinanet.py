@@ -56,6 +56,7 @@ class Parser(hyperparams.Config):
   aug_scale_max: float = 1.0
   skip_crowd_during_training: bool = True
   max_num_instances: int = 100
+  defer_anchor_labeling: bool = False
 
 
 @dataclasses.dataclass
@@ -130,6 +131,10 @@ class RetinaNetTask(cfg.TaskConfig):
   init_checkpoint_modules: str = 'all'  # all or backbone
   annotation_file: Optional[str] = None
   per_category_metrics: bool = False
+  # Matches detections to groundtruths as eval batches arrive instead of
+  # buffering them for pycocotools.
+  use_streaming_eval: bool = False
+  num_eval_processes: int = 1
 
 
 @exp_factory.register_config_factory('retinanet')
@@ -50,6 +50,9 @@ class DataConfig(cfg.DataConfig):
   cycle_length: int = 10
   drop_remainder: bool = True
   min_image_size: int = 256
+  # Decodes only the crop window of the sampled frames when they already have
+  # `min_image_size` as their smallest side.
+  decode_and_crop: bool = False
   is_multilabel: bool = False
   output_audio: bool = False
   audio_feature: str = ''
@@ -49,6 +49,7 @@ class Parser(parser.Parser):
                num_classes: float,
                aug_rand_hflip: bool = True,
                aug_policy: Optional[str] = None,
+               aug_batched: bool = False,
                dtype: str = 'float32'):
     """Initializes parameters for parsing annotations in the dataset.
 
@@ -59,6 +60,9 @@ class Parser(parser.Parser):
       aug_rand_hflip: `bool`, if True, augment training with random
         horizontal flip.
       aug_policy: `str`, augmentation policies. None, 'autoaug', or 'randaug'.
+      aug_batched: `bool`, if True, `aug_policy` is applied to batches of
+        images by the function returned from `postprocess_fn` rather than to
+        every image by the parser.
       dtype: `str`, cast output image in dtype. It can be 'float32', 'float16',
         or 'bfloat16'.
     """
@@ -84,12 +88,20 @@ class Parser(parser.Parser):
             'Augmentation policy {} not supported.'.format(aug_policy))
     else:
       self._augmenter = None
+    self._aug_batched = aug_batched and self._augmenter is not None
 
   def _parse_train_data(self, decoded_tensors):
     """Parses data for training."""
+    return self._parse_encoded_train_data(
+        *self._select_train_data(decoded_tensors))
+
+  def _select_train_data(self, decoded_tensors):
+    """Returns the still encoded image and the label of a training example."""
     label = tf.cast(decoded_tensors['image/class/label'], dtype=tf.int32)
+    return decoded_tensors['image/encoded'], label
 
-    image_bytes = decoded_tensors['image/encoded']
+  def _parse_encoded_train_data(self, image_bytes, label):
+    """Decodes, crops and augments an encoded training image."""
     image_shape = tf.image.extract_jpeg_shape(image_bytes)
 
     # Crops image.
@@ -108,6 +120,12 @@ class Parser(parser.Parser):
     image = tf.image.resize(
         image, self._output_size, method=tf.image.ResizeMethod.BILINEAR)
 
+    if self._aug_batched:
+      # Augmentation and normalization are deferred to `postprocess_fn`.
+      image = tf.ensure_shape(
+          image, [self._output_size[0], self._output_size[1], 3])
+      return image, label
+
     # Apply autoaug or randaug.
     if self._augmenter is not None:
       image = self._augmenter.distort(image)
@@ -145,3 +163,37 @@ class Parser(parser.Parser):
     image = tf.image.convert_image_dtype(image, self._dtype)
 
     return image, label
+
+  def snapshot_fns(self, is_training):
+    """See base class.
+
+    For training, the snapshot holds the still encoded images, so that it stays
+    as small as the input files and the random crop keeps decoding only the
+    crop window of each JPEG.
+    """
+    if is_training:
+      return self._select_train_data, self._parse_encoded_train_data
+    return super().snapshot_fns(is_training)
+
+  def postprocess_fn(self, is_training):
+    """Returns a function that augments batches of parsed training images.
+
+    Args:
+      is_training: a `bool` to indicate whether it is in training mode.
+
+    Returns:
+      A `callable` mapping batched (images, labels) to augmented and normalized
+      (images, labels), or None if augmentation is not batched.
+    """
+    if not (is_training and self._aug_batched):
+      return None
+
+    def postprocess(images, labels):
+      images = self._augmenter.distort_batch(images)
+      images = preprocess_ops.normalize_image(images,
+                                              offset=MEAN_RGB,
+                                              scale=STDDEV_RGB)
+      images = tf.image.convert_image_dtype(images, self._dtype)
+      return images, labels
+
+    return postprocess
@@ -46,7 +46,8 @@ class Parser(parser.Parser):
                max_num_instances=100,
                include_mask=False,
                mask_crop_size=112,
-               dtype='float32'):
+               dtype='float32',
+               defer_anchor_labeling=False):
     """Initializes parameters for parsing annotations in the dataset.
 
     Args:
@@ -80,6 +81,10 @@ class Parser(parser.Parser):
       include_mask: a bool to indicate whether parse mask groundtruth.
       mask_crop_size: the size which groundtruth mask is cropped to.
       dtype: `str`, data type. One of {`bfloat16`, `float32`, `float16`}.
+      defer_anchor_labeling: `bool`, if True, the training labels do not
+        include RPN targets, and the anchors of a whole batch are labeled at
+        once from the padded `gt_boxes` by the function returned from
+        `postprocess_fn`.
     """
 
     self._max_num_instances = max_num_instances
@@ -98,6 +103,10 @@ class Parser(parser.Parser):
     self._rpn_unmatched_threshold = rpn_unmatched_threshold
     self._rpn_batch_size_per_im = rpn_batch_size_per_im
     self._rpn_fg_fraction = rpn_fg_fraction
+    self._anchor_labeler = anchor.RpnAnchorLabeler(
+        rpn_match_threshold, rpn_unmatched_threshold, rpn_batch_size_per_im,
+        rpn_fg_fraction)
+    self._defer_anchor_labeling = defer_anchor_labeling
 
     # Data augmentation.
     self._aug_rand_hflip = aug_rand_hflip
@@ -224,21 +233,7 @@ class Parser(parser.Parser):
     # Assigns anchor targets.
     # Note that after the target assignment, box targets are absolute pixel
     # offsets w.r.t. the scaled image.
-    input_anchor = anchor.build_anchor_generator(
-        min_level=self._min_level,
-        max_level=self._max_level,
-        num_scales=self._num_scales,
-        aspect_ratios=self._aspect_ratios,
-        anchor_size=self._anchor_size)
-    anchor_boxes = input_anchor(image_size=(image_height, image_width))
-    anchor_labeler = anchor.RpnAnchorLabeler(
-        self._rpn_match_threshold,
-        self._rpn_unmatched_threshold,
-        self._rpn_batch_size_per_im,
-        self._rpn_fg_fraction)
-    rpn_score_targets, rpn_box_targets = anchor_labeler.label_anchors(
-        anchor_boxes, boxes,
-        tf.cast(tf.expand_dims(classes, axis=-1), dtype=tf.float32))
+    anchor_boxes = self._get_anchor_boxes((image_height, image_width))
 
     # Casts input image to self._dtype
     image = tf.cast(image, dtype=self._dtype)
@@ -249,10 +244,6 @@ class Parser(parser.Parser):
             anchor_boxes,
         'image_info':
             image_info,
-        'rpn_score_targets':
-            rpn_score_targets,
-        'rpn_box_targets':
-            rpn_box_targets,
         'gt_boxes':
             preprocess_ops.clip_or_pad_to_fixed_size(boxes,
                                                      self._max_num_instances,
@@ -262,6 +253,11 @@ class Parser(parser.Parser):
                                                      self._max_num_instances,
                                                      -1),
     }
+    if not self._defer_anchor_labeling:
+      (labels['rpn_score_targets'],
+       labels['rpn_box_targets']) = self._anchor_labeler.label_anchors(
+           anchor_boxes, boxes,
+           tf.cast(tf.expand_dims(classes, axis=-1), dtype=tf.float32))
     if self._include_mask:
       labels['gt_masks'] = preprocess_ops.clip_or_pad_to_fixed_size(
           masks, self._max_num_instances, -1)
@@ -314,13 +310,7 @@ class Parser(parser.Parser):
     boxes = box_ops.denormalize_boxes(data['groundtruth_boxes'], image_shape)
 
     # Compute Anchor boxes.
-    input_anchor = anchor.build_anchor_generator(
-        min_level=self._min_level,
-        max_level=self._max_level,
-        num_scales=self._num_scales,
-        aspect_ratios=self._aspect_ratios,
-        anchor_size=self._anchor_size)
-    anchor_boxes = input_anchor(image_size=(image_height, image_width))
+    anchor_boxes = self._get_anchor_boxes((image_height, image_width))
 
     labels = {
         'image_info': image_info,
@@ -343,3 +333,39 @@ class Parser(parser.Parser):
         groundtruths, self._max_num_instances)
     labels['groundtruths'] = groundtruths
     return image, labels
+
+  def _get_anchor_boxes(self, image_size):
+    """Returns the cached multilevel anchor boxes for `image_size`."""
+    return anchor.get_anchor_boxes(
+        min_level=self._min_level,
+        max_level=self._max_level,
+        num_scales=self._num_scales,
+        aspect_ratios=self._aspect_ratios,
+        anchor_size=self._anchor_size,
+        image_size=image_size)
+
+  def postprocess_fn(self, is_training):
+    """Returns a function that labels the anchors of batched examples.
+
+    Args:
+      is_training: a `bool` to indicate whether it is in training mode.
+
+    Returns:
+      A `callable` mapping batched (images, labels) from the parser to
+      (images, labels) with RPN targets, or None if anchor labeling is not
+      deferred.
+    """
+    if not (is_training and self._defer_anchor_labeling):
+      return None
+
+    def postprocess(images, labels):
+      labels = dict(labels)
+      (labels['rpn_score_targets'],
+       labels['rpn_box_targets']) = self._anchor_labeler.label_anchors_batch(
+           self._get_anchor_boxes(images.shape.as_list()[1:3]),
+           labels['gt_boxes'],
+           tf.cast(tf.expand_dims(labels['gt_classes'], axis=-1),
+                   dtype=tf.float32))
+      return images, labels
+
+    return postprocess
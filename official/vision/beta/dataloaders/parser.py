@@ -16,6 +16,8 @@
 
 import abc
 
+import tensorflow as tf
+
 
 class Parser(object):
   """Parses data and produces tensors to be consumed by models."""
@@ -67,3 +69,53 @@ class Parser(object):
         return self._parse_eval_data(decoded_tensors)
 
     return parse
+
+  def snapshot_fns(self, is_training):
+    """Returns the deterministic and the remaining part of `parse_fn`.
+
+    The `InputReader` can store the outputs of the deterministic part in a
+    snapshot, and then only executes the remaining part, e.g. the random
+    augmentation, on the elements read from the snapshot. Parsing is entirely
+    deterministic for evaluation. For training, it is considered entirely
+    random unless a subclass overrides this method, so only the outputs of the
+    decoder are snapshotted (as for RetinaNet and YOLO).
+
+    Args:
+      is_training: a `bool` to indicate whether it is in training mode.
+
+    Returns:
+      A pair of `callable`s, either of which can be None, which compose into
+      `parse_fn(is_training)`.
+    """
+    if is_training:
+      return None, self.parse_fn(is_training)
+    return self.parse_fn(is_training), None
+
+  def snapshot_key(self):
+    """Returns a str identifying the arguments of the parser.
+
+    Attributes which are not of a basic type (e.g. augmenters) are ignored.
+    Dicts and eager tensors (e.g. anchor masks) are keyed by their values.
+    """
+    key = []
+    for name, value in sorted(vars(self).items()):
+      value = _snapshot_value(value)
+      if value is not _IGNORED:
+        key.append((name, value))
+    return repr(key)
+
+
+_IGNORED = object()
+
+
+def _snapshot_value(value):
+  """Returns a representable `value` for `Parser.snapshot_key`, or `_IGNORED`."""
+  if isinstance(value, dict):
+    items = [(str(k), _snapshot_value(v)) for k, v in value.items()]
+    return sorted((k, v) for k, v in items if v is not _IGNORED)
+  if isinstance(value, tf.Tensor) and hasattr(value, 'numpy'):
+    return value.numpy().tolist()
+  basic_types = (type(None), bool, int, float, str, list, tuple, tf.DType)
+  if isinstance(value, basic_types):
+    return value
+  return _IGNORED
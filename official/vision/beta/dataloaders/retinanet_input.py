@@ -48,7 +48,8 @@ class Parser(parser.Parser):
                skip_crowd_during_training=True,
                max_num_instances=100,
                dtype='bfloat16',
-               mode=None):
+               mode=None,
+               defer_anchor_labeling=False):
     """Initializes parameters for parsing annotations in the dataset.
 
     Args:
@@ -88,6 +89,10 @@ class Parser(parser.Parser):
       dtype: `str`, data type. One of {`bfloat16`, `float32`, `float16`}.
       mode: a ModeKeys. Specifies if this is training, evaluation, prediction or
         prediction with groundtruths in the outputs.
+      defer_anchor_labeling: `bool`, if True, the parser outputs groundtruth
+        boxes and classes padded to `max_num_instances` instead of anchor
+        targets, and the anchors of a whole batch are labeled at once by the
+        function returned from `postprocess_fn`.
     """
     self._mode = mode
     self._max_num_instances = max_num_instances
@@ -102,6 +107,9 @@ class Parser(parser.Parser):
     self._anchor_size = anchor_size
     self._match_threshold = match_threshold
     self._unmatched_threshold = unmatched_threshold
+    self._anchor_labeler = anchor.AnchorLabeler(match_threshold,
+                                                unmatched_threshold)
+    self._defer_anchor_labeling = defer_anchor_labeling
 
     # Data augmentation.
     self._aug_rand_hflip = aug_rand_hflip
@@ -167,18 +175,24 @@ class Parser(parser.Parser):
     classes = tf.gather(classes, indices)
 
     # Assigns anchors.
-    input_anchor = anchor.build_anchor_generator(
-        min_level=self._min_level,
-        max_level=self._max_level,
-        num_scales=self._num_scales,
-        aspect_ratios=self._aspect_ratios,
-        anchor_size=self._anchor_size)
-    anchor_boxes = input_anchor(image_size=(image_height, image_width))
-    anchor_labeler = anchor.AnchorLabeler(self._match_threshold,
-                                          self._unmatched_threshold)
-    (cls_targets, box_targets, cls_weights,
-     box_weights) = anchor_labeler.label_anchors(
-         anchor_boxes, boxes, tf.expand_dims(classes, axis=1))
+    anchor_boxes = self._get_anchor_boxes((image_height, image_width))
+    if self._defer_anchor_labeling:
+      anchor_labels = {
+          'gt_boxes': preprocess_ops.clip_or_pad_to_fixed_size(
+              boxes, self._max_num_instances, -1),
+          'gt_classes': preprocess_ops.clip_or_pad_to_fixed_size(
+              classes, self._max_num_instances, -1),
+      }
+    else:
+      (cls_targets, box_targets, cls_weights,
+       box_weights) = self._anchor_labeler.label_anchors(
+           anchor_boxes, boxes, tf.expand_dims(classes, axis=1))
+      anchor_labels = {
+          'cls_targets': cls_targets,
+          'box_targets': box_targets,
+          'cls_weights': cls_weights,
+          'box_weights': box_weights,
+      }
 
     # If bfloat16 is used, casts input image to tf.bfloat16.
     if self._use_bfloat16:
@@ -186,13 +200,10 @@ class Parser(parser.Parser):
 
     # Packs labels for model_fn outputs.
     labels = {
-        'cls_targets': cls_targets,
-        'box_targets': box_targets,
         'anchor_boxes': anchor_boxes,
-        'cls_weights': cls_weights,
-        'box_weights': box_weights,
         'image_info': image_info,
     }
+    labels.update(anchor_labels)
     return image, labels
 
   def _parse_eval_data(self, data):
@@ -232,18 +243,24 @@ class Parser(parser.Parser):
     classes = tf.gather(classes, indices)
 
     # Assigns anchors.
-    input_anchor = anchor.build_anchor_generator(
-        min_level=self._min_level,
-        max_level=self._max_level,
-        num_scales=self._num_scales,
-        aspect_ratios=self._aspect_ratios,
-        anchor_size=self._anchor_size)
-    anchor_boxes = input_anchor(image_size=(image_height, image_width))
-    anchor_labeler = anchor.AnchorLabeler(self._match_threshold,
-                                          self._unmatched_threshold)
-    (cls_targets, box_targets, cls_weights,
-     box_weights) = anchor_labeler.label_anchors(
-         anchor_boxes, boxes, tf.expand_dims(classes, axis=1))
+    anchor_boxes = self._get_anchor_boxes((image_height, image_width))
+    if self._defer_anchor_labeling:
+      anchor_labels = {
+          'gt_boxes': preprocess_ops.clip_or_pad_to_fixed_size(
+              boxes, self._max_num_instances, -1),
+          'gt_classes': preprocess_ops.clip_or_pad_to_fixed_size(
+              classes, self._max_num_instances, -1),
+      }
+    else:
+      (cls_targets, box_targets, cls_weights,
+       box_weights) = self._anchor_labeler.label_anchors(
+           anchor_boxes, boxes, tf.expand_dims(classes, axis=1))
+      anchor_labels = {
+          'cls_targets': cls_targets,
+          'box_targets': box_targets,
+          'cls_weights': cls_weights,
+          'box_weights': box_weights,
+      }
 
     # If bfloat16 is used, casts input image to tf.bfloat16.
     if self._use_bfloat16:
@@ -269,12 +286,46 @@ class Parser(parser.Parser):
 
     # Packs labels for model_fn outputs.
     labels = {
-        'cls_targets': cls_targets,
-        'box_targets': box_targets,
         'anchor_boxes': anchor_boxes,
-        'cls_weights': cls_weights,
-        'box_weights': box_weights,
         'image_info': image_info,
         'groundtruths': groundtruths,
     }
+    labels.update(anchor_labels)
     return image, labels
+
+  def _get_anchor_boxes(self, image_size):
+    """Returns the cached multilevel anchor boxes for `image_size`."""
+    return anchor.get_anchor_boxes(
+        min_level=self._min_level,
+        max_level=self._max_level,
+        num_scales=self._num_scales,
+        aspect_ratios=self._aspect_ratios,
+        anchor_size=self._anchor_size,
+        image_size=image_size)
+
+  def postprocess_fn(self, is_training):
+    """Returns a function that labels the anchors of batched examples.
+
+    Args:
+      is_training: a `bool` to indicate whether it is in training mode.
+
+    Returns:
+      A `callable` mapping batched (images, labels) from the parser to
+      (images, labels) with anchor targets, or None if anchor labeling is not
+      deferred.
+    """
+    del is_training
+    if not self._defer_anchor_labeling:
+      return None
+
+    def postprocess(images, labels):
+      labels = dict(labels)
+      gt_boxes = labels.pop('gt_boxes')
+      gt_classes = labels.pop('gt_classes')
+      (labels['cls_targets'], labels['box_targets'], labels['cls_weights'],
+       labels['box_weights']) = self._anchor_labeler.label_anchors_batch(
+           self._get_anchor_boxes(images.shape.as_list()[1:3]), gt_boxes,
+           tf.expand_dims(gt_classes, axis=-1))
+      return images, labels
+
+    return postprocess
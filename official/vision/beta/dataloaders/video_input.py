@@ -29,6 +29,64 @@ IMAGE_KEY = 'image/encoded'
 LABEL_KEY = 'clip/label/index'
 
 
+def _decode_and_crop_frames(image: tf.Tensor,
+                            is_training: bool,
+                            min_resize: int,
+                            crop_size: int,
+                            seed: Optional[int] = None) -> tf.Tensor:
+  """Decodes the crop window of sampled frames, as in `_process_image`.
+
+  When the frames do not need to be resized, the crop window of the resized
+  frames is known from the JPEG header of the first frame, so only that window
+  is decoded. Otherwise the frames are fully decoded, resized and cropped.
+
+  Args:
+    image: Input Tensor of shape [timesteps] and type tf.string of the sampled
+      serialized frames.
+    is_training: Whether to take a random or a central crop.
+    min_resize: Frames are resized so that min(height, width) is min_resize.
+    crop_size: Final size of the frame after cropping the resized frames.
+    seed: A deterministic seed to use when cropping.
+
+  Returns:
+    Cropped uint8 frames of shape [timesteps, crop_size, crop_size, 3].
+  """
+  shape = tf.image.extract_jpeg_shape(image[0])
+  height, width = shape[0], shape[1]
+  # Same as `preprocess_ops_3d.resize_smallest`.
+  resized_height = tf.maximum(min_resize, (height * min_resize) // width)
+  resized_width = tf.maximum(min_resize, (width * min_resize) // height)
+  can_crop = tf.reduce_all([
+      tf.equal(height, resized_height),
+      tf.equal(width, resized_width),
+      height >= crop_size,
+      width >= crop_size,
+  ])
+
+  def decode_and_crop_fn():
+    if is_training:
+      offset_y = tf.random.uniform(
+          (), maxval=height - crop_size + 1, dtype=tf.int32, seed=seed)
+      offset_x = tf.random.uniform(
+          (), maxval=width - crop_size + 1, dtype=tf.int32, seed=seed)
+    else:
+      # Same as `tf.image.resize_with_crop_or_pad`.
+      offset_y = (height - crop_size) // 2
+      offset_x = (width - crop_size) // 2
+    return preprocess_ops_3d.decode_and_crop_jpeg(
+        image, tf.stack([offset_y, offset_x, crop_size, crop_size]), 3)
+
+  def decode_resize_and_crop_fn():
+    frames = preprocess_ops_3d.decode_jpeg(image, 3)
+    frames = preprocess_ops_3d.resize_smallest(frames, min_resize)
+    return preprocess_ops_3d.crop_image(frames, crop_size, crop_size,
+                                        is_training, seed=seed)
+
+  frames = tf.cond(can_crop, decode_and_crop_fn, decode_resize_and_crop_fn)
+  frames.set_shape(image.shape[:1].concatenate([crop_size, crop_size, 3]))
+  return frames
+
+
 def _process_image(image: tf.Tensor,
                    is_training: bool = True,
                    num_frames: int = 32,
@@ -38,7 +96,8 @@ def _process_image(image: tf.Tensor,
                    crop_size: int = 224,
                    num_crops: int = 1,
                    zero_centering_image: bool = False,
-                   seed: Optional[int] = None) -> tf.Tensor:
+                   seed: Optional[int] = None,
+                   decode_and_crop: bool = False) -> tf.Tensor:
   """Processes a serialized image tensor.
 
   Args:
@@ -59,6 +118,8 @@ def _process_image(image: tf.Tensor,
     zero_centering_image: If True, frames are normalized to values in [-1, 1].
       If False, values in [0, 1].
     seed: A deterministic seed to use when sampling.
+    decode_and_crop: If True, only the crop window of the sampled frames is
+      decoded, when the frames need no resizing. Only used with a single crop.
 
   Returns:
     Processed frames. Tensor of shape
@@ -83,6 +144,13 @@ def _process_image(image: tf.Tensor,
     # Sample middle clip.
     image = preprocess_ops_3d.sample_sequence(image, num_frames, False, stride)
 
+  if decode_and_crop and (is_training or num_crops == 1):
+    image = _decode_and_crop_frames(image, is_training, min_resize, crop_size,
+                                    seed)
+    if is_training:
+      image = preprocess_ops_3d.random_flip_left_right(image, seed)
+    return preprocess_ops_3d.normalize_image(image, zero_centering_image)
+
   # Decode JPEG string to tf.uint8.
   image = preprocess_ops_3d.decode_jpeg(image, 3)
 
@@ -221,6 +289,7 @@ class Parser(parser.Parser):
     self._image_key = image_key
     self._label_key = label_key
     self._dtype = tf.dtypes.as_dtype(input_params.dtype)
+    self._decode_and_crop = input_params.decode_and_crop
     self._output_audio = input_params.output_audio
     if self._output_audio:
       self._audio_feature = input_params.audio_feature
@@ -239,7 +308,8 @@ class Parser(parser.Parser):
         stride=self._stride,
         num_test_clips=self._num_test_clips,
         min_resize=self._min_resize,
-        crop_size=self._crop_size)
+        crop_size=self._crop_size,
+        decode_and_crop=self._decode_and_crop)
     image = tf.cast(image, dtype=self._dtype)
     features = {'image': image}
 
@@ -270,7 +340,8 @@ class Parser(parser.Parser):
         num_test_clips=self._num_test_clips,
         min_resize=self._min_resize,
         crop_size=self._crop_size,
-        num_crops=self._num_crops)
+        num_crops=self._num_crops,
+        decode_and_crop=self._decode_and_crop)
     image = tf.cast(image, dtype=self._dtype)
     features = {'image': image}
 
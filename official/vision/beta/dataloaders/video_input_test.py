@@ -135,6 +135,41 @@ class VideoAndLabelParserTest(tf.test.TestCase):
     self.assertAllEqual(label.shape, (600,))
     self.assertEqual(audio.shape, (15, 256))
 
+  def test_decode_and_crop(self):
+    # Frames of 256x320 need no resizing, unlike frames of 263x320.
+    for height in [256, 263]:
+      seq_example = tf.train.SequenceExample()
+      for _ in range(6):
+        random_image = np.random.randint(
+            0, 256, size=(height, 320, 3), dtype=np.uint8)
+        with io.BytesIO() as buffer:
+          Image.fromarray(random_image).save(buffer, format='JPEG')
+          seq_example.feature_lists.feature_list.get_or_create(
+              video_input.IMAGE_KEY).feature.add().bytes_list.value[:] = [
+                  buffer.getvalue()
+              ]
+      seq_example.context.feature[video_input.LABEL_KEY].int64_list.value[:] = [
+          42
+      ]
+      decoded_tensors = video_input.Decoder().decode(
+          tf.constant(seq_example.SerializeToString()))
+
+      for is_training in [True, False]:
+        images = []
+        for decode_and_crop in [False, True]:
+          params = exp_cfg.kinetics600(is_training=is_training)
+          params.feature_shape = (2, 224, 224, 3)
+          params.temporal_stride = 2
+          params.min_image_size = 256
+          params.decode_and_crop = decode_and_crop
+          parser = video_input.Parser(params).parse_fn(is_training)
+          features, _ = parser(decoded_tensors)
+          images.append(features['image'])
+        self.assertAllEqual(images[0].shape, (2, 224, 224, 3))
+        self.assertAllEqual(images[1].shape, (2, 224, 224, 3))
+        if not is_training:
+          self.assertAllEqual(images[0], images[1])
+
 
 if __name__ == '__main__':
   tf.test.main()
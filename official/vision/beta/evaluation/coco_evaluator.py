@@ -35,6 +35,7 @@ from pycocotools import cocoeval
 import six
 import tensorflow as tf
 
+from official.vision.beta.evaluation import coco_streaming_eval
 from official.vision.beta.evaluation import coco_utils
 
 
@@ -45,7 +46,10 @@ class COCOEvaluator(object):
                annotation_file,
                include_mask,
                need_rescale_bboxes=True,
-               per_category_metrics=False):
+               per_category_metrics=False,
+               use_streaming_eval=False,
+               num_eval_processes=None,
+               use_batch_mask_paste=False):
     """Constructs COCO evaluation class.
 
     The class provides the interface to COCO metrics_fn. The
@@ -62,6 +66,16 @@ class COCOEvaluator(object):
       need_rescale_bboxes: If true bboxes in `predictions` will be rescaled back
         to absolute values (`image_info` is needed in this case).
       per_category_metrics: Whether to return per category metrics.
+      use_streaming_eval: If true, detections are matched to the groundtruths
+        as batches arrive with `coco_streaming_eval.StreamingCOCOEval` instead
+        of being buffered for `pycocotools`. The metrics are the same.
+      num_eval_processes: The number of processes used to accumulate the
+        streaming evaluation by category.
+      use_batch_mask_paste: If true, the detection masks of each image are
+        pasted and encoded at once with
+        `mask_ops.batch_paste_instance_masks`. It resamples the masks like
+        `mask_ops.paste_instance_masks_v2`, so the mask metrics differ slightly
+        from the default `mask_ops.paste_instance_masks`.
     """
     if annotation_file:
       if annotation_file.startswith('gs://'):
@@ -78,6 +92,7 @@ class COCOEvaluator(object):
     self._annotation_file = annotation_file
     self._include_mask = include_mask
     self._per_category_metrics = per_category_metrics
+    self._use_batch_mask_paste = use_batch_mask_paste
     self._metric_names = [
         'AP', 'AP50', 'AP75', 'APs', 'APm', 'APl', 'ARmax1', 'ARmax10',
         'ARmax100', 'ARs', 'ARm', 'ARl'
@@ -98,6 +113,17 @@ class COCOEvaluator(object):
       self._required_prediction_fields.extend(['detection_masks'])
       self._required_groundtruth_fields.extend(['masks'])
 
+    self._streaming_evals = None
+    if use_streaming_eval:
+      self._streaming_evals = [
+          coco_streaming_eval.StreamingCOCOEval(
+              iou_type='bbox', num_processes=num_eval_processes)
+      ]
+      if self._include_mask:
+        self._streaming_evals.append(
+            coco_streaming_eval.StreamingCOCOEval(
+                iou_type='segm', num_processes=num_eval_processes))
+
     self.reset_states()
 
   @property
@@ -109,6 +135,9 @@ class COCOEvaluator(object):
     self._predictions = {}
     if not self._annotation_file:
       self._groundtruths = {}
+    if self._streaming_evals:
+      for streaming_eval in self._streaming_evals:
+        streaming_eval.reset()
 
   def result(self):
     """Evaluates detection results, and reset_states."""
@@ -124,6 +153,9 @@ class COCOEvaluator(object):
       coco_metric: float numpy array with shape [24] representing the
         coco-style evaluation metrics (box and mask).
     """
+    if self._streaming_evals:
+      return self._evaluate_streaming()
+
     if not self._annotation_file:
       logging.info('There is no annotation_file in COCOEvaluator.')
       gt_dataset = coco_utils.convert_groundtruths_to_coco_dataset(
@@ -135,7 +167,7 @@ class COCOEvaluator(object):
       logging.info('Using annotation file: %s', self._annotation_file)
       coco_gt = self._coco_gt
     coco_predictions = coco_utils.convert_predictions_to_coco_annotations(
-        self._predictions)
+        self._predictions, use_batch_mask_paste=self._use_batch_mask_paste)
     coco_dt = coco_gt.loadRes(predictions=coco_predictions)
     image_ids = [ann['image_id'] for ann in coco_predictions]
 
@@ -173,11 +205,35 @@ class COCOEvaluator(object):
 
     return metrics_dict
 
+  def _evaluate_streaming(self):
+    """Evaluates the detections matched by the streaming evaluations."""
+    category_ids = None
+    if self._annotation_file:
+      category_ids = self._coco_gt.getCatIds()
+    metrics = np.hstack([
+        streaming_eval.evaluate(category_ids)
+        for streaming_eval in self._streaming_evals
+    ])
+
+    metrics_dict = {}
+    for i, name in enumerate(self._metric_names):
+      metrics_dict[name] = metrics[i].astype(np.float32)
+
+    if self._per_category_metrics:
+      metrics_dict.update(
+          self._retrieve_per_category_metrics(self._streaming_evals[0]))
+      if self._include_mask:
+        metrics_dict.update(self._retrieve_per_category_metrics(
+            self._streaming_evals[1], prefix='mask'))
+
+    return metrics_dict
+
   def _retrieve_per_category_metrics(self, coco_eval, prefix=''):
     """Retrieves and per-category metrics and retuns them in a dict.
 
     Args:
-      coco_eval: a cocoeval.COCOeval object containing evaluation data.
+      coco_eval: a cocoeval.COCOeval or coco_streaming_eval.StreamingCOCOEval
+        object containing evaluation data.
       prefix: str, A string used to prefix metric names.
 
     Returns:
@@ -317,11 +373,6 @@ class COCOEvaluator(object):
             'Missing the required key `{}` in predictions!'.format(k))
     if self._need_rescale_bboxes:
       self._process_predictions(predictions)
-    for k, v in six.iteritems(predictions):
-      if k not in self._predictions:
-        self._predictions[k] = [v]
-      else:
-        self._predictions[k].append(v)
 
     if not self._annotation_file:
       assert groundtruths
@@ -329,8 +380,43 @@ class COCOEvaluator(object):
         if k not in groundtruths:
           raise ValueError(
               'Missing the required key `{}` in groundtruths!'.format(k))
+
+    if self._streaming_evals:
+      self._update_streaming_evals(groundtruths, predictions)
+      return
+
+    for k, v in six.iteritems(predictions):
+      if k not in self._predictions:
+        self._predictions[k] = [v]
+      else:
+        self._predictions[k].append(v)
+
+    if not self._annotation_file:
       for k, v in six.iteritems(groundtruths):
         if k not in self._groundtruths:
           self._groundtruths[k] = [v]
         else:
           self._groundtruths[k].append(v)
+
+  def _update_streaming_evals(self, groundtruths, predictions):
+    """Matches a batch of predictions in the streaming evaluations."""
+    if self._annotation_file:
+      image_groundtruths = None
+    else:
+      image_groundtruths = dict(
+          coco_streaming_eval.convert_groundtruths_to_images(
+              groundtruths, self._include_mask))
+    image_detections = coco_streaming_eval.convert_predictions_to_images(
+        predictions, self._include_mask,
+        use_batch_mask_paste=self._use_batch_mask_paste)
+    for image_id, detections in image_detections:
+      if image_groundtruths is None:
+        if image_id not in self._coco_gt.imgs:
+          raise ValueError('Results do not correspond to the current dataset!')
+        image_gt = coco_streaming_eval.image_groundtruths_from_coco(
+            self._coco_gt, image_id, self._include_mask)
+      else:
+        image_gt = image_groundtruths[int(image_id)]
+      self._streaming_evals[0].add_image(image_id, image_gt, detections)
+      if self._include_mask:
+        self._streaming_evals[1].add_image(image_id, image_gt, detections)
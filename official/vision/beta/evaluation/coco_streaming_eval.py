@@ -0,0 +1,533 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Streaming COCO detection evaluation.
+
+`StreamingCOCOEval` computes the same metrics as `pycocotools`
+`COCOeval.evaluate()`, `accumulate()` and `summarize()`, but it matches the
+detections of each image to its groundtruths as soon as the image is added and
+only keeps per-category detection scores and packed match flags around until
+the final accumulation. The accumulation is vectorized per category and can be
+spread over a process pool.
+
+The following snippet demonstrates the use of interfaces:
+
+  coco_eval = StreamingCOCOEval(iou_type='bbox')
+  for image_id, groundtruths, detections in ...:
+    coco_eval.add_image(image_id, groundtruths, detections)
+  stats = coco_eval.evaluate()  # the 12 COCO AP/AR stats.
+"""
+
+import multiprocessing
+
+# Import libraries
+from absl import logging
+import numpy as np
+from PIL import Image
+from pycocotools import cocoeval
+from pycocotools import mask as mask_api
+import six
+
+from official.vision.beta.ops import box_ops
+from official.vision.beta.ops import mask_ops
+
+
+def _box_iou(dt_boxes, gt_boxes, gt_is_crowd):
+  """Computes the IoU of [D, 4] and [G, 4] boxes in xywh format.
+
+  This follows the arithmetic of `pycocotools.mask.iou` exactly, so that the
+  matching results are bit identical. For crowd groundtruths the union is the
+  area of the detection.
+
+  Args:
+    dt_boxes: a numpy array of shape [D, 4].
+    gt_boxes: a numpy array of shape [G, 4].
+    gt_is_crowd: a boolean numpy array of shape [G].
+
+  Returns:
+    ious: a float64 numpy array of shape [D, G].
+  """
+  dt_boxes = np.asarray(dt_boxes, dtype=np.float64)
+  gt_boxes = np.asarray(gt_boxes, dtype=np.float64)
+  dx, dy, dw, dh = [dt_boxes[:, i:i + 1] for i in range(4)]
+  gx, gy, gw, gh = [gt_boxes[:, i] for i in range(4)]
+  dt_areas = dw * dh
+  gt_areas = gw * gh
+  width = np.minimum(dw + dx, gw + gx) - np.maximum(dx, gx)
+  height = np.minimum(dh + dy, gh + gy) - np.maximum(dy, gy)
+  intersection = width * height
+  union = np.where(gt_is_crowd, dt_areas, dt_areas + gt_areas - intersection)
+  with np.errstate(divide='ignore', invalid='ignore'):
+    ious = intersection / union
+  return np.where((width > 0) & (height > 0), ious, 0.0)
+
+
+def _last_argmax(values):
+  """Returns the index of the last maximum along the last axis."""
+  return values.shape[-1] - 1 - np.argmax(values[..., ::-1], axis=-1)
+
+
+def _match_detections(ious, gt_ignore, gt_is_crowd, iou_thresholds):
+  """Greedily matches detections to groundtruths at all IoU thresholds.
+
+  This is the matching of `COCOeval.evaluateImg`, vectorized over the IoU
+  thresholds.
+
+  Args:
+    ious: a numpy array of shape [D, G]. Detections are sorted by descending
+      score and groundtruths are sorted so that ignored ones come last.
+    gt_ignore: a boolean numpy array of shape [G].
+    gt_is_crowd: a boolean numpy array of shape [G].
+    iou_thresholds: a numpy array of shape [T].
+
+  Returns:
+    matches: an int numpy array of shape [T, D] with the index of the matched
+      groundtruth, or -1 if the detection is unmatched.
+  """
+  num_detections, num_groundtruths = ious.shape
+  thresholds = np.minimum(iou_thresholds, 1 - 1e-10)[:, np.newaxis]
+  matches = -np.ones((len(iou_thresholds), num_detections), dtype=np.int64)
+  if num_detections == 0 or num_groundtruths == 0:
+    return matches
+
+  num_regular = int(np.count_nonzero(~gt_ignore))
+  gt_matched = np.zeros((len(iou_thresholds), num_groundtruths), dtype=bool)
+  rows = np.arange(len(iou_thresholds))
+  for d in range(num_detections):
+    eligible = ((~gt_matched | gt_is_crowd) &
+                (ious[d][np.newaxis, :] >= thresholds))
+    candidates = np.where(eligible, ious[d][np.newaxis, :], -1.0)
+    # Among the eligible groundtruths `COCOeval` keeps the last one with the
+    # highest IoU, and only falls back to ignored groundtruths if no regular
+    # one can be matched.
+    match = -np.ones(len(iou_thresholds), dtype=np.int64)
+    if num_regular:
+      has_regular = eligible[:, :num_regular].any(axis=1)
+      match = np.where(has_regular,
+                       _last_argmax(candidates[:, :num_regular]), match)
+    if num_regular < num_groundtruths:
+      has_ignored = eligible[:, num_regular:].any(axis=1)
+      match = np.where(
+          (match < 0) & has_ignored,
+          num_regular + _last_argmax(candidates[:, num_regular:]), match)
+    matched_rows = match >= 0
+    gt_matched[rows[matched_rows], match[matched_rows]] = True
+    matches[:, d] = match
+  return matches
+
+
+def _accumulate_category(args):
+  """Computes precision and recall of a single category.
+
+  Args:
+    args: a tuple of (detections, num_groundtruths, iou_thresholds,
+      recall_thresholds, max_detections). `detections` is a list of
+      (image_id, scores, packed_states) tuples and `num_groundtruths` holds the
+      number of non-ignored groundtruths per area range.
+
+  Returns:
+    A tuple of precision with shape [T, R, A, M] and recall with shape
+    [T, A, M], where entries without groundtruths are -1.
+  """
+  (detections, num_groundtruths, iou_thresholds, recall_thresholds,
+   max_detections) = args
+  num_iou_thresholds = len(iou_thresholds)
+  num_area_ranges = len(num_groundtruths)
+  precision = -np.ones((num_iou_thresholds, len(recall_thresholds),
+                        num_area_ranges, len(max_detections)))
+  recall = -np.ones((num_iou_thresholds, num_area_ranges, len(max_detections)))
+  if not np.any(num_groundtruths):
+    return precision, recall
+
+  # `COCOeval` concatenates per-image results in sorted image id order.
+  detections = sorted(detections, key=lambda x: x[0])
+  num_states = 2 * num_area_ranges * num_iou_thresholds
+  if detections:
+    scores = np.concatenate([x[1] for x in detections])
+    ranks = np.concatenate([np.arange(len(x[1])) for x in detections])
+    states = np.unpackbits(
+        np.concatenate([x[2] for x in detections]), axis=1,
+        count=num_states).astype(bool)
+  else:
+    scores = np.zeros([0], dtype=np.float32)
+    ranks = np.zeros([0], dtype=np.int64)
+    states = np.zeros([0, num_states], dtype=bool)
+  states = states.reshape(
+      [-1, 2, num_area_ranges, num_iou_thresholds]).transpose([1, 2, 3, 0])
+
+  for m, max_detection in enumerate(max_detections):
+    keep = ranks < max_detection
+    order = np.argsort(-scores[keep], kind='mergesort')
+    for a in range(num_area_ranges):
+      if num_groundtruths[a] == 0:
+        continue
+      matched = states[0, a][:, keep][:, order]
+      ignored = states[1, a][:, keep][:, order]
+      tp_sum = np.cumsum(matched & ~ignored, axis=1).astype(np.float64)
+      fp_sum = np.cumsum(~matched & ~ignored, axis=1).astype(np.float64)
+      num_kept = tp_sum.shape[1]
+      recalls = tp_sum / num_groundtruths[a]
+      precisions = tp_sum / (fp_sum + tp_sum + np.spacing(1))
+      # Makes precision monotonically decreasing.
+      precisions = np.maximum.accumulate(precisions[:, ::-1], axis=1)[:, ::-1]
+      for t in range(num_iou_thresholds):
+        recall[t, a, m] = recalls[t, -1] if num_kept else 0
+        inds = np.searchsorted(recalls[t], recall_thresholds, side='left')
+        valid = inds < num_kept
+        q = np.zeros(len(recall_thresholds))
+        q[valid] = precisions[t, inds[valid]]
+        precision[t, :, a, m] = q
+  return precision, recall
+
+
+class StreamingCOCOEval(object):
+  """COCO detection evaluation that matches detections image by image."""
+
+  def __init__(self, iou_type='bbox', num_processes=None):
+    """Constructs a streaming COCO evaluation.
+
+    Args:
+      iou_type: either 'bbox' or 'segm'.
+      num_processes: if larger than 1, the final accumulation is spread across
+        a process pool of this size by category.
+    """
+    if iou_type not in ['bbox', 'segm']:
+      raise ValueError('The `iou_type` can only be either `bbox` or `segm`.')
+    self._iou_type = iou_type
+    self._num_processes = num_processes
+    self.params = cocoeval.Params(iouType=iou_type)
+    self.reset()
+
+  def reset(self):
+    """Resets internal states for a fresh run."""
+    self._detections = {}
+    self._num_groundtruths = {}
+    self._image_ids = set()
+    self.stats = None
+    self.category_stats = None
+
+  def add_image(self, image_id, groundtruths, detections):
+    """Matches the detections of one image against its groundtruths.
+
+    Every image is expected to be added once. As in `COCOeval`, images without
+    any detections should still be added so that their groundtruths count.
+
+    Args:
+      image_id: the id of the image.
+      groundtruths: a dictionary with the following fields for G instances.
+        - classes: a numpy array of int of shape [G].
+        - areas: a numpy array of float of shape [G].
+        - is_crowd: a numpy array of bool of shape [G].
+        - boxes: a numpy array of float of shape [G, 4] in xywh format, if the
+            `iou_type` is 'bbox'.
+        - masks: a list of G COCO RLEs, if the `iou_type` is 'segm'.
+      detections: a dictionary with the following fields for D instances.
+        - classes: a numpy array of int of shape [D].
+        - scores: a numpy array of float of shape [D].
+        - areas: a numpy array of float of shape [D].
+        - boxes: a numpy array of float of shape [D, 4] in xywh format, if the
+            `iou_type` is 'bbox'.
+        - masks: a list of D COCO RLEs, if the `iou_type` is 'segm'.
+    """
+    p = self.params
+    self._image_ids.add(image_id)
+    area_ranges = np.array(p.areaRng, dtype=np.float64)
+    gt_classes = np.asarray(groundtruths['classes'])
+    dt_classes = np.asarray(detections['classes'])
+    for category_id in np.unique(np.concatenate([gt_classes, dt_classes])):
+      gt_indices = np.flatnonzero(gt_classes == category_id)
+      dt_indices = np.flatnonzero(dt_classes == category_id)
+      dt_scores = np.asarray(detections['scores'])[dt_indices]
+      dt_order = np.argsort(-dt_scores, kind='mergesort')[:p.maxDets[-1]]
+      dt_indices = dt_indices[dt_order]
+      dt_scores = dt_scores[dt_order]
+
+      gt_areas = np.asarray(groundtruths['areas'])[gt_indices]
+      gt_is_crowd = np.asarray(groundtruths['is_crowd'],
+                               dtype=bool)[gt_indices]
+      dt_areas = np.asarray(detections['areas'])[dt_indices]
+      ious = self._compute_iou(groundtruths, detections, gt_indices,
+                               dt_indices, gt_is_crowd)
+
+      # [A, G] and [A, D] flags telling whether instances are out of range.
+      gt_out_of_range = ((gt_areas < area_ranges[:, 0:1]) |
+                         (gt_areas > area_ranges[:, 1:2]))
+      dt_out_of_range = ((dt_areas < area_ranges[:, 0:1]) |
+                         (dt_areas > area_ranges[:, 1:2]))
+      num_area_ranges = len(area_ranges)
+      matched = np.zeros(
+          [num_area_ranges, len(p.iouThrs), len(dt_indices)], dtype=bool)
+      ignored = np.zeros_like(matched)
+      num_groundtruths = np.zeros([num_area_ranges], dtype=np.int64)
+      for a in range(num_area_ranges):
+        gt_ignore = gt_is_crowd | gt_out_of_range[a]
+        gt_order = np.argsort(gt_ignore, kind='mergesort')
+        matches = _match_detections(ious[:, gt_order], gt_ignore[gt_order],
+                                    gt_is_crowd[gt_order], p.iouThrs)
+        matched[a] = matches >= 0
+        # Matched detections inherit the ignore flag of their groundtruth,
+        # unmatched ones are ignored if they are out of the area range.
+        matched_ignore = np.append(gt_ignore[gt_order], False)[matches]
+        ignored[a] = np.where(matched[a], matched_ignore,
+                              dt_out_of_range[a][np.newaxis, :])
+        num_groundtruths[a] = np.count_nonzero(~gt_ignore)
+
+      category_id = int(category_id)
+      if category_id not in self._num_groundtruths:
+        self._num_groundtruths[category_id] = num_groundtruths
+        self._detections[category_id] = []
+      else:
+        self._num_groundtruths[category_id] += num_groundtruths
+      if dt_indices.size:
+        states = np.stack([matched, ignored]).reshape([-1, len(dt_indices)])
+        self._detections[category_id].append(
+            (image_id, dt_scores, np.packbits(states.T, axis=1)))
+
+  def _compute_iou(self, groundtruths, detections, gt_indices, dt_indices,
+                   gt_is_crowd):
+    """Computes the [D, G] IoU of the given detections and groundtruths."""
+    if gt_indices.size == 0 or dt_indices.size == 0:
+      return np.zeros([len(dt_indices), len(gt_indices)])
+    if self._iou_type == 'bbox':
+      return _box_iou(
+          np.asarray(detections['boxes'])[dt_indices],
+          np.asarray(groundtruths['boxes'])[gt_indices], gt_is_crowd)
+    return np.asarray(
+        mask_api.iou([detections['masks'][i] for i in dt_indices],
+                     [groundtruths['masks'][i] for i in gt_indices],
+                     [int(c) for c in gt_is_crowd]))
+
+  def evaluate(self, category_ids=None):
+    """Accumulates the matches of all images and summarizes the metrics.
+
+    Args:
+      category_ids: the category ids to evaluate, which are all categories of
+        the groundtruth dataset in `COCOeval`. If None, all categories that
+        have been seen in the groundtruths or detections are used.
+
+    Returns:
+      stats: a float numpy array of shape [12] with the COCO AP/AR stats.
+    """
+    p = self.params
+    if category_ids is None:
+      category_ids = self._num_groundtruths.keys()
+    p.catIds = sorted(category_ids)
+    p.imgIds = sorted(self._image_ids)
+    num_area_ranges = len(p.areaRng)
+    accumulate_args = [
+        (self._detections.get(category_id, []),
+         self._num_groundtruths.get(category_id,
+                                    np.zeros([num_area_ranges], np.int64)),
+         p.iouThrs, p.recThrs, p.maxDets) for category_id in p.catIds
+    ]
+    if self._num_processes and self._num_processes > 1:
+      pool = multiprocessing.Pool(processes=self._num_processes)
+      try:
+        results = pool.map(_accumulate_category, accumulate_args)
+      finally:
+        pool.close()
+        pool.join()
+    else:
+      results = [_accumulate_category(args) for args in accumulate_args]
+
+    if results:
+      precision = np.stack([r[0] for r in results], axis=2)
+      recall = np.stack([r[1] for r in results], axis=1)
+    else:
+      precision = -np.ones(
+          [len(p.iouThrs), len(p.recThrs), 0, num_area_ranges,
+           len(p.maxDets)])
+      recall = -np.ones([len(p.iouThrs), 0, num_area_ranges, len(p.maxDets)])
+
+    self.stats = self._summarize(precision, recall, log=True)
+    self.category_stats = np.zeros([len(self.stats), len(p.catIds)])
+    for k in range(len(p.catIds)):
+      self.category_stats[:, k] = self._summarize(precision[:, :, k:k + 1],
+                                                  recall[:, k:k + 1])
+    return self.stats
+
+  def _summarize(self, precision, recall, log=False):
+    """Computes the 12 stats of `COCOeval.summarize()`."""
+    p = self.params
+
+    def _summarize_one(ap=1, iou_threshold=None, area_range='all',
+                       max_detections=100):
+      aind = [i for i, a in enumerate(p.areaRngLbl) if a == area_range]
+      mind = [i for i, m in enumerate(p.maxDets) if m == max_detections]
+      s = precision if ap == 1 else recall
+      if iou_threshold is not None:
+        s = s[np.where(iou_threshold == p.iouThrs)[0]]
+      s = s[:, :, :, aind, mind] if ap == 1 else s[:, :, aind, mind]
+      mean_s = -1 if len(s[s > -1]) == 0 else np.mean(s[s > -1])
+      if log:
+        logging.info(
+            ' %-18s %s @[ IoU=%-9s | area=%6s | maxDets=%3d ] = %0.3f',
+            'Average Precision' if ap == 1 else 'Average Recall',
+            '(AP)' if ap == 1 else '(AR)',
+            ('{:0.2f}:{:0.2f}'.format(p.iouThrs[0], p.iouThrs[-1])
+             if iou_threshold is None else '{:0.2f}'.format(iou_threshold)),
+            area_range, max_detections, mean_s)
+      return mean_s
+
+    max_dets = p.maxDets[2]
+    return np.array([
+        _summarize_one(1),
+        _summarize_one(1, iou_threshold=.5, max_detections=max_dets),
+        _summarize_one(1, iou_threshold=.75, max_detections=max_dets),
+        _summarize_one(1, area_range='small', max_detections=max_dets),
+        _summarize_one(1, area_range='medium', max_detections=max_dets),
+        _summarize_one(1, area_range='large', max_detections=max_dets),
+        _summarize_one(0, max_detections=p.maxDets[0]),
+        _summarize_one(0, max_detections=p.maxDets[1]),
+        _summarize_one(0, max_detections=max_dets),
+        _summarize_one(0, area_range='small', max_detections=max_dets),
+        _summarize_one(0, area_range='medium', max_detections=max_dets),
+        _summarize_one(0, area_range='large', max_detections=max_dets),
+    ])
+
+
+def image_groundtruths_from_coco(coco_gt, image_id, include_mask):
+  """Collects the groundtruths of one image from a COCO API object.
+
+  Args:
+    coco_gt: a `pycocotools.coco.COCO` object holding the groundtruths.
+    image_id: the id of the image.
+    include_mask: whether to also return the groundtruth masks as RLEs.
+
+  Returns:
+    A groundtruth dictionary as expected by `StreamingCOCOEval.add_image`.
+  """
+  annotations = coco_gt.imgToAnns[image_id]
+  groundtruths = {
+      'classes': np.array([ann['category_id'] for ann in annotations],
+                          dtype=np.int64),
+      'areas': np.array([ann['area'] for ann in annotations],
+                        dtype=np.float64),
+      'is_crowd': np.array(
+          [bool(ann.get('iscrowd', 0)) for ann in annotations], dtype=bool),
+      'boxes': np.array([ann['bbox'] for ann in annotations],
+                        dtype=np.float64).reshape([-1, 4]),
+  }
+  if include_mask:
+    groundtruths['masks'] = [coco_gt.annToRLE(ann) for ann in annotations]
+  return groundtruths
+
+
+def convert_groundtruths_to_images(groundtruths, include_mask):
+  """Splits a batch of groundtruths into per-image groundtruths.
+
+  The conversion mirrors `coco_utils.convert_groundtruths_to_coco_dataset`.
+
+  Args:
+    groundtruths: a dictionary of numpy arrays of a single batch. See
+      `COCOEvaluator.update_state` for the fields.
+    include_mask: whether to also return the groundtruth masks as RLEs.
+
+  Yields:
+    A tuple of (image_id, groundtruths) for each image in the batch.
+  """
+  boxes = groundtruths['boxes']
+  max_num_instances = groundtruths['classes'].shape[1]
+  for j in range(groundtruths['source_id'].shape[0]):
+    num_instances = int(groundtruths['num_detections'][j])
+    if num_instances > max_num_instances:
+      logging.warning(
+          'num_groundtruths is larger than max_num_instances, %d v.s. %d',
+          num_instances, max_num_instances)
+      num_instances = max_num_instances
+    image_boxes = boxes[j, :num_instances]
+    widths = image_boxes[:, 3] - image_boxes[:, 1]
+    heights = image_boxes[:, 2] - image_boxes[:, 0]
+    image_groundtruths = {
+        'classes': groundtruths['classes'][j, :num_instances].astype(np.int64),
+        'boxes': np.stack([image_boxes[:, 1], image_boxes[:, 0], widths,
+                           heights], axis=-1).astype(np.float64),
+    }
+    if 'is_crowds' in groundtruths:
+      image_groundtruths['is_crowd'] = (
+          groundtruths['is_crowds'][j, :num_instances].astype(bool))
+    else:
+      image_groundtruths['is_crowd'] = np.zeros([num_instances], dtype=bool)
+    if 'areas' in groundtruths:
+      image_groundtruths['areas'] = (
+          groundtruths['areas'][j, :num_instances].astype(np.float64))
+    else:
+      image_groundtruths['areas'] = (widths * heights).astype(np.float64)
+    if include_mask:
+      masks = []
+      for k in range(num_instances):
+        mask = Image.open(six.BytesIO(groundtruths['masks'][j, k]))
+        width, height = mask.size
+        np_mask = (
+            np.array(mask.getdata()).reshape(height, width).astype(np.uint8))
+        np_mask[np_mask > 0] = 255
+        masks.append(mask_api.encode(np.asfortranarray(np_mask)))
+      image_groundtruths['masks'] = masks
+      if 'areas' not in groundtruths:
+        image_groundtruths['areas'] = np.array(
+            [mask_api.area(mask) for mask in masks], dtype=np.float64)
+    yield int(groundtruths['source_id'][j]), image_groundtruths
+
+
+def convert_predictions_to_images(predictions, include_mask,
+                                  use_batch_mask_paste=False):
+  """Splits a batch of predictions into per-image detections.
+
+  The conversion mirrors `coco_utils.convert_predictions_to_coco_annotations`
+  followed by `coco_utils.COCOWrapper.loadRes`. In particular, when masks are
+  included the mask areas are used as detection areas for both box and mask
+  evaluation.
+
+  Args:
+    predictions: a dictionary of numpy arrays of a single batch. See
+      `COCOEvaluator.update_state` for the fields.
+    include_mask: whether to also return the pasted detection masks as RLEs.
+    use_batch_mask_paste: whether to paste and encode the masks of each image
+      at once with `mask_ops.batch_paste_instance_masks`.
+
+  Yields:
+    A tuple of (image_id, detections) for each image in the batch.
+  """
+  boxes = box_ops.yxyx_to_xywh(predictions['detection_boxes'])
+  if 'detection_outer_boxes' in predictions:
+    mask_boxes = box_ops.yxyx_to_xywh(predictions['detection_outer_boxes'])
+  else:
+    mask_boxes = boxes
+  for j in range(predictions['source_id'].shape[0]):
+    detections = {
+        'classes': predictions['detection_classes'][j],
+        'scores': predictions['detection_scores'][j],
+        'boxes': boxes[j],
+        'areas': boxes[j, :, 2] * boxes[j, :, 3],
+    }
+    if include_mask and use_batch_mask_paste:
+      detections['masks'] = mask_ops.batch_paste_instance_masks(
+          predictions['detection_masks'][j], mask_boxes[j],
+          int(predictions['image_info'][j, 0, 0]),
+          int(predictions['image_info'][j, 0, 1]),
+          output_rle=True)
+    elif include_mask:
+      image_masks = mask_ops.paste_instance_masks(
+          predictions['detection_masks'][j], mask_boxes[j],
+          int(predictions['image_info'][j, 0, 0]),
+          int(predictions['image_info'][j, 0, 1]))
+      binary_masks = (image_masks > 0.0).astype(np.uint8)
+      detections['masks'] = [
+          mask_api.encode(np.asfortranarray(binary_mask))
+          for binary_mask in list(binary_masks)
+      ]
+    if include_mask:
+      detections['areas'] = np.array(
+          [mask_api.area(mask) for mask in detections['masks']])
+    yield predictions['source_id'][j], detections
@@ -0,0 +1,189 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for coco_streaming_eval.py."""
+
+# Import libraries
+from absl.testing import parameterized
+import numpy as np
+from pycocotools import coco
+from pycocotools import cocoeval
+import tensorflow as tf
+
+from official.vision.beta.evaluation import coco_evaluator
+from official.vision.beta.evaluation import coco_streaming_eval
+
+
+def _random_dataset(seed, num_images=20, num_classes=4, tied_scores=False):
+  """Generates random groundtruth annotations and overlapping detections."""
+  rng = np.random.RandomState(seed)
+  images, groundtruths, detections = [], [], []
+  for image_id in range(1, num_images + 1):
+    images.append({'id': image_id, 'height': 512, 'width': 512})
+    image_groundtruths = []
+    for _ in range(rng.randint(0, 8)):
+      x, y = rng.uniform(0, 400, 2)
+      w, h = rng.uniform(2, 150, 2)
+      image_groundtruths.append({
+          'id': len(groundtruths) + len(image_groundtruths) + 1,
+          'image_id': image_id,
+          'category_id': int(rng.randint(1, num_classes + 1)),
+          'bbox': [x, y, w, h],
+          'area': float(w * h * rng.uniform(0.5, 1.0)),
+          'iscrowd': int(rng.rand() < 0.15),
+      })
+    for _ in range(rng.randint(1, 15)):
+      if image_groundtruths and rng.rand() < 0.6:
+        box = np.array(
+            image_groundtruths[rng.randint(len(image_groundtruths))]['bbox'])
+        box += rng.normal(0, 5, 4)
+        box[2:] = np.abs(box[2:]) + 1
+      else:
+        box = np.concatenate([rng.uniform(0, 400, 2), rng.uniform(2, 150, 2)])
+      score = rng.choice([0.5, 0.7]) if tied_scores else rng.rand()
+      detections.append({
+          'image_id': image_id,
+          # Includes a category which is not in the groundtruth dataset.
+          'category_id': int(rng.randint(1, num_classes + 2)),
+          'bbox': box.astype(np.float32),
+          'score': np.float32(score),
+      })
+    groundtruths.extend(image_groundtruths)
+  coco_gt = coco.COCO()
+  coco_gt.dataset = {
+      'images': images,
+      'annotations': groundtruths,
+      'categories': [{'id': i} for i in range(1, num_classes + 1)],
+  }
+  coco_gt.createIndex()
+  return coco_gt, detections
+
+
+def _encode_box_mask(box, height, width):
+  """Encodes the mask of a [ymin, xmin, ymax, xmax] box as a PNG."""
+  ymin, xmin, ymax, xmax = np.clip(np.round(box), 0, [height, width] * 2)
+  mask = np.zeros([height, width, 1], np.uint8)
+  mask[int(ymin):int(ymax), int(xmin):int(xmax)] = 1
+  return tf.io.encode_png(mask).numpy()
+
+
+class StreamingCOCOEvalTest(tf.test.TestCase, parameterized.TestCase):
+
+  @parameterized.parameters(
+      (0, False, None),
+      (1, True, None),
+      (2, False, 2),
+      (3, True, 2),
+  )
+  def test_matches_pycocotools(self, seed, tied_scores, num_processes):
+    coco_gt, detections = _random_dataset(seed, tied_scores=tied_scores)
+
+    coco_dt = coco.COCO()
+    coco_dt.dataset = {
+        'images': coco_gt.dataset['images'],
+        'categories': coco_gt.dataset['categories'],
+        'annotations': [
+            dict(d, id=i + 1, area=d['bbox'][2] * d['bbox'][3])
+            for i, d in enumerate(detections)
+        ],
+    }
+    coco_dt.createIndex()
+    coco_eval = cocoeval.COCOeval(coco_gt, coco_dt, iouType='bbox')
+    coco_eval.evaluate()
+    coco_eval.accumulate()
+    coco_eval.summarize()
+
+    streaming_eval = coco_streaming_eval.StreamingCOCOEval(
+        iou_type='bbox', num_processes=num_processes)
+    for image_id in coco_gt.getImgIds():
+      image_detections = [d for d in detections if d['image_id'] == image_id]
+      boxes = np.array([d['bbox'] for d in image_detections], dtype=np.float32)
+      streaming_eval.add_image(
+          image_id,
+          coco_streaming_eval.image_groundtruths_from_coco(
+              coco_gt, image_id, include_mask=False), {
+                  'classes': np.array(
+                      [d['category_id'] for d in image_detections]),
+                  'scores': np.array([d['score'] for d in image_detections]),
+                  'boxes': boxes,
+                  'areas': boxes[:, 2] * boxes[:, 3],
+              })
+    stats = streaming_eval.evaluate(coco_gt.getCatIds())
+
+    self.assertAllEqual(coco_eval.stats, stats)
+    self.assertEqual((12, 4), streaming_eval.category_stats.shape)
+
+  @parameterized.parameters((False, False), (True, False), (True, True))
+  def test_coco_evaluator_streaming_matches_buffered(self, include_mask,
+                                                     use_batch_mask_paste):
+    rng = np.random.RandomState(7)
+    batch_size, num_instances, num_detections = 4, 6, 10
+
+    def make_batch(batch_index):
+      source_id = np.arange(batch_size) + batch_index * batch_size + 1
+      gt_min = rng.uniform(0, 300, [batch_size, num_instances, 2])
+      gt_size = rng.uniform(4, 200, [batch_size, num_instances, 2])
+      groundtruths = {
+          'source_id': source_id,
+          'height': np.full([batch_size], 512),
+          'width': np.full([batch_size], 512),
+          'num_detections': rng.randint(0, num_instances + 1, [batch_size]),
+          'boxes': np.concatenate([gt_min, gt_min + gt_size],
+                                  axis=-1).astype(np.float32),
+          'classes': rng.randint(1, 4, [batch_size, num_instances]),
+          'is_crowds': (rng.rand(batch_size, num_instances) < 0.1).astype(
+              np.int32),
+      }
+      dt_boxes = np.concatenate([
+          groundtruths['boxes'],
+          groundtruths['boxes'][:, :num_detections - num_instances]
+      ], axis=1) + rng.normal(0, 4, [batch_size, num_detections, 4])
+      predictions = {
+          'source_id': source_id,
+          'num_detections': np.full([batch_size], num_detections),
+          'detection_boxes': dt_boxes.astype(np.float32),
+          'detection_classes': rng.randint(1, 4, [batch_size, num_detections]),
+          'detection_scores': rng.rand(batch_size,
+                                       num_detections).astype(np.float32),
+      }
+      if include_mask:
+        groundtruths['masks'] = np.array(
+            [[_encode_box_mask(box, 512, 512) for box in image_boxes]
+             for image_boxes in groundtruths['boxes']])
+        predictions['detection_masks'] = rng.rand(
+            batch_size, num_detections, 14, 14).astype(np.float32)
+        predictions['image_info'] = np.tile(
+            np.array([[512, 512], [512, 512], [1, 1], [0, 0]], np.float32),
+            [batch_size, 1, 1])
+      return groundtruths, predictions
+
+    batches = [make_batch(i) for i in range(3)]
+    results = []
+    for use_streaming_eval in [False, True]:
+      evaluator = coco_evaluator.COCOEvaluator(
+          annotation_file=None,
+          include_mask=include_mask,
+          need_rescale_bboxes=False,
+          use_streaming_eval=use_streaming_eval,
+          use_batch_mask_paste=use_batch_mask_paste)
+      for groundtruths, predictions in batches:
+        evaluator.update_state(
+            tf.nest.map_structure(tf.convert_to_tensor, groundtruths),
+            tf.nest.map_structure(tf.convert_to_tensor, predictions))
+      results.append(evaluator.result())
+    self.assertAllEqual(results[0], results[1])
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -103,7 +103,8 @@ class COCOWrapper(coco.COCO):
     return res
 
 
-def convert_predictions_to_coco_annotations(predictions):
+def convert_predictions_to_coco_annotations(predictions,
+                                            use_batch_mask_paste=False):
   """Converts a batch of predictions to annotations in COCO format.
 
   Args:
@@ -123,6 +124,9 @@ def convert_predictions_to_coco_annotations(predictions):
       Optional fields:
         - detection_masks: a list of numpy arrays of float of shape
             [batch_size, K, mask_height, mask_width].
+    use_batch_mask_paste: if True, the masks of each image are pasted and
+      encoded at once with `mask_ops.batch_paste_instance_masks`, which
+      follows `paste_instance_masks_v2`, instead of `paste_instance_masks`.
 
   Returns:
     coco_predictions: prediction in COCO annotation format.
@@ -143,7 +147,14 @@ def convert_predictions_to_coco_annotations(predictions):
       mask_boxes = predictions['detection_boxes']
 
     for j in range(batch_size):
-      if 'detection_masks' in predictions:
+      if 'detection_masks' in predictions and use_batch_mask_paste:
+        encoded_masks = mask_ops.batch_paste_instance_masks(
+            predictions['detection_masks'][i][j],
+            mask_boxes[i][j],
+            int(predictions['image_info'][i][j, 0, 0]),
+            int(predictions['image_info'][i][j, 0, 1]),
+            output_rle=True)
+      elif 'detection_masks' in predictions:
         image_masks = mask_ops.paste_instance_masks(
             predictions['detection_masks'][i][j],
             mask_boxes[i][j],
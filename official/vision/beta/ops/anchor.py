@@ -15,6 +15,8 @@
 """Anchor box and labeler definition."""
 
 import collections
+import threading
+
 # Import libraries
 import tensorflow as tf
 from official.vision import keras_cv
@@ -138,6 +140,11 @@ class AnchorLabeler(object):
         thresholds=[unmatched_threshold, match_threshold],
         indicators=[-1, -2, 1],
         force_match_for_each_col=True)
+    # The batched labeling forces matches itself to skip padded groundtruths.
+    self._batch_matcher = keras_cv.ops.BoxMatcher(
+        thresholds=[unmatched_threshold, match_threshold],
+        indicators=[-1, -2, 1],
+        force_match_for_each_col=False)
     self.box_coder = faster_rcnn_box_coder.FasterRcnnBoxCoder()
 
   def label_anchors(self, anchor_boxes, gt_boxes, gt_labels):
@@ -194,6 +201,117 @@ class AnchorLabeler(object):
 
     return cls_targets_dict, box_targets_dict, cls_weights, box_weights
 
+  def _match_batch(self, flattened_anchor_boxes, gt_boxes, gt_valid):
+    """Matches anchors to the padded groundtruths of a batch of images.
+
+    This gives the same matches as `self.matcher` applied to the valid
+    groundtruths of every image on its own.
+
+    Args:
+      flattened_anchor_boxes: A float tensor with shape [N, 4] representing
+        anchor boxes shared by all images.
+      gt_boxes: A float tensor with shape [batch_size, M, 4] representing
+        groundtruth boxes, padded at the end with zero-area boxes.
+      gt_valid: A boolean tensor with shape [batch_size, M], False for the
+        padded groundtruths.
+
+    Returns:
+      match_indices: An integer tensor with shape [batch_size, N].
+      match_indicators: An integer tensor with shape [batch_size, N].
+    """
+    batch_size = tf.shape(gt_boxes)[0]
+    num_anchors = (flattened_anchor_boxes.shape.as_list()[0] or
+                   tf.shape(flattened_anchor_boxes)[0])
+    num_gts = tf.shape(gt_boxes)[1]
+    # Computes the IoUs against the groundtruths of all images at once, with
+    # shape [N, batch_size, M]. Padded groundtruths have zero area and thus
+    # zero IoU, and come after the valid ones, so they never win the argmax
+    # over an image's groundtruths unless the image has none.
+    similarity_matrix = tf.reshape(
+        self.similarity_calc(flattened_anchor_boxes,
+                             tf.reshape(gt_boxes, [-1, 4])),
+        [num_anchors, batch_size, num_gts])
+    # Treats the anchors as the batch dimension of the matcher.
+    match_indices, match_indicators = self._batch_matcher(similarity_matrix)
+    match_indices = tf.transpose(match_indices)
+    match_indicators = tf.transpose(match_indicators)
+
+    # Forces a match of every valid groundtruth to its best anchor. When an
+    # anchor is the best one for several groundtruths, the first one wins.
+    force_match_anchor_ids = tf.argmax(
+        similarity_matrix, axis=0, output_type=tf.int32)
+    segment_ids = force_match_anchor_ids + num_anchors * tf.range(
+        batch_size)[:, None]
+    gt_ids = tf.where(gt_valid, tf.range(num_gts)[None, :], num_gts)
+    force_match_gt_ids = tf.reshape(
+        tf.math.unsorted_segment_min(gt_ids, segment_ids,
+                                     batch_size * num_anchors),
+        [batch_size, num_anchors])
+    force_match_mask = tf.less(force_match_gt_ids, num_gts)
+    match_indices = tf.where(force_match_mask, force_match_gt_ids,
+                             match_indices)
+    match_indicators = tf.where(force_match_mask,
+                                self._batch_matcher.indicators[-1],
+                                match_indicators)
+    return match_indices, match_indicators
+
+  def _encode_batch(self, box_targets, flattened_anchor_boxes):
+    """Encodes box targets of shape [batch_size, N, 4] w.r.t. the anchors."""
+    batch_size = tf.shape(box_targets)[0]
+    batched_anchor_boxes = tf.broadcast_to(
+        flattened_anchor_boxes[None], tf.shape(box_targets))
+    box_targets = self.box_coder.encode(
+        box_list.BoxList(tf.reshape(box_targets, [-1, 4])),
+        box_list.BoxList(tf.reshape(batched_anchor_boxes, [-1, 4])))
+    return tf.reshape(box_targets, [batch_size, -1, 4])
+
+  def label_anchors_batch(self, anchor_boxes, gt_boxes, gt_labels):
+    """Labels anchors of a batch of images with padded ground truth inputs.
+
+    Args:
+      anchor_boxes: An ordered dictionary of anchor boxes shared by all images,
+        as passed to `label_anchors`.
+      gt_boxes: A float tensor with shape [batch_size, M, 4] representing
+        groundtruth boxes padded to M boxes per image.
+      gt_labels: A tensor with shape [batch_size, M, 1] representing
+        groundtruth classes. Padded groundtruths have negative classes.
+    Returns:
+      cls_targets_dict: ordered dictionary with keys
+        [min_level, min_level+1, ..., max_level]. The values are tensor with
+        shape [batch_size, height_l, width_l, num_anchors_per_location].
+      box_targets_dict: ordered dictionary with keys
+        [min_level, min_level+1, ..., max_level]. The values are tensor with
+        shape [batch_size, height_l, width_l, num_anchors_per_location * 4].
+      cls_weights: A flattened Tensor with shape [batch_size, num_anchors].
+      box_weights: A flattened Tensor with shape [batch_size, num_anchors].
+    """
+    flattened_anchor_boxes = []
+    for anchors in anchor_boxes.values():
+      flattened_anchor_boxes.append(tf.reshape(anchors, [-1, 4]))
+    flattened_anchor_boxes = tf.concat(flattened_anchor_boxes, axis=0)
+    gt_boxes, gt_labels, gt_valid = _trim_padded_groundtruths(
+        gt_boxes, gt_labels)
+    match_indices, match_indicators = self._match_batch(
+        flattened_anchor_boxes, gt_boxes, gt_valid)
+    cls_mask = tf.expand_dims(tf.less_equal(match_indicators, 0), -1)
+    cls_targets = self.target_gather(gt_labels, match_indices, cls_mask, -1)
+    box_mask = tf.tile(cls_mask, [1, 1, 4])
+    box_targets = self.target_gather(gt_boxes, match_indices, box_mask)
+    # Images without groundtruths get zero weights, as in `label_anchors`.
+    weights = tf.cast(tf.expand_dims(gt_valid, -1), tf.float32)
+    box_weights = tf.squeeze(
+        self.target_gather(weights, match_indices, cls_mask), -1)
+    ignore_mask = tf.expand_dims(tf.equal(match_indicators, -2), -1)
+    cls_weights = tf.squeeze(
+        self.target_gather(weights, match_indices, ignore_mask), -1)
+    box_targets = self._encode_batch(box_targets, flattened_anchor_boxes)
+
+    # Unpacks labels into multi-level representations.
+    cls_targets_dict = unpack_batched_targets(cls_targets, anchor_boxes)
+    box_targets_dict = unpack_batched_targets(box_targets, anchor_boxes)
+
+    return cls_targets_dict, box_targets_dict, cls_weights, box_weights
+
 
 class RpnAnchorLabeler(AnchorLabeler):
   """Labeler for Region Proposal Network."""
@@ -306,6 +424,54 @@ class RpnAnchorLabeler(AnchorLabeler):
 
     return score_targets_dict, box_targets_dict
 
+  def label_anchors_batch(self, anchor_boxes, gt_boxes, gt_labels):
+    """Labels anchors of a batch of images with padded ground truth inputs.
+
+    Args:
+      anchor_boxes: An ordered dictionary of anchor boxes shared by all images,
+        as passed to `label_anchors`.
+      gt_boxes: A float tensor with shape [batch_size, M, 4] representing
+        groundtruth boxes padded to M boxes per image.
+      gt_labels: A tensor with shape [batch_size, M, 1] representing
+        groundtruth classes. Padded groundtruths have negative classes.
+    Returns:
+      score_targets_dict: ordered dictionary with keys
+        [min_level, min_level+1, ..., max_level]. The values are tensor with
+        shape [batch_size, height_l, width_l, num_anchors].
+      box_targets_dict: ordered dictionary with keys
+        [min_level, min_level+1, ..., max_level]. The values are tensor with
+        shape [batch_size, height_l, width_l, num_anchors * 4].
+    """
+    flattened_anchor_boxes = []
+    for anchors in anchor_boxes.values():
+      flattened_anchor_boxes.append(tf.reshape(anchors, [-1, 4]))
+    flattened_anchor_boxes = tf.concat(flattened_anchor_boxes, axis=0)
+    gt_boxes, gt_labels, gt_valid = _trim_padded_groundtruths(
+        gt_boxes, gt_labels)
+    match_indices, match_indicators = self._match_batch(
+        flattened_anchor_boxes, gt_boxes, gt_valid)
+    box_mask = tf.tile(
+        tf.expand_dims(tf.less_equal(match_indicators, 0), -1), [1, 1, 4])
+    box_targets = self.target_gather(gt_boxes, match_indices, box_mask)
+    box_targets = self._encode_batch(box_targets, flattened_anchor_boxes)
+
+    # Zero out the unmatched and ignored regression targets.
+    matched_anchors_mask = tf.greater_equal(match_indicators, 0)
+    box_targets = tf.where(matched_anchors_mask[..., None], box_targets,
+                           tf.zeros_like(box_targets))
+
+    # score_targets contains the subsampled positive and negative anchors.
+    # The subsampling is random and done for every image on its own.
+    score_targets = tf.map_fn(
+        lambda match_results: self._get_rpn_samples(match_results)[0],
+        match_indicators)
+
+    # Unpacks labels.
+    score_targets_dict = unpack_batched_targets(score_targets, anchor_boxes)
+    box_targets_dict = unpack_batched_targets(box_targets, anchor_boxes)
+
+    return score_targets_dict, box_targets_dict
+
 
 def build_anchor_generator(min_level, max_level, num_scales, aspect_ratios,
                            anchor_size):
@@ -327,6 +493,50 @@ def build_anchor_generator(min_level, max_level, num_scales, aspect_ratios,
   return anchor_gen
 
 
+_ANCHOR_BOXES_CACHE = {}
+_ANCHOR_BOXES_CACHE_LOCK = threading.Lock()
+
+
+def get_anchor_boxes(min_level, max_level, num_scales, aspect_ratios,
+                     anchor_size, image_size):
+  """Returns multilevel anchor boxes, generated once per process.
+
+  The anchor grid only depends on the anchor parameters and the image size, so
+  it is computed eagerly on first use and cached as numpy arrays. Every call
+  embeds the cached grid as constants, which lets input pipelines skip the
+  anchor generation for every example.
+
+  Args:
+    min_level: integer number of minimum level of the output feature pyramid.
+    max_level: integer number of maximum level of the output feature pyramid.
+    num_scales: integer number representing intermediate scales added
+      on each level.
+    aspect_ratios: list of float numbers representing the aspect raito anchors
+      added on each level.
+    anchor_size: float number representing the scale of size of the base
+      anchor to the feature stride 2^level.
+    image_size: a list of integers representing the static [height, width] of
+      the input image.
+
+  Returns:
+    An ordered dictionary with keys [min_level, ..., max_level]. The values are
+    tensors with shape [height_l, width_l, anchors_per_location * 4], as
+    returned by the generator from `build_anchor_generator`.
+  """
+  image_size = tuple(int(size) for size in image_size)
+  key = (min_level, max_level, num_scales, tuple(aspect_ratios), anchor_size,
+         image_size)
+  with _ANCHOR_BOXES_CACHE_LOCK:
+    if key not in _ANCHOR_BOXES_CACHE:
+      with tf.init_scope():
+        anchor_gen = build_anchor_generator(min_level, max_level, num_scales,
+                                            aspect_ratios, anchor_size)
+        _ANCHOR_BOXES_CACHE[key] = tf.nest.map_structure(
+            lambda boxes: boxes.numpy(), anchor_gen(image_size=image_size))
+    anchor_boxes = _ANCHOR_BOXES_CACHE[key]
+  return tf.nest.map_structure(tf.constant, anchor_boxes)
+
+
 def unpack_targets(targets, anchor_boxes_dict):
   """Unpacks an array of labels into multiscales labels."""
   unpacked_targets = collections.OrderedDict()
@@ -341,3 +551,42 @@ def unpack_targets(targets, anchor_boxes_dict):
                                          [feat_size_y, feat_size_x, -1])
     count += steps
   return unpacked_targets
+
+
+def _trim_padded_groundtruths(gt_boxes, gt_labels):
+  """Drops the trailing groundtruths that are padding in every image.
+
+  Args:
+    gt_boxes: A float tensor with shape [batch_size, M, 4].
+    gt_labels: A tensor with shape [batch_size, M, 1]. Padded groundtruths
+      have negative labels.
+
+  Returns:
+    The groundtruth boxes, labels and a boolean validity mask, sliced to the
+    last valid groundtruth of the batch (keeping at least one).
+  """
+  gt_valid = tf.greater_equal(gt_labels[..., 0], 0)
+  num_gts = tf.maximum(
+      tf.reduce_max(
+          tf.where(gt_valid, tf.range(1, tf.shape(gt_valid)[1] + 1)[None, :],
+                   0)), 1)
+  return (gt_boxes[:, :num_gts], gt_labels[:, :num_gts],
+          gt_valid[:, :num_gts])
+
+
+def unpack_batched_targets(targets, anchor_boxes_dict):
+  """Unpacks a batch of arrays of labels into multiscales labels."""
+  unpacked_targets = collections.OrderedDict()
+  batch_size = tf.shape(targets)[0]
+  count = 0
+  for level, anchor_boxes in anchor_boxes_dict.items():
+    feat_size_shape = anchor_boxes.shape.as_list()
+    feat_size_y = feat_size_shape[0]
+    feat_size_x = feat_size_shape[1]
+    anchors_per_location = int(feat_size_shape[2] / 4)
+    steps = feat_size_y * feat_size_x * anchors_per_location
+    unpacked_targets[level] = tf.reshape(
+        targets[:, count:count + steps],
+        [batch_size, feat_size_y, feat_size_x, -1])
+    count += steps
+  return unpacked_targets
@@ -163,6 +163,81 @@ class AnchorTest(parameterized.TestCase, tf.test.TestCase):
     for k in expected_anchors.keys():
       self.assertAllClose(expected_anchors[k], anchors[k])
 
+  def testGetAnchorBoxesMatchesGenerator(self):
+    anchor_gen = anchor.build_anchor_generator(3, 5, 2, [.5, 1., 2.], 4.)
+    expected_anchors = anchor_gen((128, 96))
+
+    @tf.function
+    def get_anchor_boxes():
+      return anchor.get_anchor_boxes(3, 5, 2, [.5, 1., 2.], 4., (128, 96))
+
+    for anchors in [get_anchor_boxes(),
+                    anchor.get_anchor_boxes(3, 5, 2, [.5, 1., 2.], 4.,
+                                            [128, 96])]:
+      self.assertEqual(list(expected_anchors.keys()), list(anchors.keys()))
+      for k in expected_anchors.keys():
+        self.assertAllEqual(expected_anchors[k], anchors[k])
+
+  def _generate_padded_groundtruths(self, num_groundtruths, max_num_instances):
+    rng = np.random.RandomState(0)
+    batch_size = len(num_groundtruths)
+    gt_boxes = -np.ones([batch_size, max_num_instances, 4], np.float32)
+    gt_labels = -np.ones([batch_size, max_num_instances, 1], np.float32)
+    for i, n in enumerate(num_groundtruths):
+      y_min_x_min = rng.uniform(0, 96, [n, 2])
+      height_width = rng.uniform(4, 64, [n, 2])
+      gt_boxes[i, :n] = np.concatenate(
+          [y_min_x_min, y_min_x_min + height_width], axis=-1)
+      gt_labels[i, :n, 0] = rng.randint(1, 5, [n])
+    # Duplicates a box so that two groundtruths force match the same anchor.
+    gt_boxes[1, 1] = gt_boxes[1, 0]
+    return gt_boxes, gt_labels
+
+  def testLabelAnchorsBatchMatchesUnbatched(self):
+    num_groundtruths = [3, 2, 0, 6]
+    gt_boxes, gt_labels = self._generate_padded_groundtruths(
+        num_groundtruths, max_num_instances=6)
+    anchor_boxes = anchor.get_anchor_boxes(3, 5, 2, [.5, 1., 2.], 4.,
+                                           (128, 96))
+    anchor_labeler = anchor.AnchorLabeler(match_threshold=0.5,
+                                          unmatched_threshold=0.4)
+
+    batched_targets = anchor_labeler.label_anchors_batch(
+        anchor_boxes, tf.constant(gt_boxes), tf.constant(gt_labels))
+    for i, n in enumerate(num_groundtruths):
+      targets = anchor_labeler.label_anchors(anchor_boxes,
+                                             tf.constant(gt_boxes[i, :n]),
+                                             tf.constant(gt_labels[i, :n]))
+      for target, batched_target in zip(targets, batched_targets):
+        tf.nest.map_structure(
+            lambda x, y, i=i: self.assertAllEqual(x, y[i]), target,
+            batched_target)
+
+  def testRpnLabelAnchorsBatch(self):
+    num_groundtruths = [3, 2, 0]
+    gt_boxes, gt_labels = self._generate_padded_groundtruths(
+        num_groundtruths, max_num_instances=4)
+    anchor_boxes = anchor.get_anchor_boxes(3, 5, 2, [.5, 1., 2.], 4.,
+                                           (128, 96))
+    anchor_labeler = anchor.RpnAnchorLabeler(rpn_batch_size_per_im=32)
+
+    score_targets, box_targets = anchor_labeler.label_anchors_batch(
+        anchor_boxes, tf.constant(gt_boxes), tf.constant(gt_labels))
+    for i, n in enumerate(num_groundtruths):
+      expected_score_targets, expected_box_targets = (
+          anchor_labeler.label_anchors(anchor_boxes,
+                                       tf.constant(gt_boxes[i, :n]),
+                                       tf.constant(gt_labels[i, :n])))
+      for k in expected_box_targets.keys():
+        self.assertAllEqual(expected_box_targets[k], box_targets[k][i])
+        # The sampling of positives and negatives is random.
+        self.assertEqual(expected_score_targets[k].shape,
+                         score_targets[k][i].shape)
+      num_samples = sum(
+          tf.reduce_sum(tf.cast(v[i] >= 0, tf.int32))
+          for v in score_targets.values())
+      self.assertLessEqual(num_samples, 32)
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -710,6 +710,267 @@ def _parse_policy_info(name: Text, prob: float, level: float,
   return func, prob, args
 
 
+def _wrap_batch(images: tf.Tensor) -> tf.Tensor:
+  """Returns `images` with an extra channel set to all 1s."""
+  return tf.concat([images, tf.ones_like(images[..., :1])], axis=-1)
+
+
+def _unwrap_batch(images: tf.Tensor, replace: List[int]) -> tf.Tensor:
+  """Unwraps images produced by `_wrap_batch`, filling empty pixels."""
+  replace = tf.cast(replace, images.dtype)
+  return tf.where(tf.equal(images[..., 3:], 0), replace, images[..., :3])
+
+
+def _random_signs(images: tf.Tensor) -> tf.Tensor:
+  """Returns one random +1/-1 per image, as `_randomly_negate_tensor` does."""
+  should_flip = tf.cast(
+      tf.floor(tf.random.uniform([tf.shape(images)[0]]) + 0.5), tf.bool)
+  return tf.where(should_flip, 1., -1.)
+
+
+def _channel_histograms(images: tf.Tensor) -> Tuple[tf.Tensor, tf.Tensor]:
+  """Computes a 256-bin histogram of every channel of every image.
+
+  Args:
+    images: An int32 Tensor of shape [N, H, W, C] with values in [0, 255].
+
+  Returns:
+    A tuple of the pixel values transposed to shape [N, C, H * W] and their
+    histograms of shape [N, C, 256].
+  """
+  shape = tf.shape(images)
+  num_histograms = shape[0] * shape[3]
+  values = tf.reshape(
+      tf.transpose(images, [0, 3, 1, 2]), [shape[0], shape[3], -1])
+  # Offsets the values of each channel into its own range of 256 bins so that
+  # a single bincount computes all the histograms at once.
+  offsets = tf.reshape(
+      tf.range(num_histograms) * 256, [shape[0], shape[3], 1])
+  histograms = tf.math.bincount(
+      values + offsets,
+      minlength=num_histograms * 256,
+      maxlength=num_histograms * 256)
+  return values, tf.reshape(histograms, [shape[0], shape[3], 256])
+
+
+def _cutout_batch(images: tf.Tensor, pad_size: int,
+                  replace: List[int]) -> tf.Tensor:
+  """Batched version of `cutout` with one random mask location per image."""
+  shape = tf.shape(images)
+  image_height, image_width = shape[1], shape[2]
+
+  cutout_center_height = tf.random.uniform(
+      shape=[shape[0]], minval=0, maxval=image_height, dtype=tf.int32)
+  cutout_center_width = tf.random.uniform(
+      shape=[shape[0]], minval=0, maxval=image_width, dtype=tf.int32)
+
+  lower_pad = tf.maximum(0, cutout_center_height - pad_size)
+  upper_pad = tf.maximum(0, image_height - cutout_center_height - pad_size)
+  left_pad = tf.maximum(0, cutout_center_width - pad_size)
+  right_pad = tf.maximum(0, image_width - cutout_center_width - pad_size)
+
+  rows = tf.range(image_height)[None, :]
+  cols = tf.range(image_width)[None, :]
+  in_rows = ((rows >= lower_pad[:, None]) &
+             (rows < (image_height - upper_pad)[:, None]))
+  in_cols = ((cols >= left_pad[:, None]) &
+             (cols < (image_width - right_pad)[:, None]))
+  mask = in_rows[:, :, None, None] & in_cols[:, None, :, None]
+  return tf.where(mask, tf.cast(replace, images.dtype), images)
+
+
+def _contrast_batch(images: tf.Tensor, factor: float) -> tf.Tensor:
+  """Batched version of `contrast`."""
+  degenerate = tf.cast(tf.image.rgb_to_grayscale(images), tf.int32)
+  _, hist = _channel_histograms(degenerate)
+  mean = tf.reduce_sum(tf.cast(hist, tf.float32), axis=[1, 2]) / 256.0
+  degenerate = tf.ones_like(
+      degenerate, dtype=tf.float32) * mean[:, None, None, None]
+  degenerate = tf.clip_by_value(degenerate, 0.0, 255.0)
+  degenerate = tf.image.grayscale_to_rgb(tf.cast(degenerate, tf.uint8))
+  return blend(degenerate, images, factor)
+
+
+def _autocontrast_batch(images: tf.Tensor) -> tf.Tensor:
+  """Batched version of `autocontrast`."""
+  lo = tf.cast(tf.reduce_min(images, axis=[1, 2], keepdims=True), tf.float32)
+  hi = tf.cast(tf.reduce_max(images, axis=[1, 2], keepdims=True), tf.float32)
+
+  # Channels with hi == lo divide by zero here but are not selected below.
+  scale = 255.0 / (hi - lo)
+  offset = -lo * scale
+  scaled = tf.cast(images, tf.float32) * scale + offset
+  scaled = tf.cast(tf.clip_by_value(scaled, 0.0, 255.0), tf.uint8)
+  return tf.where(hi > lo, scaled, images)
+
+
+def _sharpness_batch(images: tf.Tensor, factor: float) -> tf.Tensor:
+  """Batched version of `sharpness`."""
+  # SMOOTH PIL Kernel.
+  kernel = tf.constant([[1, 1, 1], [1, 5, 1], [1, 1, 1]],
+                       dtype=tf.float32,
+                       shape=[3, 3, 1, 1]) / 13.
+  # Tile across channel dimension.
+  kernel = tf.tile(kernel, [1, 1, 3, 1])
+  # Some TF versions do not shrink the 'VALID' output of an empty batch, so the
+  # blur is computed with 'SAME' padding and only its interior is used.
+  degenerate = tf.nn.depthwise_conv2d(
+      tf.cast(images, tf.float32),
+      kernel, [1, 1, 1, 1],
+      padding='SAME',
+      dilations=[1, 1])
+  degenerate = tf.cast(tf.clip_by_value(degenerate, 0.0, 255.0), tf.uint8)
+
+  # For the borders of the resulting images, fill in the values of the
+  # original images.
+  height, width = tf.shape(images)[1], tf.shape(images)[2]
+  rows = tf.range(height)
+  cols = tf.range(width)
+  interior = tf.logical_and(
+      tf.logical_and(rows > 0, rows < height - 1)[:, None],
+      tf.logical_and(cols > 0, cols < width - 1)[None, :])
+  result = tf.where(interior[None, :, :, None], degenerate, images)
+
+  # Blend the final result.
+  return blend(result, images, factor)
+
+
+def _equalize_batch(images: tf.Tensor) -> tf.Tensor:
+  """Batched version of `equalize`."""
+  shape = tf.shape(images)
+  values, histograms = _channel_histograms(tf.cast(images, tf.int32))
+
+  # The count of the last nonzero bin of every histogram.
+  last_nonzero = 255 - tf.argmax(
+      tf.reverse(tf.cast(histograms > 0, tf.int32), axis=[-1]),
+      axis=-1,
+      output_type=tf.int32)
+  last_count = tf.gather(histograms, last_nonzero, batch_dims=2)
+  step = (tf.reduce_sum(histograms, axis=-1) - last_count) // 255
+
+  # Compute the cumulative sum, shifting by step // 2 and then normalization
+  # by step. Channels with a zero step keep their values.
+  safe_step = tf.maximum(step, 1)[..., None]
+  lut = (tf.cumsum(histograms, axis=-1) + (safe_step // 2)) // safe_step
+  # Shift lut, prepending with 0.
+  lut = tf.concat([tf.zeros_like(lut[..., :1]), lut[..., :-1]], axis=-1)
+  lut = tf.clip_by_value(lut, 0, 255)
+
+  result = tf.where(
+      tf.equal(step, 0)[..., None], values,
+      tf.gather(lut, values, batch_dims=2))
+  result = tf.reshape(result, [shape[0], shape[3], shape[1], shape[2]])
+  return tf.cast(tf.transpose(result, [0, 2, 3, 1]), tf.uint8)
+
+
+def _shear_batch(images: tf.Tensor, level: float, replace: List[int],
+                 horizontal: bool) -> tf.Tensor:
+  """Shears every image by `level` with a random sign per image."""
+  levels = _random_signs(images) * level
+  ones = tf.ones_like(levels)
+  zeros = tf.zeros_like(levels)
+  if horizontal:
+    transforms = [ones, levels, zeros, zeros, ones, zeros, zeros, zeros]
+  else:
+    transforms = [ones, zeros, zeros, levels, ones, zeros, zeros, zeros]
+  images = transform(_wrap_batch(images), tf.stack(transforms, axis=1))
+  return _unwrap_batch(images, replace)
+
+
+def _translate_batch(images: tf.Tensor, pixels: float, replace: List[int],
+                     horizontal: bool) -> tf.Tensor:
+  """Translates every image by `pixels` with a random sign per image."""
+  pixels = _random_signs(images) * pixels
+  zeros = tf.zeros_like(pixels)
+  if horizontal:
+    translations = [-pixels, zeros]
+  else:
+    translations = [zeros, -pixels]
+  images = translate(_wrap_batch(images), tf.stack(translations, axis=1))
+  return _unwrap_batch(images, replace)
+
+
+def _rotate_batch(images: tf.Tensor, degrees: float,
+                  replace: List[int]) -> tf.Tensor:
+  """Rotates every image by `degrees` with a random sign per image."""
+  images = rotate(_wrap_batch(images), _random_signs(images) * degrees)
+  return _unwrap_batch(images, replace)
+
+
+def _get_batch_op(name: Text, level: float, replace_value: List[int],
+                  cutout_const: float, translate_const: float) -> Any:
+  """Returns a function applying the op `name` to a batch of uint8 images.
+
+  Random arguments, i.e. the sign of geometric magnitudes and the cutout
+  location, are sampled independently for every image of the batch.
+
+  Args:
+    name: The name of the augmentation op, a key of `NAME_TO_FUNC`.
+    level: The magnitude of the op.
+    replace_value: The pixel value to fill empty pixels with.
+    cutout_const: multiplier for applying cutout.
+    translate_const: multiplier for applying translation.
+
+  Returns:
+    A function mapping a [N, H, W, 3] uint8 Tensor to the augmented images.
+  """
+  level = float(level)
+  enhance_factor = _enhance_level_to_arg(level)[0]
+  rotate_degrees = (level / _MAX_LEVEL) * 30.
+  shear_level = (level / _MAX_LEVEL) * 0.3
+  translate_pixels = (level / _MAX_LEVEL) * float(translate_const)
+
+  ops = {
+      'AutoContrast': _autocontrast_batch,
+      'Equalize': _equalize_batch,
+      'Invert': invert,
+      'Rotate': lambda x: _rotate_batch(x, rotate_degrees, replace_value),
+      'Posterize': lambda x: posterize(x, *_mult_to_arg(level, 4)),
+      'Solarize': lambda x: solarize(x, *_mult_to_arg(level, 256)),
+      'SolarizeAdd': lambda x: solarize_add(x, *_mult_to_arg(level, 110)),
+      'Color': lambda x: color(x, enhance_factor),
+      'Contrast': lambda x: _contrast_batch(x, enhance_factor),
+      'Brightness': lambda x: brightness(x, enhance_factor),
+      'Sharpness': lambda x: _sharpness_batch(x, enhance_factor),
+      'ShearX': lambda x: _shear_batch(x, shear_level, replace_value, True),
+      'ShearY': lambda x: _shear_batch(x, shear_level, replace_value, False),
+      'TranslateX': lambda x: _translate_batch(  # pylint:disable=g-long-lambda
+          x, translate_pixels, replace_value, True),
+      'TranslateY': lambda x: _translate_batch(  # pylint:disable=g-long-lambda
+          x, translate_pixels, replace_value, False),
+      'Cutout': lambda x: _cutout_batch(  # pylint:disable=g-long-lambda
+          x, _mult_to_arg(level, cutout_const)[0], replace_value),
+  }
+  return ops[name]
+
+
+def _apply_batch_ops(images: tf.Tensor, op_indices: tf.Tensor,
+                     op_fns: List[Any]) -> tf.Tensor:
+  """Applies `op_fns[op_indices[i]]` to `images[i]` for every image.
+
+  The batch is partitioned by op index so that every op runs exactly once on
+  the images that selected it, and the results are stitched back in order.
+  An index of `len(op_fns)` leaves the image unchanged.
+
+  Args:
+    images: A uint8 Tensor of shape [N, H, W, 3].
+    op_indices: An int32 Tensor of shape [N] with values in
+      [0, len(op_fns)].
+    op_fns: A list of functions mapping a batch of images to augmented images.
+
+  Returns:
+    The augmented images, with the same shape as `images`.
+  """
+  num_partitions = len(op_fns) + 1
+  partitions = tf.dynamic_partition(images, op_indices, num_partitions)
+  batch_indices = tf.dynamic_partition(
+      tf.range(tf.shape(images)[0]), op_indices, num_partitions)
+  results = [fn(x) for fn, x in zip(op_fns, partitions)] + [partitions[-1]]
+  outputs = tf.dynamic_stitch(batch_indices, results)
+  outputs.set_shape(images.shape)
+  return outputs
+
+
 class ImageAugment(object):
   """Image augmentation class for applying image distortions."""
 
@@ -724,6 +985,21 @@ class ImageAugment(object):
     """
     raise NotImplementedError()
 
+  def distort_batch(self, images: tf.Tensor) -> tf.Tensor:
+    """Given a batch of images, returns distorted images with the same shape.
+
+    Subclasses may override this with a vectorized implementation; by default
+    `distort` is mapped over the batch.
+
+    Args:
+      images: `Tensor` of shape [batch_size, height, width, 3] representing a
+        batch of images.
+
+    Returns:
+      The augmented version of `images`.
+    """
+    return tf.map_fn(self.distort, images)
+
 
 class AutoAugment(ImageAugment):
   """Applies the AutoAugment policy to images.
@@ -868,6 +1144,74 @@ class AutoAugment(ImageAugment):
     image = tf.cast(image, dtype=input_image_type)
     return image
 
+  def distort_batch(self, images: tf.Tensor) -> tf.Tensor:
+    """Applies the AutoAugment policy to a batch of images.
+
+    Every image selects its own sub-policy and applies each of its ops with
+    the op probability, as in `distort`, but each op of each sub-policy runs
+    once on all the images that selected it.
+
+    Args:
+      images: `Tensor` of shape [batch_size, height, width, 3] representing a
+        batch of images.
+
+    Returns:
+      The augmented version of `images`.
+    """
+    input_image_type = images.dtype
+
+    if input_image_type != tf.uint8:
+      images = tf.clip_by_value(images, 0.0, 255.0)
+      images = tf.cast(images, dtype=tf.uint8)
+
+    replace_value = [128] * 3
+    batch_size = tf.shape(images)[0]
+
+    assert_ranges = []
+    for policy in self.policies:
+      for _, prob, level in policy:
+        assert_ranges.append(tf.Assert(tf.less_equal(prob, 1.), [prob]))
+        assert_ranges.append(
+            tf.Assert(tf.less_equal(level, int(_MAX_LEVEL)), [level]))
+
+    with tf.control_dependencies(assert_ranges):
+      policy_to_select = tf.random.uniform([batch_size],
+                                           maxval=len(self.policies),
+                                           dtype=tf.int32)
+
+    # The i-th op of every sub-policy is applied together in one step. Shorter
+    # sub-policies leave their images unchanged in the extra steps.
+    for i in range(max(len(policy) for policy in self.policies)):
+      op_fns = []
+      policy_op_indices = []
+      policy_probs = []
+      for policy in self.policies:
+        if i < len(policy):
+          name, prob, level = policy[i]
+          policy_op_indices.append(len(op_fns))
+          policy_probs.append(float(prob))
+          op_fns.append(
+              _get_batch_op(name, level, replace_value, self.cutout_const,
+                            self.translate_const))
+        else:
+          policy_op_indices.append(-1)
+          policy_probs.append(0.)
+      policy_op_indices = [
+          len(op_fns) if index < 0 else index for index in policy_op_indices
+      ]
+
+      probs = tf.gather(policy_probs, policy_to_select)
+      should_apply_op = tf.cast(
+          tf.floor(tf.random.uniform([batch_size], dtype=tf.float32) + probs),
+          tf.bool)
+      op_indices = tf.where(should_apply_op,
+                            tf.gather(policy_op_indices, policy_to_select),
+                            len(op_fns))
+      images = _apply_batch_ops(images, op_indices, op_fns)
+
+    images = tf.cast(images, dtype=input_image_type)
+    return images
+
   @staticmethod
   def policy_v0():
     """Autoaugment policy that was used in AutoAugment Paper.
@@ -1150,3 +1494,41 @@ class RandAugment(ImageAugment):
 
     image = tf.cast(image, dtype=input_image_type)
     return image
+
+  def distort_batch(self, images: tf.Tensor) -> tf.Tensor:
+    """Applies the RandAugment policy to a batch of images.
+
+    The op of every layer is sampled for all images at once, and each op runs
+    once on all the images that selected it, instead of tracing a
+    `tf.switch_case` over every op for every image.
+
+    Args:
+      images: `Tensor` of shape [batch_size, height, width, 3] representing a
+        batch of images.
+
+    Returns:
+      The augmented version of `images`.
+    """
+    input_image_type = images.dtype
+
+    if input_image_type != tf.uint8:
+      images = tf.clip_by_value(images, 0.0, 255.0)
+      images = tf.cast(images, dtype=tf.uint8)
+
+    replace_value = [128] * 3
+    op_fns = [
+        _get_batch_op(op_name, self.magnitude, replace_value,
+                      self.cutout_const, self.translate_const)
+        for op_name in self.available_ops
+    ]
+
+    for _ in range(self.num_layers):
+      # The last index leaves the image unchanged, as the default branch of
+      # `distort` does.
+      op_to_select = tf.random.uniform([tf.shape(images)[0]],
+                                       maxval=len(self.available_ops) + 1,
+                                       dtype=tf.int32)
+      images = _apply_batch_ops(images, op_to_select, op_fns)
+
+    images = tf.cast(images, dtype=input_image_type)
+    return images
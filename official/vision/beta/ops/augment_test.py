@@ -145,6 +145,96 @@ class AutoaugmentTest(tf.test.TestCase, parameterized.TestCase):
 
     self.assertEqual((224, 224, 3), image.shape)
 
+  @parameterized.parameters(list(augment.NAME_TO_FUNC.keys()))
+  def test_batch_op_matches_single_image_op(self, op_name):
+    magnitude = 7
+    replace_value = [128] * 3
+    cutout_const = 40
+    translate_const = 30
+    images = tf.random.uniform((4, 32, 48, 3), maxval=256, dtype=tf.int32)
+    # Gives the first image constant channels and the second a narrow range.
+    images = tf.cast(
+        tf.concat([
+            tf.fill((1, 32, 48, 3), 77), images[1:2] // 16 + 100, images[2:]
+        ], axis=0), tf.uint8)
+
+    batch_op = augment._get_batch_op(op_name, magnitude, replace_value,
+                                     cutout_const, translate_const)
+    aug_images = batch_op(images)
+    self.assertEqual(images.shape, aug_images.shape)
+    self.assertEqual(tf.uint8, aug_images.dtype)
+
+    func = augment.NAME_TO_FUNC[op_name]
+    _, _, args = augment._parse_policy_info(op_name, 1., magnitude,
+                                            replace_value, cutout_const,
+                                            translate_const)
+    for image, aug_image in zip(images, aug_images):
+      if op_name == 'Cutout':
+        # The cutout location is random, so only the filled pixels differ.
+        changed = tf.reduce_any(tf.not_equal(image, aug_image), axis=-1)
+        self.assertAllEqual(
+            tf.fill([tf.reduce_sum(tf.cast(changed, tf.int32)), 3], 128),
+            tf.boolean_mask(aug_image, changed))
+        continue
+      if op_name in ('Rotate', 'ShearX', 'ShearY', 'TranslateX',
+                     'TranslateY'):
+        # The sign of the magnitude is sampled per image.
+        level = tf.abs(args[0])
+        candidates = [func(image, level, *args[1:]),
+                      func(image, -level, *args[1:])]
+        self.assertTrue(
+            any(bool(tf.reduce_all(tf.equal(aug_image, c)))
+                for c in candidates))
+      else:
+        self.assertAllEqual(func(image, *args), aug_image)
+
+  def test_randaug_batch(self):
+    images = tf.random.uniform((8, 64, 64, 3), maxval=256, dtype=tf.int32)
+
+    augmenter = augment.RandAugment(num_layers=2, magnitude=10)
+    aug_images = augmenter.distort_batch(tf.cast(images, tf.float32))
+
+    self.assertEqual((8, 64, 64, 3), aug_images.shape)
+    self.assertEqual(tf.float32, aug_images.dtype)
+
+  def test_autoaugment_batch(self):
+    images = tf.random.uniform((8, 64, 64, 3), maxval=256, dtype=tf.int32)
+    images = tf.cast(images, tf.uint8)
+
+    for policy in self.AVAILABLE_POLICIES:
+      augmenter = augment.AutoAugment(augmentation_name=policy)
+      aug_images = augmenter.distort_batch(images)
+
+      self.assertEqual((8, 64, 64, 3), aug_images.shape)
+
+  def test_sharpness_batch_of_empty_batch(self):
+    images = tf.zeros((0, 32, 48, 3), tf.uint8)
+    self.assertEqual((0, 32, 48, 3),
+                     augment._sharpness_batch(images, 0.5).shape)
+
+  @parameterized.parameters(True, False)
+  def test_distort_batch_of_single_image(self, use_randaug):
+    # Every op but at most two gets an empty partition of the batch.
+    images = tf.random.uniform((1, 32, 32, 3), maxval=256, dtype=tf.int32)
+    images = tf.cast(images, tf.uint8)
+    if use_randaug:
+      augmenter = augment.RandAugment(num_layers=2, magnitude=10)
+    else:
+      augmenter = augment.AutoAugment(augmentation_name='v0')
+    distort_batch = tf.function(augmenter.distort_batch)
+
+    for _ in range(10):
+      self.assertEqual((1, 32, 32, 3), distort_batch(images).shape)
+
+  def test_distort_batch_in_dataset(self):
+    images = tf.random.uniform((6, 32, 32, 3), maxval=256, dtype=tf.int32)
+    dataset = tf.data.Dataset.from_tensor_slices(tf.cast(images, tf.uint8))
+    augmenter = augment.RandAugment(num_layers=3, magnitude=5)
+    dataset = dataset.batch(4).map(augmenter.distort_batch)
+
+    shapes = [aug_images.shape for aug_images in dataset]
+    self.assertEqual([(4, 32, 32, 3), (2, 32, 32, 3)], shapes)
+
   def _generate_test_policy(self):
     """Generate a test policy at random."""
     op_list = list(augment.NAME_TO_FUNC.keys())
@@ -18,6 +18,10 @@ import math
 # Import libraries
 import cv2
 import numpy as np
+from pycocotools import mask as mask_api
+
+# The number of canvas pixels resampled at once by `batch_paste_instance_masks`.
+_PASTE_CHUNK_SIZE = 1 << 20
 
 
 def paste_instance_masks(masks,
@@ -188,3 +192,158 @@ def paste_instance_masks_v2(masks,
   segms = np.array(segms)
   return segms
 
+
+def _runs_to_rle(canvas_indices, num_pixels):
+  """Converts sorted foreground column-major pixel indices to RLE counts."""
+  if canvas_indices.size == 0:
+    return np.array([num_pixels], np.int64)
+  breaks = np.nonzero(np.diff(canvas_indices) != 1)[0]
+  starts = np.concatenate([canvas_indices[:1], canvas_indices[breaks + 1]])
+  ends = np.concatenate([canvas_indices[breaks], canvas_indices[-1:]]) + 1
+  boundaries = np.stack([starts, ends], axis=1).reshape([-1])
+  counts = np.diff(np.concatenate([[0], boundaries, [num_pixels]]))
+  # COCO RLEs do not end with an empty run of zeros.
+  return counts[:-1] if counts[-1] == 0 else counts
+
+
+def batch_paste_instance_masks(masks,
+                               detected_boxes,
+                               image_height,
+                               image_width,
+                               output_rle=False):
+  """Pastes instance masks, vectorized over all the instances of an image.
+
+  Like `paste_instance_masks_v2`, the masks are resampled bilinearly at the
+  centers of the image pixels and thresholded at 0.5, but the masks of all
+  the instances are resampled with a single gather, and only for the pixels
+  which are inside both the box and the image, rather than warped to their
+  whole box with `cv2.warpPerspective`. The results differ from it only on
+  pixels whose value is within the precision of OpenCV's fixed-point
+  interpolation from 0.5, and on boxes with no area, whose masks are empty.
+
+  Args:
+    masks: a numpy array of shape [N, mask_height, mask_width] representing the
+      instance masks w.r.t. the `detected_boxes`.
+    detected_boxes: a numpy array of shape [N, 4] representing the reference
+      bounding boxes.
+    image_height: an integer representing the height of the image.
+    image_width: an integer representing the width of the image.
+    output_rle: if True, returns the pasted masks as a list of N COCO RLEs
+      encoded straight from the foreground pixels, without materializing the
+      image canvas of each instance.
+
+  Returns:
+    segms: a numpy uint8 array of shape [N, image_height, image_width]
+      representing the instance masks *pasted* on the image canvas, or a list
+      of N COCO RLEs if `output_rle` is True.
+  """
+  num_instances, mask_height, mask_width = masks.shape
+  boxes = detected_boxes.astype(np.float64)
+  box_mins = boxes[:, 1::-1]
+  box_sizes = boxes[:, :1:-1]
+  mask_sizes = np.array([mask_height, mask_width], np.float64)
+
+  # The crop of each box is its extent rounded outwards to whole pixels, as in
+  # `paste_instance_masks_v2`. Boxes with no area have an empty mask.
+  crop_origins = np.floor(box_mins).astype(np.int64)
+  crop_sizes = np.ceil(box_mins + box_sizes).astype(np.int64) - crop_origins
+  crop_sizes[np.any(box_sizes <= 0, axis=1)] = 0
+  # The sampling scale from image to mask pixels, along each axis.
+  scales = mask_sizes / np.where(box_sizes > 0, box_sizes, 1.)
+
+  # The part of each crop which is inside the image.
+  canvas_y0 = np.clip(crop_origins[:, 0], 0, image_height)
+  canvas_x0 = np.clip(crop_origins[:, 1], 0, image_width)
+  canvas_y1 = np.clip(crop_origins[:, 0] + crop_sizes[:, 0], 0, image_height)
+  canvas_x1 = np.clip(crop_origins[:, 1] + crop_sizes[:, 1], 0, image_width)
+  roi_heights = np.maximum(canvas_y1 - canvas_y0, 0)
+  roi_widths = np.maximum(canvas_x1 - canvas_x0, 0)
+  roi_sizes = roi_heights * roi_widths
+
+  # The boxes are axis-aligned, so the horizontal sampling position in the mask
+  # only depends on the column, and the vertical one on the row. The centers of
+  # the image pixels are sampled bilinearly, between the centers of the mask
+  # pixels.
+  col_instances = np.repeat(np.arange(num_instances), roi_widths)
+  canvas_x = canvas_x0[col_instances] + np.arange(col_instances.size) - (
+      np.repeat(np.cumsum(roi_widths) - roi_widths, roi_widths))
+  x = ((canvas_x + 0.5 - box_mins[col_instances, 1]) *
+       scales[col_instances, 1] - 0.5)
+  x_floor = np.floor(x)
+
+  row_instances = np.repeat(np.arange(num_instances), roi_heights)
+  canvas_y = canvas_y0[row_instances] + np.arange(row_instances.size) - (
+      np.repeat(np.cumsum(roi_heights) - roi_heights, roi_heights))
+  y = ((canvas_y + 0.5 - box_mins[row_instances, 0]) *
+       scales[row_instances, 0] - 0.5)
+  y_floor = np.floor(y)
+
+  # Zero-pads the masks so that all the out-of-bound taps read zeros.
+  padded_height, padded_width = mask_height + 4, mask_width + 4
+  padded_masks = np.pad(
+      masks.astype(np.float32), [[0, 0], [2, 2], [2, 2]]).reshape([-1])
+  col_taps = (col_instances * padded_height * padded_width +
+              np.clip(x_floor, -2, mask_width).astype(np.int64) + 2)
+  row_taps = (np.clip(y_floor, -2, mask_height).astype(np.int64) +
+              2) * padded_width
+  col_weights = (x - x_floor).astype(np.float32)
+  row_weights = (y - y_floor).astype(np.float32)
+  if output_rle:
+    col_outputs = canvas_x * image_height
+    row_outputs = canvas_y
+    foregrounds = []
+  else:
+    col_outputs = col_instances * image_height * image_width + canvas_x
+    row_outputs = canvas_y * image_width
+    segms = np.zeros([num_instances, image_height, image_width], np.uint8)
+    flat_segms = segms.reshape([-1])
+
+  col_starts = np.cumsum(roi_widths) - roi_widths
+  row_starts = np.cumsum(roi_heights) - roi_heights
+  chunk_start = 0
+  while chunk_start < num_instances:
+    chunk_end = chunk_start + 1
+    chunk_pixels = roi_sizes[chunk_start]
+    while (chunk_end < num_instances and
+           chunk_pixels + roi_sizes[chunk_end] <= _PASTE_CHUNK_SIZE):
+      chunk_pixels += roi_sizes[chunk_end]
+      chunk_end += 1
+
+    # Enumerates the ROI pixels of the instances in column-major order.
+    cols = np.arange(col_starts[chunk_start],
+                     col_starts[chunk_start] + roi_widths[
+                         chunk_start:chunk_end].sum())
+    col_heights = roi_heights[col_instances[cols]]
+    pixel_cols = np.repeat(cols, col_heights)
+    pixel_rows = np.arange(chunk_pixels) + np.repeat(
+        row_starts[col_instances[cols]] - (np.cumsum(col_heights) -
+                                           col_heights), col_heights)
+
+    top_left = col_taps[pixel_cols] + row_taps[pixel_rows]
+    ax = col_weights[pixel_cols]
+    ay = row_weights[pixel_rows]
+    value = (padded_masks[top_left] * ((1 - ay) * (1 - ax)) +
+             padded_masks[top_left + 1] * ((1 - ay) * ax) +
+             padded_masks[top_left + padded_width] * (ay * (1 - ax)) +
+             padded_masks[top_left + padded_width + 1] * (ay * ax))
+    foreground = np.nonzero(value > 0.5)[0]
+    outputs = (col_outputs[pixel_cols[foreground]] +
+               row_outputs[pixel_rows[foreground]])
+
+    if output_rle:
+      splits = np.searchsorted(
+          foreground, np.cumsum(roi_sizes[chunk_start:chunk_end])[:-1])
+      foregrounds.extend(np.split(outputs, splits))
+    else:
+      flat_segms[outputs] = 1
+    chunk_start = chunk_end
+
+  if not output_rle:
+    return segms
+  if not num_instances:
+    return []
+  num_pixels = image_height * image_width
+  return mask_api.frPyObjects([{
+      'counts': _runs_to_rle(indices, num_pixels),
+      'size': [image_height, image_width],
+  } for indices in foregrounds], image_height, image_width)
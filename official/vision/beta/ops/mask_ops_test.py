@@ -16,12 +16,14 @@
 """Tests for mask_ops.py."""
 
 # Import libraries
+from absl.testing import parameterized
 import numpy as np
+from pycocotools import mask as mask_api
 import tensorflow as tf
 from official.vision.beta.ops import mask_ops
 
 
-class MaskUtilsTest(tf.test.TestCase):
+class MaskUtilsTest(tf.test.TestCase, parameterized.TestCase):
 
   def testPasteInstanceMasks(self):
     image_height = 10
@@ -50,6 +52,46 @@ class MaskUtilsTest(tf.test.TestCase):
         np.array(masks > 0.5, dtype=np.uint8),
         1e-5)
 
+  @parameterized.parameters((0, np.float64), (1, np.float32), (2, np.float64))
+  def testBatchPasteInstanceMasksMatchesV2(self, seed, box_dtype):
+    rng = np.random.RandomState(seed)
+    image_height, image_width = 120, 90
+    num_instances, mask_size = 12, 14
+    masks = rng.rand(num_instances, mask_size, mask_size).astype(np.float32)
+    # Boxes which are fractional, partially or fully outside of the image,
+    # much smaller or larger than the masks, or empty.
+    box_mins = rng.uniform(-40, 130, [num_instances, 2])
+    box_sizes = rng.uniform(0.5, 150, [num_instances, 2])
+    box_sizes[0] = [0, 20]
+    detected_boxes = np.concatenate([box_mins, box_sizes],
+                                    axis=-1).astype(box_dtype)
+    detected_boxes[0, :2] += 0.5
+
+    image_masks = mask_ops.paste_instance_masks_v2(
+        masks, detected_boxes, image_height, image_width)
+    batch_image_masks = mask_ops.batch_paste_instance_masks(
+        masks, detected_boxes, image_height, image_width)
+    self.assertEqual(np.uint8, batch_image_masks.dtype)
+    self.assertAllEqual(np.zeros([image_height, image_width]),
+                        batch_image_masks[0])
+    # Some OpenCV versions interpolate in fixed point, so pixels whose value
+    # is close to 0.5 may be thresholded differently.
+    crop_mins = np.floor(detected_boxes[:, :2])
+    crop_maxs = np.ceil(detected_boxes[:, :2] + detected_boxes[:, 2:])
+    image_size = np.array([image_width, image_height])
+    crop_areas = np.prod(
+        np.clip(crop_maxs, 0, image_size) - np.clip(crop_mins, 0, image_size),
+        axis=-1)
+    num_differences = np.sum(
+        image_masks[1:] != batch_image_masks[1:], axis=(1, 2))
+    self.assertAllLessEqual(num_differences - 0.05 * crop_areas[1:], 0)
+
+    rles = mask_ops.batch_paste_instance_masks(
+        masks, detected_boxes, image_height, image_width, output_rle=True)
+    self.assertLen(rles, num_instances)
+    for image_mask, rle in zip(batch_image_masks, rles):
+      self.assertEqual(mask_api.encode(np.asfortranarray(image_mask)), rle)
+
 
 if __name__ == '__main__':
   tf.test.main()
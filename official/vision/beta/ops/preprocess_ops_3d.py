@@ -142,9 +142,54 @@ def decode_jpeg(image_string: tf.Tensor, channels: int = 0) -> tf.Tensor:
   Returns:
     A Tensor of shape [T, H, W, C] of type uint8 with the decoded images.
   """
+  parallel_iterations = image_string.shape.as_list()[0] or 10
   return tf.map_fn(
       lambda x: tf.image.decode_jpeg(x, channels=channels),
-      image_string, back_prop=False, dtype=tf.uint8)
+      image_string, back_prop=False, dtype=tf.uint8,
+      parallel_iterations=parallel_iterations)
+
+
+def decode_and_crop_jpeg(image_string: tf.Tensor,
+                         crop_window: tf.Tensor,
+                         channels: int = 0) -> tf.Tensor:
+  """Decodes the same window of every JPEG frame of a sequence.
+
+  Only the window is decoded, which saves compute when it is much smaller than
+  the frames, and the result is the same as cropping the decoded frames. The
+  frames are decoded in parallel, and must all have the same size.
+
+  Args:
+    image_string: A `tf.Tensor` of type strings with the raw JPEG bytes where
+      the first dimension is timesteps.
+    crop_window: A `tf.Tensor` of type int32 and shape [4] with the
+      [offset_y, offset_x, crop_height, crop_width] of the window.
+    channels: Number of channels of the JPEG image. Allowed values are 0, 1 and
+      3. If 0, the number of channels will be calculated at runtime and no
+      static shape is set.
+
+  Returns:
+    A Tensor of shape [T, crop_height, crop_width, C] of type uint8 with the
+    decoded windows.
+  """
+  offset_y, offset_x, crop_height, crop_width = tf.unstack(crop_window)
+  # The chroma upsampling of libjpeg differs on the boundaries of a cropped
+  # decode, so a margin of one pixel is decoded around the window.
+  shape = tf.image.extract_jpeg_shape(image_string[0])
+  start_y = tf.maximum(offset_y - 1, 0)
+  start_x = tf.maximum(offset_x - 1, 0)
+  end_y = tf.minimum(offset_y + crop_height + 1, shape[0])
+  end_x = tf.minimum(offset_x + crop_width + 1, shape[1])
+  decode_window = tf.stack(
+      [start_y, start_x, end_y - start_y, end_x - start_x])
+
+  parallel_iterations = image_string.shape.as_list()[0] or 10
+  frames = tf.map_fn(
+      lambda x: tf.image.decode_and_crop_jpeg(  # pylint: disable=g-long-lambda
+          x, decode_window, channels=channels),
+      image_string, back_prop=False, dtype=tf.uint8,
+      parallel_iterations=parallel_iterations)
+  return frames[:, offset_y - start_y:offset_y - start_y + crop_height,
+                offset_x - start_x:offset_x - start_x + crop_width]
 
 
 def crop_image(frames: tf.Tensor,
@@ -48,7 +48,9 @@ class ImageClassificationTask(image_classification.ImageClassificationTask):
         params,
         dataset_fn=tf.data.TFRecordDataset,
         decoder_fn=decoder.decode,
-        parser_fn=parser.parse_fn(params.is_training))
+        parser_fn=parser.parse_fn(params.is_training),
+        snapshot_fns=parser.snapshot_fns(params.is_training),
+        snapshot_key=parser.snapshot_key())
 
     dataset = reader.read(input_context=input_context)
     return dataset
@@ -72,29 +72,70 @@ class DetectionModule(export_base.ExportModule):
 
     image_shape = image_info[1, :]  # Shape of original image.
 
-    input_anchor = anchor.build_anchor_generator(
+    anchor_boxes = anchor.get_anchor_boxes(
         min_level=model_params.min_level,
         max_level=model_params.max_level,
         num_scales=model_params.anchor.num_scales,
         aspect_ratios=model_params.anchor.aspect_ratios,
-        anchor_size=model_params.anchor.anchor_size)
-    anchor_boxes = input_anchor(image_size=(self._input_image_size[0],
-                                            self._input_image_size[1]))
+        anchor_size=model_params.anchor.anchor_size,
+        image_size=self._input_image_size)
 
     return image, anchor_boxes, image_shape
 
-  def _run_inference_on_image_tensors(self, images: tf.Tensor):
-    """Cast image to float and run inference.
+  def _build_inputs_batch(self, images):
+    """Builds detection model inputs for a batch of same-sized images.
+
+    This matches mapping `_build_inputs` over the batch, but resizes the batch
+    with single ops and embeds the anchor boxes as constants.
 
     Args:
-      images: uint8 Tensor of shape [batch_size, None, None, 3]
+      images: float Tensor of shape [batch_size, height, width, 3].
+
     Returns:
-      Tensor holding classification output logits.
+      A tuple of the batched images, anchor boxes and image shapes.
     """
     model_params = self._params.task.model
+    batch_size = tf.shape(images)[0]
+    images = preprocess_ops.normalize_image(images,
+                                            offset=MEAN_RGB,
+                                            scale=STDDEV_RGB)
+
+    # Same as `preprocess_ops.resize_and_crop_image` without jittering.
+    image_size = tf.cast(tf.shape(images)[1:3], tf.float32)
+    desired_size = tf.constant(self._input_image_size, tf.float32)
+    scale = tf.minimum(desired_size[0] / image_size[0],
+                       desired_size[1] / image_size[1])
+    scaled_size = tf.round(image_size * scale)
+    images = tf.image.resize(images, tf.cast(scaled_size, tf.int32))
+    padded_size = preprocess_ops.compute_padded_size(
+        self._input_image_size, 2**model_params.max_level)
+    images = tf.image.pad_to_bounding_box(images, 0, 0, padded_size[0],
+                                          padded_size[1])
+
+    anchor_boxes = anchor.get_anchor_boxes(
+        min_level=model_params.min_level,
+        max_level=model_params.max_level,
+        num_scales=model_params.anchor.num_scales,
+        aspect_ratios=model_params.anchor.aspect_ratios,
+        anchor_size=model_params.anchor.anchor_size,
+        image_size=self._input_image_size)
+    anchor_boxes = {
+        level: tf.tile(boxes[None], [batch_size, 1, 1, 1])
+        for level, boxes in anchor_boxes.items()
+    }
+    # Same as `image_info[1, :]` of `_build_inputs`.
+    image_shape = tf.tile(desired_size[None], [batch_size, 1])
+    return images, anchor_boxes, image_shape
+
+  def _preprocess_images(self, images):
+    """Builds the model inputs from a batch of uint8 images."""
+    model_params = self._params.task.model
     with tf.device('cpu:0'):
       images = tf.cast(images, dtype=tf.float32)
 
+      if self._batched_preprocessing:
+        return self._build_inputs_batch(images)
+
       # Tensor Specs for map_fn outputs (images, anchor_boxes, and image_info).
       images_spec = tf.TensorSpec(shape=self._input_image_size + [3],
                                   dtype=tf.float32)
@@ -113,7 +154,7 @@ class DetectionModule(export_base.ExportModule):
 
       image_shape_spec = tf.TensorSpec(shape=[2,], dtype=tf.float32)
 
-      images, anchor_boxes, image_shape = tf.nest.map_structure(
+      return tf.nest.map_structure(
           tf.identity,
           tf.map_fn(
               self._build_inputs,
@@ -122,6 +163,16 @@ class DetectionModule(export_base.ExportModule):
                                    image_shape_spec),
               parallel_iterations=32))
 
+  def _run_inference_on_image_tensors(self, images: tf.Tensor):
+    """Cast image to float and run inference.
+
+    Args:
+      images: uint8 Tensor of shape [batch_size, None, None, 3]
+    Returns:
+      Tensor holding classification output logits.
+    """
+    images, anchor_boxes, image_shape = self._preprocess_images(images)
+
     detections = self._model.call(
         images=images,
         image_shape=image_shape,
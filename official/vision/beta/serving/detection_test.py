@@ -139,5 +139,35 @@ class DetectionExportTest(tf.test.TestCase, parameterized.TestCase):
     self.assertAllClose(outputs['num_detections'].numpy(),
                         expected_outputs['num_detections'].numpy())
 
+  @parameterized.parameters(
+      ('maskrcnn_resnetfpn_coco',),
+      ('retinanet_resnetfpn_coco',),
+  )
+  def test_batched_preprocessing(self, experiment_name):
+    params = exp_factory.get_exp_config(experiment_name)
+    params.task.model.backbone.resnet.model_id = 18
+    params.task.model.detection_generator.use_batched_nms = True
+    module = detection.DetectionModule(
+        params,
+        batch_size=2,
+        input_image_size=[256, 256],
+        batched_preprocessing=True)
+    images = tf.random.uniform((2, 200, 300, 3), maxval=256, seed=1)
+
+    processed_images, anchor_boxes, image_shape = module._build_inputs_batch(
+        images)
+    for i in range(2):
+      expected_images, expected_anchor_boxes, expected_image_shape = (
+          module._build_inputs(images[i]))
+      self.assertAllClose(expected_images, processed_images[i])
+      self.assertAllEqual(expected_image_shape, image_shape[i])
+      for level, boxes in expected_anchor_boxes.items():
+        self.assertAllEqual(boxes, anchor_boxes[level][i])
+
+    module.build_model()
+    outputs = module.inference_from_image_tensors(tf.cast(images, tf.uint8))
+    self.assertAllEqual([2], outputs['num_detections'].shape)
+
+
 if __name__ == '__main__':
   tf.test.main()
@@ -36,7 +36,12 @@ def _decode_tf_example(tf_example_string_tensor):
 class ExportModule(tf.Module, metaclass=abc.ABCMeta):
   """Base Export Module."""
 
-  def __init__(self, params, batch_size, input_image_size, model=None):
+  def __init__(self,
+               params,
+               batch_size,
+               input_image_size,
+               model=None,
+               batched_preprocessing=False):
     """Initializes a module for export.
 
     Args:
@@ -44,6 +49,10 @@ class ExportModule(tf.Module, metaclass=abc.ABCMeta):
       batch_size: Int or None.
       input_image_size: List or Tuple of height, width of the input image.
       model: A tf.keras.Model instance to be exported.
+      batched_preprocessing: Whether to preprocess the whole batch of images
+        with batched ops instead of mapping the preprocessing over every image.
+        The images of a batch always share the same size, so the outputs are
+        the same. Modules which do not support it ignore it.
     """
 
     super(ExportModule, self).__init__()
@@ -51,6 +60,7 @@ class ExportModule(tf.Module, metaclass=abc.ABCMeta):
     self._batch_size = batch_size
     self._input_image_size = input_image_size
     self._model = model
+    self._batched_preprocessing = batched_preprocessing
 
   @abc.abstractmethod
   def build_model(self):
@@ -73,6 +73,11 @@ flags.DEFINE_string(
     'input_image_size', '224,224',
     'The comma-separated string of two integers representing the height,width '
     'of the input to the model.')
+flags.DEFINE_bool(
+    'batched_preprocessing', False,
+    'Whether to preprocess the whole batch of images with batched ops instead '
+    'of mapping the preprocessing over each image. Only used by detection '
+    'models.')
 
 
 def main(_):
@@ -96,7 +101,8 @@ def main(_):
       checkpoint_path=FLAGS.checkpoint_path,
       export_dir=FLAGS.export_dir,
       export_checkpoint_subdir='checkpoint',
-      export_saved_model_subdir='saved_model')
+      export_saved_model_subdir='saved_model',
+      batched_preprocessing=FLAGS.batched_preprocessing)
 
 
 if __name__ == '__main__':
@@ -29,7 +29,8 @@ from official.vision.beta.serving import semantic_segmentation
 def export_inference_graph(input_type, batch_size, input_image_size, params,
                            checkpoint_path, export_dir,
                            export_checkpoint_subdir=None,
-                           export_saved_model_subdir=None):
+                           export_saved_model_subdir=None,
+                           batched_preprocessing=False):
   """Exports inference graph for the model specified in the exp config.
 
   Saved model is stored at export_dir/saved_model, checkpoint is saved
@@ -46,6 +47,8 @@ def export_inference_graph(input_type, batch_size, input_image_size, params,
       to store checkpoint.
     export_saved_model_subdir: Optional subdirectory under export_dir
       to store saved model.
+    batched_preprocessing: Whether the exported module preprocesses the whole
+      batch of images with batched ops. Only used by detection models.
   """
 
   if export_checkpoint_subdir:
@@ -67,7 +70,10 @@ def export_inference_graph(input_type, batch_size, input_image_size, params,
   elif isinstance(params.task, configs.retinanet.RetinaNetTask) or isinstance(
       params.task, configs.maskrcnn.MaskRCNNTask):
     export_module = detection.DetectionModule(
-        params=params, batch_size=batch_size, input_image_size=input_image_size)
+        params=params,
+        batch_size=batch_size,
+        input_image_size=input_image_size,
+        batched_preprocessing=batched_preprocessing)
   elif isinstance(params.task,
                   configs.semantic_segmentation.SemanticSegmentationTask):
     export_module = semantic_segmentation.SegmentationModule(
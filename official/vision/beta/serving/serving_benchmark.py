@@ -0,0 +1,153 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+r"""Benchmarks the serving signatures of detection export modules on CPU.
+
+Compares mapping the preprocessing over every image with the batched
+preprocessing, for several batch sizes (shell script):
+
+serving_benchmark --experiment=retinanet_resnetfpn_coco \
+                  --input_type=image_bytes \
+                  --batch_sizes=1,8,32 \
+                  --input_image_size=640,640
+
+The model weights are randomly initialized, as only the latency matters.
+"""
+
+import io
+import time
+
+from absl import app
+from absl import flags
+from absl import logging
+import numpy as np
+from PIL import Image
+import tensorflow as tf
+
+from official.common import registry_imports  # pylint: disable=unused-import
+from official.core import exp_factory
+from official.modeling import hyperparams
+from official.vision.beta.serving import detection
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_string(
+    'experiment', 'retinanet_resnetfpn_coco',
+    'experiment type, e.g. retinanet_resnetfpn_coco')
+flags.DEFINE_string(
+    'params_override', '',
+    'The JSON/YAML file or string which specifies the parameter to be overriden'
+    ' on top of the experiment config.')
+flags.DEFINE_string(
+    'input_type', 'image_bytes',
+    'One of `image_tensor`, `image_bytes`, `tf_example`.')
+flags.DEFINE_string(
+    'batch_sizes', '1,8,32',
+    'The comma-separated batch sizes to benchmark.')
+flags.DEFINE_string(
+    'input_image_size', '640,640',
+    'The comma-separated string of two integers representing the height,width '
+    'of the input to the model.')
+flags.DEFINE_integer('num_iterations', 10, 'The number of timed calls.')
+
+
+def _get_dummy_input(input_type, batch_size, input_image_size):
+  """Returns a batch of random images in the format of the signature."""
+  image = np.random.randint(
+      0, 256, input_image_size + [3]).astype(np.uint8)
+  if input_type == 'image_tensor':
+    return tf.constant(np.stack([image] * batch_size))
+  byte_io = io.BytesIO()
+  Image.fromarray(image).save(byte_io, 'JPEG')
+  encoded_image = byte_io.getvalue()
+  if input_type == 'image_bytes':
+    return tf.constant([encoded_image] * batch_size)
+  example = tf.train.Example(
+      features=tf.train.Features(
+          feature={
+              'image/encoded':
+                  tf.train.Feature(
+                      bytes_list=tf.train.BytesList(value=[encoded_image])),
+          })).SerializeToString()
+  return tf.constant([example] * batch_size)
+
+
+def _time(fn, inputs, num_iterations):
+  """Returns the mean latency in seconds of calling `fn` on `inputs`."""
+  # Warms up the function.
+  tf.nest.map_structure(lambda x: x.numpy(), fn(inputs))
+  start = time.time()
+  for _ in range(num_iterations):
+    outputs = fn(inputs)
+  tf.nest.map_structure(lambda x: x.numpy(), outputs)
+  return (time.time() - start) / num_iterations
+
+
+def benchmark(params, input_type, batch_size, input_image_size,
+              batched_preprocessing, num_iterations):
+  """Returns the mean latencies of the preprocessing and of the signature."""
+  module = detection.DetectionModule(
+      params=params,
+      batch_size=batch_size,
+      input_image_size=input_image_size,
+      batched_preprocessing=batched_preprocessing)
+  module.build_model()
+  if input_type == 'image_tensor':
+    serving_fn = module.inference_from_image_tensors.get_concrete_function(
+        tf.TensorSpec([batch_size, None, None, 3], tf.uint8))
+  elif input_type == 'image_bytes':
+    serving_fn = module.inference_from_image_bytes.get_concrete_function(
+        tf.TensorSpec([batch_size], tf.string))
+  elif input_type == 'tf_example':
+    serving_fn = module.inference_from_tf_example.get_concrete_function(
+        tf.TensorSpec([batch_size], tf.string))
+  else:
+    raise ValueError('Unrecognized `input_type`')
+
+  # pylint: disable=protected-access
+  preprocessing_latency = _time(
+      tf.function(module._preprocess_images),
+      _get_dummy_input('image_tensor', batch_size, input_image_size),
+      num_iterations)
+  # pylint: enable=protected-access
+  serving_latency = _time(
+      serving_fn, _get_dummy_input(input_type, batch_size, input_image_size),
+      num_iterations)
+  return preprocessing_latency, serving_latency
+
+
+def main(_):
+  params = exp_factory.get_exp_config(FLAGS.experiment)
+  params.task.model.detection_generator.use_batched_nms = True
+  if FLAGS.params_override:
+    params = hyperparams.override_params_dict(
+        params, FLAGS.params_override, is_strict=True)
+  input_image_size = [int(x) for x in FLAGS.input_image_size.split(',')]
+
+  for batch_size in [int(x) for x in FLAGS.batch_sizes.split(',')]:
+    mapped, batched = [
+        benchmark(params, FLAGS.input_type, batch_size, input_image_size,
+                  batched_preprocessing, FLAGS.num_iterations)
+        for batched_preprocessing in [False, True]
+    ]
+    for i, name in enumerate(['preprocessing', 'serving']):
+      logging.info(
+          'batch_size=%d %s: %.2f ms/image with map_fn preprocessing, '
+          '%.2f ms/image with batched preprocessing (%.2fx).', batch_size,
+          name, mapped[i] * 1000 / batch_size, batched[i] * 1000 / batch_size,
+          mapped[i] / batched[i])
+
+
+if __name__ == '__main__':
+  app.run(main)
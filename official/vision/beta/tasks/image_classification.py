@@ -83,13 +83,17 @@ class ImageClassificationTask(base_task.Task):
         output_size=input_size[:2],
         num_classes=num_classes,
         aug_policy=params.aug_policy,
+        aug_batched=params.aug_batched,
         dtype=params.dtype)
 
     reader = input_reader.InputReader(
         params,
         dataset_fn=dataset_fn.pick_dataset_fn(params.file_type),
         decoder_fn=decoder.decode,
-        parser_fn=parser.parse_fn(params.is_training))
+        parser_fn=parser.parse_fn(params.is_training),
+        postprocess_fn=parser.postprocess_fn(params.is_training),
+        snapshot_fns=parser.snapshot_fns(params.is_training),
+        snapshot_key=parser.snapshot_key())
 
     dataset = reader.read(input_context=input_context)
 
@@ -140,13 +140,15 @@ class MaskRCNNTask(base_task.Task):
         skip_crowd_during_training=params.parser.skip_crowd_during_training,
         max_num_instances=params.parser.max_num_instances,
         include_mask=self._task_config.model.include_mask,
-        mask_crop_size=params.parser.mask_crop_size)
+        mask_crop_size=params.parser.mask_crop_size,
+        defer_anchor_labeling=params.parser.defer_anchor_labeling)
 
     reader = input_reader.InputReader(
         params,
         dataset_fn=dataset_fn.pick_dataset_fn(params.file_type),
         decoder_fn=decoder.decode,
-        parser_fn=parser.parse_fn(params.is_training))
+        parser_fn=parser.parse_fn(params.is_training),
+        postprocess_fn=parser.postprocess_fn(params.is_training))
     dataset = reader.read(input_context=input_context)
 
     return dataset
@@ -237,7 +239,10 @@ class MaskRCNNTask(base_task.Task):
       self.coco_metric = coco_evaluator.COCOEvaluator(
           annotation_file=self._task_config.annotation_file,
           include_mask=self._task_config.model.include_mask,
-          per_category_metrics=self._task_config.per_category_metrics)
+          per_category_metrics=self._task_config.per_category_metrics,
+          use_streaming_eval=self._task_config.use_streaming_eval,
+          num_eval_processes=self._task_config.num_eval_processes,
+          use_batch_mask_paste=self._task_config.use_batch_mask_paste)
 
     return metrics
 
@@ -118,13 +118,17 @@ class RetinaNetTask(base_task.Task):
         aug_scale_min=params.parser.aug_scale_min,
         aug_scale_max=params.parser.aug_scale_max,
         skip_crowd_during_training=params.parser.skip_crowd_during_training,
-        max_num_instances=params.parser.max_num_instances)
+        max_num_instances=params.parser.max_num_instances,
+        defer_anchor_labeling=params.parser.defer_anchor_labeling)
 
     reader = input_reader.InputReader(
         params,
         dataset_fn=dataset_fn.pick_dataset_fn(params.file_type),
         decoder_fn=decoder.decode,
-        parser_fn=parser.parse_fn(params.is_training))
+        parser_fn=parser.parse_fn(params.is_training),
+        postprocess_fn=parser.postprocess_fn(params.is_training),
+        snapshot_fns=parser.snapshot_fns(params.is_training),
+        snapshot_key=parser.snapshot_key())
     dataset = reader.read(input_context=input_context)
 
     return dataset
@@ -181,7 +185,9 @@ class RetinaNetTask(base_task.Task):
       self.coco_metric = coco_evaluator.COCOEvaluator(
           annotation_file=self._task_config.annotation_file,
           include_mask=False,
-          per_category_metrics=self._task_config.per_category_metrics)
+          per_category_metrics=self._task_config.per_category_metrics,
+          use_streaming_eval=self._task_config.use_streaming_eval,
+          num_eval_processes=self._task_config.num_eval_processes)
 
     return metrics
 
@@ -15,15 +15,15 @@
 # ==============================================================================
 """TensorFlow Model Garden Vision training driver."""
 
+import os
+
 from absl import app
 from absl import flags
 import gin
 
-# pylint: disable=unused-import
-from official.common import registry_imports
-# pylint: enable=unused-import
 from official.common import distribute_utils
 from official.common import flags as tfm_flags
+from official.core import registry_manifest
 from official.core import task_factory
 from official.core import train_lib
 from official.core import train_utils
@@ -31,6 +31,13 @@ from official.modeling import performance
 
 FLAGS = flags.FLAGS
 
+# Registers the experiments, tasks and backbones without importing them, so
+# that only the modules of the launched experiment are imported.
+registry_manifest.load(
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'common',
+        'registry_manifest.json'), 'official.common.registry_imports')
+
 
 def main(_):
   gin.parse_config_files_and_bindings(FLAGS.gin_file, FLAGS.gin_params)
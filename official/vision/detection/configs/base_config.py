@@ -84,6 +84,10 @@ BASE_CFG = {
         'eval_timeout': None,
         'num_steps_per_eval': 1000,
         'type': 'box',
+        # Matches detections per batch instead of buffering them for
+        # pycocotools. Only used by the 'box' and 'box_and_mask' evaluators.
+        'use_streaming_eval': False,
+        'num_eval_processes': 1,
         'use_json_file': True,
         'val_json_file': '',
         'eval_file_pattern': '',
@@ -40,6 +40,7 @@ from pycocotools import cocoeval
 import six
 import tensorflow as tf
 
+from official.vision.beta.evaluation import coco_streaming_eval
 from official.vision.detection.evaluation import coco_utils
 from official.vision.detection.utils import class_utils
 
@@ -76,7 +77,12 @@ class MetricWrapper(object):
 class COCOEvaluator(object):
   """COCO evaluation metric class."""
 
-  def __init__(self, annotation_file, include_mask, need_rescale_bboxes=True):
+  def __init__(self,
+               annotation_file,
+               include_mask,
+               need_rescale_bboxes=True,
+               use_streaming_eval=False,
+               num_eval_processes=None):
     """Constructs COCO evaluation class.
 
     The class provides the interface to metrics_fn in TPUEstimator. The
@@ -92,6 +98,11 @@ class COCOEvaluator(object):
         eval.
       need_rescale_bboxes: If true bboxes in `predictions` will be rescaled back
         to absolute values (`image_info` is needed in this case).
+      use_streaming_eval: If true, detections are matched to the groundtruths
+        as batches arrive with `coco_streaming_eval.StreamingCOCOEval` instead
+        of being buffered for `pycocotools`. The metrics are the same.
+      num_eval_processes: The number of processes used to accumulate the
+        streaming evaluation by category.
     """
     if annotation_file:
       if annotation_file.startswith('gs://'):
@@ -127,6 +138,17 @@ class COCOEvaluator(object):
       self._required_prediction_fields.extend(['detection_masks'])
       self._required_groundtruth_fields.extend(['masks'])
 
+    self._streaming_evals = None
+    if use_streaming_eval:
+      self._streaming_evals = [
+          coco_streaming_eval.StreamingCOCOEval(
+              iou_type='bbox', num_processes=num_eval_processes)
+      ]
+      if self._include_mask:
+        self._streaming_evals.append(
+            coco_streaming_eval.StreamingCOCOEval(
+                iou_type='segm', num_processes=num_eval_processes))
+
     self.reset()
 
   def reset(self):
@@ -134,6 +156,9 @@ class COCOEvaluator(object):
     self._predictions = {}
     if not self._annotation_file:
       self._groundtruths = {}
+    if self._streaming_evals:
+      for streaming_eval in self._streaming_evals:
+        streaming_eval.reset()
 
   def evaluate(self):
     """Evaluates with detections from all images with COCO API.
@@ -142,6 +167,9 @@ class COCOEvaluator(object):
       coco_metric: float numpy array with shape [24] representing the
         coco-style evaluation metrics (box and mask).
     """
+    if self._streaming_evals:
+      return self._evaluate_streaming()
+
     if not self._annotation_file:
       logging.info('Thre is no annotation_file in COCOEvaluator.')
       gt_dataset = coco_utils.convert_groundtruths_to_coco_dataset(
@@ -185,6 +213,46 @@ class COCOEvaluator(object):
       metrics_dict[name] = metrics[i].astype(np.float32)
     return metrics_dict
 
+  def _evaluate_streaming(self):
+    """Evaluates the detections matched by the streaming evaluations."""
+    category_ids = None
+    if self._annotation_file:
+      category_ids = self._coco_gt.getCatIds()
+    metrics = np.hstack([
+        streaming_eval.evaluate(category_ids)
+        for streaming_eval in self._streaming_evals
+    ])
+
+    # Cleans up the internal variables in order for a fresh eval next time.
+    self.reset()
+
+    metrics_dict = {}
+    for i, name in enumerate(self._metric_names):
+      metrics_dict[name] = metrics[i].astype(np.float32)
+    return metrics_dict
+
+  def _update_streaming_evals(self, predictions, groundtruths):
+    """Matches a batch of predictions in the streaming evaluations."""
+    if self._annotation_file:
+      image_groundtruths = None
+    else:
+      image_groundtruths = dict(
+          coco_streaming_eval.convert_groundtruths_to_images(
+              groundtruths, self._include_mask))
+    image_detections = coco_streaming_eval.convert_predictions_to_images(
+        predictions, self._include_mask)
+    for image_id, detections in image_detections:
+      if image_groundtruths is None:
+        if image_id not in self._coco_gt.imgs:
+          raise ValueError('Results do not correspond to the current dataset!')
+        image_gt = coco_streaming_eval.image_groundtruths_from_coco(
+            self._coco_gt, image_id, self._include_mask)
+      else:
+        image_gt = image_groundtruths[int(image_id)]
+      self._streaming_evals[0].add_image(image_id, image_gt, detections)
+      if self._include_mask:
+        self._streaming_evals[1].add_image(image_id, image_gt, detections)
+
   def _process_predictions(self, predictions):
     image_scale = np.tile(predictions['image_info'][:, 2:3, :], (1, 1, 2))
     predictions['detection_boxes'] = (
@@ -240,11 +308,6 @@ class COCOEvaluator(object):
             'Missing the required key `{}` in predictions!'.format(k))
     if self._need_rescale_bboxes:
       self._process_predictions(predictions)
-    for k, v in six.iteritems(predictions):
-      if k not in self._predictions:
-        self._predictions[k] = [v]
-      else:
-        self._predictions[k].append(v)
 
     if not self._annotation_file:
       assert groundtruths
@@ -252,6 +315,18 @@ class COCOEvaluator(object):
         if k not in groundtruths:
           raise ValueError(
               'Missing the required key `{}` in groundtruths!'.format(k))
+
+    if self._streaming_evals:
+      self._update_streaming_evals(predictions, groundtruths)
+      return
+
+    for k, v in six.iteritems(predictions):
+      if k not in self._predictions:
+        self._predictions[k] = [v]
+      else:
+        self._predictions[k].append(v)
+
+    if not self._annotation_file:
       for k, v in six.iteritems(groundtruths):
         if k not in self._groundtruths:
           self._groundtruths[k] = [v]
@@ -25,10 +25,14 @@ def evaluator_generator(params):
   """Generator function for various evaluators."""
   if params.type == 'box':
     evaluator = coco_evaluator.COCOEvaluator(
-        annotation_file=params.val_json_file, include_mask=False)
+        annotation_file=params.val_json_file, include_mask=False,
+        use_streaming_eval=params.use_streaming_eval,
+        num_eval_processes=params.num_eval_processes)
   elif params.type == 'box_and_mask':
     evaluator = coco_evaluator.COCOEvaluator(
-        annotation_file=params.val_json_file, include_mask=True)
+        annotation_file=params.val_json_file, include_mask=True,
+        use_streaming_eval=params.use_streaming_eval,
+        num_eval_processes=params.num_eval_processes)
   elif params.type == 'oln_xclass_box':
     evaluator = coco_evaluator.OlnXclassEvaluator(
         annotation_file=params.val_json_file, include_mask=False,
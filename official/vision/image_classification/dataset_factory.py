@@ -105,6 +105,9 @@ class DatasetConfig(base_config.Config):
       e.g. "grpc://tf-data-service:5050".
     mean_subtract: whether or not to apply mean subtraction to the dataset.
     standardize: whether or not to apply standardization to the dataset.
+    reduced_resolution_decode: whether to decode JPEG crops at a reduced
+      resolution (1/2, 1/4 or 1/8) when they are several times larger than
+      `image_size`, which is much faster than decoding them at full resolution.
   """
   name: Optional[str] = None
   data_dir: Optional[str] = None
@@ -129,6 +132,7 @@ class DatasetConfig(base_config.Config):
   tf_data_service: Optional[str] = None
   mean_subtract: bool = False
   standardize: bool = False
+  reduced_resolution_decode: bool = False
 
   @property
   def has_data(self):
@@ -511,7 +515,8 @@ class DatasetBuilder:
           mean_subtract=self.config.mean_subtract,
           standardize=self.config.standardize,
           dtype=self.dtype,
-          augmenter=self.augmenter)
+          augmenter=self.augmenter,
+          reduced_resolution_decode=self.config.reduced_resolution_decode)
     else:
       image = preprocessing.preprocess_for_eval(
           image,
@@ -519,7 +524,8 @@ class DatasetBuilder:
           num_channels=self.num_channels,
           mean_subtract=self.config.mean_subtract,
           standardize=self.config.standardize,
-          dtype=self.dtype)
+          dtype=self.dtype,
+          reduced_resolution_decode=self.config.reduced_resolution_decode)
 
     label = tf.cast(label, tf.int32)
     if self.config.one_hot:
@@ -0,0 +1,72 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Decodes JPEGs at reduced resolution with the DCT scaling of the decoder.
+
+Depends on TensorFlow only, so that the input pipelines can use it without
+importing the augmentations of `preprocessing`.
+"""
+
+import tensorflow as tf
+
+# The scale ratios supported by the JPEG decoder.
+JPEG_DECODE_RATIOS = (1, 2, 4, 8)
+
+
+def decode_and_crop_jpeg_reduced(image_bytes: tf.Tensor,
+                                 crop_window: tf.Tensor,
+                                 target_height: int,
+                                 target_width: int,
+                                 channels: int = 3) -> tf.Tensor:
+  """Decodes a crop of a JPEG at a reduced resolution.
+
+  Same as `tf.image.decode_and_crop_jpeg`, except that a large crop is decoded
+  at 1/2, 1/4 or 1/8 of its resolution by the IDCT itself, which is much cheaper
+  than decoding it at full resolution and resizing it. The ratio is the largest
+  that keeps the crop at least `target_height` x `target_width`, so the final
+  resize never upsamples more than it would have at full resolution.
+
+  Args:
+    image_bytes: `Tensor` representing a JPEG binary of arbitrary size.
+    crop_window: an int32 `Tensor` with the `[offset_height, offset_width,
+      crop_height, crop_width]` of the crop, at full resolution.
+    target_height: the height the crop is resized to.
+    target_width: the width the crop is resized to.
+    channels: number of image channels to decode.
+
+  Returns:
+    A decoded and cropped image `Tensor`.
+  """
+  offset_height, offset_width, crop_height, crop_width = tf.unstack(
+      crop_window)
+  scale = tf.minimum(crop_height // target_height, crop_width // target_width)
+
+  def decode_at(decode_ratio):
+    def decode():
+      # The crop window of the scaled decode is in scaled coordinates.
+      scaled_window = tf.stack([
+          offset_height // decode_ratio, offset_width // decode_ratio,
+          crop_height // decode_ratio, crop_width // decode_ratio
+      ])
+      return tf.image.decode_and_crop_jpeg(
+          image_bytes, scaled_window, channels=channels, ratio=decode_ratio)
+    return decode
+
+  # The ratio is an attribute of the decode op, so it has to be static.
+  branch_index = tf.reduce_sum(
+      tf.cast(scale >= JPEG_DECODE_RATIOS[1:], tf.int32))
+  image = tf.switch_case(branch_index,
+                         [decode_at(r) for r in JPEG_DECODE_RATIOS])
+  image.set_shape([None, None, channels])
+  return image
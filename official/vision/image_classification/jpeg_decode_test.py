@@ -0,0 +1,87 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for jpeg_decode."""
+
+from unittest import mock
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+from official.vision.image_classification import jpeg_decode
+from official.vision.image_classification.resnet import imagenet_preprocessing
+
+
+def _jpeg(height, width, seed=0):
+  """Returns a JPEG of a smooth random image."""
+  noise = np.random.RandomState(seed).uniform(0, 255, (16, 16, 3))
+  image = tf.image.resize(noise, [height, width], method='bicubic')
+  image = tf.cast(tf.clip_by_value(image, 0, 255), tf.uint8)
+  return tf.io.encode_jpeg(image, quality=95)
+
+
+def _fixed_crop(*args, **kwargs):
+  """Replaces `sample_distorted_bounding_box` with a fixed crop."""
+  del args, kwargs
+  bbox_begin = tf.constant([100, 200, 0])
+  bbox_size = tf.constant([800, 900, -1])
+  return bbox_begin, bbox_size, tf.zeros([1, 1, 4])
+
+
+class JpegDecodeTest(parameterized.TestCase, tf.test.TestCase):
+
+  @parameterized.parameters(
+      # A crop smaller than twice the target is decoded at full resolution.
+      ((10, 20, 300, 400), (300, 400)),
+      ((0, 0, 480, 640), (240, 320)),
+      ((8, 16, 950, 1200), (237, 300)),
+      ((0, 0, 1800, 2400), (225, 300)),
+  )
+  def test_crop_is_decoded_at_reduced_resolution(self, crop_window,
+                                                  expected_shape):
+    image_bytes = _jpeg(1800, 2400)
+    image = jpeg_decode.decode_and_crop_jpeg_reduced(
+        image_bytes, tf.constant(crop_window), 224, 224)
+    self.assertEqual(image.shape, expected_shape + (3,))
+
+    ratio = crop_window[2] // expected_shape[0]
+    expected = tf.image.decode_and_crop_jpeg(
+        image_bytes, [x // ratio for x in crop_window],
+        channels=3,
+        ratio=ratio)
+    self.assertAllEqual(expected, image)
+
+  @parameterized.parameters(True, False)
+  @mock.patch.object(tf.image, 'random_flip_left_right', tf.identity)
+  @mock.patch.object(tf.image, 'sample_distorted_bounding_box', _fixed_crop)
+  def test_imagenet_preprocess_image_parity(self, is_training):
+    image_bytes = _jpeg(1000, 1500)
+    bbox = tf.zeros([1, 0, 4])
+    kwargs = dict(
+        image_buffer=image_bytes,
+        bbox=bbox,
+        output_height=224,
+        output_width=224,
+        num_channels=3,
+        is_training=is_training)
+    expected = imagenet_preprocessing.preprocess_image(**kwargs)
+    image = imagenet_preprocessing.preprocess_image(
+        reduced_resolution_decode=True, **kwargs)
+    self.assertEqual(expected.shape, image.shape)
+    self.assertLess(np.mean(np.abs(expected - image)), 3.)
+
+
+if __name__ == '__main__':
+  tf.test.main()
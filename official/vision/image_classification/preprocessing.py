@@ -23,6 +23,7 @@ import tensorflow as tf
 from typing import List, Optional, Text, Tuple
 
 from official.vision.image_classification import augment
+from official.vision.image_classification import jpeg_decode
 
 
 # Calculated from the ImageNet training set
@@ -170,13 +171,18 @@ def normalize_images(features: tf.Tensor,
 
 def decode_and_center_crop(image_bytes: tf.Tensor,
                            image_size: int = IMAGE_SIZE,
-                           crop_padding: int = CROP_PADDING) -> tf.Tensor:
+                           crop_padding: int = CROP_PADDING,
+                           reduced_resolution_decode: bool = False
+                          ) -> tf.Tensor:
   """Crops to center of image with padding then scales image_size.
 
   Args:
     image_bytes: `Tensor` representing an image binary of arbitrary size.
     image_size: image height/width dimension.
     crop_padding: the padding size to use when centering the crop.
+    reduced_resolution_decode: whether to decode JPEGs at a reduced resolution,
+      see `jpeg_decode.decode_and_crop_jpeg_reduced`. Ignored for decoded
+      images.
 
   Returns:
     A decoded and cropped image `Tensor`.
@@ -203,6 +209,9 @@ def decode_and_center_crop(image_bytes: tf.Tensor,
         offset_width=offset_width,
         target_height=padded_center_crop_size,
         target_width=padded_center_crop_size)
+  elif reduced_resolution_decode:
+    image = jpeg_decode.decode_and_crop_jpeg_reduced(image_bytes, crop_window,
+                                                     image_size, image_size)
   else:
     image = tf.image.decode_and_crop_jpeg(image_bytes, crop_window, channels=3)
 
@@ -213,11 +222,17 @@ def decode_and_center_crop(image_bytes: tf.Tensor,
   return image
 
 
-def decode_crop_and_flip(image_bytes: tf.Tensor) -> tf.Tensor:
+def decode_crop_and_flip(image_bytes: tf.Tensor,
+                         image_size: int = IMAGE_SIZE,
+                         reduced_resolution_decode: bool = False) -> tf.Tensor:
   """Crops an image to a random part of the image, then randomly flips.
 
   Args:
     image_bytes: `Tensor` representing an image binary of arbitrary size.
+    image_size: image height/width dimension the crop is resized to.
+    reduced_resolution_decode: whether to decode JPEGs at a reduced resolution,
+      see `jpeg_decode.decode_and_crop_jpeg_reduced`. Ignored for decoded
+      images.
 
   Returns:
     A decoded and cropped image `Tensor`.
@@ -249,6 +264,9 @@ def decode_crop_and_flip(image_bytes: tf.Tensor) -> tf.Tensor:
         offset_width=offset_width,
         target_height=target_height,
         target_width=target_width)
+  elif reduced_resolution_decode:
+    cropped = jpeg_decode.decode_and_crop_jpeg_reduced(
+        image_bytes, crop_window, image_size, image_size)
   else:
     cropped = tf.image.decode_and_crop_jpeg(image_bytes,
                                             crop_window,
@@ -284,7 +302,8 @@ def preprocess_for_eval(
     num_channels: int = 3,
     mean_subtract: bool = False,
     standardize: bool = False,
-    dtype: tf.dtypes.DType = tf.float32
+    dtype: tf.dtypes.DType = tf.float32,
+    reduced_resolution_decode: bool = False
 ) -> tf.Tensor:
   """Preprocesses the given image for evaluation.
 
@@ -295,11 +314,16 @@ def preprocess_for_eval(
     mean_subtract: whether or not to apply mean subtraction.
     standardize: whether or not to apply standardization.
     dtype: the dtype to convert the images to. Set to `None` to skip conversion.
+    reduced_resolution_decode: whether to decode JPEGs at a reduced resolution,
+      see `jpeg_decode.decode_and_crop_jpeg_reduced`.
 
   Returns:
     A preprocessed and normalized image `Tensor`.
   """
-  images = decode_and_center_crop(image_bytes, image_size)
+  images = decode_and_center_crop(
+      image_bytes,
+      image_size,
+      reduced_resolution_decode=reduced_resolution_decode)
   images = tf.reshape(images, [image_size, image_size, num_channels])
 
   if mean_subtract:
@@ -362,7 +386,9 @@ def preprocess_for_train(image_bytes: tf.Tensor,
                          augmenter: Optional[augment.ImageAugment] = None,
                          mean_subtract: bool = False,
                          standardize: bool = False,
-                         dtype: tf.dtypes.DType = tf.float32) -> tf.Tensor:
+                         dtype: tf.dtypes.DType = tf.float32,
+                         reduced_resolution_decode: bool = False
+                        ) -> tf.Tensor:
   """Preprocesses the given image for training.
 
   Args:
@@ -373,11 +399,16 @@ def preprocess_for_train(image_bytes: tf.Tensor,
     mean_subtract: whether or not to apply mean subtraction.
     standardize: whether or not to apply standardization.
     dtype: the dtype to convert the images to. Set to `None` to skip conversion.
+    reduced_resolution_decode: whether to decode JPEGs at a reduced resolution,
+      see `jpeg_decode.decode_and_crop_jpeg_reduced`.
 
   Returns:
     A preprocessed and normalized image `Tensor`.
   """
-  images = decode_crop_and_flip(image_bytes=image_bytes)
+  images = decode_crop_and_flip(
+      image_bytes=image_bytes,
+      image_size=image_size,
+      reduced_resolution_decode=reduced_resolution_decode)
   images = resize_image(images, height=image_size, width=image_size)
   if augmenter is not None:
     images = augmenter.distort(images)
@@ -0,0 +1,136 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+r"""Benchmarks the reduced resolution JPEG decoding of the input pipelines.
+
+Runs the training and evaluation preprocessing of `preprocessing` (used by
+`DatasetBuilder`) and of `imagenet_preprocessing` on a single core, with and
+without `reduced_resolution_decode`, and logs the images per second of each.
+The parity of the evaluation images is logged as the mean absolute difference
+of their pixels (in [0, 255]). Reads the JPEGs of ImageNet TFRecords if given,
+and otherwise encodes random images of the given sizes (shell script):
+
+python3 -m official.vision.image_classification.preprocessing_benchmark \
+    --file_pattern=/path/to/imagenet/validation-* --num_images=2000
+"""
+import time
+
+from absl import app
+from absl import flags
+from absl import logging
+import numpy as np
+import tensorflow as tf
+
+from official.vision.image_classification import preprocessing
+from official.vision.image_classification.resnet import imagenet_preprocessing
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_string('file_pattern', None,
+                    'The ImageNet TFRecords to read the JPEGs from.')
+flags.DEFINE_integer('num_images', 500, 'The number of timed images.')
+flags.DEFINE_list('image_sizes', ['375x500', '768x1024', '1536x2048'],
+                  'The HEIGHTxWIDTH of the random images, without TFRecords.')
+flags.DEFINE_integer('image_size', 224, 'The size of the model inputs.')
+
+
+def _random_jpegs():
+  """Returns JPEGs of smooth random images of the sizes of `image_sizes`."""
+  rng = np.random.RandomState(0)
+  jpegs = []
+  for i in range(FLAGS.num_images):
+    size = FLAGS.image_sizes[i % len(FLAGS.image_sizes)]
+    height, width = [int(x) for x in size.split('x')]
+    image = tf.image.resize(
+        rng.uniform(0, 255, (32, 32, 3)), [height, width], method='bicubic')
+    jpegs.append(
+        tf.io.encode_jpeg(tf.cast(tf.clip_by_value(image, 0, 255), tf.uint8),
+                          quality=90).numpy())
+  return jpegs
+
+
+def _tfrecord_jpegs():
+  dataset = tf.data.TFRecordDataset(tf.io.gfile.glob(FLAGS.file_pattern))
+  dataset = dataset.take(FLAGS.num_images).map(
+      lambda record: imagenet_preprocessing.parse_example_proto(record)[0])
+  return list(dataset.as_numpy_iterator())
+
+
+def _preprocess_fns(reduced_resolution_decode):
+  """Returns the preprocessing functions to benchmark, by name."""
+  image_size = FLAGS.image_size
+  bbox = tf.zeros([1, 0, 4])
+
+  def imagenet_preprocess(image_bytes, is_training):
+    return imagenet_preprocessing.preprocess_image(
+        image_bytes, bbox, image_size, image_size,
+        imagenet_preprocessing.NUM_CHANNELS, is_training=is_training,
+        reduced_resolution_decode=reduced_resolution_decode)
+
+  return {
+      'train': lambda x: preprocessing.preprocess_for_train(  # pylint: disable=g-long-lambda
+          x, image_size,
+          reduced_resolution_decode=reduced_resolution_decode),
+      'eval': lambda x: preprocessing.preprocess_for_eval(  # pylint: disable=g-long-lambda
+          x, image_size,
+          reduced_resolution_decode=reduced_resolution_decode),
+      'imagenet_train': lambda x: imagenet_preprocess(x, True),
+      'imagenet_eval': lambda x: imagenet_preprocess(x, False),
+  }
+
+
+def _dataset(jpegs, preprocess_fn):
+  """Preprocesses the JPEGs on a single core."""
+  dataset = tf.data.Dataset.from_tensor_slices(jpegs).map(preprocess_fn)
+  options = tf.data.Options()
+  options.experimental_threading.private_threadpool_size = 1
+  options.experimental_optimization.autotune = False
+  return dataset.with_options(options)
+
+
+def _images_per_second(jpegs, preprocess_fn):
+  dataset = _dataset(jpegs, preprocess_fn)
+  # Warms up.
+  for _ in dataset.take(10):
+    pass
+  start = time.time()
+  for _ in dataset:
+    pass
+  return len(jpegs) / (time.time() - start)
+
+
+def main(_):
+  tf.config.threading.set_inter_op_parallelism_threads(1)
+  tf.config.threading.set_intra_op_parallelism_threads(1)
+  jpegs = _tfrecord_jpegs() if FLAGS.file_pattern else _random_jpegs()
+
+  for name, preprocess_fn in _preprocess_fns(False).items():
+    reduced_fn = _preprocess_fns(True)[name]
+    full = _images_per_second(jpegs, preprocess_fn)
+    reduced = _images_per_second(jpegs, reduced_fn)
+    logging.info('%s: %.1f images/s/core at full resolution, %.1f images/s/core '
+                 'at reduced resolution (%.2fx).', name, full, reduced,
+                 reduced / full)
+
+    if name.endswith('eval'):
+      differences = [
+          np.mean(np.abs(x - y)) for x, y in zip(
+              _dataset(jpegs, preprocess_fn), _dataset(jpegs, reduced_fn))
+      ]
+      logging.info('%s: mean absolute pixel difference %.3f (max %.3f).',
+                   name, np.mean(differences), np.max(differences))
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -0,0 +1,71 @@
+# Copyright 2021 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for preprocessing."""
+
+from unittest import mock
+
+import numpy as np
+import tensorflow as tf
+
+from official.vision.image_classification import preprocessing
+
+
+def _jpeg(height, width, seed=0):
+  """Returns a JPEG of a smooth random image."""
+  noise = np.random.RandomState(seed).uniform(0, 255, (16, 16, 3))
+  image = tf.image.resize(noise, [height, width], method='bicubic')
+  image = tf.cast(tf.clip_by_value(image, 0, 255), tf.uint8)
+  return tf.io.encode_jpeg(image, quality=95)
+
+
+def _fixed_crop(*args, **kwargs):
+  """Replaces `sample_distorted_bounding_box` with a fixed crop."""
+  del args, kwargs
+  bbox_begin = tf.constant([100, 200, 0])
+  bbox_size = tf.constant([800, 900, -1])
+  return bbox_begin, bbox_size, tf.zeros([1, 1, 4])
+
+
+class ReducedResolutionDecodeTest(tf.test.TestCase):
+
+  def test_preprocess_for_eval_parity(self):
+    image_bytes = _jpeg(1000, 1500)
+    expected = preprocessing.preprocess_for_eval(image_bytes)
+    image = preprocessing.preprocess_for_eval(
+        image_bytes, reduced_resolution_decode=True)
+    self.assertEqual(expected.shape, image.shape)
+    self.assertLess(np.mean(np.abs(expected - image)), 3.)
+
+  @mock.patch.object(tf.image, 'random_flip_left_right', tf.identity)
+  @mock.patch.object(tf.image, 'sample_distorted_bounding_box', _fixed_crop)
+  def test_preprocess_for_train_parity(self):
+    image_bytes = _jpeg(1000, 1500)
+    expected = preprocessing.preprocess_for_train(image_bytes, dtype=None)
+    image = preprocessing.preprocess_for_train(
+        image_bytes, dtype=None, reduced_resolution_decode=True)
+    self.assertEqual(expected.shape, image.shape)
+    self.assertLess(np.mean(np.abs(expected - image)), 3.)
+
+  def test_decoded_images_are_not_changed(self):
+    image = tf.random.uniform((300, 400, 3), maxval=255, dtype=tf.int32)
+    expected = preprocessing.decode_and_center_crop(image, 224)
+    self.assertAllEqual(
+        expected,
+        preprocessing.decode_and_center_crop(
+            image, 224, reduced_resolution_decode=True))
+
+
+if __name__ == '__main__':
+  tf.test.main()
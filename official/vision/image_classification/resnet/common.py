@@ -276,6 +276,11 @@ def define_keras_flags(dynamic_loss_scale=True,
       name='enable_checkpoint_and_export',
       default=False,
       help='Whether to enable a checkpoint callback and export the savedmodel.')
+  flags.DEFINE_boolean(
+      name='reduced_resolution_decode',
+      default=False,
+      help='Whether to decode the JPEG images at 1/2, 1/4 or 1/8 of their '
+      'resolution when they are several times larger than the model inputs.')
   flags.DEFINE_string(name='tpu', default='', help='TPU address to connect to.')
   flags.DEFINE_integer(
       name='steps_per_loop',
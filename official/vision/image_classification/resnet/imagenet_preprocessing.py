@@ -40,6 +40,8 @@ import os
 from absl import logging
 import tensorflow as tf
 
+from official.vision.image_classification import jpeg_decode
+
 DEFAULT_IMAGE_SIZE = 224
 NUM_CHANNELS = 3
 NUM_CLASSES = 1001
@@ -216,7 +218,8 @@ def parse_example_proto(example_serialized):
   return features['image/encoded'], label, bbox
 
 
-def parse_record(raw_record, is_training, dtype):
+def parse_record(raw_record, is_training, dtype,
+                 reduced_resolution_decode=False):
   """Parses a record containing a training example of an image.
 
   The input record is parsed into a label and image, and the image is passed
@@ -227,6 +230,8 @@ def parse_record(raw_record, is_training, dtype):
       buffer.
     is_training: A boolean denoting whether the input is for training.
     dtype: data type to use for images/features.
+    reduced_resolution_decode: Whether to decode the JPEG at a reduced
+      resolution, see `preprocess_image`.
 
   Returns:
     Tuple with processed image tensor in a channel-last format and
@@ -240,7 +245,8 @@ def parse_record(raw_record, is_training, dtype):
       output_height=DEFAULT_IMAGE_SIZE,
       output_width=DEFAULT_IMAGE_SIZE,
       num_channels=NUM_CHANNELS,
-      is_training=is_training)
+      is_training=is_training,
+      reduced_resolution_decode=reduced_resolution_decode)
   image = tf.cast(image, dtype)
 
   # Subtract one so that labels are in [0, 1000), and cast to float32 for
@@ -251,7 +257,8 @@ def parse_record(raw_record, is_training, dtype):
   return image, label
 
 
-def get_parse_record_fn(use_keras_image_data_format=False):
+def get_parse_record_fn(use_keras_image_data_format=False,
+                        reduced_resolution_decode=False):
   """Get a function for parsing the records, accounting for image format.
 
   This is useful by handling different types of Keras models. For instance,
@@ -264,13 +271,16 @@ def get_parse_record_fn(use_keras_image_data_format=False):
     use_keras_image_data_format: A boolean denoting whether data format is keras
       backend image data format. If False, the image format is channel-last. If
       True, the image format matches tf.keras.backend.image_data_format().
+    reduced_resolution_decode: Whether to decode the JPEG at a reduced
+      resolution, see `preprocess_image`.
 
   Returns:
     Function to use for parsing the records.
   """
 
   def parse_record_fn(raw_record, is_training, dtype):
-    image, label = parse_record(raw_record, is_training, dtype)
+    image, label = parse_record(raw_record, is_training, dtype,
+                                reduced_resolution_decode)
     if use_keras_image_data_format:
       if tf.keras.backend.image_data_format() == 'channels_first':
         image = tf.transpose(image, perm=[2, 0, 1])
@@ -355,7 +365,10 @@ def input_fn(is_training,
   )
 
 
-def _decode_crop_and_flip(image_buffer, bbox, num_channels):
+def _decode_crop_and_flip(image_buffer, bbox, num_channels,
+                          output_height=DEFAULT_IMAGE_SIZE,
+                          output_width=DEFAULT_IMAGE_SIZE,
+                          reduced_resolution_decode=False):
   """Crops the given image to a random part of the image, and randomly flips.
 
   We use the fused decode_and_crop op, which performs better than the two ops
@@ -368,6 +381,10 @@ def _decode_crop_and_flip(image_buffer, bbox, num_channels):
       where each coordinate is [0, 1) and the coordinates are arranged as [ymin,
       xmin, ymax, xmax].
     num_channels: Integer depth of the image buffer for decoding.
+    output_height: The height the crop is resized to.
+    output_width: The width the crop is resized to.
+    reduced_resolution_decode: Whether to decode a large crop at a reduced
+      resolution, no smaller than `output_height` x `output_width`.
 
   Returns:
     3-D tensor with cropped image.
@@ -396,8 +413,13 @@ def _decode_crop_and_flip(image_buffer, bbox, num_channels):
   crop_window = tf.stack([offset_y, offset_x, target_height, target_width])
 
   # Use the fused decode and crop op here, which is faster than each in series.
-  cropped = tf.image.decode_and_crop_jpeg(
-      image_buffer, crop_window, channels=num_channels)
+  if reduced_resolution_decode:
+    cropped = jpeg_decode.decode_and_crop_jpeg_reduced(
+        image_buffer, crop_window, output_height, output_width,
+        channels=num_channels)
+  else:
+    cropped = tf.image.decode_and_crop_jpeg(
+        image_buffer, crop_window, channels=num_channels)
 
   # Flip to add a little more random distortion in.
   cropped = tf.image.random_flip_left_right(cropped)
@@ -538,7 +560,8 @@ def preprocess_image(image_buffer,
                      output_height,
                      output_width,
                      num_channels,
-                     is_training=False):
+                     is_training=False,
+                     reduced_resolution_decode=False):
   """Preprocesses the given image.
 
   Preprocessing includes decoding, cropping, and resizing for both training
@@ -555,14 +578,28 @@ def preprocess_image(image_buffer,
     num_channels: Integer depth of the image buffer for decoding.
     is_training: `True` if we're preprocessing the image for training and
       `False` otherwise.
+    reduced_resolution_decode: Whether to decode the JPEG at 1/2, 1/4 or 1/8 of
+      its resolution when it is several times larger than the size it is
+      resized to. This is much faster than decoding it at full resolution.
 
   Returns:
     A preprocessed image.
   """
   if is_training:
     # For training, we want to randomize some of the distortions.
-    image = _decode_crop_and_flip(image_buffer, bbox, num_channels)
+    image = _decode_crop_and_flip(image_buffer, bbox, num_channels,
+                                  output_height, output_width,
+                                  reduced_resolution_decode)
     image = _resize_image(image, output_height, output_width)
+  elif reduced_resolution_decode:
+    # The whole image is decoded, at a ratio that keeps its smallest side at
+    # least _RESIZE_MIN.
+    shape = tf.image.extract_jpeg_shape(image_buffer)
+    image = jpeg_decode.decode_and_crop_jpeg_reduced(
+        image_buffer, tf.stack([0, 0, shape[0], shape[1]]), _RESIZE_MIN,
+        _RESIZE_MIN, channels=num_channels)
+    image = _aspect_preserving_resize(image, _RESIZE_MIN)
+    image = _central_crop(image, output_height, output_width)
   else:
     # For validation, we want to decode, resize, then just crop the middle.
     image = tf.image.decode_jpeg(image_buffer, channels=num_channels)
@@ -97,13 +97,15 @@ class ResnetRunnable(orbit.StandardTrainer, orbit.StandardEvaluator):
     # Handling epochs.
     self.epoch_steps = epoch_steps
     self.epoch_helper = orbit.utils.EpochHelper(epoch_steps, self.global_step)
+    parse_record_fn = imagenet_preprocessing.get_parse_record_fn(
+        reduced_resolution_decode=flags_obj.reduced_resolution_decode)
     train_dataset = orbit.utils.make_distributed_dataset(
         self.strategy,
         self.input_fn,
         is_training=True,
         data_dir=self.flags_obj.data_dir,
         batch_size=self.batch_size,
-        parse_record_fn=imagenet_preprocessing.parse_record,
+        parse_record_fn=parse_record_fn,
         datasets_num_private_threads=self.flags_obj
         .datasets_num_private_threads,
         dtype=self.dtype,
@@ -121,7 +123,7 @@ class ResnetRunnable(orbit.StandardTrainer, orbit.StandardEvaluator):
           is_training=False,
           data_dir=self.flags_obj.data_dir,
           batch_size=self.batch_size,
-          parse_record_fn=imagenet_preprocessing.parse_record,
+          parse_record_fn=parse_record_fn,
           dtype=self.dtype)
       orbit.StandardEvaluator.__init__(
           self,
@@ -14,10 +14,14 @@
 
 """Provides a `Controller` class for managing the outer training loop."""
 
+import collections
+import concurrent.futures
+import contextlib
+import os
 import pprint
 import time
 
-from typing import Callable, Optional, Union
+from typing import Any, Callable, Optional, Tuple, Union
 
 from absl import logging
 
@@ -36,6 +40,14 @@ def _log(message: str):
 logging.ABSLLogger.register_frame_to_skip(__file__, _log.__name__)
 
 
+def _async_checkpoint_options() -> Optional[tf.train.CheckpointOptions]:
+  """Returns options writing checkpoints asynchronously, if TF supports it."""
+  try:
+    return tf.train.CheckpointOptions(experimental_enable_async_checkpoint=True)
+  except TypeError:
+    return None
+
+
 def _format_output(output, indent=4):
   """Formats `output`, either on one line, or indented across multiple lines."""
   formatted = pprint.pformat(output)
@@ -82,6 +94,13 @@ class Controller:
       # Train related
       steps_per_loop: Optional[int] = None,
       checkpoint_manager: Optional[tf.train.CheckpointManager] = None,
+      async_checkpoint: bool = False,
+      profiler: Optional[Any] = None,
+      profile_steps: Optional[Tuple[int, int]] = None,
+      # Background evaluation related
+      background_evaluator: Optional[runner.AbstractEvaluator] = None,
+      background_eval_checkpoint: Optional[tf.train.Checkpoint] = None,
+      max_pending_evals: int = 1,
       # Summary related
       summary_interval: Optional[int] = None,
       summary_dir: Optional[str] = None,
@@ -117,6 +136,42 @@ class Controller:
         the model will be restored from the most recent checkpoint inside this
         `__init__` method. If not provided, the `Controller` will not
         automatically save to or restore from checkpoints.
+      async_checkpoint: Whether to write checkpoints on a background thread,
+        with `tf.train.CheckpointOptions(experimental_enable_async_checkpoint=
+        True)`. The checkpointed values are copied to host memory at the save
+        step and training continues while they are written. At most one save
+        is in flight: a new save first waits for the previous one to complete,
+        and raises its error if it failed. `train` waits for the pending save
+        before returning. The time training was blocked by saves is summarized
+        as "checkpoint_blocking_time". If the TensorFlow version does not
+        support asynchronous checkpoints, they are saved synchronously.
+      profiler: An optional host-side profiler, i.e. an object with `start()`,
+        `stop()` and `write(directory)` methods (for example the
+        `CallstackSampler` in `official/utils/misc/callstack_sampler.py`). It
+        is started when training reaches the first step of `profile_steps`,
+        and stopped when it reaches the second one, after which its output is
+        written to a "profile_<start>_<stop>" subdirectory of `summary_dir`.
+        If the window spans several calls to `train` (for example around the
+        evaluations of `train_and_evaluate`), the profiler is stopped at the
+        end of each call, and the part of the window profiled during each
+        call is written to its own "profile_<from>_<to>" subdirectory.
+      profile_steps: A `(start, stop)` pair of global steps delimiting the
+        window in which `profiler` runs. Inner training loops are shortened to
+        end at these steps. Required if `profiler` is set.
+      background_evaluator: An optional instance of `orbit.AbstractEvaluator`,
+        evaluating a separate copy of the model. If provided,
+        `train_and_evaluate` writes a snapshot of the checkpointed values at
+        every `eval_interval` (asynchronously, if supported) and keeps training
+        while this evaluator evaluates the snapshot on a background thread.
+        The eval summaries are written at the step of the snapshot. Requires
+        `checkpoint_manager`.
+      background_eval_checkpoint: The `tf.train.Checkpoint` of the model copy
+        of `background_evaluator`, into which the snapshots are restored. Its
+        objects must match those of the `checkpoint_manager`'s checkpoint,
+        which may have more.
+      max_pending_evals: The maximum number of background evaluations queued
+        or running. When reached, training waits for the oldest one to finish,
+        which bounds the host memory used by snapshots.
       summary_interval: Step interval for training summaries. Note that this
         argument only applies to `tf.summary` calls inside the `trainer.train`
         function. Summaries written by the `Controller` (specifically
@@ -135,6 +190,9 @@ class Controller:
       ValueError: If `steps_per_loop` is not a positive integer.
       ValueError: If `summary_interval` is not a positive integer or is not
         divisible by `steps_per_loop`.
+      ValueError: If `profiler` is set without a valid `profile_steps` window.
+      ValueError: If `background_evaluator` is set without
+        `background_eval_checkpoint` and `checkpoint_manager`.
     """
     if trainer is None and evaluator is None:
       raise ValueError("`trainer` and `evaluator` should not both be `None`.")
@@ -158,22 +216,62 @@ class Controller:
     if not isinstance(global_step, tf.Variable):
       raise ValueError("`global_step` must be a `tf.Variable`.")
 
+    if profiler is not None:
+      if profile_steps is None or not 0 <= profile_steps[0] < profile_steps[1]:
+        raise ValueError(
+            f"`profile_steps` ({profile_steps}) must be a (start, stop) pair "
+            "of steps with 0 <= start < stop when `profiler` is provided.")
+
+    if background_evaluator is not None:
+      if background_eval_checkpoint is None or checkpoint_manager is None:
+        raise ValueError(
+            "`background_eval_checkpoint` and `checkpoint_manager` are "
+            "required when `background_evaluator` is provided.")
+      if max_pending_evals < 1:
+        raise ValueError(
+            f"`max_pending_evals` ({max_pending_evals}) must be positive.")
+
     self.trainer = trainer
     self.evaluator = evaluator
+    self.background_evaluator = background_evaluator
 
     self.strategy = strategy or tf.distribute.get_strategy()
 
     self.global_step = global_step
     self.checkpoint_manager = checkpoint_manager
 
+    self.async_checkpoint = async_checkpoint
+    self._checkpoint_options = None
+    self._pending_checkpoint = None
+    if self.async_checkpoint:
+      self._checkpoint_options = _async_checkpoint_options()
+      if self._checkpoint_options is None:
+        logging.warning(
+            "This TensorFlow version does not support asynchronous "
+            "checkpoints, so `async_checkpoint` saves them synchronously.")
+      self._checkpoint_blocking_time = 0.0
+
+    if self.background_evaluator is not None:
+      self.background_eval_checkpoint = background_eval_checkpoint
+      self.max_pending_evals = max_pending_evals
+      self._eval_executor = concurrent.futures.ThreadPoolExecutor(
+          max_workers=1)
+      self._pending_evals = collections.deque()
+      self._snapshot_options = _async_checkpoint_options()
+
     if self.trainer is not None:
       self.step_timer = None
       self.steps_per_loop = steps_per_loop
       self.summary_interval = summary_interval
+      self.profiler = profiler
+      self.profile_steps = profile_steps
+      # The global step at which the profiler was started, if it is running.
+      self._profile_part_start = None
+      self._profile_dir = summary_dir
       self.summary_manager = utils.SummaryManager(
           summary_dir, tf.summary.scalar, global_step=self.global_step)
 
-    if self.evaluator is not None:
+    if self.evaluator is not None or self.background_evaluator is not None:
       eval_summary_dir = eval_summary_dir or summary_dir
       if eval_summary_dir == summary_dir and self.trainer is not None:
         # Reuse the summary writer if train and evaluation summary directory
@@ -202,7 +300,10 @@ class Controller:
     Args:
       steps: The global step count to train up to.
       checkpoint_at_completion: Whether to save a checkpoint when this method
-        returns (regardless of the checkpointing interval). Defaults to `True`.
+        returns (regardless of the checkpointing interval), and wait for it if
+        it is written asynchronously. Defaults to `True`. Otherwise, an
+        asynchronous save may still be in flight when this method returns. It
+        is then waited for by the next save or restore.
     """
     self._require("trainer", for_method="train")
 
@@ -212,12 +313,23 @@ class Controller:
     while current_step < steps:
       # Calculates steps to run for the next train loop.
       num_steps = min(steps - current_step, self.steps_per_loop)
+      if self.profiler is not None:
+        # Ends the train loop at the boundaries of the profiling window.
+        for boundary in self.profile_steps:
+          if current_step < boundary:
+            num_steps = min(num_steps, boundary - current_step)
+        self._update_profiler(current_step)
       self._train_n_steps(num_steps)
-      self._maybe_save_checkpoint()
+      with self._time_phase("checkpoint"):
+        self._maybe_save_checkpoint()
       current_step = self.global_step.numpy()
 
+    if self.profiler is not None:
+      self._update_profiler(current_step, training_done=True)
+
     if checkpoint_at_completion:
       self._maybe_save_checkpoint(check_interval=False)
+      self._wait_for_checkpoint()
 
   def evaluate(self, steps: int = -1) -> Optional[runner.Output]:
     """Runs evaluation for the given number of steps.
@@ -293,7 +405,8 @@ class Controller:
       ValueError: If eval_interval is not a multiple of self.steps_per_loop.
     """
     self._require("trainer", for_method="train_and_evaluate")
-    self._require("evaluator", for_method="train_and_evaluate")
+    if self.background_evaluator is None:
+      self._require("evaluator", for_method="train_and_evaluate")
 
     current_step = self.global_step.numpy()  # Cache, since this is expensive.
     eval_interval = eval_interval or (train_steps - current_step)
@@ -301,9 +414,15 @@ class Controller:
       interval = min(train_steps - current_step, eval_interval)
       num_steps = current_step + interval
       self.train(steps=num_steps, checkpoint_at_completion=False)
-      self.evaluate(steps=eval_steps)
+      if self.background_evaluator is not None:
+        self._evaluate_in_background(eval_steps)
+      else:
+        self.evaluate(steps=eval_steps)
       current_step = self.global_step.numpy()
     self._maybe_save_checkpoint(check_interval=False)
+    self._wait_for_checkpoint()
+    if self.background_evaluator is not None:
+      self.wait_for_background_evals()
 
   def evaluate_continuously(self,
                             steps: int = -1,
@@ -352,6 +471,7 @@ class Controller:
       restore occurred.
     """
     self._require("checkpoint_manager", for_method="restore_checkpoint")
+    self._wait_for_checkpoint()
 
     with self.strategy.scope():
       # Checkpoint restoring should be inside scope (b/139450638).
@@ -381,6 +501,7 @@ class Controller:
     """
     self._require("checkpoint_manager", for_method="save_checkpoint")
     self._maybe_save_checkpoint(check_interval=False)
+    self._wait_for_checkpoint()
 
   def _train_n_steps(self, num_steps: int):
     """Runs training for `num_steps` steps.
@@ -427,8 +548,64 @@ class Controller:
          f"output: {_format_output(train_output)}")
 
     train_output["steps_per_second"] = steps_per_second
-    self.summary_manager.write_summaries(train_output)
-    self.summary_manager.flush()
+    if self.async_checkpoint:
+      train_output["checkpoint_blocking_time"] = self._checkpoint_blocking_time
+      self._checkpoint_blocking_time = 0.0
+    with self._time_phase("summary"):
+      self.summary_manager.write_summaries(train_output)
+      self.summary_manager.flush()
+
+  @contextlib.contextmanager
+  def _time_phase(self, phase: str):
+    """Records the duration of its body in the trainer's step breakdown.
+
+    The durations are recorded if the trainer has a `step_breakdown`, e.g. an
+    `orbit.StandardTrainer` with `record_step_breakdown` set. They are part of
+    the step breakdown summaries returned by the trainer's next train loop.
+
+    Args:
+      phase: The name of the phase, e.g. "summary" or "checkpoint".
+
+    Yields:
+      Nothing.
+    """
+    step_breakdown = getattr(self.trainer, "step_breakdown", None)
+    if step_breakdown is None:
+      yield
+    else:
+      with step_breakdown.time(phase):
+        yield
+
+  def _update_profiler(self, current_step: int, training_done: bool = False):
+    """Starts or stops `self.profiler` according to `self.profile_steps`.
+
+    Args:
+      current_step: The global step before the next train loop.
+      training_done: Whether the current call to `train` is done, in which
+        case the profiler is stopped even if the window is not over yet, so
+        that its output is written. It is restarted by the next call to
+        `train`, and the output of each part of the window is written to a
+        directory named after the steps of that part.
+    """
+    start, stop = self.profile_steps
+    if (self._profile_part_start is None and not training_done and
+        start <= current_step < stop):
+      _log(f"train | step: {current_step: 6d} | starting the profiler...")
+      self.profiler.start()
+      self._profile_part_start = current_step
+    elif (self._profile_part_start is not None and
+          (current_step >= stop or training_done)):
+      self.profiler.stop()
+      part_start, self._profile_part_start = self._profile_part_start, None
+      if self._profile_dir is None:
+        logging.warning("The profiler output is not written, because "
+                        "`summary_dir` was not provided.")
+        return
+      profile_dir = os.path.join(self._profile_dir,
+                                 f"profile_{part_start}_{current_step}")
+      self.profiler.write(profile_dir)
+      _log(f"train | step: {current_step: 6d} | "
+           f"wrote the profiler output to {profile_dir}.")
 
   def _maybe_save_checkpoint(self, check_interval: bool = True):
     """Conditionally saves a checkpoint.
@@ -444,17 +621,108 @@ class Controller:
         was provided to `Controller.__init__`.
 
     Returns:
-      A boolean indicating whether a checkpoint was saved.
+      A boolean indicating whether a checkpoint was saved (or, if it is written
+      asynchronously, scheduled to be saved).
     """
     if self.checkpoint_manager and self.checkpoint_manager.checkpoint_interval:
+      start = time.time()
+      # Waits for the previous asynchronous save, and raises its error if any.
       ckpt_path = self.checkpoint_manager.save(
           checkpoint_number=self.global_step.numpy(),
-          check_interval=check_interval)
+          check_interval=check_interval,
+          options=self._checkpoint_options)
+      if self.async_checkpoint:
+        self._checkpoint_blocking_time += time.time() - start
       if ckpt_path is not None:
-        _log(f"saved checkpoint to {ckpt_path}.")
+        if self._checkpoint_options is not None:
+          self._pending_checkpoint = ckpt_path
+          _log(f"saving checkpoint to {ckpt_path} in the background.")
+        else:
+          _log(f"saved checkpoint to {ckpt_path}.")
         return True
     return False
 
+  def _evaluate_in_background(self, steps: int):
+    """Snapshots the model and evaluates the snapshot on a background thread.
+
+    Args:
+      steps: The number of evaluation steps to run, or -1 for a complete
+        evaluation.
+    """
+    if steps <= 0 and steps != -1:
+      raise ValueError(f"`steps` ({steps}) should be > 0, or == -1.")
+    # Bounds the number of snapshots held in memory.
+    while len(self._pending_evals) >= self.max_pending_evals:
+      self._pending_evals.popleft().result()
+    current_step = self.global_step.numpy()
+    _log(f" eval | step: {current_step: 6d} | "
+         "snapshotting the model for background evaluation...")
+    snapshot_prefix = os.path.join(self.checkpoint_manager.directory,
+                                   "eval_snapshots", f"snapshot-{current_step}")
+    tf.io.gfile.makedirs(os.path.dirname(snapshot_prefix))
+    # The values are copied to host memory before `write` returns, and written
+    # in the background if TF supports asynchronous checkpoints.
+    snapshot_path = self.checkpoint_manager.checkpoint.write(
+        snapshot_prefix, options=self._snapshot_options)
+    self._pending_evals.append(
+        self._eval_executor.submit(self._evaluate_snapshot, snapshot_path,
+                                   current_step, steps))
+
+  def _evaluate_snapshot(self, snapshot_path, step, steps):
+    """Evaluates the snapshot taken at `step` with the background evaluator."""
+    start = time.time()
+    try:
+      if self._snapshot_options is not None:
+        self.checkpoint_manager.checkpoint.sync()
+      # The default strategy, summary writer and summary step are thread-local.
+      with self.strategy.scope():
+        self.background_eval_checkpoint.restore(
+            snapshot_path).expect_partial()
+        with self.eval_summary_manager.summary_writer().as_default():
+          tf.summary.experimental.set_step(step)
+          steps_tensor = tf.convert_to_tensor(steps, dtype=tf.int32)
+          eval_output = self.background_evaluator.evaluate(steps_tensor)
+    finally:
+      for path in tf.io.gfile.glob(snapshot_path + ".*"):
+        tf.io.gfile.remove(path)
+    eval_output = tf.nest.map_structure(utils.get_value, eval_output or {})
+    elapsed = time.time() - start
+
+    _log(f" eval | step: {step: 6d} | "
+         f"background eval time: {elapsed: 6.1f} | "
+         f"output: {_format_output(eval_output)}")
+
+    self.eval_summary_manager.write_summaries(eval_output, step=step)
+    self.eval_summary_manager.flush()
+    return eval_output
+
+  def wait_for_background_evals(self):
+    """Waits for the pending background evaluations and returns their outputs.
+
+    Returns:
+      A list of the outputs of the background evaluations that were pending,
+      in the order they were started. Exceptions raised by an evaluation are
+      re-raised.
+    """
+    outputs = []
+    while self._pending_evals:
+      outputs.append(self._pending_evals.popleft().result())
+    return outputs
+
+  def _wait_for_checkpoint(self):
+    """Blocks until the in-flight asynchronous save (if any) completes.
+
+    Raises:
+      RuntimeError: If the checkpoint was not written.
+    """
+    if self._pending_checkpoint is None:
+      return
+    ckpt_path, self._pending_checkpoint = self._pending_checkpoint, None
+    self.checkpoint_manager.checkpoint.sync()
+    if not tf.io.gfile.exists(ckpt_path + ".index"):
+      raise RuntimeError(f"The asynchronous save of {ckpt_path} failed.")
+    _log(f"saved checkpoint to {ckpt_path}.")
+
   def _require(self, attribute, for_method):
     """Utility method to raise an error if the given `attribute` is not set."""
     if getattr(self, attribute, None) is None:
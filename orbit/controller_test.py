@@ -15,6 +15,7 @@
 """Tests for orbit.controller."""
 
 import os
+from unittest import mock
 
 from absl import logging
 from absl.testing import parameterized
@@ -61,7 +62,7 @@ class TestRunner(standard_runner.StandardTrainer,
                  standard_runner.StandardEvaluator):
   """Implements the training and evaluation APIs for the test model."""
 
-  def __init__(self, return_numpy=False):
+  def __init__(self, return_numpy=False, trainer_options=None):
     self.strategy = tf.distribute.get_strategy()
     self.model = create_model()
     self.optimizer = tf.keras.optimizers.RMSprop(learning_rate=0.1)
@@ -71,7 +72,8 @@ class TestRunner(standard_runner.StandardTrainer,
     self.return_numpy = return_numpy
     train_dataset = self.strategy.distribute_datasets_from_function(dataset_fn)
     eval_dataset = self.strategy.distribute_datasets_from_function(dataset_fn)
-    standard_runner.StandardTrainer.__init__(self, train_dataset)
+    standard_runner.StandardTrainer.__init__(
+        self, train_dataset, options=trainer_options)
     standard_runner.StandardEvaluator.__init__(self, eval_dataset)
 
   def train_step(self, iterator):
@@ -435,6 +437,244 @@ class ControllerTest(tf.test.TestCase, parameterized.TestCase):
     self.assertFalse(
         tf.io.gfile.exists(os.path.join(self.model_dir, "summaries/eval")))
 
+  def test_train_with_step_breakdown(self):
+    test_runner = TestRunner(
+        trainer_options=standard_runner.StandardTrainerOptions(
+            use_tf_while_loop=False, record_step_breakdown=True))
+    checkpoint = tf.train.Checkpoint(
+        model=test_runner.model, optimizer=test_runner.optimizer)
+    checkpoint_manager = tf.train.CheckpointManager(
+        checkpoint,
+        self.model_dir,
+        max_to_keep=None,
+        step_counter=test_runner.global_step,
+        checkpoint_interval=2)
+    test_controller = controller.Controller(
+        trainer=test_runner,
+        global_step=test_runner.global_step,
+        steps_per_loop=2,
+        summary_dir=os.path.join(self.model_dir, "summaries/train"),
+        checkpoint_manager=checkpoint_manager)
+    test_controller.train(steps=6)
+
+    # The summary and checkpoint times of a loop are summarized by the next.
+    train_summary_dir = os.path.join(self.model_dir, "summaries/train")
+    for phase in ("input_wait", "step", "train_loop_end", "summary",
+                  "checkpoint"):
+      self.assertNotEmpty(
+          summaries_with_matching_keyword(f"step_breakdown/{phase}_ms_p50",
+                                          train_summary_dir))
+
+  def test_async_checkpoint_matches_sync(self):
+
+    def train(model_dir, async_checkpoint):
+      test_runner = TestRunner()
+      test_runner.model.set_weights(
+          [np.full(w.shape, 0.1) for w in test_runner.model.get_weights()])
+      checkpoint = tf.train.Checkpoint(
+          model=test_runner.model, optimizer=test_runner.optimizer)
+      checkpoint_manager = tf.train.CheckpointManager(
+          checkpoint,
+          model_dir,
+          max_to_keep=3,
+          step_counter=test_runner.global_step,
+          checkpoint_interval=4)
+      test_controller = controller.Controller(
+          trainer=test_runner,
+          global_step=test_runner.global_step,
+          steps_per_loop=2,
+          summary_dir=os.path.join(model_dir, "summaries/train"),
+          checkpoint_manager=checkpoint_manager,
+          async_checkpoint=async_checkpoint)
+      test_controller.train(steps=14)
+      return checkpoint_manager
+
+    sync_manager = train(os.path.join(self.model_dir, "sync"), False)
+    async_manager = train(os.path.join(self.model_dir, "async"), True)
+
+    self.assertEqual(
+        [os.path.basename(path) for path in sync_manager.checkpoints],
+        [os.path.basename(path) for path in async_manager.checkpoints])
+    self.assertEqual(
+        tf.train.latest_checkpoint(async_manager.directory),
+        async_manager.latest_checkpoint)
+    for sync_path, async_path in zip(sync_manager.checkpoints,
+                                     async_manager.checkpoints):
+      sync_reader = tf.train.load_checkpoint(sync_path)
+      async_reader = tf.train.load_checkpoint(async_path)
+      self.assertEqual(sync_reader.get_variable_to_shape_map(),
+                       async_reader.get_variable_to_shape_map())
+      for name in sync_reader.get_variable_to_shape_map():
+        # Asynchronous saves may not update the saved `save_counter`, which
+        # `CheckpointManager` does not use for numbering.
+        if name.startswith("save_counter"):
+          continue
+        self.assertAllEqual(
+            sync_reader.get_tensor(name), async_reader.get_tensor(name))
+
+    self.assertNotEmpty(
+        summaries_with_matching_keyword(
+            "checkpoint_blocking_time",
+            os.path.join(async_manager.directory, "summaries/train")))
+    self.assertEmpty(
+        summaries_with_matching_keyword(
+            "checkpoint_blocking_time",
+            os.path.join(sync_manager.directory, "summaries/train")))
+
+  def test_async_checkpoint_is_waited_for_at_completion(self):
+    if controller._async_checkpoint_options() is None:
+      self.skipTest("Asynchronous checkpoints are not supported.")
+    test_runner = TestRunner()
+    checkpoint = tf.train.Checkpoint(
+        model=test_runner.model, optimizer=test_runner.optimizer)
+    checkpoint_manager = tf.train.CheckpointManager(
+        checkpoint,
+        self.model_dir,
+        max_to_keep=None,
+        step_counter=test_runner.global_step,
+        checkpoint_interval=4)
+    test_controller = controller.Controller(
+        trainer=test_runner,
+        evaluator=TestEvaluator(),
+        global_step=test_runner.global_step,
+        steps_per_loop=2,
+        checkpoint_manager=checkpoint_manager,
+        async_checkpoint=True)
+
+    with mock.patch.object(
+        checkpoint, "sync", side_effect=checkpoint.sync) as sync:
+      test_controller.train_and_evaluate(
+          train_steps=12, eval_steps=2, eval_interval=4)
+    # The saves at the end of the eval intervals overlap with the evaluations.
+    sync.assert_called_once()
+    self.assertEqual(
+        os.path.join(self.model_dir, "ckpt-12"),
+        checkpoint_manager.latest_checkpoint)
+    for path in checkpoint_manager.checkpoints:
+      self.assertTrue(tf.io.gfile.exists(path + ".index"))
+
+  def test_background_eval_matches_sync_eval(self):
+
+    def eval_losses(summary_dir):
+      losses = {}
+      for path in tf.io.gfile.glob(os.path.join(summary_dir, "events*")):
+        for event in tf.compat.v1.train.summary_iterator(path):
+          for value in event.summary.value:
+            if value.tag == "eval_loss":
+              losses[event.step] = tf.make_ndarray(value.tensor)
+      return losses
+
+    def train_and_evaluate(model_dir, background):
+      tf.random.set_seed(1)
+      test_runner = TestRunner()
+      checkpoint = tf.train.Checkpoint(
+          model=test_runner.model, optimizer=test_runner.optimizer)
+      checkpoint_manager = tf.train.CheckpointManager(
+          checkpoint,
+          model_dir,
+          max_to_keep=None,
+          step_counter=test_runner.global_step)
+      kwargs = {}
+      if background:
+        background_runner = TestRunner()
+        kwargs = dict(
+            background_evaluator=background_runner,
+            background_eval_checkpoint=tf.train.Checkpoint(
+                model=background_runner.model),
+            max_pending_evals=2)
+      test_controller = controller.Controller(
+          trainer=test_runner,
+          evaluator=None if background else test_runner,
+          global_step=test_runner.global_step,
+          steps_per_loop=2,
+          checkpoint_manager=checkpoint_manager,
+          summary_dir=os.path.join(model_dir, "summaries/train"),
+          eval_summary_dir=os.path.join(model_dir, "summaries/eval"),
+          **kwargs)
+      if background:
+        # A file of a later snapshot, whose name starts with the name of the
+        # snapshot at step 4.
+        snapshot_dir = os.path.join(model_dir, "eval_snapshots")
+        tf.io.gfile.makedirs(snapshot_dir)
+        with tf.io.gfile.GFile(
+            os.path.join(snapshot_dir, "snapshot-40.index"), "w") as f:
+          f.write("")
+      test_controller.train_and_evaluate(
+          train_steps=10, eval_steps=2, eval_interval=4)
+      return eval_losses(os.path.join(model_dir, "summaries/eval"))
+
+    sync_losses = train_and_evaluate(
+        os.path.join(self.model_dir, "sync"), background=False)
+    background_losses = train_and_evaluate(
+        os.path.join(self.model_dir, "background"), background=True)
+    self.assertEqual([4, 8, 10], sorted(sync_losses))
+    self.assertAllClose(sync_losses, background_losses)
+    # The snapshots are deleted once evaluated, and only their own files.
+    self.assertEqual(
+        ["snapshot-40.index"],
+        tf.io.gfile.listdir(
+            os.path.join(self.model_dir, "background", "eval_snapshots")))
+
+  def test_profile_steps(self):
+
+    class FakeProfiler:
+
+      def __init__(self, global_step):
+        self.global_step = global_step
+        self.events = []
+
+      def start(self):
+        self.events.append(("start", self.global_step.numpy()))
+
+      def stop(self):
+        self.events.append(("stop", self.global_step.numpy()))
+
+      def write(self, directory):
+        self.events.append(("write", directory))
+
+    test_runner = TestRunner()
+    profiler = FakeProfiler(test_runner.global_step)
+    summary_dir = os.path.join(self.model_dir, "summaries/train")
+    test_controller = controller.Controller(
+        trainer=test_runner,
+        global_step=test_runner.global_step,
+        steps_per_loop=4,
+        summary_dir=summary_dir,
+        profiler=profiler,
+        profile_steps=(3, 6))
+    test_controller.train(steps=10)
+    self.assertEqual(
+        [("start", 3), ("stop", 6),
+         ("write", os.path.join(summary_dir, "profile_3_6"))], profiler.events)
+
+    # The window is split by the evaluation at step 4, and each part is written
+    # to its own directory.
+    test_runner = TestRunner()
+    profiler = FakeProfiler(test_runner.global_step)
+    test_controller = controller.Controller(
+        trainer=test_runner,
+        evaluator=test_runner,
+        global_step=test_runner.global_step,
+        steps_per_loop=4,
+        summary_dir=summary_dir,
+        profiler=profiler,
+        profile_steps=(3, 6))
+    test_controller.train_and_evaluate(
+        train_steps=10, eval_steps=2, eval_interval=4)
+    self.assertEqual(
+        [("start", 3), ("stop", 4),
+         ("write", os.path.join(summary_dir, "profile_3_4")),
+         ("start", 4), ("stop", 6),
+         ("write", os.path.join(summary_dir, "profile_4_6"))], profiler.events)
+
+    with self.assertRaisesRegex(ValueError, "profile_steps"):
+      controller.Controller(
+          trainer=test_runner,
+          global_step=test_runner.global_step,
+          steps_per_loop=4,
+          profiler=profiler,
+          profile_steps=(6, 3))
+
   def test_evaluate_only(self):
     test_runner = TestRunner()
 
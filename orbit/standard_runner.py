@@ -39,7 +39,10 @@ from typing import Any, Optional
 
 import dataclasses
 
+from absl import logging
+
 from orbit import runner
+from orbit import utils
 from orbit.utils import loop_fns
 
 import tensorflow as tf
@@ -62,14 +65,30 @@ class StandardTrainerOptions:
       `True`, this optimization creates two `tf.function`s with two XLA programs
       (one with summary calls, and one without). The program with summaries runs
       only for one step when summaries should be recorded.
+    record_step_breakdown: A boolean indicating whether to record the time
+      spent waiting for the inputs, in the train steps and in
+      `train_loop_begin`/`train_loop_end`, in an `orbit.utils.StepBreakdown`.
+      The loop then returns to Python at every step, so `use_tf_while_loop`
+      must be `False`, and `train_step` must dequeue each iterator at most once
+      per step. The mean and percentile durations are added to the output of
+      `train`, and thus written as summaries by `orbit.Controller`.
+    step_breakdown_window: The number of most recent steps (or loops) over
+      which the percentiles of the step breakdown are computed.
   """
   use_tf_function: bool = True
   use_tf_while_loop: bool = True
   use_tpu_summary_optimization: bool = False
+  record_step_breakdown: bool = False
+  step_breakdown_window: int = 1000
 
 
-def _create_train_loop_fn(train_step_fn, options: StandardTrainerOptions):
+def _create_train_loop_fn(train_step_fn,
+                          options: StandardTrainerOptions,
+                          step_breakdown=None):
   """Creates a training loop from the given step function and options."""
+  if step_breakdown is not None:
+    return loop_fns.create_timed_loop_fn(
+        train_step_fn, step_breakdown, use_tf_function=options.use_tf_function)
   if options.use_tf_while_loop:
     loop_fn = loop_fns.create_tf_while_loop_fn(train_step_fn)
     if options.use_tpu_summary_optimization:
@@ -113,11 +132,18 @@ class StandardTrainer(runner.AbstractTrainer, metaclass=abc.ABCMeta):
     if options.use_tpu_summary_optimization and not options.use_tf_while_loop:
       raise ValueError("`use_tpu_summary_optimization=True` and "
                        "`use_tf_while_loop=False` is not supported")
+    if options.record_step_breakdown and options.use_tf_while_loop:
+      raise ValueError("`record_step_breakdown=True` and "
+                       "`use_tf_while_loop=True` is not supported")
 
     self._train_options = options
     self._train_dataset = train_dataset
     self._train_iter = None
     self._train_loop_fn = None
+    self._step_breakdown = None
+    if options.record_step_breakdown:
+      self._step_breakdown = utils.StepBreakdown(
+          window=options.step_breakdown_window)
 
   def train(self, num_steps: tf.Tensor) -> Optional[runner.Output]:
     """Implements `num_steps` steps of training.
@@ -127,19 +153,39 @@ class StandardTrainer(runner.AbstractTrainer, metaclass=abc.ABCMeta):
         to the number of calls made to `train_step`.
 
     Returns:
-      The output of `train_loop_end`.
+      The output of `train_loop_end`. If `record_step_breakdown` is set, the
+      summaries of the step breakdown are added to it.
     """
-    self.train_loop_begin()
+    if self._step_breakdown is None:
+      self.train_loop_begin()
+    else:
+      with self._step_breakdown.time("train_loop_begin"):
+        self.train_loop_begin()
 
     if self._train_loop_fn is None:
       self._train_loop_fn = _create_train_loop_fn(
-          self.train_step, options=self._train_options)
+          self.train_step,
+          options=self._train_options,
+          step_breakdown=self._step_breakdown)
 
     if self._train_iter is None:
       self._train_iter = tf.nest.map_structure(iter, self.train_dataset)
 
     self._train_loop_fn(self._train_iter, num_steps)
-    return self.train_loop_end()
+    if self._step_breakdown is None:
+      return self.train_loop_end()
+
+    with self._step_breakdown.time("train_loop_end"):
+      output = self.train_loop_end()
+    summaries = self._step_breakdown.loop_summaries()
+    logging.info("Step breakdown (ms):\n%s", self._step_breakdown.report())
+    if output is None:
+      return summaries
+    if isinstance(output, dict):
+      return {**output, **summaries}
+    logging.warning("The step breakdown is not returned, because the output "
+                    "of `train_loop_end` is not a dictionary.")
+    return output
 
   def train_loop_begin(self):
     """Called once at the beginning of the training loop.
@@ -187,6 +233,11 @@ class StandardTrainer(runner.AbstractTrainer, metaclass=abc.ABCMeta):
     """
     pass
 
+  @property
+  def step_breakdown(self) -> Optional[utils.StepBreakdown]:
+    """The `orbit.utils.StepBreakdown`, if `record_step_breakdown` is set."""
+    return self._step_breakdown
+
   @property
   def train_dataset(self):
     """The current training dataset."""
@@ -58,6 +58,13 @@ class TestTrainer(standard_runner.StandardTrainer):
     return self.global_step.numpy()
 
 
+class TestDictTrainer(TestTrainer):
+  """A TestTrainer returning a dictionary from `train_loop_end`."""
+
+  def train_loop_end(self):
+    return {"steps": self.global_step.numpy()}
+
+
 class TestEvaluator(standard_runner.StandardEvaluator):
   """A StandardEvaluator subclass for tests."""
 
@@ -122,6 +129,27 @@ class StandardRunnerTest(parameterized.TestCase):
     trainer = TestTrainer(options)
     self.assertEqual(trainer.train(tf.constant(10)), 10)
 
+  @parameterized.named_parameters(("use_tf_function", True), ("", False))
+  def test_trainer_with_step_breakdown(self, use_tf_function):
+    options = standard_runner.StandardTrainerOptions(
+        use_tf_function=use_tf_function,
+        use_tf_while_loop=False,
+        record_step_breakdown=True)
+    trainer = TestDictTrainer(options)
+    output = trainer.train(tf.constant(10))
+    self.assertEqual(output["steps"], 10)
+    for phase in ("input_wait", "step", "train_loop_begin", "train_loop_end"):
+      self.assertIn(f"step_breakdown/{phase}_ms", output)
+      self.assertIn(f"step_breakdown/{phase}_ms_p90", output)
+    self.assertBetween(output["step_breakdown/input_wait_fraction"], 0., 1.)
+    self.assertLen(trainer.step_breakdown._rolling["step"], 10)  # pylint: disable=protected-access
+
+  def test_step_breakdown_requires_python_loop(self):
+    options = standard_runner.StandardTrainerOptions(
+        record_step_breakdown=True)
+    with self.assertRaises(ValueError):
+      TestTrainer(options)
+
   @parameterized.named_parameters(("use_tf_while_loop", True), ("", False))
   def test_default_evaluator(self, use_tf_while_loop):
     options = standard_runner.StandardEvaluatorOptions(
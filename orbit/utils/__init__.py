@@ -21,9 +21,12 @@ from orbit.utils.common import make_distributed_dataset
 from orbit.utils.epoch_helper import EpochHelper
 
 from orbit.utils.loop_fns import create_loop_fn
+from orbit.utils.loop_fns import create_timed_loop_fn
 from orbit.utils.loop_fns import create_tf_while_loop_fn
 from orbit.utils.loop_fns import LoopFnWithSummaries
 
+from orbit.utils.step_breakdown import StepBreakdown
+
 from orbit.utils.summary_manager import SummaryManager
 
 from orbit.utils.tpu_summaries import OptionalSummariesFunction
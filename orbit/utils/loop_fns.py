@@ -14,6 +14,8 @@
 
 """Utilities for creating loop functions."""
 
+import time
+
 from orbit.utils import tpu_summaries
 
 import tensorflow as tf
@@ -83,6 +85,86 @@ def create_loop_fn(step_fn):
   return loop_fn
 
 
+class _SingleElementIterator:
+  """An iterator yielding an element that was already dequeued."""
+
+  def __init__(self, element):
+    self._element = element
+
+  def __iter__(self):
+    return self
+
+  def __next__(self):
+    return self._element
+
+  def get_next(self):
+    return self._element
+
+
+def create_timed_loop_fn(step_fn, step_breakdown, use_tf_function=True):
+  """Creates a loop function recording the input wait and step times.
+
+  Each step first dequeues the next element of every iterator eagerly, timing
+  it as "input_wait", then calls `step_fn` with iterators yielding these
+  elements, timing it as "step". This requires `step_fn` to dequeue each of its
+  iterators at most once per step.
+
+  The durations are measured on the host. On GPUs and TPUs, ops run
+  asynchronously, so the "step" time is only the time to dispatch the step
+  unless the device falls behind. The device time then shows up in the next
+  host-side wait, mostly as "input_wait", rather than in "step".
+
+  Args:
+    step_fn: A function taking a nested structure of iterators.
+    step_breakdown: An `orbit.utils.StepBreakdown` recording the durations.
+    use_tf_function: Whether to run the steps in a `tf.function`, traced with
+      the dequeued elements as inputs.
+
+  Returns:
+    A loop function taking required `iterator` and `num_steps` parameters, like
+    the loop functions of `create_loop_fn`. The outputs of `step_fn` are
+    ignored.
+  """
+
+  def element_step_fn(structure, elements):
+    # `structure` mirrors the structure of the iterators, and is part of the
+    # `tf.function` cache key; `elements` holds an element of each iterator.
+    iterators = [_SingleElementIterator(element) for element in elements]
+    return step_fn(tf.nest.pack_sequence_as(structure, iterators))
+
+  if use_tf_function:
+    element_step_fn = tf.function(element_step_fn)
+
+  def loop_fn(iterator, num_steps):
+    """Makes `num_steps` timed calls to `step_fn`.
+
+    Args:
+      iterator: A nested structure of `tf.data.Iterator` or
+        `DistributedIterator`.
+      num_steps: The number of steps in the loop. If `num_steps == -1`, will
+        iterate until exausting the iterator.
+    """
+    structure = tf.nest.map_structure(lambda _: 0, iterator)
+    iterators = tf.nest.flatten(iterator)
+    # Unlike `create_loop_fn`, the loop doesn't run in an `async_scope`, where
+    # the ops would return before being executed and the timings would only
+    # measure their dispatch.
+    step = 0
+    while num_steps == -1 or step < num_steps:
+      start = time.time()
+      try:
+        elements = [next(it) for it in iterators]
+      except (StopIteration, tf.errors.OutOfRangeError):
+        return
+      dequeued = time.time()
+      element_step_fn(structure, elements)
+      step_breakdown.record("input_wait", dequeued - start)
+      step_breakdown.record("step", time.time() - dequeued)
+      step += 1
+
+  return loop_fn
+
+
 def create_tf_while_loop_fn(step_fn):
   """Creates a loop function compatible with TF's AutoGraph loop conversion.
 
@@ -0,0 +1,116 @@
+# Copyright 2021 The Orbit Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Provides a utility class recording where the time of training is spent."""
+
+import collections
+import contextlib
+import time
+
+from typing import Dict, Sequence
+
+import numpy as np
+
+
+class StepBreakdown:
+  """Records the time spent in each phase of the training loops.
+
+  Durations are recorded with `record` or the `time` context manager. The
+  recordings of the current loop are summarized by `loop_summaries`, which
+  returns the mean duration of each phase, in milliseconds, along with the
+  percentiles of the durations recorded over the last `window` recordings of
+  each phase. Comparing e.g. `input_wait` to `step` then tells whether a job is
+  input-bound or device-bound.
+
+  The phases recorded by `orbit.StandardTrainer` and `orbit.Controller` are:
+
+    input_wait: host time spent in `next(iterator)`, per step.
+    step: time of the (possibly compiled) train step, per step.
+    train_loop_begin, train_loop_end: time of these methods, per train loop.
+    summary: time spent writing and flushing the train summaries, per loop.
+    checkpoint: time spent saving (or scheduling) checkpoints, per loop.
+  """
+
+  def __init__(self,
+               window: int = 1000,
+               percentiles: Sequence[int] = (50, 90, 99),
+               prefix: str = "step_breakdown"):
+    """Initializes the instance.
+
+    Args:
+      window: The number of most recent recordings of each phase over which
+        percentiles are computed.
+      percentiles: The percentiles to report.
+      prefix: The prefix of the names of the summaries.
+    """
+    self._window = window
+    self._percentiles = tuple(percentiles)
+    self._prefix = prefix
+    self._loop = collections.defaultdict(list)
+    self._rolling = collections.defaultdict(
+        lambda: collections.deque(maxlen=self._window))
+
+  def record(self, phase: str, seconds: float):
+    """Records a duration of `phase`."""
+    self._loop[phase].append(seconds)
+    self._rolling[phase].append(seconds)
+
+  @contextlib.contextmanager
+  def time(self, phase: str):
+    """A context manager recording the duration of its body as `phase`."""
+    start = time.time()
+    try:
+      yield
+    finally:
+      self.record(phase, time.time() - start)
+
+  def loop_summaries(self, reset: bool = True) -> Dict[str, float]:
+    """Returns the summaries of the recordings since the last reset.
+
+    Args:
+      reset: Whether to clear the recordings of the current loop. The rolling
+        windows used for the percentiles are kept.
+
+    Returns:
+      A dictionary with, for every recorded phase, the mean duration in the
+      loop as "<prefix>/<phase>_ms" and the rolling percentiles as
+      "<prefix>/<phase>_ms_p<percentile>", plus the fraction of the step time
+      spent waiting for the inputs as "<prefix>/input_wait_fraction".
+    """
+    summaries = {}
+    for phase, durations in sorted(self._loop.items()):
+      name = f"{self._prefix}/{phase}_ms"
+      summaries[name] = 1e3 * float(np.mean(durations))
+      rolling = 1e3 * np.asarray(self._rolling[phase])
+      for percentile, value in zip(self._percentiles,
+                                   np.percentile(rolling, self._percentiles)):
+        summaries[f"{name}_p{percentile}"] = float(value)
+    if "input_wait" in self._loop:
+      input_wait = sum(self._loop["input_wait"])
+      total = input_wait + sum(self._loop.get("step", ()))
+      summaries[f"{self._prefix}/input_wait_fraction"] = (
+          input_wait / total if total > 0 else 0.)
+    if reset:
+      self._loop.clear()
+    return summaries
+
+  def report(self) -> str:
+    """Returns a table of the rolling percentiles of each phase, in ms."""
+    header = "".join(f"{'p' + str(p):>10}" for p in self._percentiles)
+    lines = [f"{'phase':<20}{header}{'count':>8}"]
+    for phase, durations in sorted(self._rolling.items()):
+      values = np.percentile(1e3 * np.asarray(durations), self._percentiles)
+      row = "".join(f"{value:10.3f}" for value in values)
+      lines.append(f"{phase:<20}{row}{len(durations):8d}")
+    return "\n".join(lines)
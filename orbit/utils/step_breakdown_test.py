@@ -0,0 +1,54 @@
+# Copyright 2021 The Orbit Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for orbit.utils.step_breakdown."""
+
+from orbit.utils import step_breakdown
+
+import tensorflow as tf
+
+
+class StepBreakdownTest(tf.test.TestCase):
+
+  def test_loop_summaries(self):
+    breakdown = step_breakdown.StepBreakdown(window=4, percentiles=(50,))
+    for seconds in (0.001, 0.002, 0.003):
+      breakdown.record("input_wait", seconds)
+      breakdown.record("step", 3 * seconds)
+    summaries = breakdown.loop_summaries()
+    self.assertAllClose(summaries["step_breakdown/input_wait_ms"], 2.)
+    self.assertAllClose(summaries["step_breakdown/step_ms_p50"], 6.)
+    self.assertAllClose(summaries["step_breakdown/input_wait_fraction"], 0.25)
+
+    # The loop recordings are reset, but the percentiles are over the window.
+    for seconds in (0.010, 0.020):
+      breakdown.record("step", seconds)
+    summaries = breakdown.loop_summaries()
+    self.assertAllClose(summaries["step_breakdown/step_ms"], 15.)
+    self.assertAllClose(summaries["step_breakdown/step_ms_p50"], 9.5)
+    self.assertNotIn("step_breakdown/input_wait_ms", summaries)
+    self.assertNotIn("step_breakdown/input_wait_fraction", summaries)
+
+  def test_time_and_report(self):
+    breakdown = step_breakdown.StepBreakdown()
+    with breakdown.time("summary"):
+      pass
+    self.assertIn("step_breakdown/summary_ms", breakdown.loop_summaries())
+    report = breakdown.report()
+    self.assertIn("p99", report)
+    self.assertIn("summary", report)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -246,6 +246,10 @@ class YoloTask(cfg.TaskConfig):
   annotation_file: Optional[str] = None
   gradient_clip_norm: float = 0.0
   per_category_metrics: bool = False
+  # Matches detections to groundtruths as eval batches arrive instead of
+  # buffering them for pycocotools.
+  use_streaming_eval: bool = False
+  num_eval_processes: int = 1
 
   load_darknet_weights: bool = True
   darknet_load_decoder: bool = True
@@ -114,7 +114,9 @@ class YoloTask(base_task.Task):
         dataset_fn=tf.data.TFRecordDataset,
         decoder_fn=decoder.decode,
         parser_fn=parser.parse_fn(params.is_training),
-        postprocess_fn=parser.postprocess_fn(params.is_training))
+        postprocess_fn=parser.postprocess_fn(params.is_training),
+        snapshot_fns=parser.snapshot_fns(params.is_training),
+        snapshot_key=parser.snapshot_key())
     dataset = reader.read(input_context=input_context)
     return dataset
 
@@ -158,7 +160,9 @@ class YoloTask(base_task.Task):
           annotation_file=self.task_config.annotation_file,
           include_mask=False,
           need_rescale_bboxes=False,
-          per_category_metrics=self._task_config.per_category_metrics)
+          per_category_metrics=self._task_config.per_category_metrics,
+          use_streaming_eval=self._task_config.use_streaming_eval,
+          num_eval_processes=self._task_config.num_eval_processes)
     return metrics
 
   def train_step(self, inputs, model, optimizer, metrics=None):
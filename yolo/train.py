@@ -23,12 +23,11 @@ except BaseException:
 from absl import app
 from absl import flags
 import gin
+import os
 import sys
 
+from official.core import registry_manifest
 from official.core import train_utils
-# pylint: disable=unused-import
-from yolo.common import registry_imports
-# pylint: enable=unused-import
 from official.common import distribute_utils
 from official.common import flags as tfm_flags
 from official.core import task_factory
@@ -36,6 +35,12 @@ from official.core import train_lib
 from official.modeling import performance
 
 FLAGS = flags.FLAGS
+
+# Registers the experiments, tasks and backbones without importing them, so
+# that only the modules of the launched experiment are imported.
+registry_manifest.load(
+    os.path.join(os.path.dirname(__file__), 'common', 'registry_manifest.json'),
+    'yolo.common.registry_imports')
 """
 export LD_LIBRARY_PATH=/usr/local/cuda/lib64
 """